@@ -7,18 +7,59 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 CACHE_DIR = os.path.join(DATA_DIR, "cache")
 CACHE_FILE = os.path.join(CACHE_DIR, "processed_files.json")
 LOG_DIR = os.path.join(DATA_DIR, "logs")
+REPORTS_DIR = os.path.join(DATA_DIR, "reports")
+# Content-addressed store of raw reports; point several checkouts at one directory to
+# share downloads
+CONTENT_STORE_DIR = os.path.join(DATA_DIR, "store")
+CONTENT_STORE_INDEX_BATCH = 64  # new index entries kept in memory before a write
+# Parsed reports in the memory-mapped columnar format
+COLUMNAR_DIR = os.path.join(DATA_DIR, "columnar")
+# Generated reports keyed by a fingerprint of their inputs, evicted least recently used
+# first
+REPORT_CACHE_DIR = os.path.join(CACHE_DIR, "reports")
+REPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# SQLite database of parsed rows and summaries, loaded incrementally per report
+SQLITE_PATH = os.path.join(DATA_DIR, "icann_reports.sqlite")
+SQLITE_BATCH_ROWS = 50000  # rows inserted per transaction
+# State of the resident service: the running aggregate and the reports it has applied
+SERVICE_STATE_DIR = os.path.join(DATA_DIR, "service")
+SERVICE_POLL_INTERVAL = 3600  # seconds between checks for newly published reports
+# HTTP API serving slices of the generated reports from memory
+API_HOST = "127.0.0.1"
+API_PORT = 8080
+API_PAGE_SIZE = 100  # items per page unless a request asks for another size
+API_MAX_PAGE_SIZE = 1000
+API_GZIP_MIN_BYTES = 1024  # smaller responses are not worth compressing
+API_RESPONSE_CACHE_SIZE = 256  # encoded responses kept until the reports change
 
 # Network settings
 DOWNLOAD_TIMEOUT = 30  # seconds
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # bytes read per chunk when streaming a download
 MAX_RETRIES = 3
-RETRY_DELAY = 2  # seconds
+RETRY_DELAY = 2  # seconds, base of the exponential backoff
+RETRY_MAX_DELAY = 60  # seconds, cap on a single backoff or Retry-After wait
+RETRY_BUDGET = 50  # retries allowed per run across all downloads
+
+# Adaptive download concurrency (AIMD) settings
+DOWNLOAD_CONCURRENCY_MIN = 1
+DOWNLOAD_CONCURRENCY_INITIAL = 4
+DOWNLOAD_CONCURRENCY_MAX = 12
+DOWNLOAD_LATENCY_TARGET = 10  # seconds
+DOWNLOAD_CONCURRENCY_COOLDOWN = 2  # seconds
 
 # Processing settings
 MAX_WORKERS = 12
+
+# Shared work queue settings for runs spread over several hosts
+LEASE_SECONDS = 300  # seconds a worker's claim on a report lasts unless renewed
+QUEUE_POLL_INTERVAL = 5  # seconds between checks for claimable reports
 CUTOFF_FILE = "com-transactions-201003-en.csv"
 
 # Base URL for reports
-BASE_URL = "https://www.icann.org/sites/default/files/mrr/{tld}/{tld}-transactions-{date}-en.csv"
+BASE_URL = (
+    "https://www.icann.org/sites/default/files/mrr/"
+    "{tld}/{tld}-transactions-{date}-en.csv"
+)
 
 # Expected field names and their descriptions for validation
 EXPECTED_FIELDS: Dict[str, str] = {
@@ -47,10 +88,13 @@ EXPECTED_FIELDS: Dict[str, str] = {
     "Net-renews-8-yr": "Domains renewed with 8-year term",
     "Net-renews-9-yr": "Domains renewed with 9-year term",
     "Net-renews-10-yr": "Domains renewed with 10-year term",
-    "Transfer-gaining-successful": "Transfers initiated and accepted by other registrar",
+    "Transfer-gaining-successful": "Transfers initiated and accepted by other "
+    "registrar",
     "Transfer-gaining-nacked": "Transfers initiated and rejected by other registrar",
-    "Transfer-losing-successful": "Transfers initiated by others and accepted by this registrar",
-    "Transfer-losing-nacked": "Transfers initiated by others and rejected by this registrar",
+    "Transfer-losing-successful": "Transfers initiated by others and accepted by this "
+    "registrar",
+    "Transfer-losing-nacked": "Transfers initiated by others and rejected by this "
+    "registrar",
     "Transfer-disputed-won": "Transfer disputes won",
     "Transfer-disputed-lost": "Transfer disputes lost",
     "Transfer-disputed-nodecision": "Transfer disputes with split or no decision",
@@ -69,4 +113,4 @@ HEADER_PATTERNS = [
 # Create necessary directories
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(CACHE_DIR, exist_ok=True)
-os.makedirs(LOG_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(LOG_DIR, exist_ok=True)
@@ -0,0 +1,465 @@
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from config import (
+    API_GZIP_MIN_BYTES,
+    API_HOST,
+    API_MAX_PAGE_SIZE,
+    API_PAGE_SIZE,
+    API_PORT,
+    API_RESPONSE_CACHE_SIZE,
+    REPORTS_DIR,
+)
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="api")
+
+# Reports the API serves from, as written by ReportGenerator
+API_REPORT_NAMES = ["registrar_id_summary", "tld_summary"]
+
+# Request durations are well under the pipeline's default buckets
+API_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+# Route name -> path pattern, matched in order
+ROUTES = [
+    ("index", re.compile(r"/?")),
+    ("registrars", re.compile(r"/registrars/?")),
+    ("registrar", re.compile(r"/registrars/([^/]+)/?")),
+    ("tlds", re.compile(r"/tlds/?")),
+    ("tld", re.compile(r"/tlds/([^/]+)/?")),
+    ("timeseries", re.compile(r"/tlds/([^/]+)/timeseries/?")),
+]
+
+
+class APIError(Exception):
+    """Request that cannot be answered, with the HTTP status to answer it with."""
+
+    def __init__(self, status: int, message: str):
+        """Initialize the error with its HTTP status."""
+        super().__init__(message)
+        self.status = status
+
+
+def _month(key: str) -> str:
+    """Get a monthly_data key as YYYY-MM, e.g. "2024-01" for "202401"."""
+    return f"{key[:4]}-{key[4:]}" if len(key) == 6 else key
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Check whether an Accept-Encoding header allows gzip."""
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.strip()
+            return not re.fullmatch(r"q\s*=\s*0(\.0*)?", quality)
+    return False
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against a weak ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return etag in tags or etag[2:] in tags
+
+
+class ReportAPI:
+    """Registrar, TLD and time-series slices of the generated reports.
+
+    The reports are parsed once and kept in memory with the lookups the
+    routes need, so the cost of a request depends on the slice it asks for
+    rather than on the size of the report files. Before each request the
+    report files are stat'ed. If ReportGenerator has replaced any of them
+    since they were loaded, or invalidate() was called, they are loaded
+    again. Encoded responses are cached, with their gzip form, until then.
+
+    ETags are derived from the report files' modification times and sizes
+    and the request, so a conditional request is answered with 304 before
+    any body is built.
+    """
+
+    def __init__(
+        self,
+        reports_dir: str = REPORTS_DIR,
+        page_size: int = API_PAGE_SIZE,
+        max_page_size: int = API_MAX_PAGE_SIZE,
+        gzip_min_bytes: int = API_GZIP_MIN_BYTES,
+        response_cache_size: int = API_RESPONSE_CACHE_SIZE,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """Initialize the API over a reports directory.
+
+        Args:
+            reports_dir: Directory ReportGenerator writes the reports to
+            page_size: Items per page when a request does not ask for a size
+            max_page_size: Largest page size a request may ask for
+            gzip_min_bytes: Smallest response body compressed for clients accepting gzip
+            response_cache_size: Encoded responses kept between report changes
+            metrics: MetricsRegistry to record requests and report loads in
+        """
+        self.reports_dir = reports_dir
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.gzip_min_bytes = gzip_min_bytes
+        self.response_cache_size = response_cache_size
+        self.metrics = metrics or MetricsRegistry()
+        self._lock = threading.Lock()
+        self._snapshot = self._build_snapshot(
+            None, {name: {} for name in API_REPORT_NAMES}
+        )
+        self._invalidated = True
+
+    def _report_path(self, report_name: str) -> str:
+        return os.path.join(self.reports_dir, f"{report_name}.json")
+
+    def _file_signature(self) -> Tuple[Any, ...]:
+        """Get the modification time and size of every report file."""
+        signature = []
+        for report_name in API_REPORT_NAMES:
+            try:
+                stat = os.stat(self._report_path(report_name))
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    @staticmethod
+    def _build_snapshot(
+        signature: Optional[Tuple[Any, ...]], reports: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build the lookups the routes answer from; snapshots are never changed."""
+        registrars = list(reports["registrar_id_summary"].values())
+        registrars_by_tld: Dict[str, List[Dict[str, Any]]] = {}
+        for registrar in registrars:
+            for tld in registrar.get("tlds", {}):
+                registrars_by_tld.setdefault(tld.lower(), []).append(registrar)
+        return {
+            "signature": signature,
+            "registrar_ids": reports["registrar_id_summary"],
+            "registrars": registrars,
+            # Lower-case TLD -> registrars with figures for it
+            "registrars_by_tld": registrars_by_tld,
+            # Lower-case TLD -> TLD summary
+            "tlds": {
+                tld.lower(): summary for tld, summary in reports["tld_summary"].items()
+            },
+            # Canonical request -> [body, gzip body or None until asked for], least
+            # recently used first
+            "responses": OrderedDict(),
+        }
+
+    def invalidate(self) -> None:
+        """Load the reports again at the next request, even if they look unchanged."""
+        with self._lock:
+            self._invalidated = True
+
+    def _current_snapshot(self) -> Dict[str, Any]:
+        """Get a snapshot of the current reports, loading them again if they changed."""
+        signature = self._file_signature()
+        with self._lock:
+            if not self._invalidated and signature == self._snapshot["signature"]:
+                return self._snapshot
+            reports = {}
+            for report_name in API_REPORT_NAMES:
+                try:
+                    with open(self._report_path(report_name), "r") as f:
+                        reports[report_name] = json.load(f)
+                except FileNotFoundError:
+                    reports[report_name] = {}
+                except (OSError, ValueError) as e:
+                    # Keep serving what was loaded; the next request tries again
+                    logger.warning(
+                        f"Failed to load report {report_name}, serving the previous "
+                        f"one: {e}"
+                    )
+                    return self._snapshot
+            self._snapshot = self._build_snapshot(signature, reports)
+            self._invalidated = False
+        self.metrics.inc("api_report_loads_total")
+        logger.info(
+            f"Loaded {len(self._snapshot['registrars'])} registrars and "
+            f"{len(self._snapshot['tlds'])} TLDs from {self.reports_dir}"
+        )
+        return self._snapshot
+
+    def _page(self, items: List[Any], params: Dict[str, str]) -> Dict[str, Any]:
+        """Get one page of items, as asked for by the page and per_page parameters."""
+        try:
+            page = int(params.get("page", 1))
+            per_page = int(params.get("per_page", self.page_size))
+        except ValueError:
+            raise APIError(400, "page and per_page must be integers")
+        if page < 1 or not 1 <= per_page <= self.max_page_size:
+            raise APIError(
+                400,
+                "page must be at least 1 and per_page between 1 and "
+                f"{self.max_page_size}",
+            )
+        start = (page - 1) * per_page
+        return {
+            "total": len(items),
+            "page": page,
+            "per_page": per_page,
+            "pages": math.ceil(len(items) / per_page),
+            "items": items[start : start + per_page],
+        }
+
+    @staticmethod
+    def _match(path: str) -> Tuple[str, Optional["re.Match[str]"]]:
+        """Find the route of a path, or "unknown" with no match."""
+        for route, pattern in ROUTES:
+            match = pattern.fullmatch(path)
+            if match:
+                return route, match
+        return "unknown", None
+
+    def _route(
+        self, snapshot: Dict[str, Any], path: str, params: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Answer a request from a snapshot of the reports.
+
+        Raises:
+            APIError: If the path or a parameter is invalid, or the registrar or TLD is
+                unknown
+        """
+        route, match = self._match(path)
+        if match is None:
+            raise APIError(404, f"Not found: {path}")
+        if route == "index":
+            return {
+                "registrars": len(snapshot["registrars"]),
+                "tlds": sorted(snapshot["tlds"]),
+                "endpoints": [
+                    "/registrars?tld=&page=&per_page=",
+                    "/registrars/{iana_id}",
+                    "/tlds?page=&per_page=",
+                    "/tlds/{tld}",
+                    "/tlds/{tld}/timeseries?since=&until=&page=&per_page=",
+                ],
+            }
+        if route == "registrars":
+            tld = params.get("tld")
+            registrars = (
+                snapshot["registrars_by_tld"].get(tld.lower(), [])
+                if tld
+                else snapshot["registrars"]
+            )
+            return self._page(registrars, params)
+        if route == "registrar":
+            registrar = snapshot["registrar_ids"].get(match.group(1))
+            if registrar is None:
+                raise APIError(404, f"Unknown IANA ID: {match.group(1)}")
+            return registrar
+        if route == "tlds":
+            tlds = [
+                {
+                    "tld": tld,
+                    **{
+                        name: value
+                        for name, value in summary.items()
+                        if name != "monthly_data"
+                    },
+                }
+                for tld, summary in sorted(snapshot["tlds"].items())
+            ]
+            return self._page(tlds, params)
+
+        tld = match.group(1).lower()
+        summary = snapshot["tlds"].get(tld)
+        if summary is None:
+            raise APIError(404, f"Unknown TLD: {match.group(1)}")
+        if route == "tld":
+            return {"tld": tld, **summary}
+        since, until = params.get("since"), params.get("until")
+        series = [
+            {"month": _month(key), **figures}
+            for key, figures in sorted(summary.get("monthly_data", {}).items())
+            if (not since or _month(key) >= since)
+            and (not until or _month(key) <= until)
+        ]
+        return {"tld": tld, **self._page(series, params)}
+
+    def handle(
+        self,
+        target: str,
+        accept_encoding: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """Answer a GET request.
+
+        Args:
+            target: Request path with its query string
+            accept_encoding: Accept-Encoding header of the request
+            if_none_match: If-None-Match header of the request
+
+        Returns:
+            Tuple of the status, the response headers and the body
+        """
+        started = time.perf_counter()
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        key = f"{url.path}?{urlencode(sorted(params.items()))}"
+        snapshot = self._current_snapshot()
+        responses = snapshot["responses"]
+        etag = (
+            'W/"'
+            + hashlib.sha256(
+                f"{snapshot['signature']!r} {key}".encode("utf-8")
+            ).hexdigest()[:32]
+            + '"'
+        )
+        headers = {"Vary": "Accept-Encoding"}
+
+        with self._lock:
+            cached = responses.get(key)
+            if cached is not None:
+                responses.move_to_end(key)
+        self.metrics.inc("api_response_cache_total", result="hit" if cached else "miss")
+
+        if _etag_matches(if_none_match, etag):
+            # Answered from the request alone, without building the body
+            status, body = 304, b""
+            headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+        else:
+            if cached is None:
+                try:
+                    body = json.dumps(
+                        self._route(snapshot, url.path, params), separators=(",", ":")
+                    )
+                    status, cached = 200, [body.encode("utf-8"), None]
+                    with self._lock:
+                        responses[key] = cached
+                        while len(responses) > self.response_cache_size:
+                            responses.popitem(last=False)
+                except APIError as e:
+                    status, body = e.status, json.dumps({"error": str(e)}).encode(
+                        "utf-8"
+                    )
+            else:
+                status = 200
+            if status == 200:
+                headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+                body = cached[0]
+                if len(body) >= self.gzip_min_bytes and _accepts_gzip(accept_encoding):
+                    if cached[1] is None:
+                        cached[1] = gzip.compress(body, compresslevel=6, mtime=0)
+                    body = cached[1]
+                    headers["Content-Encoding"] = "gzip"
+            headers["Content-Type"] = "application/json"
+
+        self.metrics.inc(
+            "api_requests_total", route=self._match(url.path)[0], status=status
+        )
+        self.metrics.observe(
+            "api_request_duration_seconds",
+            time.perf_counter() - started,
+            buckets=API_DURATION_BUCKETS,
+        )
+        return status, headers, body
+
+
+class ReportAPIRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler answering GET and HEAD requests from a ReportAPI."""
+
+    def __init__(self, *args, api: ReportAPI, **kwargs):
+        """Initialize the handler with the API it answers from."""
+        self.api = api
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format: str, *args) -> None:
+        """Send request logs to the module logger instead of stderr."""
+        logger.debug(format % args)
+
+    def _respond(self, send_body: bool) -> None:
+        status, headers, body = self.api.handle(
+            self.path,
+            self.headers.get("Accept-Encoding"),
+            self.headers.get("If-None-Match"),
+        )
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body and status != 304:
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        """Answer a GET request."""
+        self._respond(send_body=True)
+
+    def do_HEAD(self) -> None:
+        """Answer a HEAD request with the headers of the GET answer."""
+        self._respond(send_body=False)
+
+
+class ReportAPIServer:
+    """Serves a ReportAPI over HTTP."""
+
+    def __init__(self, api: ReportAPI, host: str = API_HOST, port: int = API_PORT):
+        """Initialize the API server.
+
+        Args:
+            api: ReportAPI answering the requests
+            host: Host to bind to
+            port: Port to bind to (0 picks a free port)
+        """
+        self.api = api
+        self.host = host
+        self.port = port
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Root URL of the running server."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "ReportAPIServer":
+        """Start serving in a background thread.
+
+        Returns:
+            The server instance
+        """
+        self.server = ThreadingHTTPServer(
+            (self.host, self.port), partial(ReportAPIRequestHandler, api=self.api)
+        )
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Serving {self.api.reports_dir} at {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and wait for its thread to finish."""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self) -> "ReportAPIServer":
+        """Start serving."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Stop serving."""
+        self.stop()
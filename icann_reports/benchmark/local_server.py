@@ -0,0 +1,137 @@
+import io
+import os
+import re
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="local_server")
+
+
+# Single byte range in a Range header, e.g. "bytes=100-" or "bytes=100-199"
+RANGE_PATTERN = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+class QuietRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler that logs requests at debug level only.
+
+    Like icann.org, it serves single byte ranges, honouring ``If-Range``
+    against the file's Last-Modified date or its ETag.
+    """
+
+    def current_etag(self) -> Optional[str]:
+        """Get the ETag of the requested file, if the handler sends one."""
+        return None
+
+    def log_message(self, format: str, *args) -> None:
+        """Send request logs to the module logger instead of stderr."""
+        logger.debug(format % args)
+
+    def send_head(self):
+        """Send the headers for a GET or HEAD request, serving byte ranges."""
+        range_header = self.headers.get("Range")
+        path = self.translate_path(self.path)
+        match = RANGE_PATTERN.fullmatch(range_header.strip()) if range_header else None
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+
+        stat = os.stat(path)
+        last_modified = self.date_time_string(int(stat.st_mtime))
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range not in (last_modified, self.current_etag()):
+            # The client's copy is stale, so send the whole file
+            return super().send_head()
+
+        size = stat.st_size
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        if start >= size or end < start:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        return io.BytesIO(body)
+
+
+class LocalReportServer:
+    """Serves a directory of reports over HTTP as a stand-in for icann.org."""
+
+    def __init__(self, root_dir: str, host: str = "127.0.0.1", port: int = 0):
+        """Initialize the local report server.
+
+        Args:
+            root_dir: Directory to serve, laid out like the ICANN site
+            host: Host to bind to
+            port: Port to bind to (0 picks a free port)
+        """
+        self.root_dir = root_dir
+        self.host = host
+        self.port = port
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def make_handler(self):
+        """Create the request handler class bound to the served directory.
+
+        Returns:
+            Request handler factory for the HTTP server
+        """
+        return partial(QuietRequestHandler, directory=self.root_dir)
+
+    @property
+    def url(self) -> str:
+        """Root URL of the running server."""
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def base_url(self) -> str:
+        """URL template for reports, in the same format as config.BASE_URL."""
+        return f"{self.url}/mrr/{{tld}}/{{tld}}-transactions-{{date}}-en.csv"
+
+    def start(self) -> "LocalReportServer":
+        """Start serving in a background thread.
+
+        Returns:
+            The server instance
+        """
+        self.server = ThreadingHTTPServer((self.host, self.port), self.make_handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Serving {self.root_dir} at {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and wait for its thread to finish."""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self) -> "LocalReportServer":
+        """Start serving."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Stop serving."""
+        self.stop()
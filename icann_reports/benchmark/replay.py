@@ -0,0 +1,197 @@
+import hashlib
+import os
+import random
+import threading
+import time
+import urllib.parse
+from typing import Dict, Optional
+
+from config import BASE_URL
+from icann_reports.benchmark.local_server import LocalReportServer, QuietRequestHandler
+from icann_reports.downloader.recorder import ResponseRecorder
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="replay")
+
+# Faults that can be injected into replayed responses
+FAULT_TYPES = ("404", "429", "500", "503", "timeout")
+
+# Bytes written per chunk when the bandwidth is capped
+BANDWIDTH_CHUNK_SIZE = 16 * 1024
+
+
+class FaultInjector:
+    """Decides deterministically which requests fail, and how.
+
+    The decision for a request depends only on the seed, the URL path and how
+    many times that path was requested before, so a run injects the same
+    faults regardless of the order in which worker threads send requests.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, seed: int = 0):
+        """Initialize the fault injector.
+
+        Args:
+            rates: Probability of each fault type ("404", "429", "500", "503",
+                "timeout")
+            seed: Seed for the fault decisions
+        """
+        rates = rates or {}
+        unknown = set(rates) - set(FAULT_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown fault types: {', '.join(sorted(unknown))}")
+        if sum(rates.values()) > 1:
+            raise ValueError("Fault rates must add up to at most 1")
+
+        self.rates = rates
+        self.seed = seed
+        self.requests: Dict[str, int] = {}
+        self.injected: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_rates(spec: str) -> Dict[str, float]:
+        """Parse fault rates from a string such as "503=0.1,timeout=0.05".
+
+        Args:
+            spec: Comma-separated fault=rate pairs
+
+        Returns:
+            Dictionary with fault types as keys and rates as values
+        """
+        rates = {}
+        for pair in filter(None, (part.strip() for part in spec.split(","))):
+            fault, _, rate = pair.partition("=")
+            rates[fault.strip()] = float(rate)
+        return rates
+
+    def choose(self, path: str) -> Optional[str]:
+        """Pick the fault for the next request of a path.
+
+        Args:
+            path: URL path of the request
+
+        Returns:
+            The fault type to inject, or None to serve the response normally
+        """
+        with self._lock:
+            count = self.requests.get(path, 0)
+            self.requests[path] = count + 1
+
+        digest = hashlib.sha256(f"{self.seed}:{path}:{count}".encode()).digest()
+        draw = random.Random(digest).random()
+        threshold = 0.0
+        for fault in FAULT_TYPES:
+            threshold += self.rates.get(fault, 0.0)
+            if draw < threshold:
+                with self._lock:
+                    self.injected[fault] = self.injected.get(fault, 0) + 1
+                return fault
+        return None
+
+
+class ReplayServer(LocalReportServer):
+    """Serves recorded report responses as an offline stand-in for icann.org.
+
+    Responses come from a fixture directory written by ``ResponseRecorder``.
+    Every request can be delayed, bodies can be sent at a capped bandwidth,
+    and 404, 5xx and timeout faults can be injected to exercise the
+    concurrency and retry paths.
+    """
+
+    def __init__(
+        self,
+        fixture_dir: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        bandwidth: Optional[int] = None,
+        faults: Optional[FaultInjector] = None,
+        timeout_delay: float = 60.0,
+    ):
+        """Initialize the replay server.
+
+        Args:
+            fixture_dir: Directory of recorded responses
+            host: Host to bind to
+            port: Port to bind to (0 picks a free port)
+            latency: Seconds to wait before answering each request
+            bandwidth: Maximum bytes per second per response (unlimited if None)
+            faults: FaultInjector deciding which requests fail
+            timeout_delay: Seconds a "timeout" fault stalls before dropping the
+                connection
+        """
+        super().__init__(os.path.join(fixture_dir, "bodies"), host, port)
+        self.fixture_dir = fixture_dir
+        self.index = ResponseRecorder.load_index(fixture_dir)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.faults = faults or FaultInjector()
+        self.timeout_delay = timeout_delay
+
+    @property
+    def base_url(self) -> str:
+        """URL template for reports, with the same path as config.BASE_URL."""
+        path = urllib.parse.unquote(urllib.parse.urlparse(BASE_URL).path)
+        return f"{self.url}{path}"
+
+    def make_handler(self):
+        """Create the request handler class that replays the fixtures.
+
+        Returns:
+            Request handler class for the HTTP server
+        """
+        server = self
+
+        class ReplayRequestHandler(QuietRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=server.root_dir, **kwargs)
+
+            def do_GET(self):
+                path = urllib.parse.urlparse(self.path).path
+                if server.latency:
+                    time.sleep(server.latency)
+
+                fault = server.faults.choose(path)
+                if fault == "timeout":
+                    time.sleep(server.timeout_delay)
+                    self.close_connection = True
+                    return
+                if fault:
+                    self.send_response(int(fault))
+                    if fault == "429":
+                        self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                entry = server.index.get(path)
+                if entry is None or entry["status"] != 200 or not entry.get("body"):
+                    self.send_response(entry["status"] if entry else 404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.recorded_headers = entry["headers"]
+                super().do_GET()
+
+            def current_etag(self):
+                return getattr(self, "recorded_headers", {}).get("ETag")
+
+            def end_headers(self):
+                etag = self.current_etag()
+                if etag:
+                    self.send_header("ETag", etag)
+                super().end_headers()
+
+            def copyfile(self, source, outputfile):
+                if not server.bandwidth:
+                    super().copyfile(source, outputfile)
+                    return
+                # Send about ten chunks per second, each after the time its bytes take
+                chunk_size = max(1, min(BANDWIDTH_CHUNK_SIZE, server.bandwidth // 10))
+                for chunk in iter(lambda: source.read(chunk_size), b""):
+                    time.sleep(len(chunk) / server.bandwidth)
+                    outputfile.write(chunk)
+
+        return ReplayRequestHandler
@@ -0,0 +1,243 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Callable
+
+from config import MAX_WORKERS
+from icann_reports.benchmark.local_server import LocalReportServer
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.csv_downloader import CSVDownloader
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.processor.field_validation import FieldValidator
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.file_structure import FileStructureAnalyzer
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="benchmark")
+
+# Version of the benchmark result format, bumped when the layout changes
+RESULT_SCHEMA_VERSION = 1
+
+# Pipeline stages in the order they run
+STAGES = [
+    "url_generation",
+    "download",
+    "structure_detection",
+    "parse",
+    "validation",
+    "report_generation",
+]
+
+
+class BenchmarkRunner:
+    """Times every pipeline stage against synthetic reports served locally."""
+
+    def __init__(
+        self,
+        generator: SyntheticReportGenerator,
+        max_workers: int = MAX_WORKERS,
+        repeat: int = 1,
+        aggregation_backend: str = "auto",
+    ):
+        """Initialize the benchmark runner.
+
+        Args:
+            generator: Generator for the synthetic reports to benchmark against
+            max_workers: Number of worker threads for download and parse stages
+            repeat: Number of times to run the whole pipeline
+            aggregation_backend: Backend of the report generation stage
+        """
+        self.generator = generator
+        self.max_workers = max_workers
+        self.repeat = repeat
+        self.aggregation_backend = aggregation_backend
+
+    @staticmethod
+    def _time_stage(
+        timings: Dict[str, Dict[str, Any]], stage: str, func: Callable[[], Any]
+    ) -> Any:
+        """Run a stage function and record its wall-clock duration.
+
+        Args:
+            timings: Dictionary to record the stage timing in
+            stage: Name of the stage
+            func: Function running the stage
+
+        Returns:
+            The return value of the stage function
+        """
+        start = time.perf_counter()
+        result = func()
+        timings[stage] = {"seconds": time.perf_counter() - start}
+        return result
+
+    def run_once(self, work_dir: str) -> Dict[str, Dict[str, Any]]:
+        """Run the pipeline once in an isolated working directory.
+
+        Args:
+            work_dir: Empty directory for sources, downloads, cache and reports
+
+        Returns:
+            Dictionary with stage names as keys and timing details as values
+        """
+        source_dir = os.path.join(work_dir, "source")
+        data_dir = os.path.join(work_dir, "data")
+        os.makedirs(data_dir, exist_ok=True)
+        cache_manager = CacheManager(os.path.join(work_dir, "processed_files.json"))
+        self.generator.generate(source_dir)
+
+        timings: Dict[str, Dict[str, Any]] = {}
+        with (
+            LocalReportServer(source_dir) as server,
+            ThreadPoolExecutor(max_workers=self.max_workers) as executor,
+        ):
+            tlds = [
+                {
+                    "tld": tld,
+                    "base_url": server.base_url,
+                    "start_date": self.generator.start_date,
+                    "end_date": self.generator.end_date,
+                }
+                for tld in self.generator.tlds
+            ]
+            urls = self._time_stage(
+                timings,
+                "url_generation",
+                lambda: URLGenerator().generate_tld_urls(tlds),
+            )
+            timings["url_generation"]["items"] = len(urls)
+
+            downloader = CSVDownloader(data_dir=data_dir, cache_manager=cache_manager)
+            file_infos = self._time_stage(
+                timings,
+                "download",
+                lambda: list(downloader.download_all(urls, executor).values()),
+            )
+            downloader.retry_scheduler.close()
+            file_infos = [file_info for file_info in file_infos if file_info[0]]
+            timings["download"]["items"] = len(file_infos)
+            timings["download"]["bytes"] = sum(
+                os.path.getsize(file_path) for file_path, _ in file_infos
+            )
+
+            analyzer = FileStructureAnalyzer()
+            self._time_stage(
+                timings,
+                "structure_detection",
+                lambda: [
+                    analyzer.detect_file_structure(file_path)
+                    for file_path, _ in file_infos
+                ],
+            )
+            timings["structure_detection"]["items"] = len(file_infos)
+
+            processor = CSVProcessor(data_dir=data_dir, cache_manager=cache_manager)
+            results = self._time_stage(
+                timings,
+                "parse",
+                lambda: list(executor.map(processor.process_csv, file_infos)),
+            )
+            data = {}
+            for result in results:
+                if result:
+                    data.update(result)
+            row_count = sum(len(rows) for rows in data.values())
+            timings["parse"]["items"] = len(data)
+            timings["parse"]["rows"] = row_count
+
+        validator = FieldValidator()
+        self._time_stage(timings, "validation", lambda: validator.validate_data(data))
+        timings["validation"]["rows"] = row_count
+
+        report_generator = ReportGenerator(
+            data_dir=data_dir, backend=self.aggregation_backend
+        )
+        reports = self._time_stage(
+            timings,
+            "report_generation",
+            lambda: report_generator.generate_all_reports(data),
+        )
+        timings["report_generation"]["items"] = len(reports)
+        timings["report_generation"]["rows"] = row_count
+
+        return timings
+
+    def run(self) -> Dict[str, Any]:
+        """Run the benchmark and summarise the timings of every repetition.
+
+        Returns:
+            Machine-readable benchmark results
+        """
+        runs: List[Dict[str, Dict[str, Any]]] = []
+        for iteration in range(self.repeat):
+            with tempfile.TemporaryDirectory(prefix="icann-bench-") as work_dir:
+                runs.append(self.run_once(work_dir))
+            logger.info(f"Benchmark run {iteration + 1}/{self.repeat} complete")
+
+        stages = {}
+        for stage in STAGES:
+            seconds = [run[stage]["seconds"] for run in runs]
+            summary = {
+                key: value for key, value in runs[-1][stage].items() if key != "seconds"
+            }
+            summary["seconds"] = {
+                "min": min(seconds),
+                "median": statistics.median(seconds),
+                "max": max(seconds),
+                "runs": seconds,
+            }
+            if summary.get("rows"):
+                summary["rows_per_second"] = (
+                    summary["rows"] / summary["seconds"]["median"]
+                )
+            if summary.get("bytes"):
+                summary["bytes_per_second"] = (
+                    summary["bytes"] / summary["seconds"]["median"]
+                )
+            stages[stage] = summary
+
+        return {
+            "schema_version": RESULT_SCHEMA_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "parameters": {
+                "tlds": self.generator.tlds,
+                "start_date": self.generator.start_date,
+                "end_date": self.generator.end_date,
+                "registrar_count": self.generator.registrar_count,
+                "header_variants": self.generator.header_variants,
+                "noise": self.generator.noise,
+                "seed": self.generator.seed,
+                "max_workers": self.max_workers,
+                "repeat": self.repeat,
+            },
+            "stages": stages,
+        }
+
+    @staticmethod
+    def save_results(results: Dict[str, Any], output_path: str) -> str:
+        """Save benchmark results to a JSON file.
+
+        Args:
+            results: Results returned by run()
+            output_path: Path of the JSON file to write
+
+        Returns:
+            Path to the saved results file
+        """
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Benchmark results saved to {output_path}")
+        return output_path
@@ -0,0 +1,225 @@
+import csv
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+from config import EXPECTED_FIELDS
+
+# Header layouts seen across the history of the ICANN monthly reports
+HEADER_VARIANTS = ("standard", "title_rows", "missing_tld", "agp_fields")
+
+# Extra fields that appear in some of the newer report layouts
+AGP_FIELDS = [
+    "Agp-exemption-requests",
+    "Agp-exemptions-granted",
+    "Agp-exempted-domains",
+    "Attempted-adds",
+]
+
+# Values used to simulate the messy cells found in real reports
+NOISE_VALUES = ["", " ", "n/a", "-"]
+
+REGISTRAR_SUFFIXES = ["LLC", "Inc.", "Ltd.", "GmbH", "S.A.", "Corp."]
+REGISTRAR_WORDS = [
+    "Domain",
+    "Names",
+    "Web",
+    "Host",
+    "Net",
+    "Register",
+    "Cloud",
+    "Global",
+    "Digital",
+    "Online",
+    "Direct",
+    "Network",
+    "Data",
+    "Secure",
+    "Blue",
+    "Star",
+]
+
+
+class SyntheticReportGenerator:
+    """Generates synthetic ICANN monthly transaction reports for benchmarking."""
+
+    def __init__(
+        self,
+        tlds: Optional[List[str]] = None,
+        start_date: str = "2024-01",
+        end_date: str = "2024-12",
+        registrar_count: int = 500,
+        header_variants: Optional[List[str]] = None,
+        noise: float = 0.0,
+        seed: int = 0,
+    ):
+        """Initialize the synthetic report generator.
+
+        Args:
+            tlds: TLDs to generate reports for (default: ["com", "net"])
+            start_date: First month to generate in YYYY-MM format
+            end_date: Last month to generate in YYYY-MM format
+            registrar_count: Number of registrars per monthly report
+            header_variants: Header layouts to use, assigned to TLDs in turn
+            noise: Fraction of metric cells replaced with blank or invalid values
+            seed: Seed for the random number generator, for reproducible output
+        """
+        self.tlds = tlds or ["com", "net"]
+        self.start_date = start_date
+        self.end_date = end_date
+        self.registrar_count = registrar_count
+        self.header_variants = header_variants or ["standard"]
+        self.noise = noise
+        self.seed = seed
+
+        unknown_variants = set(self.header_variants) - set(HEADER_VARIANTS)
+        if unknown_variants:
+            raise ValueError(
+                f"Unknown header variants: {', '.join(sorted(unknown_variants))}"
+            )
+
+    def months(self) -> List[str]:
+        """Get the months covered by the generator.
+
+        Returns:
+            List of month strings in YYYYMM format
+        """
+        months = []
+        current_date = datetime.strptime(self.start_date, "%Y-%m")
+        end_date = datetime.strptime(self.end_date, "%Y-%m")
+        while current_date <= end_date:
+            months.append(current_date.strftime("%Y%m"))
+            current_date += timedelta(days=32)
+            current_date = current_date.replace(day=1)
+        return months
+
+    def header_variant_for(self, tld: str) -> str:
+        """Get the header layout used for a TLD.
+
+        Variants are assigned per TLD rather than per file, because
+        FileStructureAnalyzer reuses the structure it detected for a TLD.
+
+        Args:
+            tld: The TLD to look up
+
+        Returns:
+            Name of the header variant
+        """
+        index = self.tlds.index(tld) if tld in self.tlds else 0
+        return self.header_variants[index % len(self.header_variants)]
+
+    def registrars(self) -> List[Dict[str, str]]:
+        """Build the list of synthetic registrars.
+
+        Returns:
+            List of dictionaries with 'name' and 'iana_id' keys
+        """
+        rng = random.Random(self.seed)
+        registrars = []
+        for index in range(self.registrar_count):
+            words = rng.sample(REGISTRAR_WORDS, 2)
+            suffix = rng.choice(REGISTRAR_SUFFIXES)
+            registrars.append(
+                {
+                    "name": f"{words[0]}{words[1]}.com, {suffix}",
+                    "iana_id": str(1000 + index),
+                }
+            )
+        return registrars
+
+    def generate_rows(self, tld: str, month: str) -> List[Dict[str, str]]:
+        """Generate the data rows for one monthly report.
+
+        Args:
+            tld: The TLD of the report
+            month: The month of the report in YYYYMM format
+
+        Returns:
+            List of row dictionaries keyed by the standard field names
+        """
+        rng = random.Random(f"{self.seed}-{tld}-{month}")
+        rows = []
+        for registrar in self.registrars():
+            # Registrar sizes follow a long tail, like the real reports
+            total_domains = int(rng.paretovariate(1.2) * 1000)
+            row = {
+                "TLD": tld.upper(),
+                "Registrar-name": registrar["name"],
+                "IANA-ID": registrar["iana_id"],
+                "Total-domains": str(total_domains),
+                "Total-Nameservers": str(total_domains // 50),
+            }
+            for field_name in EXPECTED_FIELDS:
+                if field_name not in row:
+                    row[field_name] = str(rng.randint(0, max(1, total_domains // 100)))
+            for field_name in AGP_FIELDS:
+                row[field_name] = str(rng.randint(0, 10))
+
+            if self.noise:
+                for field_name in list(row)[3:]:
+                    if rng.random() < self.noise:
+                        row[field_name] = rng.choice(NOISE_VALUES)
+
+            rows.append(row)
+        return rows
+
+    def write_report(self, file_path: str, tld: str, month: str) -> int:
+        """Write one monthly report to disk.
+
+        Args:
+            file_path: Path of the CSV file to write
+            tld: The TLD of the report
+            month: The month of the report in YYYYMM format
+
+        Returns:
+            Number of bytes written
+        """
+        variant = self.header_variant_for(tld)
+        field_names = list(EXPECTED_FIELDS.keys())
+        if variant == "missing_tld":
+            field_names.remove("TLD")
+        elif variant == "agp_fields":
+            field_names.extend(AGP_FIELDS)
+
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            if variant == "title_rows":
+                f.write(
+                    f"ICANN Monthly Consolidated Data Report - {tld.upper()} {month}\n"
+                )
+                f.write("<TLD>,<registrar-name>,<iana-id>,<total-domains>\n")
+
+            writer = csv.writer(f)
+            writer.writerow(field_names)
+            for row in self.generate_rows(tld, month):
+                writer.writerow([row[field_name] for field_name in field_names])
+
+        return os.path.getsize(file_path)
+
+    def generate(self, output_dir: str) -> Dict[str, Any]:
+        """Generate all reports, laid out like the ICANN site.
+
+        Files are written to
+        ``{output_dir}/mrr/{tld}/{tld}-transactions-{date}-en.csv``.
+
+        Args:
+            output_dir: Directory to write the reports to
+
+        Returns:
+            Dictionary with the generated file paths, file count and total bytes
+        """
+        files = []
+        total_bytes = 0
+        for tld in self.tlds:
+            tld_dir = os.path.join(output_dir, "mrr", tld)
+            os.makedirs(tld_dir, exist_ok=True)
+            for month in self.months():
+                file_path = os.path.join(tld_dir, f"{tld}-transactions-{month}-en.csv")
+                total_bytes += self.write_report(file_path, tld, month)
+                files.append(file_path)
+
+        return {
+            "files": files,
+            "file_count": len(files),
+            "bytes": total_bytes,
+        }
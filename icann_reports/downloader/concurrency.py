@@ -0,0 +1,176 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+from config import (
+    DOWNLOAD_CONCURRENCY_COOLDOWN,
+    DOWNLOAD_CONCURRENCY_INITIAL,
+    DOWNLOAD_CONCURRENCY_MAX,
+    DOWNLOAD_CONCURRENCY_MIN,
+    DOWNLOAD_LATENCY_TARGET,
+)
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="concurrency")
+
+
+class DownloadSlot:
+    """An acquired in-flight request slot, reporting its outcome on release."""
+
+    def __init__(self, limiter: "AdaptiveConcurrencyLimiter"):
+        """Initialize the slot.
+
+        Args:
+            limiter: The limiter the slot was acquired from
+        """
+        self.limiter = limiter
+        self.start = time.perf_counter()
+        self.outcome = "neutral"
+
+    def succeeded(self) -> None:
+        """Mark the request as completed successfully."""
+        self.outcome = "success"
+
+    def throttled(self) -> None:
+        """Mark the request as rate limited, overloaded or timed out."""
+        self.outcome = "throttled"
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits in-flight downloads using additive-increase/multiplicative-decrease.
+
+    Every successful request under the latency target grows the limit by
+    ``increase / limit``, so the limit rises by about ``increase`` per window
+    of ``limit`` requests. A throttled request (HTTP 429, 5xx or a timeout)
+    multiplies the limit by ``decrease_factor``, at most once per cooldown
+    period so that one burst of failures only cuts the limit once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = DOWNLOAD_CONCURRENCY_INITIAL,
+        min_limit: int = DOWNLOAD_CONCURRENCY_MIN,
+        max_limit: int = DOWNLOAD_CONCURRENCY_MAX,
+        latency_target: float = DOWNLOAD_LATENCY_TARGET,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = DOWNLOAD_CONCURRENCY_COOLDOWN,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """Initialize the concurrency limiter.
+
+        Args:
+            initial_limit: Number of concurrent requests to start with
+            min_limit: Lowest limit the limiter will cut back to
+            max_limit: Highest limit the limiter will grow to
+            latency_target: Requests slower than this (seconds) do not grow the limit
+            increase: Amount the limit grows by per window of successful requests
+            decrease_factor: Factor the limit is multiplied by when throttled
+            cooldown: Minimum seconds between two decreases
+            metrics: MetricsRegistry to publish the limit and in-flight count to
+        """
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(
+                "Concurrency limits must satisfy 1 <= min_limit <= max_limit"
+            )
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.metrics = metrics or MetricsRegistry()
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently in flight."""
+        return self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current state of the limiter.
+
+        Returns:
+            Dictionary with the current limit, bounds and in-flight count
+        """
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+        }
+
+    def _publish(self) -> None:
+        """Publish the current limit and in-flight count as gauges."""
+        self.metrics.set_gauge("download_concurrency_limit", self.limit)
+        self.metrics.set_gauge("downloads_in_flight", self._in_flight)
+
+    def acquire(self) -> DownloadSlot:
+        """Wait until a request slot is free and take it.
+
+        Returns:
+            The acquired slot
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            self._publish()
+        return DownloadSlot(self)
+
+    def release(self, slot: DownloadSlot) -> None:
+        """Return a slot and adjust the limit according to its outcome.
+
+        Args:
+            slot: Slot returned by acquire()
+        """
+        latency = time.perf_counter() - slot.start
+        with self._condition:
+            self._in_flight -= 1
+            previous_limit = self.limit
+
+            if slot.outcome == "success" and latency <= self.latency_target:
+                self._limit = min(
+                    self.max_limit, self._limit + self.increase / self._limit
+                )
+            elif slot.outcome == "throttled":
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._limit = max(
+                        self.min_limit, self._limit * self.decrease_factor
+                    )
+                    self._last_decrease = now
+                    self.metrics.inc("download_concurrency_decreases_total")
+
+            self._publish()
+            self._condition.notify_all()
+
+        if self.limit > previous_limit:
+            logger.debug(f"Download concurrency limit raised to {self.limit}")
+        elif self.limit < previous_limit:
+            logger.warning(f"Download concurrency limit cut to {self.limit}")
+
+    @contextmanager
+    def slot(self) -> Iterator[DownloadSlot]:
+        """Hold a request slot for the duration of a block.
+
+        Yields:
+            The acquired slot; mark it succeeded() or throttled() before the block ends
+        """
+        slot = self.acquire()
+        try:
+            yield slot
+        finally:
+            self.release(slot)
@@ -1,20 +1,40 @@
+import http.client
+import json
 import os
+import threading
 import time
 import urllib.request
 import urllib.error
-from typing import Tuple, Optional
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Tuple, Optional
 
 from config import (
     DATA_DIR,
+    DOWNLOAD_CHUNK_SIZE,
     DOWNLOAD_TIMEOUT,
     MAX_RETRIES,
     RETRY_DELAY,
 )
+from icann_reports.downloader.concurrency import AdaptiveConcurrencyLimiter
+from icann_reports.downloader.recorder import ResponseRecorder
+from icann_reports.downloader.retry import RetryScheduler
 from icann_reports.utils.logging_setup import setup_logging
 from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.compression import COMPRESSION_SUFFIXES, compress_file
+from icann_reports.utils.content_store import ContentStore
+from icann_reports.utils.metrics import MetricsRegistry
+from icann_reports.utils.tracing import TraceRecorder
 
 logger = setup_logging(logger_name="csv_downloader")
 
+# Errors that fail a single download attempt and may be retried
+DOWNLOAD_ERRORS = (
+    urllib.error.URLError,
+    TimeoutError,
+    ConnectionError,
+    http.client.HTTPException,
+)
+
 
 class CSVDownloader:
     """Downloads CSV files from ICANN with retry logic."""
@@ -25,6 +45,14 @@ class CSVDownloader:
         download_timeout: int = DOWNLOAD_TIMEOUT,
         max_retries: int = MAX_RETRIES,
         retry_delay: int = RETRY_DELAY,
+        cache_manager: Optional[CacheManager] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        tracer: Optional[TraceRecorder] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        retry_scheduler: Optional[RetryScheduler] = None,
+        content_store: Optional[ContentStore] = None,
+        compression: Optional[str] = None,
+        recorder: Optional[ResponseRecorder] = None,
     ):
         """Initialize the CSV downloader.
 
@@ -32,64 +60,474 @@ class CSVDownloader:
             data_dir: Directory to store downloaded files
             download_timeout: Timeout for downloads in seconds
             max_retries: Maximum number of retry attempts
-            retry_delay: Delay between retry attempts in seconds
+            retry_delay: Base delay of the exponential retry backoff in seconds
+            cache_manager: CacheManager instance to use for processed-file lookups
+            metrics: MetricsRegistry to record download metrics in
+            tracer: TraceRecorder to record HTTP requests and retry waits in
+            concurrency_limiter: Limiter for the number of requests in flight
+            retry_scheduler: Scheduler deciding when failed downloads are retried
+            content_store: Content-addressed store to share downloads through
+                (downloads are kept only in data_dir if not given)
+            compression: Keep downloads gzip or xz compressed ("gzip", "xz" or None)
+            recorder: ResponseRecorder to capture server responses into replay fixtures
         """
+        if compression is not None and compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unsupported compression: {compression}")
+
         self.data_dir = data_dir
         self.download_timeout = download_timeout
         self.max_retries = max_retries
         self.retry_delay = retry_delay
-        self.cache_manager = CacheManager()
+        self.cache_manager = cache_manager or CacheManager()
+        self.metrics = metrics or MetricsRegistry()
+        self.tracer = tracer or TraceRecorder()
+        self.concurrency_limiter = concurrency_limiter or AdaptiveConcurrencyLimiter(
+            metrics=self.metrics
+        )
+        self.retry_scheduler = retry_scheduler or RetryScheduler(
+            base_delay=retry_delay, max_retries=max_retries, metrics=self.metrics
+        )
+        self.content_store = content_store
+        self.compression = compression
+        self.recorder = recorder
+
+    @staticmethod
+    def is_throttling_error(error: Exception) -> bool:
+        """Check whether an error means the server is rate limiting or overloaded.
+
+        Args:
+            error: Exception raised by a download attempt
+
+        Returns:
+            True for HTTP 429 and 5xx responses, timeouts and dropped connections
+        """
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code == 429 or error.code >= 500
+        if isinstance(error, urllib.error.URLError):
+            return isinstance(error.reason, (TimeoutError, ConnectionError))
+        return isinstance(error, TimeoutError)
+
+    @staticmethod
+    def partial_paths(file_path: str) -> Tuple[str, str]:
+        """Get the paths of the partial download and its metadata sidecar.
+
+        Args:
+            file_path: Final path of the downloaded file
 
-    def download_csv(self, url: str, retry_count: int = 0) -> Tuple[Optional[str], bool]:
-        """Download a CSV file with retries and timeouts.
+        Returns:
+            Tuple of (partial_file_path, metadata_path)
+        """
+        return f"{file_path}.part", f"{file_path}.part.json"
+
+    def _load_partial(self, url: str, file_path: str) -> Optional[Dict[str, Any]]:
+        """Load the state of a partial download that can be resumed.
+
+        A partial download is only resumable if it came from the same URL and
+        the server sent an ETag or Last-Modified validator for it. Anything
+        else is discarded.
+
+        Args:
+            url: URL being downloaded
+            file_path: Final path of the downloaded file
+
+        Returns:
+            Dictionary with 'etag', 'last_modified' and 'bytes', or None
+        """
+        part_path, meta_path = self.partial_paths(file_path)
+        if not os.path.exists(part_path):
+            return None
+
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            meta = {}
+
+        size = os.path.getsize(part_path)
+        if (
+            meta.get("url") != url
+            or not (meta.get("etag") or meta.get("last_modified"))
+            or not size
+        ):
+            self._discard_partial(file_path)
+            return None
+
+        meta["bytes"] = size
+        return meta
+
+    def _discard_partial(self, file_path: str) -> None:
+        """Remove a partial download and its metadata sidecar."""
+        for path in self.partial_paths(file_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _fetch(self, url: str, file_path: str, attempt: int) -> int:
+        """Perform one HTTP request while holding a concurrency slot.
+
+        The body is streamed into a ``.part`` file next to the final path, with
+        the response validators kept in a ``.part.json`` sidecar. If an earlier
+        attempt left a partial file, the request asks for the remaining bytes
+        with ``Range`` and ``If-Range``; a 206 response is appended and a 200
+        response (ranges unsupported, or the file changed) replaces the partial
+        file. The finished file is renamed into place.
 
         Args:
             url: URL to download
-            retry_count: Current retry attempt (used internally)
+            file_path: Final path of the downloaded file
+            attempt: Number of this attempt, starting at 1
 
         Returns:
-            Tuple of (file_path, already_processed)
-                - file_path: Path to the downloaded file or None if download failed
-                - already_processed: True if file was already processed
+            Number of bytes transferred by this request
         """
+        file_name = os.path.basename(file_path)
+        part_path, meta_path = self.partial_paths(file_path)
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
+        partial = self._load_partial(url, file_path)
+        if partial:
+            headers["Range"] = f"bytes={partial['bytes']}-"
+            headers["If-Range"] = partial.get("etag") or partial["last_modified"]
+        req = urllib.request.Request(url, headers=headers)
+
+        with self.concurrency_limiter.slot() as slot:
+            transferred = 0
+            try:
+                with (
+                    self.metrics.timer("http_request_duration_seconds"),
+                    self.tracer.span(
+                        "http_get",
+                        cat="download",
+                        file=file_name,
+                        attempt=attempt,
+                        resume_from=partial["bytes"] if partial else 0,
+                    ),
+                ):
+                    with urllib.request.urlopen(
+                        req, timeout=self.download_timeout
+                    ) as response:
+                        resumed = partial is not None and response.status == 206
+                        if response.status not in (200, 206) or (
+                            response.status == 206 and not resumed
+                        ):
+                            raise urllib.error.HTTPError(
+                                url, response.status, "Download failed", None, None
+                            )
+                        if resumed and not response.headers.get(
+                            "Content-Range", ""
+                        ).startswith(f"bytes {partial['bytes']}-"):
+                            self._discard_partial(file_path)
+                            raise urllib.error.URLError(
+                                f"Unexpected Content-Range for {file_name}"
+                            )
+                        response_headers = dict(response.headers)
+                        if partial:
+                            self.metrics.inc(
+                                "download_resumes_total",
+                                result="resumed" if resumed else "restarted",
+                            )
+                            if resumed:
+                                logger.info(
+                                    f"Resuming {file_name} from byte {partial['bytes']}"
+                                )
+
+                        with open(meta_path, "w") as f:
+                            json.dump(
+                                {
+                                    "url": url,
+                                    "etag": response.headers.get("ETag"),
+                                    "last_modified": response.headers.get(
+                                        "Last-Modified"
+                                    ),
+                                },
+                                f,
+                            )
+                        with open(part_path, "ab" if resumed else "wb") as out_file:
+                            while True:
+                                chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+                                if not chunk:
+                                    break
+                                out_file.write(chunk)
+                                transferred += len(chunk)
+
+                        # read() with a size does not raise if the connection drops
+                        # early
+                        expected = response.headers.get("Content-Length")
+                        if (
+                            expected
+                            and expected.isdigit()
+                            and transferred < int(expected)
+                        ):
+                            raise http.client.IncompleteRead(
+                                b"", int(expected) - transferred
+                            )
+            except urllib.error.HTTPError as e:
+                if partial and e.code == 416:
+                    # The partial file no longer matches the remote file; start over
+                    self._discard_partial(file_path)
+                    raise urllib.error.URLError(
+                        f"Range not satisfiable for {file_name}"
+                    ) from e
+                if self.recorder and not RetryScheduler.is_retryable(e):
+                    # Permanent errors such as a missing month are part of the fixture
+                    self.recorder.record(url, e.code, dict(e.headers or {}))
+                if self.is_throttling_error(e):
+                    slot.throttled()
+                raise
+            except Exception as e:
+                if self.is_throttling_error(e):
+                    slot.throttled()
+                raise
+            finally:
+                self.metrics.inc("bytes_downloaded_total", transferred)
+
+            slot.succeeded()
+
+        os.replace(part_path, file_path)
+        os.remove(meta_path)
+        if self.recorder:
+            self.recorder.record(url, 200, response_headers, file_path)
+        return transferred
+
+    def stored_path(self, file_path: str) -> str:
+        """Get the path a downloaded file is kept at, after any compression.
+
+        Args:
+            file_path: Path of the uncompressed download
+
+        Returns:
+            file_path with the suffix of the configured compression
+        """
+        if self.compression:
+            return file_path + COMPRESSION_SUFFIXES[self.compression]
+        return file_path
+
+    def _check_local(self, url: str) -> Optional[Tuple[str, bool]]:
+        """Check whether a URL needs downloading at all.
+
+        Args:
+            url: URL to download
+
+        Returns:
+            Tuple of (file_path, already_processed) if the file was already
+            processed, already exists locally or could be linked from the
+            content store, None if it must be downloaded
+        """
         file_name = url.split("/")[-1]
         file_path = os.path.join(self.data_dir, file_name)
 
         # Skip if file has been processed
         if self.cache_manager.is_file_processed(file_name):
             logger.info(f"Already processed: {file_name}")
+            self.metrics.inc(
+                "cache_lookups_total", cache="processed_files", result="hit"
+            )
+            self.metrics.inc("downloads_total", result="already_processed")
             return file_path, True
+        self.metrics.inc("cache_lookups_total", cache="processed_files", result="miss")
 
-        # Skip download if file exists
-        if os.path.exists(file_path):
-            logger.info(f"File exists: {file_path}")
-            return file_path, False
+        # Skip download if file exists, plain or compressed
+        for existing_path in [file_path] + [
+            file_path + suffix for suffix in COMPRESSION_SUFFIXES.values()
+        ]:
+            if os.path.exists(existing_path):
+                logger.info(f"File exists: {existing_path}")
+                self.metrics.inc("cache_lookups_total", cache="data_dir", result="hit")
+                self.metrics.inc("downloads_total", result="existing")
+                return existing_path, False
+        self.metrics.inc("cache_lookups_total", cache="data_dir", result="miss")
 
-        req = urllib.request.Request(url, headers=headers)
+        # Link the file from the content store if another run already downloaded it
+        stored_path = self.stored_path(file_path)
+        if self.content_store and self.content_store.link_into(
+            os.path.basename(stored_path), stored_path
+        ):
+            logger.info(f"Linked from content store: {stored_path}")
+            self.metrics.inc("downloads_total", result="content_store")
+            return stored_path, False
+
+        return None
+
+    def _attempt_download(self, url: str, attempt: int) -> Tuple[str, bool]:
+        """Make one attempt at downloading a file.
+
+        Args:
+            url: URL to download
+            attempt: Number of this attempt, starting at 1
+
+        Returns:
+            Tuple of (file_path, already_processed)
+
+        Raises:
+            urllib.error.URLError: If the request failed (HTTPError for bad responses)
+            TimeoutError: If the request timed out
+            http.client.HTTPException: If the connection broke off mid-response
+        """
+        file_name = url.split("/")[-1]
+        file_path = os.path.join(self.data_dir, file_name)
 
         try:
-            with urllib.request.urlopen(req, timeout=self.download_timeout) as response:
-                if response.status == 200:
-                    with open(file_path, "wb") as out_file:
-                        out_file.write(response.read())
-                    logger.info(f"Downloaded: {file_path}")
-                    return file_path, False
-                else:
-                    raise urllib.error.HTTPError(
-                        url, response.status, "Download failed", None, None
+            self._fetch(url, file_path, attempt)
+        except DOWNLOAD_ERRORS as e:
+            error_type = (
+                str(e.code)
+                if isinstance(e, urllib.error.HTTPError)
+                else type(e).__name__
+            )
+            self.metrics.inc("http_errors_total", error=error_type)
+            raise
+
+        logger.info(f"Downloaded: {file_path}")
+        self.metrics.inc("downloads_total", result="downloaded")
+        if self.compression:
+            file_path = compress_file(file_path, self.compression)
+        if self.content_store:
+            self.content_store.put(os.path.basename(file_path), file_path)
+        return file_path, False
+
+    def _give_up(
+        self, url: str, attempt: int, error: Exception
+    ) -> Tuple[Optional[str], bool]:
+        """Log and count a download that will not be retried again."""
+        logger.error(f"Failed to download {url} after {attempt} attempts: {error}")
+        self.metrics.inc("downloads_total", result="failed")
+        return None, False
+
+    def download_csv(self, url: str) -> Tuple[Optional[str], bool]:
+        """Download a CSV file with retries and timeouts, waiting in this thread.
+
+        Use download_all to download many files without blocking workers
+        during the backoff between attempts.
+
+        Args:
+            url: URL to download
+
+        Returns:
+            Tuple of (file_path, already_processed)
+                - file_path: Path to the downloaded file or None if download failed
+                - already_processed: True if file was already processed
+        """
+        local = self._check_local(url)
+        if local:
+            return local
+
+        file_name = url.split("/")[-1]
+        attempt = 1
+        while True:
+            try:
+                return self._attempt_download(url, attempt)
+            except DOWNLOAD_ERRORS as e:
+                delay = self.retry_scheduler.retry_delay(e, attempt)
+                if delay is None:
+                    return self._give_up(url, attempt, e)
+                logger.warning(
+                    f"Error downloading {url}: {e}. Retrying in {delay:.1f}s..."
+                )
+                with self.tracer.span("retry_wait", cat="download", file=file_name):
+                    time.sleep(delay)
+                attempt += 1
+
+    def download_all(
+        self,
+        urls: List[str],
+        executor: Executor,
+        wrap: Optional[Callable[[Callable], Callable]] = None,
+        on_finish: Optional[Callable[[str, Tuple[Optional[str], bool]], None]] = None,
+    ) -> Dict[str, Tuple[Optional[str], bool]]:
+        """Download many CSV files, parking retries in the retry scheduler.
+
+        Each attempt runs as its own task on the executor. A failed attempt
+        hands its retry to the scheduler's timer queue and returns, so the
+        worker is free during the backoff and retries of different files do
+        not fire in lockstep.
+
+        Args:
+            urls: URLs to download
+            executor: Executor to run download attempts on
+            wrap: Optional decorator applied to every attempt task (e.g. for profiling)
+            on_finish: Optional callback called with each URL and its result as soon
+                as the URL is done (e.g. to checkpoint the run)
+
+        Returns:
+            Dictionary with URLs as keys and (file_path, already_processed) as values
+        """
+        results: Dict[str, Tuple[Optional[str], bool]] = {}
+        remaining = len(set(urls))
+        lock = threading.Lock()
+        finished = threading.Event()
+        if not remaining:
+            return results
+
+        def finish(url: str, result: Tuple[Optional[str], bool]) -> None:
+            nonlocal remaining
+            if on_finish:
+                try:
+                    on_finish(url, result)
+                except Exception as e:
+                    logger.error(f"Download callback failed for {url}: {e}")
+            with lock:
+                results[url] = result
+                remaining -= 1
+                if remaining == 0:
+                    finished.set()
+
+        def submit(url: str, attempt: int) -> None:
+            try:
+                executor.submit(task, url, attempt)
+            except RuntimeError as e:
+                # The executor is shutting down; the retry cannot run
+                finish(url, self._give_up(url, attempt - 1, e))
+
+        def run_attempt(url: str, attempt: int) -> None:
+            file_name = url.split("/")[-1]
+            try:
+                with self.tracer.span(
+                    "download", cat="download", file=file_name, attempt=attempt
+                ):
+                    if attempt == 1:
+                        local = self._check_local(url)
+                        if local:
+                            finish(url, local)
+                            return
+                    result = self._attempt_download(url, attempt)
+            except DOWNLOAD_ERRORS as e:
+                delay = self.retry_scheduler.retry_delay(e, attempt)
+                if delay is None:
+                    finish(url, self._give_up(url, attempt, e))
+                    return
+                # A retry that cannot be parked, or is dropped when the scheduler
+                # closes, gives the URL up so that download_all always returns
+                try:
+                    self.retry_scheduler.schedule(
+                        delay,
+                        lambda: submit(url, attempt + 1),
+                        on_cancel=lambda: finish(
+                            url,
+                            self._give_up(
+                                url, attempt, RuntimeError("pending retry was dropped")
+                            ),
+                        ),
                     )
-        except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError) as e:
-            if retry_count < self.max_retries:
+                except RuntimeError as schedule_error:
+                    finish(url, self._give_up(url, attempt, schedule_error))
+                    return
                 logger.warning(
-                    f"Error downloading {url}: {e}. Retrying in {self.retry_delay}s..."
+                    f"Error downloading {url}: {e}. Retrying in {delay:.1f}s..."
                 )
-                time.sleep(self.retry_delay)
-                return self.download_csv(url, retry_count + 1)
-            else:
-                logger.error(
-                    f"Failed to download {url} after {self.max_retries} attempts: {e}"
+                self.tracer.instant(
+                    "retry_scheduled", cat="download", file=file_name, delay=delay
                 )
-                return None, False
\ No newline at end of file
+                return
+            except Exception as e:
+                logger.error(f"Exception for {url}: {e}")
+                self.metrics.inc("downloads_total", result="failed")
+                finish(url, (None, False))
+                return
+            finish(url, result)
+
+        task = wrap(run_attempt) if wrap else run_attempt
+        for url in dict.fromkeys(urls):
+            submit(url, 1)
+
+        finished.wait()
+        return results
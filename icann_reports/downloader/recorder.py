@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import threading
+import urllib.parse
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="recorder")
+
+# Response headers kept in fixtures; the rest describe the transfer, not the report
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class ResponseRecorder:
+    """Records report server responses into a fixture directory for replay.
+
+    Bodies are stored under ``bodies/`` at their URL path, and ``index.json``
+    maps each URL path to its status code, headers and body file. The
+    directory can be served with ``ReplayServer``.
+    """
+
+    def __init__(self, fixture_dir: str):
+        """Initialize the response recorder.
+
+        Args:
+            fixture_dir: Directory to write fixtures to
+        """
+        self.fixture_dir = fixture_dir
+        self.bodies_dir = os.path.join(fixture_dir, "bodies")
+        self.index_file = os.path.join(fixture_dir, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.index = self.load_index(fixture_dir)
+
+    @staticmethod
+    def load_index(fixture_dir: str) -> Dict[str, Dict[str, Any]]:
+        """Load the index of a fixture directory.
+
+        Args:
+            fixture_dir: Directory holding the fixtures
+
+        Returns:
+            Dictionary with URL paths as keys and recorded responses as values
+        """
+        index_file = os.path.join(fixture_dir, "index.json")
+        if not os.path.exists(index_file):
+            return {}
+        with open(index_file, "r") as f:
+            return json.load(f)
+
+    def _save_index(self) -> None:
+        """Write the index atomically; the caller must hold the lock."""
+        temp_path = f"{self.index_file}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.index_file)
+
+    def record(
+        self,
+        url: str,
+        status: int,
+        headers: Dict[str, str],
+        body_path: Optional[str] = None,
+    ) -> None:
+        """Record a response.
+
+        Args:
+            url: URL that was requested
+            status: HTTP status code of the response
+            headers: Response headers (only RECORDED_HEADERS are kept)
+            body_path: File holding the complete response body, if any
+        """
+        path = urllib.parse.urlparse(url).path
+        entry: Dict[str, Any] = {
+            "status": status,
+            "headers": {
+                name: headers[name] for name in RECORDED_HEADERS if headers.get(name)
+            },
+            "body": None,
+        }
+
+        if body_path:
+            relative_path = path.lstrip("/")
+            dest_path = os.path.join(self.bodies_dir, relative_path)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            shutil.copyfile(body_path, dest_path)
+            last_modified = entry["headers"].get("Last-Modified")
+            if last_modified:
+                # Keep the file's mtime so replayed Last-Modified headers match the
+                # original
+                try:
+                    timestamp = parsedate_to_datetime(last_modified).timestamp()
+                    os.utime(dest_path, (timestamp, timestamp))
+                except (TypeError, ValueError):
+                    pass
+            entry["body"] = relative_path
+
+        with self._lock:
+            self.index[path] = entry
+            self._save_index()
+        logger.debug(f"Recorded {status} response for {path}")
@@ -0,0 +1,242 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+import urllib.error
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Optional, Tuple
+
+from config import MAX_RETRIES, RETRY_BUDGET, RETRY_DELAY, RETRY_MAX_DELAY
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="retry")
+
+# HTTP client errors that are worth retrying; every other 4xx is permanent
+RETRYABLE_CLIENT_ERRORS = (408, 429)
+
+
+class RetryScheduler:
+    """Schedules download retries on a timer heap instead of sleeping in workers.
+
+    A failed attempt asks ``retry_delay`` whether and when to retry, then parks
+    the retry with ``schedule``. A single timer thread fires due callbacks, which
+    resubmit the attempt to the worker pool, so no worker is blocked while it
+    waits. Delays use exponential backoff with full jitter, a ``Retry-After``
+    header takes precedence, and the number of retries per run is capped by a
+    shared budget.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = RETRY_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        max_retries: int = MAX_RETRIES,
+        retry_budget: int = RETRY_BUDGET,
+        metrics: Optional[MetricsRegistry] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        """Initialize the retry scheduler.
+
+        Args:
+            base_delay: Backoff cap for the first retry in seconds
+            max_delay: Longest backoff or Retry-After wait in seconds
+            max_retries: Maximum number of retries per download
+            retry_budget: Maximum number of retries across the whole run
+            metrics: MetricsRegistry to record retries and dropped retries in
+            rng: Random number generator for the jitter
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.metrics = metrics or MetricsRegistry()
+        self.rng = rng or random.Random()
+        self.retries_used = 0
+        self._timers: List[
+            Tuple[float, int, Callable[[], None], Optional[Callable[[], None]]]
+        ] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """Number of retries waiting to fire."""
+        return len(self._timers)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Check whether a failed attempt is worth retrying.
+
+        Args:
+            error: Exception raised by a download attempt
+
+        Returns:
+            False for HTTP 4xx responses other than 408 and 429, True otherwise
+        """
+        if isinstance(error, urllib.error.HTTPError):
+            return not 400 <= error.code < 500 or error.code in RETRYABLE_CLIENT_ERRORS
+        return True
+
+    @staticmethod
+    def parse_retry_after(error: Exception) -> Optional[float]:
+        """Read the Retry-After header of an HTTP error.
+
+        Args:
+            error: Exception raised by a download attempt
+
+        Returns:
+            Seconds to wait, or None if the header is missing or invalid
+        """
+        headers = getattr(error, "headers", None)
+        value = headers.get("Retry-After") if headers is not None else None
+        if not value:
+            return None
+
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Compute a full-jitter exponential backoff delay.
+
+        Args:
+            attempt: Number of the failed attempt, starting at 1
+
+        Returns:
+            Delay drawn uniformly between 0 and min(max_delay, base_delay * 2^(attempt -
+            1))
+        """
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return self.rng.uniform(0, cap)
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Decide whether a failed attempt is retried and after how long.
+
+        A positive answer takes one retry from the run's budget.
+
+        Args:
+            error: Exception raised by the failed attempt
+            attempt: Number of the failed attempt, starting at 1
+
+        Returns:
+            Seconds to wait before the next attempt, or None to give up
+        """
+        if not self.is_retryable(error):
+            reason = "not_retryable"
+        elif attempt > self.max_retries:
+            reason = "max_retries"
+        else:
+            with self._condition:
+                if self.retries_used >= self.retry_budget:
+                    reason = "budget_exhausted"
+                else:
+                    self.retries_used += 1
+                    reason = None
+
+        if reason:
+            self.metrics.inc("download_retries_dropped_total", reason=reason)
+            if reason == "budget_exhausted":
+                logger.warning(
+                    f"Retry budget of {self.retry_budget} exhausted, not retrying"
+                )
+            return None
+
+        self.metrics.inc("download_retries_total")
+        retry_after = self.parse_retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self.backoff_delay(attempt)
+
+    def reset_budget(self) -> None:
+        """Give back every retry taken from the budget, as at the start of a run."""
+        with self._condition:
+            self.retries_used = 0
+
+    def schedule(
+        self,
+        delay: float,
+        callback: Callable[[], None],
+        on_cancel: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Run a callback on the timer thread once a delay has passed.
+
+        The callback should only hand work off (e.g. submit it to an executor),
+        since it runs on the single timer thread.
+
+        Args:
+            delay: Seconds to wait
+            callback: Function to call when the delay has passed
+            on_cancel: Function to call instead if the scheduler is closed before
+                the delay has passed
+
+        Raises:
+            RuntimeError: If the scheduler was already closed
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(
+                    "Cannot schedule a retry after the scheduler was closed"
+                )
+            heapq.heappush(
+                self._timers,
+                (time.monotonic() + delay, next(self._sequence), callback, on_cancel),
+            )
+            self.metrics.set_gauge("retries_pending", len(self._timers))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="retry-scheduler", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        """Fire due callbacks until the scheduler is closed."""
+        while True:
+            with self._condition:
+                while not self._closed and (
+                    not self._timers or self._timers[0][0] > time.monotonic()
+                ):
+                    timeout = (
+                        self._timers[0][0] - time.monotonic() if self._timers else None
+                    )
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+                _, _, callback, _ = heapq.heappop(self._timers)
+                self.metrics.set_gauge("retries_pending", len(self._timers))
+
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Scheduled retry failed: {e}")
+
+    def close(self) -> None:
+        """Stop the timer thread, cancelling any retries that have not fired."""
+        with self._condition:
+            self._closed = True
+            dropped = [timer[3] for timer in self._timers]
+            self._timers.clear()
+            self._condition.notify()
+        if dropped:
+            logger.warning(f"Dropped {len(dropped)} pending retries")
+        for on_cancel in dropped:
+            if on_cancel is None:
+                continue
+            try:
+                on_cancel()
+            except Exception as e:
+                logger.error(f"Cancelling a scheduled retry failed: {e}")
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
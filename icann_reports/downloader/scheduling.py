@@ -0,0 +1,222 @@
+import os
+import re
+import statistics
+import urllib.error
+import urllib.request
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import DATA_DIR, DOWNLOAD_TIMEOUT
+from icann_reports.utils.compression import COMPRESSION_SUFFIXES
+from icann_reports.utils.content_store import ContentStore
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="scheduling")
+
+# Orders in which downloads and parse tasks can be submitted
+SCHEDULING_STRATEGIES = ("url", "largest-first", "newest-first")
+
+# Month of a report in its URL or file name, e.g. "202401"
+REPORT_MONTH_PATTERN = re.compile(r"-transactions-(\d{6})-")
+
+
+class WorkScheduler:
+    """Orders downloads and parse tasks to shorten the run's makespan.
+
+    With "largest-first", the biggest files start first so the tail of the
+    run is made of small files that fill the gaps between workers, bringing
+    the wall-clock time close to total work divided by workers. Sizes come
+    from earlier runs (files in the data directory and the content store
+    index) or, when probing is enabled, from the Content-Length of HEAD
+    requests. With "newest-first", the most recent months are fetched and
+    parsed first so fresh data is available early. "url" keeps the order
+    the URLs were generated in.
+    """
+
+    def __init__(
+        self,
+        strategy: str = "url",
+        data_dir: str = DATA_DIR,
+        content_store: Optional[ContentStore] = None,
+        probe_sizes: bool = False,
+        head_timeout: int = DOWNLOAD_TIMEOUT,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """Initialize the work scheduler.
+
+        Args:
+            strategy: "url", "largest-first" or "newest-first"
+            data_dir: Directory holding downloads of earlier runs
+            content_store: Content store whose index records sizes of earlier downloads
+            probe_sizes: Send HEAD requests for files whose size is not known locally
+            head_timeout: Timeout for HEAD requests in seconds
+            metrics: MetricsRegistry to record where size estimates came from
+        """
+        if strategy not in SCHEDULING_STRATEGIES:
+            raise ValueError(f"Unknown scheduling strategy: {strategy}")
+
+        self.strategy = strategy
+        self.data_dir = data_dir
+        self.content_store = content_store
+        self.probe_sizes = probe_sizes
+        self.head_timeout = head_timeout
+        self.metrics = metrics or MetricsRegistry()
+
+    @staticmethod
+    def report_month(url: str) -> str:
+        """Get the YYYYMM month of a report from its URL or path (empty if unknown)."""
+        match = REPORT_MONTH_PATTERN.search(os.path.basename(url))
+        return match.group(1) if match else ""
+
+    @staticmethod
+    def report_tld(url: str) -> str:
+        """Get the TLD of a report from its URL or path (empty if unknown)."""
+        name = os.path.basename(url)
+        return name.split("-transactions-")[0] if "-transactions-" in name else ""
+
+    def known_size(
+        self, url: str, index: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Tuple[Optional[int], str]:
+        """Look up the size of a report from earlier runs.
+
+        Args:
+            url: URL of the report
+            index: Content store index to look the size up in (loaded from the
+                content store if not given)
+
+        Returns:
+            Tuple of (size in bytes or None, source of the size)
+        """
+        file_name = url.split("/")[-1]
+        candidates = [file_name] + [
+            file_name + suffix for suffix in COMPRESSION_SUFFIXES.values()
+        ]
+
+        for name in candidates:
+            path = os.path.join(self.data_dir, name)
+            if os.path.exists(path):
+                return os.path.getsize(path), "data_dir"
+
+        if index is None and self.content_store:
+            index = self.content_store.load_index()
+        if index:
+            for name in candidates:
+                if name in index:
+                    return index[name]["size"], "content_store"
+
+        return None, "unknown"
+
+    def probe_size(self, url: str) -> Optional[int]:
+        """Get the size of a report from the Content-Length of a HEAD request.
+
+        Args:
+            url: URL of the report
+
+        Returns:
+            Size in bytes, or None if the request failed or sent no length
+        """
+        req = urllib.request.Request(url, method="HEAD")
+        try:
+            with urllib.request.urlopen(req, timeout=self.head_timeout) as response:
+                length = response.headers.get("Content-Length")
+                return int(length) if length else None
+        except (urllib.error.URLError, TimeoutError, ConnectionError, ValueError) as e:
+            logger.debug(f"HEAD request failed for {url}: {e}")
+            return None
+
+    def estimate_sizes(
+        self, urls: List[str], executor: Optional[Executor] = None
+    ) -> Dict[str, int]:
+        """Estimate the size of every report.
+
+        Sizes that are neither known nor probed are estimated as the median
+        known size of the same TLD, or of all TLDs, or 0 without any data.
+
+        Args:
+            urls: URLs of the reports
+            executor: Executor to send HEAD requests on (sent one by one if None)
+
+        Returns:
+            Dictionary with URLs as keys and sizes in bytes as values
+        """
+        sizes: Dict[str, int] = {}
+        unknown = []
+        # Load the content store index once rather than once per URL
+        index = self.content_store.load_index() if self.content_store else {}
+        for url in urls:
+            size, source = self.known_size(url, index)
+            if size is None:
+                unknown.append(url)
+            else:
+                sizes[url] = size
+                self.metrics.inc("size_estimates_total", source=source)
+
+        if self.probe_sizes and unknown:
+            probe_map = executor.map if executor else map
+            for url, size in zip(unknown, list(probe_map(self.probe_size, unknown))):
+                if size is not None:
+                    sizes[url] = size
+                    self.metrics.inc("size_estimates_total", source="head")
+            unknown = [url for url in unknown if url not in sizes]
+
+        by_tld: Dict[str, List[int]] = {}
+        for url, size in sizes.items():
+            by_tld.setdefault(self.report_tld(url), []).append(size)
+        overall = statistics.median(sizes.values()) if sizes else 0
+        for url in unknown:
+            tld_sizes = by_tld.get(self.report_tld(url))
+            sizes[url] = int(statistics.median(tld_sizes) if tld_sizes else overall)
+            self.metrics.inc("size_estimates_total", source="estimated")
+
+        return sizes
+
+    def order(self, urls: List[str], executor: Optional[Executor] = None) -> List[str]:
+        """Order URLs for downloading according to the strategy.
+
+        Sorting is stable, so URLs that tie keep their generated order (which
+        interleaves TLDs).
+
+        Args:
+            urls: URLs in generated order
+            executor: Executor to send HEAD requests on when probing sizes
+
+        Returns:
+            URLs in the order they should be submitted
+        """
+        if self.strategy == "newest-first":
+            return sorted(urls, key=self.report_month, reverse=True)
+        if self.strategy == "largest-first":
+            sizes = self.estimate_sizes(urls, executor)
+            total = sum(sizes.values())
+            logger.info(
+                f"Scheduling {len(urls)} downloads largest first, about {total} bytes "
+                "in total"
+            )
+            return sorted(urls, key=lambda url: sizes[url], reverse=True)
+        return list(urls)
+
+    def order_files(self, file_infos: List[Tuple[str, bool]]) -> List[Tuple[str, bool]]:
+        """Order downloaded files for parsing according to the strategy.
+
+        Args:
+            file_infos: List of (file_path, already_processed) tuples
+
+        Returns:
+            The same tuples in the order they should be parsed
+        """
+        if self.strategy == "newest-first":
+            return sorted(
+                file_infos, key=lambda info: self.report_month(info[0]), reverse=True
+            )
+        if self.strategy == "largest-first":
+
+            def file_size(info: Tuple[str, bool]) -> int:
+                # Already processed files are only read from the cache, so they are
+                # cheap
+                if info[1] or not os.path.exists(info[0]):
+                    return 0
+                return os.path.getsize(info[0])
+
+            return sorted(file_infos, key=file_size, reverse=True)
+        return list(file_infos)
@@ -1,4 +1,6 @@
+import json
 from datetime import datetime, timedelta
+from itertools import chain, zip_longest
 from typing import Dict, List, Any
 
 from config import BASE_URL
@@ -6,61 +8,124 @@ from config import BASE_URL
 
 class URLGenerator:
     """Generates URLs for ICANN reports based on TLD configurations."""
-    
+
     def __init__(self, base_url: str = BASE_URL):
         """Initialize URL generator.
-        
+
         Args:
             base_url: Base URL template for reports
         """
         self.base_url = base_url
-        
+
     def generate_tld_urls(self, tlds: List[Dict[str, Any]]) -> List[str]:
         """Generate URLs for TLD data based on date ranges.
-        
+
         Args:
             tlds: List of dictionaries with 'base_url', 'start_date', and 'end_date'
                  Each TLD dict should have format:
                  {
-                    'base_url': 'https://icann.org/sites/default/files/mrr/{tld}/com-transactions-{date}-en.csv',
+                    'base_url':
+                    'https://icann.org/sites/default/files/mrr/{tld}/com-transactions-{date}-en.csv',
                     'start_date': '2019-01',
                     'end_date': '2023-12'
                  }
-                 
+
         Returns:
             List of complete URLs to download
         """
         urls = []
         for tld in tlds:
-            start_date = datetime.strptime(tld["start_date"], "%Y-%m")
-            end_date = datetime.strptime(tld["end_date"], "%Y-%m")
-            
-            # Use provided base URL or default
-            tld_base_url = tld.get("base_url") or self.base_url
-            
-            # Set TLD in URL if present
-            if "{tld}" in tld_base_url and "tld" in tld:
-                tld_base_url = tld_base_url.replace("{tld}", tld["tld"])
-                
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.strftime("%Y%m")
-                url = tld_base_url.replace("{date}", date_str)
-                urls.append(url)
-                
-                # Move to next month
-                current_date += timedelta(days=32)
-                current_date = current_date.replace(day=1)
-                
+            urls.extend(self._urls_for_tld(tld))
         return urls
-        
+
+    def generate_interleaved_urls(self, tlds: List[Dict[str, Any]]) -> List[str]:
+        """Generate URLs for several TLDs, taking one month from each TLD in turn.
+
+        A large TLD with a long date range does not hold up the others: the
+        first month of every TLD comes before the second month of any of them.
+
+        Args:
+            tlds: List of TLD configurations, as for generate_tld_urls
+
+        Returns:
+            List of complete URLs to download, interleaved across TLDs
+        """
+        per_tld = [self._urls_for_tld(tld) for tld in tlds]
+        return [
+            url for url in chain.from_iterable(zip_longest(*per_tld)) if url is not None
+        ]
+
+    def _urls_for_tld(self, tld: Dict[str, Any]) -> List[str]:
+        """Generate the URLs for one TLD configuration, in date order."""
+        urls = []
+        start_date = datetime.strptime(tld["start_date"], "%Y-%m")
+        end_date = datetime.strptime(tld["end_date"], "%Y-%m")
+
+        # Use provided base URL or default
+        tld_base_url = tld.get("base_url") or self.base_url
+
+        # Set TLD in URL if present
+        if "{tld}" in tld_base_url and "tld" in tld:
+            tld_base_url = tld_base_url.replace("{tld}", tld["tld"])
+
+        current_date = start_date
+        while current_date <= end_date:
+            date_str = current_date.strftime("%Y%m")
+            url = tld_base_url.replace("{date}", date_str)
+            urls.append(url)
+
+            # Move to next month
+            current_date += timedelta(days=32)
+            current_date = current_date.replace(day=1)
+
+        return urls
+
+    @staticmethod
+    def load_tld_manifest(
+        manifest_path: str, start_date: str, end_date: str
+    ) -> List[Dict[str, Any]]:
+        """Load TLD configurations from a JSON manifest file.
+
+        The manifest is a list whose entries are either a TLD name or an object
+        with a "tld" key and optional "start_date", "end_date" and "base_url"
+        keys, e.g. ``["com", {"tld": "net", "start_date": "2023-01"}]``.
+
+        Args:
+            manifest_path: Path to the manifest file
+            start_date: Start date (YYYY-MM) for entries that do not set one
+            end_date: End date (YYYY-MM) for entries that do not set one
+
+        Returns:
+            List of TLD configurations for generate_tld_urls
+
+        Raises:
+            ValueError: If the manifest is not a list of TLD entries
+        """
+        with open(manifest_path, "r") as f:
+            entries = json.load(f)
+        if not isinstance(entries, list):
+            raise ValueError(f"TLD manifest must be a list: {manifest_path}")
+
+        tlds = []
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {"tld": entry}
+            if not isinstance(entry, dict) or not entry.get("tld"):
+                raise ValueError(f"Invalid TLD manifest entry: {entry!r}")
+            tld = {"start_date": start_date, "end_date": end_date, **entry}
+            tld["tld"] = tld["tld"].lower()
+            for key in ("start_date", "end_date"):
+                datetime.strptime(tld[key], "%Y-%m")
+            tlds.append(tld)
+        return tlds
+
     @staticmethod
     def parse_filename_date(file_name: str) -> str:
         """Extract date from a report filename.
-        
+
         Args:
             file_name: Name of the report file (e.g., "com-transactions-202401-en.csv")
-            
+
         Returns:
             Date string in YYYY-MM format
         """
@@ -72,4 +137,4 @@ class URLGenerator:
                 year = date_part[:4]
                 month = date_part[4:6]
                 return f"{year}-{month}"
-        return ""
\ No newline at end of file
+        return ""
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-ICANN Reports Downloader - Main Module
+ICANN Reports Downloader - Main Module.
 
 This script downloads and processes ICANN transaction reports for domain registrars,
 normalizes field names, and generates summary reports.
@@ -8,16 +8,75 @@ normalizes field names, and generates summary reports.
 
 import argparse
 import logging
+import os
+import signal
+import sys
+import tarfile
+import threading
+import time
+import zipfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional
 
-from config import MAX_WORKERS, BASE_URL
+from config import (
+    API_HOST,
+    API_PORT,
+    MAX_WORKERS,
+    BASE_URL,
+    COLUMNAR_DIR,
+    CONTENT_STORE_DIR,
+    DATA_DIR,
+    DOWNLOAD_CONCURRENCY_INITIAL,
+    DOWNLOAD_CONCURRENCY_MAX,
+    DOWNLOAD_CONCURRENCY_MIN,
+    LEASE_SECONDS,
+    QUEUE_POLL_INTERVAL,
+    REPORT_CACHE_DIR,
+    REPORT_CACHE_MAX_BYTES,
+    REPORTS_DIR,
+    SERVICE_POLL_INTERVAL,
+    SERVICE_STATE_DIR,
+    SQLITE_PATH,
+    RETRY_BUDGET,
+)
+from icann_reports.api import ReportAPI, ReportAPIServer
+from icann_reports.benchmark.replay import FaultInjector, ReplayServer
+from icann_reports.downloader.concurrency import AdaptiveConcurrencyLimiter
+from icann_reports.downloader.recorder import ResponseRecorder
+from icann_reports.downloader.retry import RetryScheduler
+from icann_reports.downloader.scheduling import SCHEDULING_STRATEGIES, WorkScheduler
 from icann_reports.downloader.url_generator import URLGenerator
 from icann_reports.downloader.csv_downloader import CSVDownloader
+from icann_reports.processor.aggregation import ReportAggregator
+from icann_reports.processor.archive import ArchiveIngestor
 from icann_reports.processor.csv_processor import CSVProcessor
 from icann_reports.processor.field_validation import FieldValidator
+from icann_reports.processor.query import (
+    QUERY_FORMATS,
+    QUERY_GROUP_FIELDS,
+    QUERY_MEASURES,
+    ReportQuery,
+    write_query_results,
+)
 from icann_reports.processor.reports import ReportGenerator
+from icann_reports.processor.sqlite_export import SQLiteExporter
+from icann_reports.processor.streaming import StreamingSink
+from icann_reports.processor.vectorized import AGGREGATION_BACKENDS
+from icann_reports.service import OPEN_END_DATE, ReportService
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.columnar import ColumnarStore
+from icann_reports.utils.compression import COMPRESSION_SUFFIXES
+from icann_reports.utils.content_store import ContentStore
 from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+from icann_reports.utils.profiling import StageProfiler, DEFAULT_TOP_N
+from icann_reports.utils.run_manifest import RunManifest
+from icann_reports.utils.query_index import QueryIndex
+from icann_reports.utils.report_cache import ReportCache
+from icann_reports.utils.tracing import TraceRecorder
+from icann_reports.utils.work_queue import LeaseWorkQueue
+
+logger = setup_logging()
 
 
 def parse_arguments():
@@ -26,134 +85,1356 @@ def parse_arguments():
         description="Download and process ICANN registrar transaction reports."
     )
     parser.add_argument(
-        "--tld", type=str, default="com",
-        help="TLD to process (default: com)"
+        "--tld",
+        type=str,
+        nargs="+",
+        default=["com"],
+        help="TLDs to process in one run (default: com)",
+    )
+    parser.add_argument(
+        "--tld-manifest",
+        metavar="FILE",
+        help="JSON list of TLDs, each optionally with its own date range, instead of "
+        "--tld",
+    )
+    parser.add_argument(
+        "--start-date",
+        type=str,
+        default="2024-01",
+        help="Start date in YYYY-MM format (default: 2024-01)",
+    )
+    parser.add_argument(
+        "--end-date",
+        type=str,
+        default="2024-11",
+        help="End date in YYYY-MM format (default: 2024-11)",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_WORKERS,
+        help="Maximum number of worker threads for processing (default: "
+        f"{MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--min-download-concurrency",
+        type=int,
+        default=DOWNLOAD_CONCURRENCY_MIN,
+        help="Lowest adaptive limit on in-flight downloads (default: "
+        f"{DOWNLOAD_CONCURRENCY_MIN})",
+    )
+    parser.add_argument(
+        "--initial-download-concurrency",
+        type=int,
+        default=DOWNLOAD_CONCURRENCY_INITIAL,
+        help="Starting limit on in-flight downloads (default: "
+        f"{DOWNLOAD_CONCURRENCY_INITIAL})",
+    )
+    parser.add_argument(
+        "--max-download-concurrency",
+        type=int,
+        default=DOWNLOAD_CONCURRENCY_MAX,
+        help="Highest adaptive limit on in-flight downloads (default: "
+        f"{DOWNLOAD_CONCURRENCY_MAX})",
+    )
+    parser.add_argument(
+        "--retry-budget",
+        type=int,
+        default=RETRY_BUDGET,
+        help=f"Maximum number of download retries per run (default: {RETRY_BUDGET})",
     )
     parser.add_argument(
-        "--start-date", type=str, default="2024-01",
-        help="Start date in YYYY-MM format (default: 2024-01)"
+        "--schedule",
+        choices=SCHEDULING_STRATEGIES,
+        default="url",
+        help="Order of downloads and parsing: url, largest-first or newest-first "
+        "(default: url)",
     )
     parser.add_argument(
-        "--end-date", type=str, default="2024-11",
-        help="End date in YYYY-MM format (default: 2024-11)"
+        "--probe-sizes",
+        action="store_true",
+        help="Send HEAD requests for report sizes unknown from earlier runs (with "
+        "--schedule largest-first)",
     )
     parser.add_argument(
-        "--max-workers", type=int, default=MAX_WORKERS,
-        help=f"Maximum number of worker threads (default: {MAX_WORKERS})"
+        "--store-dir",
+        default=CONTENT_STORE_DIR,
+        help="Content-addressed store shared by runs on this host (default: "
+        "data/store)",
     )
     parser.add_argument(
-        "--validate", action="store_true",
-        help="Validate the data after processing"
+        "--compress",
+        choices=["none", "gzip", "xz"],
+        default="none",
+        help="Keep downloaded reports compressed at rest (default: none)",
     )
     parser.add_argument(
-        "--generate-reports", action="store_true",
-        help="Generate summary reports after processing"
+        "--run-dir",
+        metavar="DIR",
+        help="Checkpoint the run in this directory, resuming it from there if it was "
+        "interrupted",
     )
     parser.add_argument(
-        "--verbose", action="store_true",
-        help="Enable verbose logging"
+        "--aggregation-backend",
+        choices=AGGREGATION_BACKENDS,
+        default="auto",
+        help="Aggregate reports with NumPy or pure Python (default: auto, NumPy when "
+        "installed)",
+    )
+    parser.add_argument(
+        "--no-report-cache",
+        action="store_true",
+        help="Always generate reports instead of reusing ones generated from the same "
+        "inputs",
+    )
+    parser.add_argument(
+        "--report-cache-size",
+        type=int,
+        default=REPORT_CACHE_MAX_BYTES // (1024 * 1024),
+        help="Megabytes of cached reports kept before the least recently used are "
+        "evicted "
+        f"(default: {REPORT_CACHE_MAX_BYTES // (1024 * 1024)})",
+    )
+    parser.add_argument(
+        "--sqlite",
+        nargs="?",
+        const=SQLITE_PATH,
+        metavar="PATH",
+        help="Load parsed rows and summaries into a SQLite database, skipping reports "
+        "already loaded "
+        "(default path: data/icann_reports.sqlite)",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Keep parsed reports in memory-mapped columnar files and load them "
+        "instead of parsing again",
+    )
+    parser.add_argument(
+        "--columnar-dir",
+        default=COLUMNAR_DIR,
+        help="Directory of the columnar reports (default: data/columnar)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Validate and aggregate each report as soon as it is parsed, without "
+        "keeping its rows",
+    )
+    parser.add_argument(
+        "--queue-dir",
+        metavar="DIR",
+        help="Share the run with other workers through a work queue in this shared "
+        "directory",
+    )
+    parser.add_argument(
+        "--worker-id",
+        help="Name of this worker in the work queue (default: hostname and process ID)",
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=LEASE_SECONDS,
+        help="Seconds a worker's claim on a report lasts unless renewed (default: "
+        f"{LEASE_SECONDS})",
+    )
+    parser.add_argument(
+        "--ingest-archive",
+        nargs="+",
+        metavar="ARCHIVE",
+        help="Process every report in these zip or tar archives instead of downloading",
+    )
+    parser.add_argument(
+        "--record-fixtures",
+        metavar="DIR",
+        help="Record server responses into a fixture directory for offline replay",
+    )
+    parser.add_argument(
+        "--replay-fixtures",
+        metavar="DIR",
+        help="Download from a local replay server serving this fixture directory",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=0.0,
+        help="Seconds the replay server waits before each response (default: 0)",
+    )
+    parser.add_argument(
+        "--replay-bandwidth",
+        type=int,
+        default=None,
+        help="Bytes per second the replay server sends each response at (default: "
+        "unlimited)",
+    )
+    parser.add_argument(
+        "--replay-faults",
+        type=FaultInjector.parse_rates,
+        default={},
+        help='Fault rates for the replay server, e.g. "503=0.1,timeout=0.02"',
+    )
+    parser.add_argument(
+        "--replay-seed",
+        type=int,
+        default=0,
+        help="Seed for the replay server's fault injection (default: 0)",
+    )
+    parser.add_argument(
+        "--validate", action="store_true", help="Validate the data after processing"
+    )
+    parser.add_argument(
+        "--generate-reports",
+        action="store_true",
+        help="Generate summary reports after processing",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Capture cProfile statistics per pipeline stage",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Capture tracemalloc snapshots per pipeline stage",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=DEFAULT_TOP_N,
+        help=f"Number of entries in profiling summaries (default: {DEFAULT_TOP_N})",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=str,
+        help="Write run metrics to this Prometheus textfile (.prom)",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        type=str,
+        help="Write a JSON summary of run metrics to this file",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        help="Write a Chrome Trace Event JSON timeline of the run to this file",
     )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.ingest_archive:
+        # Archives are ingested in one pass that has no run manifest, columnar store,
+        # work queue or streaming sink, so those options would be silently dropped
+        download_only = [
+            option
+            for option, value in [
+                ("--stream", args.stream),
+                ("--run-dir", args.run_dir),
+                ("--columnar", args.columnar),
+                ("--queue-dir", args.queue_dir),
+            ]
+            if value
+        ]
+        if download_only:
+            parser.error(
+                f"--ingest-archive cannot be combined with {', '.join(download_only)}"
+            )
+    return args
 
 
 def download_and_process_csv_files(
-    urls: List[str], 
-    max_workers: int
+    urls: List[str],
+    max_workers: int,
+    profiler: Optional[StageProfiler] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    tracer: Optional[TraceRecorder] = None,
+    concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    retry_scheduler: Optional[RetryScheduler] = None,
+    content_store: Optional[ContentStore] = None,
+    compression: Optional[str] = None,
+    recorder: Optional[ResponseRecorder] = None,
+    work_scheduler: Optional[WorkScheduler] = None,
+    run_manifest: Optional[RunManifest] = None,
+    reparse_processed: bool = False,
+    row_sink: Optional[Callable[[Dict[str, List[Dict[str, Any]]]], None]] = None,
+    columnar_store: Optional[ColumnarStore] = None,
+    data_dir: str = DATA_DIR,
+    cache_manager: Optional[CacheManager] = None,
 ) -> Dict[str, List[Dict[str, Any]]]:
     """Download and process CSV files concurrently.
 
     Args:
         urls: List of URLs to download
         max_workers: Maximum number of concurrent workers
+        profiler: StageProfiler to capture the download, structure detection
+            and parse stages with
+        metrics: MetricsRegistry to record download and parse metrics in
+        tracer: TraceRecorder to record one span per download, structure
+            detection and parse task in
+        concurrency_limiter: Adaptive limit on in-flight downloads (the download
+            pool is sized to its maximum)
+        retry_scheduler: Scheduler that parks failed downloads until their retry;
+            the caller closes it when given, so it can be shared across calls
+        content_store: Content-addressed store that downloads are shared through
+        compression: Keep downloads gzip or xz compressed ("gzip", "xz" or None)
+        recorder: ResponseRecorder to capture server responses into replay fixtures
+        work_scheduler: WorkScheduler deciding the order of downloads and parse tasks
+        run_manifest: RunManifest to checkpoint every report's progress in; reports
+            it records as downloaded or parsed are not downloaded or parsed again
+        reparse_processed: Parse reports listed in the processed-files cache again
+            when they are on disk, because their rows are needed (always done
+            with a run manifest)
+        row_sink: Callable handed each parsed report (e.g. StreamingSink.consume);
+            when given, rows are dropped afterwards instead of being returned
+        columnar_store: ColumnarStore that parsed reports are written to; reports
+            already in it are loaded from it instead of being downloaded and parsed
+        data_dir: Directory reports are downloaded to
+        cache_manager: Processed-files cache shared by the downloader and the
+            processor
 
     Returns:
-        Dictionary with file names as keys and processed data as values
+        Dictionary with file names as keys and processed data as values (empty
+        when a row sink is given)
     """
     consolidated_data = {}
-    csv_downloader = CSVDownloader()
-    csv_processor = CSVProcessor()
-    
-    # Download files concurrently
+    metrics = metrics or MetricsRegistry()
+    tracer = tracer or TraceRecorder()
+    concurrency_limiter = concurrency_limiter or AdaptiveConcurrencyLimiter(
+        metrics=metrics
+    )
+    cache_manager = cache_manager or CacheManager()
+    csv_downloader = CSVDownloader(
+        data_dir=data_dir,
+        cache_manager=cache_manager,
+        metrics=metrics,
+        tracer=tracer,
+        concurrency_limiter=concurrency_limiter,
+        retry_scheduler=retry_scheduler,
+        content_store=content_store,
+        compression=compression,
+        recorder=recorder,
+    )
+    csv_processor = CSVProcessor(data_dir, cache_manager=cache_manager, metrics=metrics)
+    profiler = profiler or StageProfiler()
+    work_scheduler = work_scheduler or WorkScheduler(metrics=metrics)
+
+    def detect_task(file_path: str):
+        with tracer.span(
+            "structure_detection", cat="parse", file=os.path.basename(file_path)
+        ):
+            return csv_processor.file_structure_analyzer.detect_file_structure(
+                file_path
+            )
+
+    def parse_task(file_info: tuple, structure: Optional[Dict[str, Any]]):
+        with tracer.span("parse", cat="parse", file=os.path.basename(file_info[0])):
+            result = csv_processor.process_csv(file_info, structure)
+        if result and columnar_store:
+            columnar_store.write(result)
+        if result and run_manifest:
+            for file_name, rows in result.items():
+                run_manifest.spill_rows(file_urls[file_info[0]], file_name, rows)
+        if result and row_sink:
+            row_sink(result)
+            return None
+        return result
+
+    def checkpoint_download(url: str, file_info: tuple) -> None:
+        file_path, already_processed = file_info
+        if file_path and not already_processed:
+            file_urls[file_path] = url
+            run_manifest.mark(url, "downloaded", path=file_path)
+
+    def recover_cached_report(url: str, file_info: tuple) -> tuple:
+        # The processed-files cache does not know whether a report's rows reached
+        # this run's output, so reports it lists are parsed again if still on disk
+        file_path, already_processed = file_info
+        if not already_processed:
+            return file_info
+        for local_path in [file_path] + [
+            file_path + suffix for suffix in COMPRESSION_SUFFIXES.values()
+        ]:
+            if os.path.exists(local_path):
+                file_urls[local_path] = url
+                return local_path, False
+        logger.warning(
+            f"{os.path.basename(file_path)} was processed by an earlier run but is "
+            "not on disk"
+        )
+        return file_info
+
+    # Reports that reached a stage before an interrupted run are picked up from there
+    file_urls: Dict[str, str] = {}
+    resumed_infos = []
+    pending_urls = list(urls)
+    if run_manifest:
+        with (
+            profiler.stage("resume"),
+            metrics.time_stage("resume"),
+            tracer.span("resume", cat="stage"),
+            ThreadPoolExecutor(max_workers=max_workers) as resume_executor,
+        ):
+            parsed_urls = [url for url in urls if run_manifest.reached(url, "parsed")]
+            resumed = set()
+            for url, rows in zip(
+                parsed_urls, resume_executor.map(run_manifest.load_rows, parsed_urls)
+            ):
+                if rows:
+                    if row_sink:
+                        row_sink(rows)
+                    else:
+                        consolidated_data.update(rows)
+                    resumed.add(url)
+
+            for url in urls:
+                file_path = run_manifest.files.get(url, {}).get("path")
+                if url in resumed or not run_manifest.reached(url, "downloaded"):
+                    continue
+                if file_path and os.path.exists(file_path):
+                    file_urls[file_path] = url
+                    resumed.add(url)
+                    resumed_infos.append((file_path, False))
+                    metrics.inc("run_files_resumed_total", stage="downloaded")
+            pending_urls = [url for url in urls if url not in resumed]
+        logger.info(
+            f"Resumed {len(resumed) - len(resumed_infos)} parsed and "
+            f"{len(resumed_infos)} "
+            f"downloaded reports, {len(pending_urls)} reports left"
+        )
+
+    # Reports parsed by an earlier run are read back from their columnar files
+    if columnar_store:
+        with (
+            profiler.stage("columnar_load"),
+            metrics.time_stage("columnar_load"),
+            tracer.span("columnar_load", cat="stage"),
+            ThreadPoolExecutor(max_workers=max_workers) as columnar_executor,
+        ):
+            stored_urls = [
+                url for url in pending_urls if columnar_store.has(url.split("/")[-1])
+            ]
+            loaded = set()
+            for url, rows in zip(
+                stored_urls,
+                columnar_executor.map(
+                    lambda url: columnar_store.load(url.split("/")[-1]), stored_urls
+                ),
+            ):
+                if rows is None:
+                    continue
+                if row_sink:
+                    row_sink(rows)
+                else:
+                    consolidated_data.update(rows)
+                loaded.add(url)
+            pending_urls = [url for url in pending_urls if url not in loaded]
+        logger.info(
+            f"Loaded {len(loaded)} reports from the columnar store, "
+            f"{len(pending_urls)} reports left"
+        )
+
+    # Download files concurrently, with in-flight requests bounded by the limiter
+    # and failed attempts parked in the retry scheduler instead of sleeping
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {
-            executor.submit(csv_downloader.download_csv, url): url for url in urls
-        }
-        file_infos = []
+        with (
+            profiler.stage("download"),
+            metrics.time_stage("download"),
+            tracer.span("download", cat="stage"),
+            ThreadPoolExecutor(
+                max_workers=concurrency_limiter.max_limit
+            ) as download_executor,
+        ):
+            downloads = csv_downloader.download_all(
+                work_scheduler.order(pending_urls, download_executor),
+                download_executor,
+                wrap=lambda task: profiler.wrap("download", task),
+                on_finish=checkpoint_download if run_manifest else None,
+            )
+            if run_manifest or reparse_processed:
+                downloads = {
+                    url: recover_cached_report(url, file_info)
+                    for url, file_info in downloads.items()
+                }
+            file_infos = work_scheduler.order_files(
+                resumed_infos
+                + [file_info for file_info in downloads.values() if file_info[0]]
+            )
+        if retry_scheduler is None:
+            # Only a scheduler created for this call is closed here
+            csv_downloader.retry_scheduler.close()
+        if content_store:
+            # Write out the index entries of this call's downloads
+            content_store.flush()
 
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                file_info = future.result()
-                if file_info[0]:  # If file_path is not None
-                    file_infos.append(file_info)
-            except Exception as e:
-                logger.error(f"Exception for {url}: {e}")
+        logger.info(
+            f"Download concurrency after downloads: {concurrency_limiter.stats()}"
+        )
+
+        # Detect file structures concurrently, ahead of parsing
+        with (
+            profiler.stage("structure_detection"),
+            metrics.time_stage("structure_detection"),
+            tracer.span("structure_detection", cat="stage"),
+        ):
+            detect_file_structure = profiler.wrap("structure_detection", detect_task)
+            future_to_path = {
+                executor.submit(detect_file_structure, file_path): file_path
+                for file_path, already_processed in file_infos
+                if not already_processed
+            }
+            structures = {}
+
+            for future in as_completed(future_to_path):
+                try:
+                    structures[future_to_path[future]] = future.result()
+                except Exception as e:
+                    logger.error(f"Structure detection error: {e}")
 
         # Process files concurrently
-        futures = [
-            executor.submit(csv_processor.process_csv, file_info) for file_info in file_infos
-        ]
+        with (
+            profiler.stage("parse"),
+            metrics.time_stage("parse"),
+            tracer.span("parse", cat="stage"),
+        ):
+            process_csv = profiler.wrap("parse", parse_task)
+            futures = [
+                executor.submit(process_csv, file_info, structures.get(file_info[0]))
+                for file_info in file_infos
+            ]
+
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    if result:
+                        consolidated_data.update(result)
+                except Exception as e:
+                    logger.error(f"Processing error: {e}")
+
+    parse_seconds = metrics.get_gauge("stage_duration_seconds", stage="parse")
+    if parse_seconds:
+        metrics.set_gauge(
+            "rows_parsed_per_second",
+            metrics.get_counter("rows_parsed_total") / parse_seconds,
+        )
+
+    return consolidated_data
+
+
+def process_work_queue(
+    queue: LeaseWorkQueue,
+    batch_size: int,
+    process_batch: Callable[[List[str]], Dict[str, List[Dict[str, Any]]]],
+    poll_interval: float = QUEUE_POLL_INTERVAL,
+) -> ReportAggregator:
+    """Work through a shared work queue until every task in it is finished.
+
+    Tasks are claimed in batches, processed while their leases are renewed
+    in the background, and folded into this worker's partial aggregate,
+    which is saved before the tasks are marked finished. When nothing can
+    be claimed but other workers still hold leases, the worker waits, so it
+    can take over the tasks of workers that die.
+
+    Args:
+        queue: LeaseWorkQueue shared with the other workers
+        batch_size: Number of tasks to claim at a time
+        process_batch: Function downloading and processing a list of URLs
+        poll_interval: Seconds to wait when no task can be claimed
+
+    Returns:
+        This worker's partial aggregate
+    """
+    partial_path = queue.partial_path()
+    aggregator = (
+        ReportAggregator.load(partial_path)
+        if os.path.exists(partial_path)
+        else ReportAggregator()
+    )
+
+    while True:
+        leases = queue.claim(batch_size)
+        if not leases:
+            if queue.finished():
+                break
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(f"Claimed {len(leases)} reports: {queue.stats()}")
+        with queue.keep_alive(leases):
+            data = process_batch([lease.url for lease in leases])
+        aggregator.add(data)
+        aggregator.save(partial_path)
+        for lease in leases:
+            queue.complete(lease)
+
+    return aggregator
+
+
+def merge_partial_aggregates(
+    queue: LeaseWorkQueue, report_generator: Optional[ReportGenerator] = None
+) -> ReportAggregator:
+    """Merge the partial aggregates of every worker of a work queue.
+
+    Args:
+        queue: LeaseWorkQueue the workers shared
+        report_generator: ReportGenerator to write the merged reports with
+
+    Returns:
+        Aggregate of every report processed by any worker
+    """
+    aggregator = ReportAggregator(report_generator)
+    for partial_path in queue.partial_paths():
+        aggregator.merge(ReportAggregator.load(partial_path))
+    return aggregator
+
+
+def generate_run_reports(
+    report_generator: ReportGenerator,
+    urls: List[str],
+    data: Dict[str, List[Dict[str, Any]]],
+    process_urls: Callable[..., Dict[str, List[Dict[str, Any]]]],
+    content_store: Optional[ContentStore] = None,
+    cache_manager: Optional[CacheManager] = None,
+) -> Dict[str, str]:
+    """Generate the reports of a run over every report it covers.
+
+    Reports processed by earlier runs are skipped, so their rows are not in
+    data, but the reports still cover them. Unless the report cache holds
+    reports of the same inputs, they are parsed again from disk.
+
+    Args:
+        report_generator: ReportGenerator to generate the reports with
+        urls: URLs of every report the run covers
+        data: Dictionary with file names as keys and processed data as values
+        process_urls: Function downloading and processing a list of URLs, called
+            with reparse_processed=True for reports processed by earlier runs
+        content_store: Content-addressed store to take the input hashes from
+        cache_manager: Processed-files cache of the run
+
+    Returns:
+        Dictionary with report names as keys and file paths as values
+    """
+    cache_manager = cache_manager or CacheManager()
+    processed_urls = {
+        url.split("/")[-1]: url
+        for url in urls
+        if url.split("/")[-1] not in data
+        and cache_manager.is_file_processed(url.split("/")[-1])
+    }
+    input_names = [*data, *processed_urls]
+    file_hashes = content_store.report_digests(input_names) if content_store else None
+
+    def load_missing(file_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        logger.info(f"Parsing {len(file_names)} reports processed by earlier runs")
+        return process_urls(
+            [processed_urls[name] for name in file_names if name in processed_urls],
+            reparse_processed=True,
+        )
+
+    return report_generator.generate_all_reports(
+        data, file_hashes, input_names, load_missing
+    )
+
+
+def streaming_row_sink(
+    streaming_sink: StreamingSink,
+    sqlite_exporter: Optional[SQLiteExporter] = None,
+    content_store: Optional[ContentStore] = None,
+) -> Callable[[Dict[str, List[Dict[str, Any]]]], None]:
+    """Create the row sink of a streaming run.
+
+    Args:
+        streaming_sink: StreamingSink to hand each parsed report to
+        sqlite_exporter: SQLiteExporter to load each parsed report into as well
+        content_store: Content-addressed store to take the hashes of the exported
+            reports from
+
+    Returns:
+        Function taking each parsed report
+    """
+
+    def stream_report(report_data: Dict[str, List[Dict[str, Any]]]) -> None:
+        streaming_sink.consume(report_data)
+        if sqlite_exporter:
+            # Streaming does not keep the rows, so export each report as it is parsed
+            sqlite_exporter.export(
+                report_data,
+                content_store.report_digests(report_data) if content_store else None,
+            )
+
+    return stream_report
+
+
+def write_streamed_reports(
+    streaming_sink: StreamingSink,
+    urls: List[str],
+    cache_manager: Optional[CacheManager] = None,
+) -> Dict[str, str]:
+    """Write the reports aggregated by a streaming run over every report it covers.
+
+    The aggregate only covers the reports streamed into it, so when a report
+    processed by this or an earlier run was not streamed (its file is no
+    longer on disk), existing report files are kept rather than replaced
+    with reports missing it.
+
+    Args:
+        streaming_sink: StreamingSink the run's reports were aggregated in
+        urls: URLs of every report the run covers
+        cache_manager: Processed-files cache of the run
+
+    Returns:
+        Dictionary with report names as keys and file paths as values
+    """
+    cache_manager = cache_manager or CacheManager()
+    missing = [
+        url.split("/")[-1]
+        for url in urls
+        if url.split("/")[-1] not in streaming_sink.file_names
+        and cache_manager.is_file_processed(url.split("/")[-1])
+    ]
+    if missing:
+        existing = streaming_sink.aggregator.report_generator.existing_reports()
+        if existing:
+            logger.warning(
+                f"{len(missing)} processed reports were not streamed (no longer on "
+                "disk), keeping the existing reports"
+            )
+            return existing
+        logger.warning(
+            f"{len(missing)} processed reports were not streamed, writing reports "
+            "from the others"
+        )
+    return streaming_sink.aggregator.write_reports()
+
 
-        for future in as_completed(futures):
+def ingest_archives(
+    archive_paths: List[str],
+    max_workers: int,
+    profiler: Optional[StageProfiler] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    tracer: Optional[TraceRecorder] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Process the reports in zip or tar archives without downloading anything.
+
+    Args:
+        archive_paths: Paths to the archives
+        max_workers: Maximum number of concurrent workers
+        profiler: StageProfiler to capture the ingest stage with
+        metrics: MetricsRegistry to record parse metrics in
+        tracer: TraceRecorder to record one span per archive member in
+
+    Returns:
+        Dictionary with file names as keys and processed data as values
+    """
+    consolidated_data = {}
+    metrics = metrics or MetricsRegistry()
+    tracer = tracer or TraceRecorder()
+    profiler = profiler or StageProfiler()
+    ingestor = ArchiveIngestor(
+        CSVProcessor(metrics=metrics),
+        max_workers=max_workers,
+        metrics=metrics,
+        tracer=tracer,
+    )
+
+    with (
+        profiler.stage("ingest"),
+        metrics.time_stage("ingest"),
+        tracer.span("ingest", cat="stage"),
+    ):
+        for archive_path in archive_paths:
             try:
-                result = future.result()
-                if result:
-                    consolidated_data.update(result)
-            except Exception as e:
-                logger.error(f"Processing error: {e}")
+                consolidated_data.update(ingestor.ingest(archive_path))
+            except (OSError, ValueError, tarfile.TarError, zipfile.BadZipFile) as e:
+                logger.error(f"Failed to ingest {archive_path}: {e}")
+
+    rows_parsed = metrics.get_counter("rows_parsed_total")
+    ingest_seconds = metrics.get_gauge("stage_duration_seconds", stage="ingest")
+    if ingest_seconds:
+        metrics.set_gauge("rows_parsed_per_second", rows_parsed / ingest_seconds)
 
     return consolidated_data
 
 
+def parse_query_arguments(argv: List[str]) -> argparse.Namespace:
+    """Parse the arguments of the query subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="icann-reports query",
+        description="Query the parsed reports kept in the columnar store (see "
+        "--columnar).",
+    )
+    parser.add_argument(
+        "--iana-id",
+        nargs="+",
+        metavar="ID",
+        help="Only include these registrars (default: all)",
+    )
+    parser.add_argument(
+        "--tld", nargs="+", help="Only include these TLDs (default: all)"
+    )
+    parser.add_argument(
+        "--since", metavar="YYYY-MM", help="Only include months from this one on"
+    )
+    parser.add_argument(
+        "--until", metavar="YYYY-MM", help="Only include months up to this one"
+    )
+    parser.add_argument(
+        "--metric",
+        nargs="+",
+        metavar="NAME",
+        help=f"Figures to return: {', '.join(QUERY_MEASURES)} or raw columns such as "
+        "Net-adds-1-yr "
+        f"(default: all of the former)",
+    )
+    parser.add_argument(
+        "--group-by",
+        nargs="*",
+        choices=QUERY_GROUP_FIELDS,
+        default=QUERY_GROUP_FIELDS,
+        help="Fields to sum the figures by (default: iana_id tld month)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=QUERY_FORMATS,
+        default="csv",
+        help="Output format (default: csv)",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="Write the results to this file instead of standard output",
+    )
+    parser.add_argument(
+        "--columnar-dir",
+        default=COLUMNAR_DIR,
+        help="Directory of the columnar reports (default: data/columnar)",
+    )
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="Index reports added to the columnar store since the last indexed run "
+        "first",
+    )
+    return parser.parse_args(argv)
+
+
+def run_query(args: argparse.Namespace) -> int:
+    """Run the query subcommand.
+
+    Args:
+        args: Arguments from parse_query_arguments
+
+    Returns:
+        Exit status
+    """
+    columnar_store = ColumnarStore(args.columnar_dir)
+    report_query = ReportQuery(columnar_store)
+    if args.reindex:
+        report_query.query_index.update()
+    try:
+        records = report_query.run(
+            iana_ids=args.iana_id,
+            tlds=args.tld,
+            since=args.since,
+            until=args.until,
+            metrics=args.metric,
+            group_by=args.group_by,
+        )
+    except ValueError as e:
+        print(f"icann-reports query: error: {e}", file=sys.stderr)
+        return 2
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            write_query_results(records, f, args.format)
+    else:
+        write_query_results(records, sys.stdout, args.format)
+    return 0
+
+
+def parse_serve_arguments(argv: List[str]) -> argparse.Namespace:
+    """Parse the arguments of the serve subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="icann-reports serve",
+        description="Stay resident and apply newly published reports as they appear.",
+    )
+    parser.add_argument(
+        "--tld",
+        type=str,
+        nargs="+",
+        default=["com"],
+        help="TLDs to poll (default: com)",
+    )
+    parser.add_argument(
+        "--tld-manifest",
+        metavar="FILE",
+        help="JSON list of TLDs, each optionally with its own date range, instead of "
+        "--tld",
+    )
+    parser.add_argument(
+        "--start-date",
+        type=str,
+        default="2024-01",
+        help="First month to apply in YYYY-MM format (default: 2024-01)",
+    )
+    parser.add_argument(
+        "--end-date",
+        type=str,
+        default=None,
+        help="Last month to apply in YYYY-MM format (default: keep polling for new "
+        "months)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=SERVICE_POLL_INTERVAL,
+        help="Seconds between checks for newly published reports (default: "
+        f"{SERVICE_POLL_INTERVAL})",
+    )
+    parser.add_argument(
+        "--state-dir",
+        default=SERVICE_STATE_DIR,
+        help="Directory of the service's aggregate and applied reports (default: "
+        "data/service)",
+    )
+    parser.add_argument("--once", action="store_true", help="Poll once and exit")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_WORKERS,
+        help="Maximum number of reports downloaded and parsed at once (default: "
+        f"{MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--store-dir",
+        default=CONTENT_STORE_DIR,
+        help="Content-addressed store shared by runs on this host (default: "
+        "data/store)",
+    )
+    parser.add_argument(
+        "--aggregation-backend",
+        choices=AGGREGATION_BACKENDS,
+        default="auto",
+        help="Aggregate reports with NumPy or pure Python (default: auto, NumPy when "
+        "installed)",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=str,
+        help="Rewrite this Prometheus textfile (.prom) after every poll",
+    )
+    parser.add_argument(
+        "--api-port",
+        type=int,
+        metavar="PORT",
+        help="Also serve the reports over HTTP on this port, reloading them after "
+        "every poll that applied reports",
+    )
+    parser.add_argument(
+        "--api-host",
+        default=API_HOST,
+        help=f"Host the report API binds to (default: {API_HOST})",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    return parser.parse_args(argv)
+
+
+def run_service(args: argparse.Namespace) -> int:
+    """Run the serve subcommand until it is stopped with SIGINT or SIGTERM.
+
+    Args:
+        args: Arguments from parse_serve_arguments
+
+    Returns:
+        Exit status
+    """
+    global logger
+    logger = setup_logging(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    end_date = args.end_date or OPEN_END_DATE
+    if args.tld_manifest:
+        tlds = URLGenerator.load_tld_manifest(
+            args.tld_manifest, args.start_date, end_date
+        )
+    else:
+        tlds = [
+            {"tld": tld.lower(), "start_date": args.start_date, "end_date": end_date}
+            for tld in dict.fromkeys(args.tld)
+        ]
+    metrics = MetricsRegistry()
+    report_generator = ReportGenerator(
+        metrics=metrics, backend=args.aggregation_backend
+    )
+    api_server = None
+    if args.api_port is not None:
+        api = ReportAPI(report_generator.reports_dir, metrics=metrics)
+        api_server = ReportAPIServer(
+            api, host=args.api_host, port=args.api_port
+        ).start()
+    service = ReportService(
+        tlds,
+        state_dir=args.state_dir,
+        poll_interval=args.poll_interval,
+        max_workers=args.max_workers,
+        metrics=metrics,
+        content_store=ContentStore(args.store_dir, metrics=metrics),
+        report_generator=report_generator,
+        on_update=(lambda reports: api_server.api.invalidate()) if api_server else None,
+    )
+
+    def on_poll(result: Dict[str, Any]) -> None:
+        logger.info(
+            f"Poll checked {result['checked']} reports and applied "
+            f"{len(result['applied'])}"
+        )
+        if args.metrics_textfile:
+            metrics.write_prometheus_textfile(args.metrics_textfile)
+
+    def stop(signum, frame) -> None:
+        logger.info(f"Received signal {signum}, stopping after the current poll")
+        service.stop()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    logger.info(f"Serving {len(tlds)} TLDs, polling every {args.poll_interval:g}s")
+    try:
+        service.run(max_polls=1 if args.once else None, on_poll=on_poll)
+    finally:
+        if api_server:
+            api_server.stop()
+    return 0
+
+
+def parse_api_arguments(argv: List[str]) -> argparse.Namespace:
+    """Parse the arguments of the api subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="icann-reports api",
+        description="Serve registrar, TLD and time-series slices of the generated "
+        "reports over HTTP.",
+    )
+    parser.add_argument(
+        "--host", default=API_HOST, help=f"Host to bind to (default: {API_HOST})"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=API_PORT,
+        help=f"Port to bind to (default: {API_PORT})",
+    )
+    parser.add_argument(
+        "--reports-dir",
+        default=REPORTS_DIR,
+        help="Directory of the generated reports (default: data/reports)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    return parser.parse_args(argv)
+
+
+def run_api(args: argparse.Namespace) -> int:
+    """Run the api subcommand until it is stopped with SIGINT or SIGTERM.
+
+    Args:
+        args: Arguments from parse_api_arguments
+
+    Returns:
+        Exit status
+    """
+    global logger
+    logger = setup_logging(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    stopped = threading.Event()
+
+    def stop(signum, frame) -> None:
+        logger.info(f"Received signal {signum}, stopping the report API")
+        stopped.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    with ReportAPIServer(ReportAPI(args.reports_dir), host=args.host, port=args.port):
+        stopped.wait()
+    return 0
+
+
 def main():
-    """Main entry point for the application."""
+    """Run the application from the command line."""
+    if sys.argv[1:2] == ["query"]:
+        return run_query(parse_query_arguments(sys.argv[2:]))
+    if sys.argv[1:2] == ["serve"]:
+        return run_service(parse_serve_arguments(sys.argv[2:]))
+    if sys.argv[1:2] == ["api"]:
+        return run_api(parse_api_arguments(sys.argv[2:]))
+
     args = parse_arguments()
-    
+
     # Setup logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
     global logger
     logger = setup_logging(level=log_level)
-    
+
     logger.info("Starting ICANN Reports Downloader")
-    
-    # Configure TLD and date range
-    tlds = [
-        {
-            "tld": args.tld,
-            "base_url": BASE_URL,
-            "start_date": args.start_date,
-            "end_date": args.end_date,
-        }
-    ]
-    
-    # Generate URLs
-    url_generator = URLGenerator()
-    urls = url_generator.generate_tld_urls(tlds)
-    logger.info(f"Generated {len(urls)} URLs for downloading")
-    
-    # Download and process files
-    data = download_and_process_csv_files(urls, args.max_workers)
-    logger.info(f"Processed {len(data)} files")
-    
+
+    profiler = StageProfiler(
+        profile=args.profile,
+        trace_memory=args.trace_memory,
+        top_n=args.profile_top,
+    )
+    metrics = MetricsRegistry()
+    tracer = TraceRecorder(enabled=bool(args.trace))
+    run_manifest = None
+    work_queue = None
+    streaming_sink = None
+    content_store = None
+    sqlite_exporter = (
+        SQLiteExporter(args.sqlite, metrics=metrics) if args.sqlite else None
+    )
+    if args.ingest_archive:
+        # Process historical archives offline, skipping URL generation and downloads
+        data = ingest_archives(
+            args.ingest_archive, args.max_workers, profiler, metrics, tracer
+        )
+    else:
+        concurrency_limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=args.initial_download_concurrency,
+            min_limit=args.min_download_concurrency,
+            max_limit=args.max_download_concurrency,
+            metrics=metrics,
+        )
+        retry_scheduler = RetryScheduler(
+            retry_budget=args.retry_budget, metrics=metrics
+        )
+        content_store = ContentStore(args.store_dir, metrics=metrics)
+        recorder = (
+            ResponseRecorder(args.record_fixtures) if args.record_fixtures else None
+        )
+        columnar_store = (
+            ColumnarStore(args.columnar_dir, metrics=metrics) if args.columnar else None
+        )
+
+        # Serve recorded responses locally instead of downloading from icann.org
+        base_url = BASE_URL
+        if args.replay_fixtures:
+            replay_server = ReplayServer(
+                args.replay_fixtures,
+                latency=args.replay_latency,
+                bandwidth=args.replay_bandwidth,
+                faults=FaultInjector(args.replay_faults, seed=args.replay_seed),
+            ).start()
+            base_url = replay_server.base_url
+
+        # Configure TLDs and date ranges
+        if args.tld_manifest:
+            tlds = URLGenerator.load_tld_manifest(
+                args.tld_manifest, args.start_date, args.end_date
+            )
+        else:
+            tlds = [
+                {
+                    "tld": tld.lower(),
+                    "start_date": args.start_date,
+                    "end_date": args.end_date,
+                }
+                for tld in dict.fromkeys(args.tld)
+            ]
+        if args.replay_fixtures:
+            for tld in tlds:
+                tld["base_url"] = base_url
+
+        # Generate URLs, taking one month of each TLD in turn so every TLD makes
+        # progress
+        url_generator = URLGenerator(base_url)
+        urls = url_generator.generate_interleaved_urls(tlds)
+        logger.info(
+            f"Generated {len(urls)} URLs for downloading across {len(tlds)} TLDs"
+        )
+
+        # Checkpoint the run, or take the plan of the interrupted run being resumed
+        if args.run_dir:
+            run_manifest = RunManifest(args.run_dir, metrics=metrics)
+            urls = run_manifest.plan(urls, {"tlds": tlds})
+
+        # Download and process files
+        work_scheduler = WorkScheduler(
+            args.schedule,
+            content_store=content_store,
+            probe_sizes=args.probe_sizes,
+            metrics=metrics,
+        )
+
+        def process_urls(
+            batch_urls: List[str], reparse_processed: bool = False, row_sink=None
+        ):
+            return download_and_process_csv_files(
+                batch_urls,
+                args.max_workers,
+                profiler,
+                metrics,
+                tracer,
+                concurrency_limiter,
+                retry_scheduler,
+                content_store,
+                None if args.compress == "none" else args.compress,
+                recorder,
+                work_scheduler,
+                run_manifest,
+                reparse_processed,
+                row_sink,
+                columnar_store,
+            )
+
+        # Stream parsed reports into validation and aggregation instead of keeping their
+        # rows
+        if args.stream:
+            streaming_sink = StreamingSink(
+                FieldValidator(metrics=metrics) if args.validate else None,
+                # A work queue aggregates into per-worker partials instead
+                (
+                    ReportAggregator(
+                        ReportGenerator(
+                            metrics=metrics,
+                            tracer=tracer,
+                            backend=args.aggregation_backend,
+                        )
+                    )
+                    if args.generate_reports and not args.queue_dir
+                    else None
+                ),
+                metrics=metrics,
+            )
+
+        row_sink = (
+            streaming_row_sink(streaming_sink, sqlite_exporter, content_store)
+            if streaming_sink
+            else None
+        )
+
+        if args.queue_dir:
+            # Share the reports with other workers; every report's rows go into
+            # this worker's partial aggregate, so cached reports are parsed again
+            work_queue = LeaseWorkQueue(
+                args.queue_dir, args.worker_id, args.lease_seconds, metrics
+            )
+            work_queue.enqueue(urls)
+            data = {}
+
+            def process_batch(batch_urls: List[str]):
+                batch_data = process_urls(batch_urls, reparse_processed=True)
+                if row_sink:
+                    row_sink(batch_data)
+                else:
+                    data.update(batch_data)
+                return batch_data
+
+            process_work_queue(work_queue, args.max_workers, process_batch)
+            logger.info(f"Work queue finished: {work_queue.stats()}")
+        else:
+            # An aggregate only covers the reports streamed into it, so reports
+            # processed by an earlier run are parsed again
+            data = process_urls(
+                urls,
+                reparse_processed=bool(streaming_sink and streaming_sink.aggregator),
+                row_sink=row_sink,
+            )
+        # Every batch shares the scheduler, so it is closed after the last one
+        retry_scheduler.close()
+        if args.replay_fixtures:
+            replay_server.stop()
+        if columnar_store:
+            # Keep the query index in step with the columnar reports
+            QueryIndex(columnar_store, metrics=metrics).update()
+    logger.info(
+        f"Processed {streaming_sink.files if streaming_sink else len(data)} files"
+    )
+
     # Validate data if requested
     if args.validate:
-        field_validator = FieldValidator()
-        validation_results = field_validator.validate_data(data)
-        validation_report = field_validator.get_validation_report(validation_results)
+        with (
+            profiler.stage("validate"),
+            metrics.time_stage("validate"),
+            tracer.span("validate", cat="stage"),
+        ):
+            field_validator = FieldValidator(metrics=metrics)
+            if streaming_sink:
+                validation_results = streaming_sink.validation_results
+            else:
+                validation_results = field_validator.validate_data(data)
+            validation_report = field_validator.get_validation_report(
+                validation_results
+            )
         print("\n" + validation_report)
-    
+
+    # Export to SQLite if requested
+    if sqlite_exporter:
+        if not streaming_sink:
+            with (
+                profiler.stage("export"),
+                metrics.time_stage("export"),
+                tracer.span("export", cat="stage"),
+            ):
+                file_hashes = (
+                    content_store.report_digests(data) if content_store else None
+                )
+                sqlite_exporter.export(data, file_hashes)
+        sqlite_exporter.close()
+        print(f"\nSQLite database: {sqlite_exporter.db_path}")
+
     # Generate reports if requested
     if args.generate_reports:
-        report_generator = ReportGenerator()
-        reports = report_generator.generate_all_reports(data)
+        with (
+            profiler.stage("report"),
+            metrics.time_stage("report"),
+            tracer.span("report", cat="stage"),
+        ):
+            report_cache = None
+            if not args.no_report_cache:
+                report_cache = ReportCache(
+                    REPORT_CACHE_DIR,
+                    max_bytes=args.report_cache_size * 1024 * 1024,
+                    metrics=metrics,
+                )
+            report_generator = ReportGenerator(
+                metrics=metrics,
+                tracer=tracer,
+                backend=args.aggregation_backend,
+                report_cache=report_cache,
+            )
+            if work_queue:
+                # Reports cover what every worker processed, not just this one
+                reports = merge_partial_aggregates(
+                    work_queue, report_generator
+                ).write_reports()
+            elif streaming_sink:
+                reports = write_streamed_reports(streaming_sink, urls)
+            elif args.ingest_archive:
+                reports = report_generator.generate_all_reports(data)
+            else:
+                reports = generate_run_reports(
+                    report_generator, urls, data, process_urls, content_store
+                )
+            if run_manifest:
+                run_manifest.mark_all("parsed", "aggregated")
         logger.info(f"Generated reports: {', '.join(reports.keys())}")
-        
+
         # Print report file paths
         print("\nGenerated Reports:")
         for report_name, report_path in reports.items():
             print(f"  - {report_name}: {report_path}")
 
+    # Export run metrics if requested
+    metrics.set_gauge("last_run_timestamp_seconds", time.time())
+    if args.metrics_textfile:
+        metrics.write_prometheus_textfile(args.metrics_textfile)
+    if args.metrics_json:
+        metrics.write_json_summary(args.metrics_json)
+
+    # Write the trace timeline if requested
+    if args.trace:
+        tracer.write(args.trace)
+        print(f"\nTrace written to {args.trace} (open in https://ui.perfetto.dev)")
+
+    # Write profiling captures if requested
+    if profiler.enabled:
+        captures = profiler.write_reports()
+        print(f"\nProfiling output ({profiler.output_dir}):")
+        for stage_name, paths in captures.items():
+            print(f"  - {stage_name}: {', '.join(os.path.basename(p) for p in paths)}")
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
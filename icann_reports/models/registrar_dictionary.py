@@ -0,0 +1,258 @@
+import bisect
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Sequence, Set, Tuple
+
+NON_ALPHANUMERIC_PATTERN = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a registrar name for prefix lookups.
+
+    Args:
+        name: Registrar name (e.g. "GoDaddy.com, LLC")
+
+    Returns:
+        Lowercase name without spaces or punctuation (e.g. "godaddycomllc")
+    """
+    return NON_ALPHANUMERIC_PATTERN.sub("", name.lower())
+
+
+def canonical_name(names: Dict[str, Sequence[str]]) -> str:
+    """Get the name seen in the latest month.
+
+    Args:
+        names: Name -> (first month, last month) it was seen under
+
+    Returns:
+        The latest name
+    """
+    return max(names, key=lambda name: (names[name][1], names[name][0]))
+
+
+def name_history(names: Dict[str, Sequence[str]]) -> List[Dict[str, str]]:
+    """Get every name, oldest first.
+
+    Args:
+        names: Name -> (first month, last month) it was seen under
+
+    Returns:
+        List of dictionaries with "name", "first_seen" and "last_seen"
+    """
+    return [
+        {"name": name, "first_seen": first, "last_seen": last}
+        for name, (first, last) in sorted(
+            names.items(), key=lambda item: (item[1][0], item[1][1], item[0])
+        )
+    ]
+
+
+@dataclass
+class Registrar:
+    """A registrar known to the registrar dictionary."""
+
+    code: int
+    iana_id: str
+    # Name -> (first month, last month) it was seen under, as YYYY-MM
+    names: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        """Canonical name: the one seen in the latest month."""
+        return canonical_name(self.names)
+
+    def name_history(self) -> List[Dict[str, str]]:
+        """Get every name of the registrar, oldest first.
+
+        Returns:
+            List of dictionaries with "name", "first_seen" and "last_seen"
+        """
+        return name_history(self.names)
+
+
+class RegistrarDictionary:
+    """Process-wide dictionary of registrars and the strings repeated in every report.
+
+    Every IANA ID gets a small integer code in the order registrars are first
+    seen. Registrar names, IANA IDs and TLDs are interned, so the rows of
+    every report share one string object per distinct value instead of each
+    holding its own copy, and registrar summary keys are built once per
+    registrar instead of once per row. Names are recorded with the months
+    they were seen in, so renamed registrars keep their history under their
+    IANA ID, and the dictionary doubles as an identity index that finds
+    registrars by ID, by any name they had, or by the start of a name.
+    """
+
+    def __init__(self):
+        """Initialize an empty registrar dictionary."""
+        self.registrars: List[Registrar] = []
+        self._codes: Dict[str, int] = {}
+        self._keys: Dict[Tuple[str, str], str] = {}
+        # Name and normalized name -> codes of the registrars seen under it
+        self._name_codes: Dict[str, Set[int]] = {}
+        self._normalized_codes: Dict[str, Set[int]] = {}
+        # Sorted normalized names for prefix lookups, rebuilt after new names
+        self._sorted_names: Optional[List[str]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def intern(value: str) -> str:
+        """Get the shared copy of a string."""
+        return sys.intern(value)
+
+    def _encode(self, iana_id: str, name: str, month: str) -> int:
+        """Get the code of a registrar, recording the name; the lock must be held."""
+        code = self._codes.get(iana_id)
+        if code is None:
+            code = len(self.registrars)
+            self._codes[iana_id] = code
+            self.registrars.append(Registrar(code, iana_id))
+        names = self.registrars[code].names
+        seen = names.get(name)
+        if seen is None:
+            names[name] = (month, month)
+            self._name_codes.setdefault(name, set()).add(code)
+            normalized = normalize_name(name)
+            if normalized not in self._normalized_codes:
+                self._sorted_names = None
+            self._normalized_codes.setdefault(normalized, set()).add(code)
+        elif month < seen[0] or month > seen[1]:
+            names[name] = (min(seen[0], month), max(seen[1], month))
+        return code
+
+    def encode(self, iana_id: str, name: str, month: str = "") -> int:
+        """Get the code of a registrar, adding it if it is new.
+
+        Args:
+            iana_id: IANA ID of the registrar
+            name: Name the registrar appears under
+            month: Month of the report it appears in, as YYYY-MM
+
+        Returns:
+            Code of the registrar
+        """
+        with self._lock:
+            return self._encode(sys.intern(iana_id), sys.intern(name), month)
+
+    def encode_rows(
+        self, rows: List[Dict[str, Any]], month: str = ""
+    ) -> List[Optional[int]]:
+        """Intern the repeated strings of parsed rows and record their registrars.
+
+        Args:
+            rows: Row dictionaries of one report
+            month: Month of the report, as YYYY-MM
+
+        Returns:
+            Registrar code of each row (None for rows without an IANA ID)
+        """
+        codes: List[Optional[int]] = []
+        with self._lock:
+            for row in rows:
+                for field_name in ("TLD", "Registrar-name", "IANA-ID"):
+                    value = row.get(field_name)
+                    if value:
+                        row[field_name] = sys.intern(value)
+                iana_id = row.get("IANA-ID")
+                if iana_id:
+                    codes.append(
+                        self._encode(iana_id, row.get("Registrar-name") or "", month)
+                    )
+                else:
+                    codes.append(None)
+        return codes
+
+    def code(self, iana_id: str) -> Optional[int]:
+        """Get the code of a registrar, or None if it has not been seen."""
+        return self._codes.get(iana_id)
+
+    def decode(self, code: int) -> Registrar:
+        """Get the registrar with a code.
+
+        Raises:
+            IndexError: If no registrar has the code
+        """
+        return self.registrars[code]
+
+    def canonical_name(self, iana_id: str) -> Optional[str]:
+        """Get the latest name of a registrar, or None if it has not been seen."""
+        code = self._codes.get(iana_id)
+        if code is None:
+            return None
+        with self._lock:
+            return self.registrars[code].name
+
+    def find_by_id(self, iana_id: str) -> Optional[Registrar]:
+        """Find a registrar by IANA ID.
+
+        Args:
+            iana_id: IANA ID of the registrar
+
+        Returns:
+            The registrar, or None if it has not been seen
+        """
+        code = self._codes.get(iana_id)
+        return None if code is None else self.registrars[code]
+
+    def find_by_name(self, name: str) -> List[Registrar]:
+        """Find the registrars that were ever seen under a name.
+
+        Args:
+            name: Exact registrar name, current or former
+
+        Returns:
+            Matching registrars in code order
+        """
+        with self._lock:
+            return [
+                self.registrars[code] for code in sorted(self._name_codes.get(name, ()))
+            ]
+
+    def find_by_prefix(self, prefix: str) -> List[Registrar]:
+        """Find the registrars with a current or former name starting with a prefix.
+
+        Case, spaces and punctuation are ignored on both sides, so "go daddy"
+        finds both "Go Daddy Software" and "GoDaddy.com, LLC".
+
+        Args:
+            prefix: Start of a registrar name
+
+        Returns:
+            Matching registrars in code order
+        """
+        prefix = normalize_name(prefix)
+        with self._lock:
+            if self._sorted_names is None:
+                self._sorted_names = sorted(self._normalized_codes)
+            codes: Set[int] = set()
+            for index in range(
+                bisect.bisect_left(self._sorted_names, prefix), len(self._sorted_names)
+            ):
+                normalized = self._sorted_names[index]
+                if not normalized.startswith(prefix):
+                    break
+                codes |= self._normalized_codes[normalized]
+            return [self.registrars[code] for code in sorted(codes)]
+
+    def registrar_key(self, iana_id: str, name: str) -> str:
+        """Get the key of a registrar in the registrar summary.
+
+        Args:
+            iana_id: IANA ID of the registrar
+            name: Name the registrar appears under
+
+        Returns:
+            Key of the form "<name> (IANA ID: <id>)", the same object on every call
+        """
+        key = self._keys.get((iana_id, name))
+        if key is None:
+            key = self._keys.setdefault(
+                (iana_id, name), sys.intern(f"{name} (IANA ID: {iana_id})")
+            )
+        return key
+
+
+# Shared by every parser and report generator of the process
+default_registrar_dictionary = RegistrarDictionary()
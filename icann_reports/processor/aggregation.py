@@ -0,0 +1,265 @@
+import json
+import os
+from typing import Dict, List, Any, Optional
+
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.models.registrar_dictionary import canonical_name, name_history
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="aggregation")
+
+
+class ReportAggregator:
+    """Partial aggregate of the registrar and TLD summaries that can be merged.
+
+    Each worker of a distributed run folds the reports it processed into an
+    aggregator and saves it as a partial. Merging partials gives the same
+    summaries as aggregating every report in one process, whatever the order:
+    registrar figures come from the latest month of each registrar and TLD,
+    and TLD monthly totals are kept per report file, so a report processed
+    by two workers is only counted once.
+    """
+
+    def __init__(self, report_generator: Optional[ReportGenerator] = None):
+        """Initialize an empty aggregator.
+
+        Args:
+            report_generator: ReportGenerator whose per-file summaries are merged
+        """
+        self.report_generator = report_generator or ReportGenerator()
+        # registrar key -> {"name", "iana_id", "tlds": {TLD: {"month", stats...}}}
+        self.registrars: Dict[str, Dict[str, Any]] = {}
+        # TLD -> {file name: {"month", monthly totals...}}
+        self.tld_files: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # TLD -> sorted IANA IDs seen in any report
+        self.tld_registrar_ids: Dict[str, List[str]] = {}
+        # IANA ID -> name -> [first month, last month] it was seen under
+        self.registrar_names: Dict[str, Dict[str, List[str]]] = {}
+
+    def add(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Fold processed reports into the aggregate.
+
+        Args:
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
+        """
+        for file_name, rows in data.items():
+            report_month = URLGenerator.parse_filename_date(file_name)
+            month = report_month.replace("-", "")
+            partial = ReportAggregator(self.report_generator)
+
+            for (
+                registrar_key,
+                summary,
+            ) in self.report_generator.generate_summary_by_registrar(
+                {file_name: rows}
+            ).items():
+                partial.registrars[registrar_key] = {
+                    **summary,
+                    "tlds": {
+                        tld: {"month": month, **stats}
+                        for tld, stats in summary["tlds"].items()
+                    },
+                }
+
+            for tld, summary in self.report_generator.generate_summary_by_tld(
+                {file_name: rows}
+            ).items():
+                for file_month, totals in summary.get("monthly_data", {}).items():
+                    partial.tld_files.setdefault(tld, {})[file_name] = {
+                        "month": file_month,
+                        **totals,
+                    }
+            for row in rows:
+                iana_id = row.get("IANA-ID")
+                if iana_id:
+                    tld = row.get("TLD", "Unknown").upper()
+                    partial.tld_registrar_ids.setdefault(tld, []).append(iana_id)
+                    partial.registrar_names.setdefault(iana_id, {})[
+                        row.get("Registrar-name") or ""
+                    ] = [
+                        report_month,
+                        report_month,
+                    ]
+
+            self.merge(partial)
+
+    def merge(self, other: "ReportAggregator") -> None:
+        """Merge another aggregate into this one.
+
+        Args:
+            other: Aggregate of other reports (or of overlapping ones)
+        """
+        for registrar_key, summary in other.registrars.items():
+            entry = self.registrars.setdefault(
+                registrar_key,
+                {"name": summary["name"], "iana_id": summary["iana_id"], "tlds": {}},
+            )
+            for tld, stats in summary["tlds"].items():
+                current = entry["tlds"].get(tld)
+                if current is None or stats["month"] >= current["month"]:
+                    entry["tlds"][tld] = dict(stats)
+
+        for tld, files in other.tld_files.items():
+            self.tld_files.setdefault(tld, {}).update(files)
+
+        for tld, iana_ids in other.tld_registrar_ids.items():
+            self.tld_registrar_ids[tld] = sorted(
+                set(self.tld_registrar_ids.get(tld, [])) | set(iana_ids)
+            )
+
+        for iana_id, names in other.registrar_names.items():
+            current_names = self.registrar_names.setdefault(iana_id, {})
+            for name, (first, last) in names.items():
+                seen = current_names.get(name)
+                current_names[name] = (
+                    [min(seen[0], first), max(seen[1], last)] if seen else [first, last]
+                )
+
+    def registrar_summary(self) -> Dict[str, Any]:
+        """Get the registrar summary, in the format of ReportGenerator.
+
+        Returns:
+            Dictionary with registrar summaries
+        """
+        return {
+            registrar_key: {
+                **summary,
+                "tlds": {
+                    tld: {
+                        name: value for name, value in stats.items() if name != "month"
+                    }
+                    for tld, stats in summary["tlds"].items()
+                },
+            }
+            for registrar_key, summary in self.registrars.items()
+        }
+
+    def registrar_id_summary(self) -> Dict[str, Any]:
+        """Get the registrar summary keyed by IANA ID, in the format of ReportGenerator.
+
+        Returns:
+            Dictionary with registrar summaries keyed by IANA ID
+        """
+        # IANA ID -> TLD -> stats of the latest month
+        latest: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for summary in self.registrars.values():
+            tlds = latest.setdefault(summary["iana_id"], {})
+            for tld, stats in summary["tlds"].items():
+                if tld not in tlds or stats["month"] >= tlds[tld]["month"]:
+                    tlds[tld] = stats
+
+        return {
+            iana_id: {
+                "iana_id": iana_id,
+                "name": canonical_name(self.registrar_names[iana_id]),
+                "names": name_history(self.registrar_names[iana_id]),
+                "tlds": {
+                    tld: {
+                        name: value for name, value in stats.items() if name != "month"
+                    }
+                    for tld, stats in sorted(latest[iana_id].items())
+                },
+            }
+            for iana_id in sorted(latest, key=lambda iana_id: (len(iana_id), iana_id))
+            if iana_id in self.registrar_names
+        }
+
+    def tld_summary(self) -> Dict[str, Any]:
+        """Get the TLD summary, in the format of ReportGenerator.
+
+        Returns:
+            Dictionary with TLD summaries
+        """
+        tld_summary = {}
+        for tld in sorted(set(self.tld_files) | set(self.tld_registrar_ids)):
+            monthly_data: Dict[str, Dict[str, int]] = {}
+            for totals in self.tld_files.get(tld, {}).values():
+                month_data = monthly_data.setdefault(
+                    totals["month"],
+                    {
+                        "total_domains": 0,
+                        "new_additions": 0,
+                        "renewals": 0,
+                        "transfers": 0,
+                        "deletions": 0,
+                    },
+                )
+                for name in month_data:
+                    month_data[name] += totals[name]
+
+            summary = {
+                "total_domains": 0,
+                "total_nameservers": 0,
+                "registrars": len(self.tld_registrar_ids.get(tld, [])),
+                "new_additions": 0,
+                "renewals": 0,
+                "transfers": 0,
+                "deletions": 0,
+            }
+            if monthly_data:
+                summary["monthly_data"] = monthly_data
+                summary.update(monthly_data[max(monthly_data)])
+            tld_summary[tld] = summary
+        return tld_summary
+
+    def write_reports(self) -> Dict[str, str]:
+        """Save the registrar and TLD summaries as report files.
+
+        Returns:
+            Dictionary with report names as keys and file paths as values
+        """
+        return {
+            "registrar_summary": self.report_generator.save_report(
+                self.registrar_summary(), "registrar_summary"
+            ),
+            "registrar_id_summary": self.report_generator.save_report(
+                self.registrar_id_summary(), "registrar_id_summary"
+            ),
+            "tld_summary": self.report_generator.save_report(
+                self.tld_summary(), "tld_summary"
+            ),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the aggregate as JSON-serializable data."""
+        return {
+            "registrars": self.registrars,
+            "tld_files": self.tld_files,
+            "tld_registrar_ids": self.tld_registrar_ids,
+            "registrar_names": self.registrar_names,
+        }
+
+    def save(self, path: str) -> None:
+        """Write the aggregate to a JSON file atomically.
+
+        Args:
+            path: Path to write the partial aggregate to
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.to_dict(), f, sort_keys=True)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(
+        cls, path: str, report_generator: Optional[ReportGenerator] = None
+    ) -> "ReportAggregator":
+        """Load an aggregate saved with save().
+
+        Args:
+            path: Path of the partial aggregate
+            report_generator: ReportGenerator for reports added later
+
+        Returns:
+            The loaded aggregate
+        """
+        with open(path, "r") as f:
+            data = json.load(f)
+        aggregator = cls(report_generator)
+        aggregator.registrars = data.get("registrars", {})
+        aggregator.tld_files = data.get("tld_files", {})
+        aggregator.tld_registrar_ids = data.get("tld_registrar_ids", {})
+        aggregator.registrar_names = data.get("registrar_names", {})
+        return aggregator
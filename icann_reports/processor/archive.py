@@ -0,0 +1,198 @@
+import io
+import os
+import re
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional
+
+from config import MAX_WORKERS
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.utils.compression import open_report_stream, report_name
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+from icann_reports.utils.tracing import TraceRecorder
+
+logger = setup_logging(logger_name="archive")
+
+# Name of a monthly transaction report, e.g. "com-transactions-202401-en.csv"
+REPORT_NAME_PATTERN = re.compile(
+    r"^(?P<tld>[a-z0-9-]+?)-transactions-(?P<date>\d{6})-en\.csv$"
+)
+
+
+class ArchiveIngestor:
+    """Processes reports straight from zip and tar archives, without network access.
+
+    Members are parsed from their decompressed stream without being extracted
+    to disk. Zip members are spread across workers, each with its own handle
+    on the archive. Tar archives can only be read front to back, so members
+    are read in order and their bytes handed to the workers.
+    """
+
+    def __init__(
+        self,
+        csv_processor: Optional[CSVProcessor] = None,
+        max_workers: int = MAX_WORKERS,
+        tlds: Optional[List[str]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        tracer: Optional[TraceRecorder] = None,
+    ):
+        """Initialize the archive ingestor.
+
+        Args:
+            csv_processor: CSVProcessor to parse members with
+            max_workers: Number of worker threads parsing members
+            tlds: Only ingest reports for these TLDs (all TLDs if None)
+            metrics: MetricsRegistry to record member outcomes in
+            tracer: TraceRecorder to record one span per member in
+        """
+        self.metrics = metrics or MetricsRegistry()
+        self.csv_processor = csv_processor or CSVProcessor(metrics=self.metrics)
+        self.max_workers = max_workers
+        self.tlds = {tld.lower() for tld in tlds} if tlds else None
+        self.tracer = tracer or TraceRecorder()
+
+    def is_report(self, member_name: str) -> bool:
+        """Check whether an archive member is a monthly report to ingest.
+
+        Args:
+            member_name: Path of the member inside the archive
+
+        Returns:
+            True if the member is a (possibly compressed) report for a selected TLD
+        """
+        match = REPORT_NAME_PATTERN.match(report_name(member_name))
+        return bool(match) and (self.tlds is None or match.group("tld") in self.tlds)
+
+    def _should_process(self, member_name: str) -> bool:
+        """Check whether a member still needs processing, counting skipped ones."""
+        if self.csv_processor.cache_manager.is_file_processed(report_name(member_name)):
+            logger.info(f"Already processed: {report_name(member_name)}")
+            self.metrics.inc("archive_members_total", result="already_processed")
+            return False
+        return True
+
+    def _process_member(
+        self, member_name: str, binary_stream
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Parse one member from its binary stream.
+
+        Args:
+            member_name: Path of the member inside the archive
+            binary_stream: Binary file object with the member's contents
+
+        Returns:
+            Parsed data keyed by report name, or None if parsing failed
+        """
+        with self.tracer.span(
+            "ingest", cat="parse", file=os.path.basename(member_name)
+        ):
+            with open_report_stream(binary_stream, member_name) as stream:
+                data = self.csv_processor.process_stream(
+                    os.path.basename(member_name), stream
+                )
+        self.metrics.inc("archive_members_total", result="parsed" if data else "failed")
+        return data
+
+    def ingest(self, archive_path: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Process every report in an archive.
+
+        Args:
+            archive_path: Path to a zip file or a (possibly compressed) tar file
+
+        Returns:
+            Dictionary with report file names as keys and processed rows as values
+
+        Raises:
+            ValueError: If the file is neither a zip nor a tar archive
+        """
+        if zipfile.is_zipfile(archive_path):
+            consolidated_data = self._ingest_zip(archive_path)
+        elif tarfile.is_tarfile(archive_path):
+            consolidated_data = self._ingest_tar(archive_path)
+        else:
+            raise ValueError(f"Not a zip or tar archive: {archive_path}")
+
+        logger.info(f"Ingested {len(consolidated_data)} reports from {archive_path}")
+        return consolidated_data
+
+    def _ingest_zip(self, archive_path: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Process the reports in a zip archive, one member per task."""
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [
+                info.filename
+                for info in archive.infolist()
+                if not info.is_dir() and self.is_report(info.filename)
+            ]
+        members = [name for name in members if self._should_process(name)]
+
+        # ZipFile handles are not safe to share between threads, so each worker opens
+        # its own
+        local = threading.local()
+        handles: List[zipfile.ZipFile] = []
+        handles_lock = threading.Lock()
+
+        def process(member_name: str):
+            archive = getattr(local, "archive", None)
+            if archive is None:
+                archive = local.archive = zipfile.ZipFile(archive_path)
+                with handles_lock:
+                    handles.append(archive)
+            with archive.open(member_name) as member:
+                return self._process_member(member_name, member)
+
+        consolidated_data: Dict[str, List[Dict[str, Any]]] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(process, name): name for name in members}
+                for future in as_completed(futures):
+                    self._collect(futures[future], future, consolidated_data)
+        finally:
+            for archive in handles:
+                archive.close()
+        return consolidated_data
+
+    def _ingest_tar(self, archive_path: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Process the reports in a tar archive, reading members sequentially."""
+        consolidated_data: Dict[str, List[Dict[str, Any]]] = {}
+        # Bound the member contents held in memory while waiting for a worker
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+
+        def process(member_name: str, content: bytes):
+            try:
+                return self._process_member(member_name, io.BytesIO(content))
+            finally:
+                in_flight.release()
+
+        with (
+            ThreadPoolExecutor(max_workers=self.max_workers) as executor,
+            tarfile.open(archive_path, "r|*") as archive,
+        ):
+            futures = {}
+            for member in archive:
+                if not member.isfile() or not self.is_report(member.name):
+                    continue
+                if not self._should_process(member.name):
+                    continue
+                extracted = archive.extractfile(member)
+                content = extracted.read() if extracted else b""
+                in_flight.acquire()
+                futures[executor.submit(process, member.name, content)] = member.name
+
+            for future in as_completed(futures):
+                self._collect(futures[future], future, consolidated_data)
+        return consolidated_data
+
+    def _collect(
+        self, member_name: str, future, consolidated_data: Dict[str, Any]
+    ) -> None:
+        """Add the result of a member task to the consolidated data."""
+        try:
+            data = future.result()
+            if data:
+                consolidated_data.update(data)
+        except Exception as e:
+            logger.error(f"Exception for {member_name}: {e}")
+            self.metrics.inc("archive_members_total", result="failed")
@@ -1,12 +1,23 @@
 import csv
-import os
-from typing import Dict, List, Any, Optional
+import itertools
+import time
+from typing import Dict, Iterable, List, Any, Optional
 
 from config import DATA_DIR
+from icann_reports.downloader.url_generator import URLGenerator
 from icann_reports.models.field_metadata import FieldMetadata
+from icann_reports.models.registrar_dictionary import (
+    RegistrarDictionary,
+    default_registrar_dictionary,
+)
 from icann_reports.utils.logging_setup import setup_logging
-from icann_reports.utils.file_structure import FileStructureAnalyzer
+from icann_reports.utils.file_structure import (
+    FileStructureAnalyzer,
+    STRUCTURE_SAMPLE_LINES,
+)
 from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.compression import open_report, report_name
+from icann_reports.utils.metrics import MetricsRegistry
 
 logger = setup_logging(logger_name="csv_processor")
 
@@ -14,22 +25,38 @@ logger = setup_logging(logger_name="csv_processor")
 class CSVProcessor:
     """Processes CSV files from ICANN reports."""
 
-    def __init__(self, data_dir: str = DATA_DIR):
+    def __init__(
+        self,
+        data_dir: str = DATA_DIR,
+        cache_manager: Optional[CacheManager] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        registrar_dictionary: Optional[RegistrarDictionary] = None,
+    ):
         """Initialize the CSV processor.
 
         Args:
             data_dir: Directory containing CSV files to process
+            cache_manager: CacheManager instance to record processed files in
+            metrics: MetricsRegistry to record parse metrics in
+            registrar_dictionary: RegistrarDictionary that parsed rows share their
+                registrar strings through (the process-wide one by default)
         """
         self.data_dir = data_dir
+        self.metrics = metrics or MetricsRegistry()
+        self.registrar_dictionary = registrar_dictionary or default_registrar_dictionary
         self.field_metadata = FieldMetadata()
-        self.file_structure_analyzer = FileStructureAnalyzer()
-        self.cache_manager = CacheManager()
+        self.file_structure_analyzer = FileStructureAnalyzer(metrics=self.metrics)
+        self.cache_manager = cache_manager or CacheManager()
 
-    def process_csv(self, file_info: tuple) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    def process_csv(
+        self, file_info: tuple, structure: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
         """Process a CSV file and return its data.
 
         Args:
-            file_info: Tuple of (file_path, already_processed)
+            file_info: Tuple of (file_path, already_processed); the file may be
+                gzip or xz compressed, and is decompressed as it is parsed
+            structure: File structure detected beforehand (detected here if None)
 
         Returns:
             Dictionary with file name as key and list of row dictionaries as value,
@@ -43,91 +70,148 @@ class CSVProcessor:
         if already_processed:
             return None
 
-        file_name = os.path.basename(file_path)
+        file_name = report_name(file_path)
+        start = time.perf_counter()
 
         try:
             # Detect file structure
-            structure = self.file_structure_analyzer.detect_file_structure(file_path)
-            header_rows = structure["header_rows"]
-
-            result = []
-            with open(file_path, "r", encoding="utf-8", errors="replace") as file:
-                lines = []
-                # Only read first few lines to determine headers
-                for _ in range(max(5, header_rows + 1)):  # Read enough lines to cover headers
-                    try:
-                        lines.append(next(file))
-                    except StopIteration:
-                        break
-
-                # Reset file pointer
-                file.seek(0)
-
-                # Skip header lines in the file
-                for _ in range(header_rows):
-                    next(file)
-
-                # Process the file line by line to avoid loading everything into memory
-                reader = csv.DictReader(file)
-
-                # Validate and normalize field names
-                field_names = reader.fieldnames or []
-                normalized_headers, warnings = self.field_metadata.validate_fields(
-                    field_names, file_name
+            if structure is None:
+                structure = self.file_structure_analyzer.detect_file_structure(
+                    file_path
                 )
 
-                # If headers don't match expected format, create a new reader with normalized headers
-                if normalized_headers != field_names:
-                    logger.info(f"Normalizing field names for {file_name}")
-                    # Reset file position after headers
-                    file.seek(0)
-                    for _ in range(header_rows + 1):  # +1 to skip the header line
-                        next(file)
-
-                    # Create a custom csv reader with normalized field names
-                    csv_reader = csv.reader(file)
-                    for row in csv_reader:
-                        # Create a dict with normalized field names
-                        row_dict = {
-                            normalized_headers[i]: val
-                            for i, val in enumerate(row)
-                            if i < len(normalized_headers)
-                        }
-
-                        # If TLD was inferred from filename, add it to the row data
-                        if (
-                            "TLD" not in field_names
-                            and "TLD" in normalized_headers
-                            and "-" in file_name
-                        ):
-                            tld_match = file_name.split("-")[0]
-                            row_dict["TLD"] = tld_match.upper()
-
-                        result.append(row_dict)
-                else:
-                    # Use the original DictReader if headers are already correct
-                    for row in reader:
-                        # If TLD was inferred from filename, add it to the row data
-                        if "TLD" not in field_names and "-" in file_name:
-                            tld_match = file_name.split("-")[0]
-                            row["TLD"] = tld_match.upper()
-
-                        result.append(row)
-
-            # Mark as processed in cache
-            self.cache_manager.add_processed_file(
-                file_name,
-                {
-                    "row_count": len(result),
-                    "structure": structure,
-                },
-            )
+            with open_report(file_path) as file:
+                return self._parse_lines(file_name, file, structure, start)
+
+        except Exception as e:
+            logger.error(f"Error processing {file_path}: {e}")
+            self.metrics.inc("parse_errors_total")
+            return None
+
+    def process_stream(
+        self, file_name: str, stream: Iterable[str]
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Detect the structure of a report and parse it from a text stream.
 
-            logger.info(
-                f"Processed {file_name}: {len(result)} rows, {header_rows} header rows"
+        The stream is read once: its first lines are used for structure
+        detection and then parsed along with the rest, so reports can be
+        processed straight from an archive member without extracting them.
+
+        Args:
+            file_name: Name of the report file (a compression suffix is ignored)
+            stream: Text lines of the report
+
+        Returns:
+            Dictionary with file name as key and list of row dictionaries as value,
+            or None if the report could not be processed
+        """
+        file_name = report_name(file_name)
+        start = time.perf_counter()
+
+        try:
+            stream = iter(stream)
+            head = list(itertools.islice(stream, STRUCTURE_SAMPLE_LINES))
+            structure = self.file_structure_analyzer.detect_structure_from_lines(
+                file_name, head
+            )
+            return self._parse_lines(
+                file_name, itertools.chain(head, stream), structure, start
             )
-            return {file_name: result}
 
         except Exception as e:
-            logger.error(f"Error processing {file_path}: {e}")
-            return None
\ No newline at end of file
+            logger.error(f"Error processing {file_name}: {e}")
+            self.metrics.inc("parse_errors_total")
+            return None
+
+    def _parse_lines(
+        self,
+        file_name: str,
+        file: Iterable[str],
+        structure: Dict[str, Any],
+        start: float,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Parse the lines of a report, reading them in a single pass.
+
+        Args:
+            file_name: Name of the uncompressed report file
+            file: Lines of the report, from the first line of the file
+            structure: Detected file structure
+            start: perf_counter() value at which processing of the file started
+
+        Returns:
+            Dictionary with file name as key and list of row dictionaries as value
+        """
+        header_rows = structure["header_rows"]
+        file = iter(file)
+        result = []
+
+        # Skip header lines in the file
+        for _ in range(header_rows):
+            next(file)
+
+        # Process the file line by line to avoid loading everything into memory
+        reader = csv.DictReader(file)
+
+        # Validate and normalize field names
+        field_names = reader.fieldnames or []
+        normalized_headers, warnings = self.field_metadata.validate_fields(
+            field_names, file_name
+        )
+
+        # If headers don't match expected format, create a new reader with normalized
+        # headers
+        if normalized_headers != field_names:
+            logger.info(f"Normalizing field names for {file_name}")
+
+            # Create a custom csv reader with normalized field names, continuing
+            # after the header line so compressed streams are read only once
+            csv_reader = csv.reader(file)
+            for row in csv_reader:
+                # Create a dict with normalized field names
+                row_dict = {
+                    normalized_headers[i]: val
+                    for i, val in enumerate(row)
+                    if i < len(normalized_headers)
+                }
+
+                # If TLD was inferred from filename, add it to the row data
+                if (
+                    "TLD" not in field_names
+                    and "TLD" in normalized_headers
+                    and "-" in file_name
+                ):
+                    tld_match = file_name.split("-")[0]
+                    row_dict["TLD"] = tld_match.upper()
+
+                result.append(row_dict)
+        else:
+            # Use the original DictReader if headers are already correct
+            for row in reader:
+                # If TLD was inferred from filename, add it to the row data
+                if "TLD" not in field_names and "-" in file_name:
+                    tld_match = file_name.split("-")[0]
+                    row["TLD"] = tld_match.upper()
+
+                result.append(row)
+
+        # Share the registrar strings repeated in every report
+        self.registrar_dictionary.encode_rows(
+            result, URLGenerator.parse_filename_date(file_name)
+        )
+
+        # Mark as processed in cache
+        self.cache_manager.add_processed_file(
+            file_name,
+            {
+                "row_count": len(result),
+                "structure": structure,
+            },
+        )
+
+        logger.info(
+            f"Processed {file_name}: {len(result)} rows, {header_rows} header rows"
+        )
+        self.metrics.inc("files_parsed_total")
+        self.metrics.inc("rows_parsed_total", len(result))
+        self.metrics.observe("file_parse_duration_seconds", time.perf_counter() - start)
+        return {file_name: result}
@@ -0,0 +1,244 @@
+import csv
+import json
+from typing import Dict, List, Any, Iterable, Optional, Sequence, TextIO, Tuple
+
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.processor.vectorized import METRIC_FIELDS
+from icann_reports.utils.columnar import ColumnarStore
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.query_index import QueryIndex
+
+logger = setup_logging(logger_name="query")
+
+# Figures of the registrar summaries that queries can select, besides raw metric columns
+QUERY_MEASURES = [
+    "total_domains",
+    "total_nameservers",
+    "new_additions",
+    "renewals",
+    "transfers_in",
+    "transfers_out",
+    "deletions",
+]
+
+# Fields query results can be grouped by
+QUERY_GROUP_FIELDS = ["iana_id", "tld", "month"]
+
+QUERY_FORMATS = ["csv", "json"]
+
+
+def _numeric(row: Dict[str, Any], field_name: str) -> int:
+    """Get a metric cell like ReportGenerator: blank or invalid cells count as 0."""
+    try:
+        value = row.get(field_name, "0").strip()
+        return int(value) if value else 0
+    except (ValueError, TypeError, AttributeError):
+        return 0
+
+
+class ReportQuery:
+    """Filtered and grouped queries over the reports in a columnar store.
+
+    Lookups go through the QueryIndex: a query for given IANA IDs reads only
+    the rows of those registrars, and a query for given TLDs and months opens
+    only the reports of those TLDs and months.
+    """
+
+    def __init__(
+        self,
+        columnar_store: Optional[ColumnarStore] = None,
+        query_index: Optional[QueryIndex] = None,
+    ):
+        """Initialize the query engine.
+
+        Args:
+            columnar_store: ColumnarStore holding the parsed reports
+            query_index: QueryIndex of the columnar store
+        """
+        self.columnar_store = columnar_store or ColumnarStore()
+        self.query_index = query_index or QueryIndex(self.columnar_store)
+
+    def _selected_rows(
+        self,
+        iana_ids: Optional[Sequence[str]],
+        tlds: Optional[Sequence[str]],
+        since: Optional[str],
+        until: Optional[str],
+    ) -> Dict[str, Tuple[str, str, Optional[List[int]]]]:
+        """Find the reports and rows a query reads.
+
+        Returns:
+            Dictionary with file names as keys and (TLD, month, row indices)
+            as values, with None for every row of the report
+        """
+        tld_filter = {tld.lower() for tld in tlds} if tlds else None
+
+        def wanted(tld: str, month: str) -> bool:
+            return (
+                (tld_filter is None or tld in tld_filter)
+                and (not since or month >= since)
+                and (not until or month <= until)
+            )
+
+        selected: Dict[str, Tuple[str, str, Optional[List[int]]]] = {}
+        if iana_ids:
+            for iana_id in iana_ids:
+                registrar = self.query_index.registrar(iana_id)
+                if registrar is None:
+                    continue
+                for file_name, posting in registrar["reports"].items():
+                    if wanted(posting["tld"], posting["month"]):
+                        rows = selected.setdefault(
+                            file_name, (posting["tld"], posting["month"], [])
+                        )[2]
+                        rows.extend(posting["rows"])
+            for _, _, rows in selected.values():
+                rows.sort()
+        else:
+            for tld in (
+                sorted(tld_filter)
+                if tld_filter is not None
+                else self.query_index.tlds()
+            ):
+                for file_name, entry in self.query_index.tld_reports(tld).items():
+                    if wanted(tld, entry["month"]):
+                        selected[file_name] = (tld, entry["month"], None)
+        return dict(
+            sorted(selected.items(), key=lambda item: (item[1][1], item[1][0], item[0]))
+        )
+
+    def run(
+        self,
+        iana_ids: Optional[Sequence[str]] = None,
+        tlds: Optional[Sequence[str]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        metrics: Optional[Sequence[str]] = None,
+        group_by: Sequence[str] = QUERY_GROUP_FIELDS,
+    ) -> List[Dict[str, Any]]:
+        """Run a query.
+
+        Args:
+            iana_ids: Only include these registrars (all by default)
+            tlds: Only include these TLDs (all by default)
+            since: Only include months from this one on, as YYYY-MM
+            until: Only include months up to this one, as YYYY-MM
+            metrics: Figures to return: QUERY_MEASURES names or raw metric
+                columns such as "Net-adds-1-yr" (all QUERY_MEASURES by default)
+            group_by: Fields to group by, from QUERY_GROUP_FIELDS; figures are
+                summed over the rows of each group
+
+        Returns:
+            One record per group, with the group fields and the figures, in
+            month, TLD and IANA ID order. Records grouped by IANA ID also have
+            the registrar's latest "name".
+
+        Raises:
+            ValueError: If a metric or group field is unknown
+        """
+        metrics = list(metrics or QUERY_MEASURES)
+        unknown = [
+            name
+            for name in metrics
+            if name not in QUERY_MEASURES and name not in METRIC_FIELDS
+        ]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+        unknown = [name for name in group_by if name not in QUERY_GROUP_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown group fields: {', '.join(unknown)}")
+        group_fields = [name for name in QUERY_GROUP_FIELDS if name in group_by]
+        iana_id_filter = set(iana_ids) if iana_ids else None
+
+        groups: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        # Group -> (month, name) of the latest name seen, for groups by IANA ID
+        names: Dict[Tuple[str, ...], Tuple[str, str]] = {}
+        for file_name, (tld, month, indices) in self._selected_rows(
+            iana_ids, tlds, since, until
+        ).items():
+            try:
+                with self.columnar_store.open(file_name) as report:
+                    rows = (
+                        list(report.rows())
+                        if indices is None
+                        else [report.row(index) for index in indices]
+                    )
+            except (OSError, ValueError, IndexError) as e:
+                logger.warning(
+                    f"Failed to read columnar report {file_name}, index may be stale: "
+                    f"{e}"
+                )
+                continue
+            for row in rows:
+                iana_id = row.get("IANA-ID", "")
+                if iana_id_filter is not None and iana_id not in iana_id_filter:
+                    continue
+                fields = {"iana_id": iana_id, "tld": tld, "month": month}
+                key = tuple(fields[name] for name in group_fields)
+                record = groups.get(key)
+                if record is None:
+                    record = groups[key] = {name: fields[name] for name in group_fields}
+                    record.update(dict.fromkeys(metrics, 0))
+                stats = ReportGenerator._registrar_stats(row)
+                for name in metrics:
+                    record[name] += (
+                        stats[name] if name in stats else _numeric(row, name)
+                    )
+                if "iana_id" in group_fields and row.get("Registrar-name"):
+                    if key not in names or month >= names[key][0]:
+                        names[key] = (month, row["Registrar-name"])
+
+        records = []
+        for key in sorted(groups, key=self._sort_key(group_fields)):
+            record = groups[key]
+            if "iana_id" in group_fields:
+                record = {
+                    "iana_id": record["iana_id"],
+                    "name": names.get(key, ("", ""))[1],
+                    **record,
+                }
+            records.append(record)
+        return records
+
+    @staticmethod
+    def _sort_key(group_fields: List[str]):
+        """Order groups by month, TLD and then numeric IANA ID."""
+        order = [name for name in ["month", "tld", "iana_id"] if name in group_fields]
+
+        def key(group: Tuple[str, ...]) -> Tuple[Any, ...]:
+            values = dict(zip(group_fields, group))
+            return tuple(
+                (len(values[name]), values[name]) if name == "iana_id" else values[name]
+                for name in order
+            )
+
+        return key
+
+
+def write_query_results(
+    records: Iterable[Dict[str, Any]], output: TextIO, output_format: str = "csv"
+) -> None:
+    """Write query results.
+
+    Args:
+        records: Records returned by ReportQuery.run
+        output: Text stream to write to
+        output_format: "csv" or "json"
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    records = list(records)
+    if output_format == "json":
+        json.dump(records, output, indent=2)
+        output.write("\n")
+    elif output_format == "csv":
+        fieldnames = list(dict.fromkeys(name for record in records for name in record))
+        writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(records)
+    else:
+        raise ValueError(
+            f"Unknown output format {output_format!r}, expected one of "
+            f"{', '.join(QUERY_FORMATS)}"
+        )
@@ -1,121 +1,251 @@
+import functools
+import hashlib
 import json
 import os
-from typing import Dict, List, Any, Optional
+import shutil
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
 
 from config import DATA_DIR
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.models.registrar_dictionary import (
+    RegistrarDictionary,
+    default_registrar_dictionary,
+)
+from icann_reports.processor import vectorized
+from icann_reports.utils.content_store import ContentStore
 from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+from icann_reports.utils.report_cache import ReportCache
+from icann_reports.utils.tracing import TraceRecorder
 
 logger = setup_logging(logger_name="reports")
 
+# Version of the report output; bump it whenever the reports change for the same inputs,
+# so reports cached by earlier versions are not reused
+REPORT_SCHEMA_VERSION = 1
+
+# Reports written by generate_all_reports, in order
+REPORT_NAMES = ["registrar_summary", "registrar_id_summary", "tld_summary"]
+
+
+def _numeric(row: Dict[str, Any], field_name: str) -> int:
+    """Get a metric cell as an integer; blank or non-numeric cells count as 0."""
+    try:
+        value = row.get(field_name, "0").strip()
+        return int(value) if value else 0
+    except (ValueError, TypeError):
+        return 0
+
 
 class ReportGenerator:
     """Generates reports and summaries from processed ICANN data."""
 
-    def __init__(self, data_dir: str = DATA_DIR):
+    def __init__(
+        self,
+        data_dir: str = DATA_DIR,
+        metrics: Optional[MetricsRegistry] = None,
+        tracer: Optional[TraceRecorder] = None,
+        registrar_dictionary: Optional[RegistrarDictionary] = None,
+        backend: str = "auto",
+        report_cache: Optional[ReportCache] = None,
+    ):
         """Initialize the report generator.
 
         Args:
             data_dir: Directory to store generated reports
+            metrics: MetricsRegistry to record report metrics in
+            tracer: TraceRecorder to record report generation spans in
+            registrar_dictionary: RegistrarDictionary that registrar summary keys
+                are taken from (the process-wide one by default)
+            backend: Aggregation backend, one of vectorized.AGGREGATION_BACKENDS;
+                "auto" uses NumPy when it is installed and pure Python otherwise
+            report_cache: ReportCache to reuse reports generated from the same
+                inputs by earlier runs (no caching if None)
+
+        Raises:
+            ValueError: If the backend is unknown
         """
+        if backend not in vectorized.AGGREGATION_BACKENDS:
+            raise ValueError(f"Unknown aggregation backend: {backend}")
+        if backend == "numpy" and not vectorized.NUMPY_AVAILABLE:
+            logger.warning("NumPy is not installed, aggregating in pure Python")
+        self.backend = (
+            "numpy" if backend != "python" and vectorized.NUMPY_AVAILABLE else "python"
+        )
         self.data_dir = data_dir
+        self.metrics = metrics or MetricsRegistry()
+        self.tracer = tracer or TraceRecorder()
+        self.registrar_dictionary = registrar_dictionary or default_registrar_dictionary
+        self.report_cache = report_cache
         self.reports_dir = os.path.join(data_dir, "reports")
         os.makedirs(self.reports_dir, exist_ok=True)
 
-    def generate_summary_by_registrar(self, data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    def generate_summary_by_registrar(
+        self, data: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
         """Generate a summary of domain data grouped by registrar.
 
+        Figures of each TLD come from the latest month, so the summary does not
+        depend on the order of the reports in data.
+
         Args:
-            data: Dictionary with file names as keys and lists of row dictionaries as values
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
 
         Returns:
             Dictionary with registrar summaries
         """
+        if self.backend == "numpy":
+            try:
+                return vectorized.summary_by_registrar(data, self.registrar_dictionary)
+            except OverflowError:
+                logger.warning("Values too large for NumPy, aggregating in pure Python")
+
         registrar_summary = {}
-        
+        # (registrar key, TLD) -> month the figures were taken from
+        months: Dict[Tuple[str, str], str] = {}
+
         for file_name, rows in data.items():
+            month = URLGenerator.parse_filename_date(file_name)
             for row in rows:
                 # Get registrar info
                 registrar_name = row.get("Registrar-name", "Unknown")
                 iana_id = row.get("IANA-ID", "Unknown")
                 tld = row.get("TLD", "Unknown").upper()
-                
-                # Create registrar key
-                registrar_key = f"{registrar_name} (IANA ID: {iana_id})"
-                
+
+                # Get the registrar key, built once per registrar rather than per row
+                registrar_key = self.registrar_dictionary.registrar_key(
+                    iana_id, registrar_name
+                )
+
                 if registrar_key not in registrar_summary:
                     registrar_summary[registrar_key] = {
                         "name": registrar_name,
                         "iana_id": iana_id,
                         "tlds": {},
                     }
-                    
-                # Ensure TLD entry exists
-                if tld not in registrar_summary[registrar_key]["tlds"]:
-                    registrar_summary[registrar_key]["tlds"][tld] = {
-                        "total_domains": 0,
-                        "total_nameservers": 0,
-                        "new_additions": 0,
-                        "renewals": 0,
-                        "transfers_in": 0,
-                        "transfers_out": 0,
-                        "deletions": 0,
-                    }
-                    
-                # Update TLD stats
-                tld_stats = registrar_summary[registrar_key]["tlds"][tld]
-                
-                # Extract numeric values with fallback to 0 for empty or non-numeric values
-                def get_numeric(field_name: str) -> int:
-                    try:
-                        value = row.get(field_name, "0").strip()
-                        return int(value) if value else 0
-                    except (ValueError, TypeError):
-                        return 0
-                
-                # Add values to summary
-                tld_stats["total_domains"] = get_numeric("Total-domains")
-                tld_stats["total_nameservers"] = get_numeric("Total-Nameservers")
-                
-                # Sum all additions
-                tld_stats["new_additions"] = sum(
-                    get_numeric(f"Net-adds-{year}-yr")
-                    for year in range(1, 11)
-                )
-                
-                # Sum all renewals
-                tld_stats["renewals"] = sum(
-                    get_numeric(f"Net-renews-{year}-yr")
-                    for year in range(1, 11)
+
+                # Replace the TLD stats with this row's, unless they are of a later
+                # month
+                if months.get((registrar_key, tld), "") > month:
+                    continue
+                months[registrar_key, tld] = month
+                registrar_summary[registrar_key]["tlds"][tld] = self._registrar_stats(
+                    row
                 )
-                
-                # Transfers
-                tld_stats["transfers_in"] = get_numeric("Transfer-gaining-successful")
-                tld_stats["transfers_out"] = get_numeric("Transfer-losing-successful")
-                
-                # Deletions
-                tld_stats["deletions"] = (
-                    get_numeric("Deleted-domains-grace") +
-                    get_numeric("Deleted-domains-nograce")
+
+        return registrar_summary
+
+    @staticmethod
+    def _registrar_stats(row: Dict[str, Any]) -> Dict[str, int]:
+        """Get the figures of one registrar row for the registrar summaries.
+
+        Args:
+            row: Row dictionary of a registrar in one TLD and month
+
+        Returns:
+            Dictionary with domain, nameserver, addition, renewal, transfer and deletion
+            counts
+        """
+        # Extract numeric values with fallback to 0 for empty or non-numeric values
+        get_numeric = functools.partial(_numeric, row)
+
+        return {
+            "total_domains": get_numeric("Total-domains"),
+            "total_nameservers": get_numeric("Total-Nameservers"),
+            # Sum all additions and renewals
+            "new_additions": sum(
+                get_numeric(f"Net-adds-{year}-yr") for year in range(1, 11)
+            ),
+            "renewals": sum(
+                get_numeric(f"Net-renews-{year}-yr") for year in range(1, 11)
+            ),
+            "transfers_in": get_numeric("Transfer-gaining-successful"),
+            "transfers_out": get_numeric("Transfer-losing-successful"),
+            "deletions": get_numeric("Deleted-domains-grace")
+            + get_numeric("Deleted-domains-nograce"),
+        }
+
+    def generate_summary_by_registrar_id(
+        self, data: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Generate a summary of domain data grouped by IANA ID.
+
+        Unlike the registrar summary, a renamed registrar stays under one key.
+        Figures of each TLD come from the latest month, and names are attached
+        from the registrar dictionary: the canonical (latest) name and every
+        name with the months it was seen in. Rows without an IANA ID are left out.
+
+        Args:
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
+
+        Returns:
+            Dictionary with registrar summaries keyed by IANA ID
+        """
+        if self.backend == "numpy":
+            try:
+                return vectorized.summary_by_registrar_id(
+                    data, self.registrar_dictionary
                 )
-        
+            except OverflowError:
+                logger.warning("Values too large for NumPy, aggregating in pure Python")
+
+        # IANA ID -> TLD -> (month, stats)
+        latest: Dict[str, Dict[str, Any]] = {}
+
+        for file_name, rows in data.items():
+            month = URLGenerator.parse_filename_date(file_name)
+            # Make sure the dictionary knows rows that were not parsed through it
+            self.registrar_dictionary.encode_rows(rows, month)
+            for row in rows:
+                iana_id = row.get("IANA-ID")
+                if not iana_id:
+                    continue
+                tld = row.get("TLD", "Unknown").upper()
+                tlds = latest.setdefault(iana_id, {})
+                if tld not in tlds or month >= tlds[tld][0]:
+                    tlds[tld] = (month, self._registrar_stats(row))
+
+        registrar_summary = {}
+        for iana_id in sorted(latest, key=lambda iana_id: (len(iana_id), iana_id)):
+            registrar = self.registrar_dictionary.find_by_id(iana_id)
+            registrar_summary[iana_id] = {
+                "iana_id": iana_id,
+                "name": registrar.name,
+                "names": registrar.name_history(),
+                "tlds": {
+                    tld: stats
+                    for tld, (month, stats) in sorted(latest[iana_id].items())
+                },
+            }
         return registrar_summary
-    
-    def generate_summary_by_tld(self, data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+
+    def generate_summary_by_tld(
+        self, data: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
         """Generate a summary of domain data grouped by TLD.
 
         Args:
-            data: Dictionary with file names as keys and lists of row dictionaries as values
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
 
         Returns:
             Dictionary with TLD summaries
         """
+        if self.backend == "numpy":
+            try:
+                return vectorized.summary_by_tld(data)
+            except OverflowError:
+                logger.warning("Values too large for NumPy, aggregating in pure Python")
+
         tld_summary = {}
-        
+
         for file_name, rows in data.items():
             for row in rows:
                 # Extract TLD
                 tld = row.get("TLD", "Unknown").upper()
-                
+
                 # Create TLD entry if it doesn't exist
                 if tld not in tld_summary:
                     tld_summary[tld] = {
@@ -127,7 +257,7 @@ class ReportGenerator:
                         "transfers": 0,
                         "deletions": 0,
                     }
-                
+
                 # Extract numeric values
                 def get_numeric(field_name: str) -> int:
                     try:
@@ -135,24 +265,28 @@ class ReportGenerator:
                         return int(value) if value else 0
                     except (ValueError, TypeError):
                         return 0
-                
+
                 # Update registrar count (unique IANA IDs)
                 if "registrar_ids" not in tld_summary[tld]:
                     tld_summary[tld]["registrar_ids"] = set()
-                
+
                 iana_id = row.get("IANA-ID")
                 if iana_id:
                     tld_summary[tld]["registrar_ids"].add(iana_id)
-                    tld_summary[tld]["registrars"] = len(tld_summary[tld]["registrar_ids"])
-                
+                    tld_summary[tld]["registrars"] = len(
+                        tld_summary[tld]["registrar_ids"]
+                    )
+
                 # Add values to summary (only for current file to avoid double counting)
-                file_date = file_name.split("-")[2][:6] if len(file_name.split("-")) > 2 else ""
-                
+                file_date = (
+                    file_name.split("-")[2][:6] if len(file_name.split("-")) > 2 else ""
+                )
+
                 # Store data by month if we have a date
                 if file_date and len(file_date) == 6:
                     if "monthly_data" not in tld_summary[tld]:
                         tld_summary[tld]["monthly_data"] = {}
-                        
+
                     if file_date not in tld_summary[tld]["monthly_data"]:
                         tld_summary[tld]["monthly_data"][file_date] = {
                             "total_domains": 0,
@@ -161,50 +295,51 @@ class ReportGenerator:
                             "transfers": 0,
                             "deletions": 0,
                         }
-                    
+
                     # Add to monthly totals
                     month_data = tld_summary[tld]["monthly_data"][file_date]
                     month_data["total_domains"] += get_numeric("Total-domains")
-                    
+
                     month_data["new_additions"] += sum(
-                        get_numeric(f"Net-adds-{year}-yr")
-                        for year in range(1, 11)
+                        get_numeric(f"Net-adds-{year}-yr") for year in range(1, 11)
                     )
-                    
+
                     month_data["renewals"] += sum(
-                        get_numeric(f"Net-renews-{year}-yr")
-                        for year in range(1, 11)
+                        get_numeric(f"Net-renews-{year}-yr") for year in range(1, 11)
                     )
-                    
-                    month_data["transfers"] += get_numeric("Transfer-gaining-successful")
-                    
-                    month_data["deletions"] += (
-                        get_numeric("Deleted-domains-grace") +
-                        get_numeric("Deleted-domains-nograce")
+
+                    month_data["transfers"] += get_numeric(
+                        "Transfer-gaining-successful"
                     )
-                    
+
+                    month_data["deletions"] += get_numeric(
+                        "Deleted-domains-grace"
+                    ) + get_numeric("Deleted-domains-nograce")
+
                 # Update overall totals with the most recent data
                 if "monthly_data" in tld_summary[tld]:
                     # Sort months in descending order
-                    months = sorted(tld_summary[tld]["monthly_data"].keys(), reverse=True)
+                    months = sorted(
+                        tld_summary[tld]["monthly_data"].keys(), reverse=True
+                    )
                     if months:
                         latest_month = months[0]
                         latest_data = tld_summary[tld]["monthly_data"][latest_month]
-                        
+
                         # Use the latest month's data for overall totals
                         tld_summary[tld]["total_domains"] = latest_data["total_domains"]
                         tld_summary[tld]["new_additions"] = latest_data["new_additions"]
                         tld_summary[tld]["renewals"] = latest_data["renewals"]
                         tld_summary[tld]["transfers"] = latest_data["transfers"]
                         tld_summary[tld]["deletions"] = latest_data["deletions"]
-        
+
         # Remove the set used for counting unique registrars
         for tld in tld_summary:
             if "registrar_ids" in tld_summary[tld]:
                 del tld_summary[tld]["registrar_ids"]
-                
+
         return tld_summary
-    
+
     def save_report(self, data: Dict[str, Any], report_name: str) -> str:
         """Save report data to a JSON file.
 
@@ -216,37 +351,186 @@ class ReportGenerator:
             Path to the saved report file
         """
         report_path = os.path.join(self.reports_dir, f"{report_name}.json")
-        
+
         try:
-            with open(report_path, "w") as f:
+            # Replace the report in one step, so readers such as the report API never
+            # see half of it
+            temp_path = f"{report_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
                 json.dump(data, f, indent=2)
+            os.replace(temp_path, report_path)
             logger.info(f"Report saved to {report_path}")
+            self.metrics.inc("reports_generated_total", report=report_name)
+            self.metrics.inc("report_bytes_written_total", os.path.getsize(report_path))
             return report_path
         except Exception as e:
             logger.error(f"Error saving report to {report_path}: {e}")
             return ""
-            
-    def generate_all_reports(self, data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, str]:
+
+    @staticmethod
+    def input_hashes(
+        data: Dict[str, List[Dict[str, Any]]],
+        file_hashes: Optional[Dict[str, str]] = None,
+        input_names: Optional[Iterable[str]] = None,
+    ) -> Dict[str, str]:
+        """Get a content hash of every input report.
+
+        Args:
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
+            file_hashes: Known content hashes of report files, keyed by file name;
+                reports without one are hashed from their rows
+            input_names: Names of every input report, including ones whose rows
+                are not in data (the names in data by default)
+
+        Returns:
+            Dictionary with file names as keys and hex digests as values (or
+            "missing" for reports with neither rows nor a known hash)
+        """
+        file_hashes = file_hashes or {}
+        hashes = {}
+        for file_name in dict.fromkeys([*data, *(input_names or [])]):
+            if file_hashes.get(file_name):
+                hashes[file_name] = file_hashes[file_name]
+            elif file_name in data:
+                rows = repr(data[file_name]).encode("utf-8")
+                hashes[file_name] = "rows:" + hashlib.sha256(rows).hexdigest()
+            else:
+                hashes[file_name] = "missing"
+        return hashes
+
+    def existing_reports(self) -> Dict[str, str]:
+        """Get the paths of the reports already in the reports directory.
+
+        Returns:
+            Dictionary with report names as keys and file paths as values, empty
+            unless every report exists
+        """
+        reports = {
+            report_name: os.path.join(self.reports_dir, f"{report_name}.json")
+            for report_name in REPORT_NAMES
+        }
+        if not all(os.path.exists(report_path) for report_path in reports.values()):
+            return {}
+        return reports
+
+    def _restore_cached_reports(
+        self, cached: Dict[str, Dict[str, str]]
+    ) -> Dict[str, str]:
+        """Put cached reports in the reports directory, leaving identical files alone.
+
+        Args:
+            cached: Cached reports as returned by ReportCache.get
+
+        Returns:
+            Dictionary with report names as keys and file paths as values
+        """
+        reports = {}
+        for report_name, report in cached.items():
+            report_path = os.path.join(self.reports_dir, f"{report_name}.json")
+            if (
+                not os.path.exists(report_path)
+                or ContentStore.hash_file(report_path) != report["sha256"]
+            ):
+                temp_path = f"{report_path}.{os.getpid()}.tmp"
+                shutil.copyfile(report["path"], temp_path)
+                os.replace(temp_path, report_path)
+                logger.info(f"Report restored from cache to {report_path}")
+            reports[report_name] = report_path
+        return reports
+
+    def generate_all_reports(
+        self,
+        data: Dict[str, List[Dict[str, Any]]],
+        file_hashes: Optional[Dict[str, str]] = None,
+        input_names: Optional[Iterable[str]] = None,
+        load_missing: Optional[
+            Callable[[List[str]], Dict[str, List[Dict[str, Any]]]]
+        ] = None,
+    ) -> Dict[str, str]:
         """Generate and save all reports.
 
+        With a report cache, the inputs are fingerprinted first, and reports
+        generated from the same inputs before are reused instead. Otherwise the
+        rows of inputs not in data are loaded with load_missing. Reports are
+        only cached when every input's rows were at hand, and reports already
+        written are never replaced with ones missing inputs.
+
         Args:
-            data: Dictionary with file names as keys and lists of row dictionaries as values
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
+            file_hashes: Content hashes of the input report files, keyed by file
+                name, to fingerprint them with instead of hashing their rows
+            input_names: Names of every report the reports cover, including ones
+                processed by earlier runs whose rows are not in data (the names in
+                data by default)
+            load_missing: Function returning the rows of the named inputs that are
+                not in data, called only when the reports have to be generated
 
         Returns:
             Dictionary with report names as keys and file paths as values
         """
+        input_hashes = self.input_hashes(data, file_hashes, input_names)
+        missing = [file_name for file_name in input_hashes if file_name not in data]
+        fingerprint = None
+        if self.report_cache:
+            fingerprint = self.report_cache.fingerprint(
+                input_hashes,
+                {"schema_version": REPORT_SCHEMA_VERSION, "reports": REPORT_NAMES},
+            )
+            cached = self.report_cache.get(fingerprint)
+            if cached:
+                logger.info(
+                    f"Inputs unchanged since reports {fingerprint[:12]} were "
+                    "generated, reusing them"
+                )
+                return self._restore_cached_reports(cached)
+
+        if missing and load_missing:
+            data = {**data, **load_missing(missing)}
+            input_hashes = self.input_hashes(data, file_hashes, input_names)
+            missing = [file_name for file_name in input_hashes if file_name not in data]
+            if fingerprint:
+                fingerprint = self.report_cache.fingerprint(
+                    input_hashes,
+                    {"schema_version": REPORT_SCHEMA_VERSION, "reports": REPORT_NAMES},
+                )
+
+        if missing:
+            existing = self.existing_reports()
+            if existing:
+                logger.warning(
+                    f"Rows of {len(missing)} of {len(input_hashes)} input reports "
+                    "are not at hand (processed by an earlier run and no longer on "
+                    "disk), keeping the existing reports"
+                )
+                return existing
+            logger.warning(
+                f"Rows of {len(missing)} of {len(input_hashes)} input reports are "
+                "not at hand, generating reports from the others"
+            )
+
         reports = {}
-        
+
         # Generate registrar summary
-        registrar_summary = self.generate_summary_by_registrar(data)
-        reports["registrar_summary"] = self.save_report(
-            registrar_summary, "registrar_summary"
-        )
-        
+        with self.tracer.span("report", cat="report", report="registrar_summary"):
+            registrar_summary = self.generate_summary_by_registrar(data)
+            reports["registrar_summary"] = self.save_report(
+                registrar_summary, "registrar_summary"
+            )
+
+        # Generate registrar summary keyed by IANA ID
+        with self.tracer.span("report", cat="report", report="registrar_id_summary"):
+            registrar_id_summary = self.generate_summary_by_registrar_id(data)
+            reports["registrar_id_summary"] = self.save_report(
+                registrar_id_summary, "registrar_id_summary"
+            )
+
         # Generate TLD summary
-        tld_summary = self.generate_summary_by_tld(data)
-        reports["tld_summary"] = self.save_report(
-            tld_summary, "tld_summary"
-        )
-        
-        return reports
\ No newline at end of file
+        with self.tracer.span("report", cat="report", report="tld_summary"):
+            tld_summary = self.generate_summary_by_tld(data)
+            reports["tld_summary"] = self.save_report(tld_summary, "tld_summary")
+
+        if fingerprint and not missing and all(reports.values()):
+            self.report_cache.put(fingerprint, reports)
+        return reports
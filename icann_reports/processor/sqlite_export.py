@@ -0,0 +1,321 @@
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from config import SQLITE_PATH, SQLITE_BATCH_ROWS
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.processor.vectorized import METRIC_FIELDS, metric_cells
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="sqlite_export")
+
+# Version of the database schema, kept in PRAGMA user_version
+SQLITE_SCHEMA_VERSION = 1
+
+
+def _column_name(field_name: str) -> str:
+    """Get the SQL column of a metric field, e.g. "net_adds_1_yr"."""
+    return re.sub(r"[^0-9a-z]+", "_", field_name.lower()).strip("_")
+
+
+METRIC_COLUMNS = [_column_name(field_name) for field_name in METRIC_FIELDS]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL UNIQUE,
+    tld TEXT NOT NULL,
+    month TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    loaded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS registrars (
+    iana_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    last_month TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS registrar_names (
+    iana_id TEXT NOT NULL REFERENCES registrars (iana_id),
+    name TEXT NOT NULL,
+    first_month TEXT NOT NULL,
+    last_month TEXT NOT NULL,
+    PRIMARY KEY (iana_id, name)
+);
+CREATE TABLE IF NOT EXISTS monthly_metrics (
+    file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    row_number INTEGER NOT NULL,
+    iana_id TEXT REFERENCES registrars (iana_id),
+    registrar_name TEXT,
+    tld TEXT NOT NULL,
+    month TEXT NOT NULL,
+    {", ".join(f"{column} INTEGER" for column in METRIC_COLUMNS)},
+    PRIMARY KEY (file_id, row_number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tld_monthly_summary (
+    file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    tld TEXT NOT NULL,
+    month TEXT NOT NULL,
+    registrars INTEGER NOT NULL,
+    total_domains INTEGER NOT NULL,
+    new_additions INTEGER NOT NULL,
+    renewals INTEGER NOT NULL,
+    transfers INTEGER NOT NULL,
+    deletions INTEGER NOT NULL,
+    PRIMARY KEY (file_id, tld, month)
+);
+"""
+
+# Created after the first bulk load, which is faster than maintaining them row by row
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS files_tld_month ON files (tld, month);
+CREATE INDEX IF NOT EXISTS monthly_metrics_registrar
+    ON monthly_metrics (iana_id, tld, month);
+CREATE INDEX IF NOT EXISTS monthly_metrics_tld_month ON monthly_metrics (tld, month);
+CREATE INDEX IF NOT EXISTS tld_monthly_summary_tld_month
+    ON tld_monthly_summary (tld, month);
+"""
+
+_INSERT_METRICS = (
+    "INSERT INTO monthly_metrics (file_id, row_number, iana_id, registrar_name, tld, "
+    "month, "
+    f"{', '.join(METRIC_COLUMNS)}) VALUES "
+    f"({', '.join(['?'] * (6 + len(METRIC_COLUMNS)))})"
+)
+
+_ADDS = " + ".join(
+    f"COALESCE({column}, 0)"
+    for column in METRIC_COLUMNS
+    if column.startswith("net_adds_")
+)
+_RENEWS = " + ".join(
+    f"COALESCE({column}, 0)"
+    for column in METRIC_COLUMNS
+    if column.startswith("net_renews_")
+)
+
+# Summed like the monthly data of ReportGenerator.generate_summary_by_tld
+_INSERT_TLD_SUMMARY = f"""
+INSERT INTO tld_monthly_summary
+SELECT file_id, tld, month, COUNT(DISTINCT iana_id),
+    SUM(COALESCE(total_domains, 0)), SUM({_ADDS}), SUM({_RENEWS}),
+    SUM(COALESCE(transfer_gaining_successful, 0)),
+    SUM(COALESCE(deleted_domains_grace, 0) + COALESCE(deleted_domains_nograce, 0))
+FROM monthly_metrics WHERE file_id = ? GROUP BY tld, month
+"""
+
+
+def _integer(value: Any) -> Optional[int]:
+    """Get a metric cell as an integer, or None for blank or invalid cells."""
+    try:
+        value = value.strip()
+        return int(value) if value else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class SQLiteExporter:
+    """Incremental export of parsed reports to a SQLite database.
+
+    Every report becomes a row of ``files``, its rows go to
+    ``monthly_metrics`` with one INTEGER column per metric, and its totals go
+    to ``tld_monthly_summary``. Registrars and every name they were seen under
+    are kept in ``registrars`` and ``registrar_names``. Rows are inserted with
+    executemany in transactions of SQLITE_BATCH_ROWS rows. Reports already
+    loaded with the same content hash are skipped, and reports whose content
+    changed replace their earlier rows.
+    """
+
+    def __init__(
+        self,
+        db_path: str = SQLITE_PATH,
+        batch_rows: int = SQLITE_BATCH_ROWS,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """Open the database, creating its schema if needed.
+
+        Args:
+            db_path: Path of the SQLite database
+            batch_rows: Rows inserted per transaction
+            metrics: MetricsRegistry to record loaded and skipped reports in
+
+        Raises:
+            ValueError: If the database has a newer schema version
+        """
+        self.db_path = db_path
+        self.batch_rows = batch_rows
+        self.metrics = metrics or MetricsRegistry()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Parsing threads hand reports over when streaming, so allow any thread behind
+        # the lock
+        self.connection = sqlite3.connect(
+            db_path, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > SQLITE_SCHEMA_VERSION:
+            self.connection.close()
+            raise ValueError(f"Unsupported SQLite schema version {version}: {db_path}")
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+        self._indexed = (
+            self.connection.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = "
+                "'monthly_metrics_registrar'"
+            ).fetchone()[0]
+            > 0
+        )
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+    def __enter__(self) -> "SQLiteExporter":
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Close the database."""
+        self.close()
+
+    def loaded_hashes(self) -> Dict[str, str]:
+        """Get the content hash of every loaded report, keyed by file name."""
+        with self._lock:
+            return dict(
+                self.connection.execute("SELECT file_name, content_hash FROM files")
+            )
+
+    def export(
+        self,
+        data: Dict[str, List[Dict[str, Any]]],
+        file_hashes: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, int]:
+        """Load parsed reports that are new or changed since they were last loaded.
+
+        Args:
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
+            file_hashes: Content hashes of the report files, keyed by file name;
+                reports without one are hashed from their rows
+
+        Returns:
+            Dictionary with the number of reports "loaded" and "skipped" and of "rows"
+            inserted
+        """
+        hashes = ReportGenerator.input_hashes(data, file_hashes)
+        counts = {"loaded": 0, "skipped": 0, "rows": 0}
+        with self._lock:
+            loaded = dict(
+                self.connection.execute("SELECT file_name, content_hash FROM files")
+            )
+            pending_rows = 0
+            self.connection.execute("BEGIN")
+            try:
+                for file_name, rows in data.items():
+                    if loaded.get(file_name) == hashes[file_name]:
+                        counts["skipped"] += 1
+                        continue
+                    self._load_report(file_name, rows, hashes[file_name])
+                    counts["loaded"] += 1
+                    counts["rows"] += len(rows)
+                    # Commit at report boundaries, so every report is loaded whole or
+                    # not at all
+                    pending_rows += len(rows)
+                    if pending_rows >= self.batch_rows:
+                        self.connection.execute("COMMIT")
+                        self.connection.execute("BEGIN")
+                        pending_rows = 0
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            if counts["loaded"] and not self._indexed:
+                self.connection.executescript(_INDEXES)
+                self._indexed = True
+
+        self.metrics.inc("sqlite_reports_total", counts["loaded"], result="loaded")
+        self.metrics.inc("sqlite_reports_total", counts["skipped"], result="skipped")
+        self.metrics.inc("sqlite_rows_written_total", counts["rows"])
+        if counts["loaded"]:
+            logger.info(
+                f"Loaded {counts['loaded']} reports ({counts['rows']} rows) into "
+                f"{self.db_path}, "
+                f"skipped {counts['skipped']} unchanged"
+            )
+        return counts
+
+    def _load_report(
+        self, file_name: str, rows: List[Dict[str, Any]], content_hash: str
+    ) -> None:
+        """Replace the rows of one report; needs an open transaction and the lock."""
+        month = URLGenerator.parse_filename_date(file_name)
+        file_tld = file_name.split("-", 1)[0].lower()
+        connection = self.connection
+        connection.execute("DELETE FROM files WHERE file_name = ?", (file_name,))
+        file_id = connection.execute(
+            "INSERT INTO files (file_name, tld, month, content_hash, row_count, "
+            "loaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (file_name, file_tld, month, content_hash, len(rows), time.time()),
+        ).lastrowid
+
+        # Reports repeat the same few thousand values, so convert each distinct cell
+        # once
+        cells = metric_cells(rows)
+        converted = {
+            cell: _integer(cell) for cell in set(itertools.chain.from_iterable(cells))
+        }
+        # IANA ID -> names seen in this report
+        registrar_names: Dict[str, Dict[str, None]] = {}
+        metric_rows: List[Tuple[Any, ...]] = []
+        for row_number, (row, row_cells) in enumerate(zip(rows, cells)):
+            iana_id = row.get("IANA-ID") or None
+            registrar_name = row.get("Registrar-name") or None
+            if iana_id:
+                registrar_names.setdefault(iana_id, {})[registrar_name or ""] = None
+            metric_rows.append(
+                (
+                    file_id,
+                    row_number,
+                    iana_id,
+                    registrar_name,
+                    (row.get("TLD") or file_tld).lower(),
+                    month,
+                )
+                + tuple(map(converted.__getitem__, row_cells))
+            )
+
+        connection.executemany(
+            "INSERT INTO registrars (iana_id, name, last_month) VALUES (?, ?, ?) "
+            "ON CONFLICT (iana_id) DO UPDATE SET name = excluded.name, last_month = "
+            "excluded.last_month "
+            "WHERE excluded.last_month >= registrars.last_month",
+            [
+                (iana_id, next(reversed(names)), month)
+                for iana_id, names in registrar_names.items()
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO registrar_names (iana_id, name, first_month, last_month) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (iana_id, name) DO UPDATE SET "
+            "first_month = MIN(first_month, excluded.first_month), "
+            "last_month = MAX(last_month, excluded.last_month)",
+            [
+                (iana_id, name, month, month)
+                for iana_id, names in registrar_names.items()
+                for name in names
+            ],
+        )
+        connection.executemany(_INSERT_METRICS, metric_rows)
+        connection.execute(_INSERT_TLD_SUMMARY, (file_id,))
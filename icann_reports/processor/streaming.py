@@ -0,0 +1,74 @@
+import threading
+from typing import Dict, List, Any, Optional, Set
+
+from icann_reports.processor.aggregation import ReportAggregator
+from icann_reports.processor.field_validation import FieldValidator
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="streaming")
+
+
+class StreamingSink:
+    """Validates and aggregates parsed reports as they arrive, then drops their rows.
+
+    Parse tasks hand each report's rows to ``consume`` from their worker
+    thread. Validation and per-report aggregation run in that thread, and
+    only the small per-report results are merged under a lock, so memory
+    holds the rows of the reports being parsed plus the aggregate state,
+    never every row of the run.
+    """
+
+    def __init__(
+        self,
+        validator: Optional[FieldValidator] = None,
+        aggregator: Optional[ReportAggregator] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """Initialize the streaming sink.
+
+        Args:
+            validator: FieldValidator to validate each report with (no validation if
+                None)
+            aggregator: ReportAggregator to fold each report into (no aggregation if
+                None)
+            metrics: MetricsRegistry to record streamed reports in
+        """
+        self.validator = validator
+        self.aggregator = aggregator
+        self.metrics = metrics or MetricsRegistry()
+        self.validation_results: Dict[str, Dict[str, Any]] = {}
+        self.files = 0
+        self.rows = 0
+        # Names of the reports consumed, to tell whether the aggregate covers a run
+        self.file_names: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def consume(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Validate and aggregate parsed reports.
+
+        Args:
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
+        """
+        validation_results = {}
+        if self.validator:
+            for file_name, rows in data.items():
+                validation_results[file_name] = self.validator.validate_file(
+                    file_name, rows
+                )
+
+        partial = None
+        if self.aggregator:
+            partial = ReportAggregator(self.aggregator.report_generator)
+            partial.add(data)
+
+        row_count = sum(len(rows) for rows in data.values())
+        with self._lock:
+            self.validation_results.update(validation_results)
+            if partial:
+                self.aggregator.merge(partial)
+            self.files += len(data)
+            self.file_names.update(data)
+            self.rows += row_count
+        self.metrics.inc("rows_streamed_total", row_count)
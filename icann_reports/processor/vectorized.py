@@ -0,0 +1,301 @@
+import itertools
+from operator import itemgetter
+from typing import Dict, List, Any, Tuple
+
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.models.registrar_dictionary import RegistrarDictionary
+from icann_reports.utils.logging_setup import setup_logging
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+logger = setup_logging(logger_name="vectorized")
+
+# Backends ReportGenerator can aggregate with; "auto" picks numpy when installed
+AGGREGATION_BACKENDS = ("auto", "python", "numpy")
+
+NUMPY_AVAILABLE = np is not None
+
+# Metric columns of the matrix built from the rows, in column order
+METRIC_FIELDS = (
+    ["Total-domains", "Total-Nameservers"]
+    + [f"Net-adds-{year}-yr" for year in range(1, 11)]
+    + [f"Net-renews-{year}-yr" for year in range(1, 11)]
+    + [
+        "Transfer-gaining-successful",
+        "Transfer-losing-successful",
+        "Deleted-domains-grace",
+        "Deleted-domains-nograce",
+    ]
+)
+_COLUMN = {name: index for index, name in enumerate(METRIC_FIELDS)}
+_ADDS = slice(_COLUMN["Net-adds-1-yr"], _COLUMN["Net-adds-10-yr"] + 1)
+_RENEWS = slice(_COLUMN["Net-renews-1-yr"], _COLUMN["Net-renews-10-yr"] + 1)
+_METRIC_GETTER = itemgetter(*METRIC_FIELDS)
+
+
+def _numeric(value: Any) -> int:
+    """Convert a cell like ReportGenerator does: blank or invalid cells count as 0."""
+    try:
+        value = value.strip()
+        return int(value) if value else 0
+    except (ValueError, TypeError, AttributeError):
+        return 0
+
+
+def metric_cells(rows: List[Dict[str, Any]]) -> List[Tuple[Any, ...]]:
+    """Get the metric cells of every row, in METRIC_FIELDS order."""
+    try:
+        return list(map(_METRIC_GETTER, rows))
+    except KeyError:
+        # Rows missing a field count it as 0, like ReportGenerator
+        return [
+            tuple(row.get(field_name) for field_name in METRIC_FIELDS) for row in rows
+        ]
+
+
+def metric_matrix(rows: List[Dict[str, Any]]) -> "np.ndarray":
+    """Build the int64 matrix of the metric columns of rows.
+
+    Reports repeat the same few thousand values, so each distinct cell is
+    converted once and the matrix is filled from those conversions.
+
+    Args:
+        rows: Row dictionaries
+
+    Returns:
+        Matrix with one row per row dictionary and one column per METRIC_FIELDS entry
+
+    Raises:
+        OverflowError: If a value does not fit in int64
+    """
+    cells = metric_cells(rows)
+    converted = {
+        cell: _numeric(cell) for cell in set(itertools.chain.from_iterable(cells))
+    }
+    matrix = np.fromiter(
+        map(converted.__getitem__, itertools.chain.from_iterable(cells)),
+        dtype=np.int64,
+        count=len(rows) * len(METRIC_FIELDS),
+    )
+    return matrix.reshape(len(rows), len(METRIC_FIELDS))
+
+
+def _registrar_stats(matrix: "np.ndarray") -> Dict[str, "np.ndarray"]:
+    """Compute the registrar summary figures of every row at once."""
+    return {
+        "total_domains": matrix[:, _COLUMN["Total-domains"]],
+        "total_nameservers": matrix[:, _COLUMN["Total-Nameservers"]],
+        "new_additions": matrix[:, _ADDS].sum(axis=1),
+        "renewals": matrix[:, _RENEWS].sum(axis=1),
+        "transfers_in": matrix[:, _COLUMN["Transfer-gaining-successful"]],
+        "transfers_out": matrix[:, _COLUMN["Transfer-losing-successful"]],
+        "deletions": matrix[:, _COLUMN["Deleted-domains-grace"]]
+        + matrix[:, _COLUMN["Deleted-domains-nograce"]],
+    }
+
+
+def _stats_of(stats: Dict[str, "np.ndarray"]) -> List[Dict[str, int]]:
+    """Get the figures of every row as dictionaries of Python ints."""
+    columns = [values.tolist() for values in stats.values()]
+    return [dict(zip(stats, row_stats)) for row_stats in zip(*columns)]
+
+
+def summary_by_registrar(
+    data: Dict[str, List[Dict[str, Any]]], registrar_dictionary: RegistrarDictionary
+) -> Dict[str, Any]:
+    """Vectorized ReportGenerator.generate_summary_by_registrar.
+
+    Each TLD of a registrar keeps the figures of its row of the latest month,
+    so those rows are picked first and only their figures are computed.
+
+    Args:
+        data: Dictionary with file names as keys and lists of row dictionaries as values
+        registrar_dictionary: RegistrarDictionary to take registrar keys from
+
+    Returns:
+        Dictionary with registrar summaries, identical to the pure Python one
+    """
+    # (registrar key, TLD) -> [registrar name, IANA ID, month, row of the latest
+    # month], in order of first appearance; the later row wins within a month
+    groups: Dict[Tuple[str, str], List[Any]] = {}
+    for file_name, rows in data.items():
+        month = URLGenerator.parse_filename_date(file_name)
+        for row in rows:
+            registrar_name = row.get("Registrar-name", "Unknown")
+            iana_id = row.get("IANA-ID", "Unknown")
+            key = (
+                registrar_dictionary.registrar_key(iana_id, registrar_name),
+                row.get("TLD", "Unknown").upper(),
+            )
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [registrar_name, iana_id, month, row]
+            elif month >= group[2]:
+                group[2:] = [month, row]
+    if not groups:
+        return {}
+
+    latest_rows = [group[3] for group in groups.values()]
+    registrar_summary: Dict[str, Any] = {}
+    for ((registrar_key, tld), (registrar_name, iana_id, _, _)), tld_stats in zip(
+        groups.items(), _stats_of(_registrar_stats(metric_matrix(latest_rows)))
+    ):
+        entry = registrar_summary.get(registrar_key)
+        if entry is None:
+            entry = registrar_summary[registrar_key] = {
+                "name": registrar_name,
+                "iana_id": iana_id,
+                "tlds": {},
+            }
+        entry["tlds"][tld] = tld_stats
+    return registrar_summary
+
+
+def summary_by_registrar_id(
+    data: Dict[str, List[Dict[str, Any]]], registrar_dictionary: RegistrarDictionary
+) -> Dict[str, Any]:
+    """Vectorized ReportGenerator.generate_summary_by_registrar_id.
+
+    The row of the latest month of each (registrar, TLD) is picked first,
+    and only the figures of those rows are computed.
+
+    Args:
+        data: Dictionary with file names as keys and lists of row dictionaries as values
+        registrar_dictionary: RegistrarDictionary to record names in and take them from
+
+    Returns:
+        Dictionary with registrar summaries keyed by IANA ID, identical to the pure
+        Python one
+    """
+    # (IANA ID, TLD) -> (month, row) of the latest month; the later row wins within a
+    # month
+    latest_rows: Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]] = {}
+    for file_name, rows in data.items():
+        month = URLGenerator.parse_filename_date(file_name)
+        registrar_dictionary.encode_rows(rows, month)
+        for row in rows:
+            iana_id = row.get("IANA-ID")
+            if not iana_id:
+                continue
+            key = (iana_id, row.get("TLD", "Unknown").upper())
+            current = latest_rows.get(key)
+            if current is None or month >= current[0]:
+                latest_rows[key] = (month, row)
+    if not latest_rows:
+        return {}
+
+    latest: Dict[str, Dict[str, Dict[str, int]]] = {}
+    rows = [row for _, row in latest_rows.values()]
+    for (iana_id, tld), tld_stats in zip(
+        latest_rows, _stats_of(_registrar_stats(metric_matrix(rows)))
+    ):
+        latest.setdefault(iana_id, {})[tld] = tld_stats
+
+    registrar_summary = {}
+    for iana_id in sorted(latest, key=lambda iana_id: (len(iana_id), iana_id)):
+        registrar = registrar_dictionary.find_by_id(iana_id)
+        registrar_summary[iana_id] = {
+            "iana_id": iana_id,
+            "name": registrar.name,
+            "names": registrar.name_history(),
+            "tlds": dict(sorted(latest[iana_id].items())),
+        }
+    return registrar_summary
+
+
+def summary_by_tld(data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Vectorized ReportGenerator.generate_summary_by_tld.
+
+    Monthly totals are summed per (TLD, month) group with np.add.reduceat
+    over the rows sorted by group.
+
+    Args:
+        data: Dictionary with file names as keys and lists of row dictionaries as values
+
+    Returns:
+        Dictionary with TLD summaries, identical to the pure Python one
+    """
+    tld_summary: Dict[str, Any] = {}
+    registrar_ids: Dict[str, set] = {}
+    # Code every (TLD, month) pair in order of first appearance; -1 for rows without a
+    # month
+    group_codes: Dict[Tuple[str, str], int] = {}
+    groups: List[int] = []
+    rows: List[Dict[str, Any]] = []
+    for file_name, file_rows in data.items():
+        parts = file_name.split("-")
+        file_date = parts[2][:6] if len(parts) > 2 else ""
+        if len(file_date) != 6:
+            file_date = ""
+        for row in file_rows:
+            tld = row.get("TLD", "Unknown").upper()
+            if tld not in tld_summary:
+                tld_summary[tld] = {
+                    "total_domains": 0,
+                    "total_nameservers": 0,
+                    "registrars": 0,
+                    "new_additions": 0,
+                    "renewals": 0,
+                    "transfers": 0,
+                    "deletions": 0,
+                }
+                registrar_ids[tld] = set()
+            iana_id = row.get("IANA-ID")
+            if iana_id:
+                registrar_ids[tld].add(iana_id)
+            rows.append(row)
+            groups.append(
+                group_codes.setdefault((tld, file_date), len(group_codes))
+                if file_date
+                else -1
+            )
+    if not rows:
+        return {}
+
+    for tld, iana_ids in registrar_ids.items():
+        if iana_ids:
+            tld_summary[tld]["registrars"] = len(iana_ids)
+
+    matrix = metric_matrix(rows)
+    measures = np.stack(
+        [
+            matrix[:, _COLUMN["Total-domains"]],
+            matrix[:, _ADDS].sum(axis=1),
+            matrix[:, _RENEWS].sum(axis=1),
+            matrix[:, _COLUMN["Transfer-gaining-successful"]],
+            matrix[:, _COLUMN["Deleted-domains-grace"]]
+            + matrix[:, _COLUMN["Deleted-domains-nograce"]],
+        ],
+        axis=1,
+    )
+    measure_names = [
+        "total_domains",
+        "new_additions",
+        "renewals",
+        "transfers",
+        "deletions",
+    ]
+
+    groups_array = np.array(groups, dtype=np.int64)
+    grouped = np.flatnonzero(groups_array >= 0)
+    if len(grouped):
+        order = grouped[np.argsort(groups_array[grouped], kind="stable")]
+        sorted_groups = groups_array[order]
+        starts = np.flatnonzero(
+            np.append(True, sorted_groups[1:] != sorted_groups[:-1])
+        )
+        sums = np.add.reduceat(measures[order], starts, axis=0).tolist()
+        for (tld, file_date), totals in zip(group_codes, sums):
+            tld_summary[tld].setdefault("monthly_data", {})[file_date] = dict(
+                zip(measure_names, totals)
+            )
+
+    # Overall totals come from the latest month
+    for summary in tld_summary.values():
+        monthly_data = summary.get("monthly_data")
+        if monthly_data:
+            summary.update(monthly_data[max(monthly_data)])
+    return tld_summary
@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Optional, Set, Tuple
+
+from config import (
+    BASE_URL,
+    DATA_DIR,
+    MAX_WORKERS,
+    SERVICE_POLL_INTERVAL,
+    SERVICE_STATE_DIR,
+)
+from icann_reports.downloader.csv_downloader import CSVDownloader
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.processor.aggregation import ReportAggregator
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.content_store import ContentStore
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+from icann_reports.utils.tracing import TraceRecorder
+
+logger = setup_logging(logger_name="service")
+
+# End date of TLDs polled indefinitely; every poll caps it at the current month
+OPEN_END_DATE = "9999-12"
+
+
+def current_month() -> str:
+    """Get the current UTC month as YYYY-MM."""
+    now = time.gmtime()
+    return f"{now.tm_year:04d}-{now.tm_mon:02d}"
+
+
+class ReportService:
+    """Resident pipeline that polls for newly published reports.
+
+    A one-shot run reloads the processed-files cache, rebuilds the field
+    metadata and structure analyzer, and aggregates every report again. The
+    service builds those once and keeps them, along with a ReportAggregator
+    of every report applied so far. Each poll downloads only the months not
+    applied yet. Their rows are folded into the aggregate, and the reports are
+    rewritten from it. The aggregate and the applied reports are saved in the
+    state directory after every change, so a restarted service picks up where
+    it stopped without processing anything again.
+    """
+
+    def __init__(
+        self,
+        tlds: List[Dict[str, Any]],
+        base_url: str = BASE_URL,
+        data_dir: str = DATA_DIR,
+        state_dir: str = SERVICE_STATE_DIR,
+        poll_interval: float = SERVICE_POLL_INTERVAL,
+        max_workers: int = MAX_WORKERS,
+        metrics: Optional[MetricsRegistry] = None,
+        tracer: Optional[TraceRecorder] = None,
+        content_store: Optional[ContentStore] = None,
+        report_generator: Optional[ReportGenerator] = None,
+        on_update: Optional[Callable[[Dict[str, str]], None]] = None,
+    ):
+        """Initialize the service, loading the state of an earlier one if there is any.
+
+        Args:
+            tlds: TLD configurations as for URLGenerator.generate_tld_urls; end
+                dates after the current month (such as OPEN_END_DATE) are
+                capped at the month of each poll
+            base_url: URL template of the reports
+            data_dir: Directory reports are downloaded to and written in
+            state_dir: Directory holding the aggregate and the applied reports
+            poll_interval: Seconds between the starts of two polls
+            max_workers: Maximum number of reports parsed at once (downloads are
+                bounded by the downloader's adaptive concurrency limit)
+            metrics: MetricsRegistry to record polls and applied reports in
+            tracer: TraceRecorder to record downloads in
+            content_store: Content-addressed store that downloads are shared through
+            report_generator: ReportGenerator that writes the reports
+            on_update: Callable handed the written report paths after each poll
+                that applied new reports
+        """
+        self.tlds = tlds
+        self.state_dir = state_dir
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self.metrics = metrics or MetricsRegistry()
+        self.tracer = tracer or TraceRecorder()
+        self.on_update = on_update
+        os.makedirs(state_dir, exist_ok=True)
+
+        # Warm for the life of the service: one processed-files cache shared by
+        # the downloader and the processor, field metadata and structure analyzer
+        self.cache_manager = CacheManager(
+            os.path.join(state_dir, "processed_files.json")
+        )
+        self.url_generator = URLGenerator(base_url)
+        self.csv_downloader = CSVDownloader(
+            data_dir=data_dir,
+            cache_manager=self.cache_manager,
+            metrics=self.metrics,
+            tracer=self.tracer,
+            content_store=content_store,
+        )
+        self.csv_processor = CSVProcessor(
+            data_dir, cache_manager=self.cache_manager, metrics=self.metrics
+        )
+        self.report_generator = report_generator or ReportGenerator(
+            data_dir, metrics=self.metrics, tracer=self.tracer
+        )
+
+        self.aggregate_path = os.path.join(state_dir, "aggregate.json")
+        self.state_path = os.path.join(state_dir, "state.json")
+        self.applied_files: Set[str] = set()
+        self.aggregator = ReportAggregator(self.report_generator)
+        self._load_state()
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _load_state(self) -> None:
+        """Restore the aggregate and applied reports of an earlier service."""
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            aggregator = ReportAggregator.load(
+                self.aggregate_path, self.report_generator
+            )
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load service state, starting empty: {e}")
+            return
+        self.aggregator = aggregator
+        self.applied_files = set(state.get("applied_files", []))
+        logger.info(
+            f"Restored service state with {len(self.applied_files)} applied reports"
+        )
+
+    def _save_state(self) -> None:
+        """Save the aggregate, then the applied reports it covers."""
+        self.aggregator.save(self.aggregate_path)
+        temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {"applied_files": sorted(self.applied_files), "saved_at": time.time()},
+                f,
+            )
+        os.replace(temp_path, self.state_path)
+
+    def pending_urls(self, month: Optional[str] = None) -> List[str]:
+        """Get the URLs of reports that have not been applied yet.
+
+        Args:
+            month: Month to poll up to, as YYYY-MM (the current month by default)
+
+        Returns:
+            URLs of every month not applied yet, interleaved across TLDs
+        """
+        month = month or current_month()
+        tlds = [
+            {**tld, "end_date": min(tld.get("end_date") or month, month)}
+            for tld in self.tlds
+        ]
+        return [
+            url
+            for url in self.url_generator.generate_interleaved_urls(tlds)
+            if url.split("/")[-1] not in self.applied_files
+        ]
+
+    def _parse(
+        self, file_info: Tuple[Optional[str], bool]
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Parse one downloaded report, or get None if it is not published yet."""
+        file_path, already_processed = file_info
+        if not file_path:
+            return None
+        # The service's own cache marks what it applied, so anything on disk is parsed
+        return self.csv_processor.process_csv((file_path, False))
+
+    def poll(self, month: Optional[str] = None) -> Dict[str, Any]:
+        """Apply every newly published report.
+
+        Args:
+            month: Month to poll up to, as YYYY-MM (the current month by default)
+
+        Returns:
+            Dictionary with the number of reports "checked", the file names
+            "applied" and the written "reports" (empty if nothing was applied)
+        """
+        with self._lock:
+            urls = self.pending_urls(month)
+            # Each poll is a run of its own as far as the retry budget goes
+            self.csv_downloader.retry_scheduler.reset_budget()
+            # Downloads are bounded by the adaptive limit, with retries parked in
+            # the retry scheduler instead of blocking workers
+            with ThreadPoolExecutor(
+                max_workers=self.csv_downloader.concurrency_limiter.max_limit
+            ) as download_executor:
+                downloads = self.csv_downloader.download_all(urls, download_executor)
+            if self.csv_downloader.content_store:
+                self.csv_downloader.content_store.flush()
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(
+                    executor.map(self._parse, [downloads[url] for url in urls])
+                )
+
+            new_data: Dict[str, List[Dict[str, Any]]] = {}
+            applied = []
+            for url, data in zip(urls, results):
+                if data:
+                    new_data.update(data)
+                    applied.append(url.split("/")[-1])
+
+            reports: Dict[str, str] = {}
+            if new_data:
+                self.aggregator.add(new_data)
+                self.applied_files.update(applied)
+                reports = self.aggregator.write_reports()
+                self._save_state()
+                logger.info(
+                    f"Applied {len(applied)} new reports: {', '.join(sorted(applied))}"
+                )
+
+        self.metrics.inc("service_polls_total")
+        self.metrics.inc("service_reports_applied_total", len(applied))
+        self.metrics.set_gauge("service_applied_reports", len(self.applied_files))
+        self.metrics.set_gauge("service_last_poll_timestamp_seconds", time.time())
+        if reports and self.on_update:
+            self.on_update(reports)
+        return {"checked": len(urls), "applied": sorted(applied), "reports": reports}
+
+    def run(
+        self,
+        max_polls: Optional[int] = None,
+        on_poll: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        """Poll on schedule until stopped.
+
+        Args:
+            max_polls: Stop after this many polls (run until stop() by default)
+            on_poll: Callable handed the result of every poll
+        """
+        polls = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                result = self.poll()
+                if on_poll:
+                    on_poll(result)
+            except Exception as e:
+                # A failed poll must not end the service; the next one tries again
+                logger.error(f"Poll failed: {e}")
+                self.metrics.inc("service_poll_errors_total")
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            self._stop.wait(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    def stop(self) -> None:
+        """Stop the service after the poll in progress."""
+        self._stop.set()
@@ -0,0 +1,419 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Dict, List, Any, Iterator, Optional
+
+from config import COLUMNAR_DIR
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.models.registrar_dictionary import (
+    RegistrarDictionary,
+    default_registrar_dictionary,
+)
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+logger = setup_logging(logger_name="columnar")
+
+# File signature and layout version of columnar report files
+COLUMNAR_MAGIC = b"ICRC"
+COLUMNAR_VERSION = 1
+COLUMNAR_SUFFIX = ".icr"
+
+# Sentinels in int64 columns for an empty cell and for a cell missing from its row
+INT64_EMPTY = -(2**63)
+INT64_MISSING = -(2**63) + 1
+
+# Sentinel in string columns for a cell missing from its row
+STRING_MISSING = -1
+
+# Sections start on 8-byte boundaries so int64 columns can be read in place
+ALIGNMENT = 8
+
+_PREAMBLE = struct.Struct("<4sI")
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _int_value(value: Any) -> Optional[int]:
+    """Get the int64 a cell is stored as, or None if it must be kept as a string."""
+    if value is None:
+        return INT64_MISSING
+    if value == "":
+        return INT64_EMPTY
+    try:
+        number = int(value)
+    except (ValueError, TypeError):
+        return None
+    # Only values that read back unchanged, e.g. not "007" or " 5"
+    if str(number) != value or not INT64_MISSING < number < 2**63:
+        return None
+    return number
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_columnar(path: str, file_name: str, rows: List[Dict[str, Any]]) -> int:
+    """Write parsed rows of a report as a columnar file.
+
+    Columns whose cells are all integers (or empty) are stored as int64
+    arrays; other columns are stored as int32 indices into a string table
+    shared by all columns, so repeated values such as registrar names are
+    stored once. Rows read back exactly as they were written.
+
+    Args:
+        path: Path of the columnar file
+        file_name: Name of the report the rows came from
+        rows: Parsed row dictionaries
+
+    Returns:
+        Size of the written file in bytes
+    """
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    strings: Dict[str, int] = {}
+    columns = []
+    for name in names:
+        cells = [row.get(name) for row in rows]
+        ints = [_int_value(cell) for cell in cells]
+        if rows and None not in ints:
+            columns.append((name, "int64", _little_endian(array("q", ints))))
+        else:
+            indices = array(
+                "i",
+                (
+                    (
+                        STRING_MISSING
+                        if cell is None
+                        else strings.setdefault(str(cell), len(strings))
+                    )
+                    for cell in cells
+                ),
+            )
+            columns.append((name, "string", _little_endian(indices)))
+
+    encoded = [value.encode("utf-8") for value in strings]
+    string_offsets = array("Q", [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+    sections = [_little_endian(string_offsets), b"".join(encoded)] + [
+        data for _, _, data in columns
+    ]
+
+    # Lay the sections out after the header; the header size depends on the offsets, so
+    # iterate
+    header: Dict[str, Any] = {}
+    header_size = 0
+    while True:
+        offset = _align(_PREAMBLE.size + header_size)
+        layout = []
+        for section in sections:
+            layout.append({"offset": offset, "length": len(section)})
+            offset = _align(offset + len(section))
+        header = {
+            "version": COLUMNAR_VERSION,
+            "file_name": file_name,
+            "row_count": len(rows),
+            "strings": {"count": len(encoded), "offsets": layout[0], "data": layout[1]},
+            "columns": [
+                {"name": name, "type": column_type, **section}
+                for (name, column_type, _), section in zip(columns, layout[2:])
+            ],
+        }
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        if len(header_bytes) == header_size:
+            break
+        header_size = len(header_bytes)
+
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(COLUMNAR_MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for section, position in zip(sections, layout):
+            f.write(b"\0" * (position["offset"] - f.tell()))
+            f.write(section)
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+
+class ColumnarReport:
+    """A columnar report file opened with mmap.
+
+    Columns are exposed as memoryviews over the mapped file, so reading a
+    column costs page-cache hits rather than parsing. String columns hold
+    indices into the string table, which is decoded only on demand.
+    """
+
+    def __init__(self, path: str):
+        """Open a columnar report file.
+
+        Args:
+            path: Path of the columnar file
+
+        Raises:
+            ValueError: If the file is not a columnar report of a supported version
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        magic, header_size = _PREAMBLE.unpack_from(self._buffer, 0)
+        if magic != COLUMNAR_MAGIC:
+            self.close()
+            raise ValueError(f"Not a columnar report: {path}")
+        self.header = json.loads(
+            bytes(self._buffer[_PREAMBLE.size : _PREAMBLE.size + header_size])
+        )
+        if self.header.get("version") != COLUMNAR_VERSION:
+            self.close()
+            raise ValueError(
+                f"Unsupported columnar report version {self.header.get('version')}: "
+                f"{path}"
+            )
+
+        self.file_name: str = self.header["file_name"]
+        self.row_count: int = self.header["row_count"]
+        self.columns = {column["name"]: column for column in self.header["columns"]}
+        self._string_table: Optional[List[str]] = None
+
+    def __enter__(self) -> "ColumnarReport":
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Close the report."""
+        self.close()
+
+    def close(self) -> None:
+        """Release the memory map.
+
+        Columns still referenced keep the mapping alive until they are
+        released or garbage collected.
+        """
+        self._buffer.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def _section(self, section: Dict[str, int], typecode: str) -> memoryview:
+        view = self._buffer[section["offset"] : section["offset"] + section["length"]]
+        if sys.byteorder != "little":
+            values = array(typecode, view.tobytes())
+            values.byteswap()
+            return memoryview(values)
+        return view.cast(typecode)
+
+    def column(self, name: str) -> memoryview:
+        """Get a column without copying it.
+
+        Args:
+            name: Name of the column
+
+        Returns:
+            memoryview of int64 values (with INT64_EMPTY and INT64_MISSING
+            sentinels) for int64 columns, or of int32 string table indices
+            (with STRING_MISSING) for string columns
+        """
+        column = self.columns[name]
+        return self._section(column, "q" if column["type"] == "int64" else "i")
+
+    def numpy_column(self, name: str):
+        """Get a column as a NumPy array sharing the mapped memory.
+
+        Args:
+            name: Name of the column
+
+        Returns:
+            Read-only numpy array of int64 values or int32 string indices
+
+        Raises:
+            RuntimeError: If numpy is not installed
+        """
+        if numpy is None:
+            raise RuntimeError("numpy is not installed")
+        column = self.columns[name]
+        dtype = "<i8" if column["type"] == "int64" else "<i4"
+        return numpy.frombuffer(
+            self._buffer, dtype=dtype, count=self.row_count, offset=column["offset"]
+        )
+
+    def string_table(self) -> List[str]:
+        """Get the decoded string table (decoded once, then cached)."""
+        if self._string_table is None:
+            strings = self.header["strings"]
+            offsets = self._section(strings["offsets"], "Q")
+            data = self._buffer[
+                strings["data"]["offset"] : strings["data"]["offset"]
+                + strings["data"]["length"]
+            ]
+            self._string_table = [
+                str(data[offsets[i] : offsets[i + 1]], "utf-8")
+                for i in range(strings["count"])
+            ]
+        return self._string_table
+
+    def values(self, name: str) -> List[Optional[str]]:
+        """Get a column as the cell strings it was written from.
+
+        Args:
+            name: Name of the column
+
+        Returns:
+            List of cell values, with None for cells missing from their row
+        """
+        column = self.column(name)
+        if self.columns[name]["type"] == "int64":
+            return [
+                (
+                    None
+                    if value == INT64_MISSING
+                    else "" if value == INT64_EMPTY else str(value)
+                )
+                for value in column
+            ]
+        table = self.string_table()
+        return [None if index == STRING_MISSING else table[index] for index in column]
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the rows as dictionaries, as they were written."""
+        names = list(self.columns)
+        if not names:
+            yield from ({} for _ in range(self.row_count))
+            return
+        columns = [self.values(name) for name in names]
+        for cells in zip(*columns):
+            yield {name: cell for name, cell in zip(names, cells) if cell is not None}
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Read one row without decoding whole columns or the string table.
+
+        Args:
+            index: Position of the row in the report
+
+        Returns:
+            Row dictionary, as it was written
+
+        Raises:
+            IndexError: If the report has no row at the index
+        """
+        if not 0 <= index < self.row_count:
+            raise IndexError(f"Row {index} out of range for {self.row_count} rows")
+        strings = self.header["strings"]
+        offsets = None
+        row = {}
+        for name, column in self.columns.items():
+            value = self.column(name)[index]
+            if column["type"] == "int64":
+                if value != INT64_MISSING:
+                    row[name] = "" if value == INT64_EMPTY else str(value)
+            elif value != STRING_MISSING:
+                if self._string_table is not None:
+                    row[name] = self._string_table[value]
+                    continue
+                if offsets is None:
+                    offsets = self._section(strings["offsets"], "Q")
+                start = strings["data"]["offset"]
+                row[name] = str(
+                    self._buffer[start + offsets[value] : start + offsets[value + 1]],
+                    "utf-8",
+                )
+        return row
+
+    def to_data(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the rows keyed by report file name, as CSVProcessor returns them."""
+        return {self.file_name: list(self.rows())}
+
+
+class ColumnarStore:
+    """Directory of columnar report files, one per parsed report."""
+
+    def __init__(
+        self,
+        columnar_dir: str = COLUMNAR_DIR,
+        metrics: Optional[MetricsRegistry] = None,
+        registrar_dictionary: Optional[RegistrarDictionary] = None,
+    ):
+        """Initialize the columnar store.
+
+        Args:
+            columnar_dir: Directory holding the columnar files
+            metrics: MetricsRegistry to record written and loaded reports in
+            registrar_dictionary: RegistrarDictionary that loaded rows share their
+                registrar strings through (the process-wide one by default)
+        """
+        self.columnar_dir = columnar_dir
+        self.metrics = metrics or MetricsRegistry()
+        self.registrar_dictionary = registrar_dictionary or default_registrar_dictionary
+        os.makedirs(columnar_dir, exist_ok=True)
+
+    def path_for(self, file_name: str) -> str:
+        """Get the columnar file path of a report."""
+        return os.path.join(self.columnar_dir, file_name + COLUMNAR_SUFFIX)
+
+    def has(self, file_name: str) -> bool:
+        """Check whether a report is in the store."""
+        return os.path.exists(self.path_for(file_name))
+
+    def write(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Store parsed reports.
+
+        Args:
+            data: Dictionary with file names as keys and lists of row dictionaries as
+                values
+        """
+        for file_name, rows in data.items():
+            size = write_columnar(self.path_for(file_name), file_name, rows)
+            self.metrics.inc("columnar_reports_total", result="written")
+            self.metrics.inc("columnar_bytes_written_total", size)
+
+    def open(self, file_name: str) -> ColumnarReport:
+        """Open a stored report for reading its columns."""
+        return ColumnarReport(self.path_for(file_name))
+
+    def load(self, file_name: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Load the rows of a stored report.
+
+        Args:
+            file_name: Name of the report file
+
+        Returns:
+            Dictionary with the file name as key and its rows as value, or None
+            if the report is not stored or cannot be read
+        """
+        try:
+            with self.open(file_name) as report:
+                data = report.to_data()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to load columnar report {file_name}: {e}")
+            self.metrics.inc("columnar_reports_total", result="failed")
+            return None
+        for rows in data.values():
+            self.registrar_dictionary.encode_rows(
+                rows, URLGenerator.parse_filename_date(file_name)
+            )
+        self.metrics.inc("columnar_reports_total", result="loaded")
+        return data
+
+    def file_names(self) -> List[str]:
+        """Get the names of all stored reports, sorted."""
+        return sorted(
+            entry[: -len(COLUMNAR_SUFFIX)]
+            for entry in os.listdir(self.columnar_dir)
+            if entry.endswith(COLUMNAR_SUFFIX)
+        )
@@ -0,0 +1,120 @@
+import gzip
+import io
+import lzma
+import os
+import shutil
+from typing import IO, Optional
+
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="compression")
+
+# File suffix for each supported at-rest compression
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "xz": ".xz",
+}
+
+# Bytes copied at a time when compressing
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def compression_for(path: str) -> Optional[str]:
+    """Get the compression of a report file from its suffix.
+
+    Args:
+        path: Path or name of the report file
+
+    Returns:
+        "gzip", "xz" or None for an uncompressed file
+    """
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return compression
+    return None
+
+
+def report_name(path: str) -> str:
+    """Get the name of a report file without any compression suffix.
+
+    Args:
+        path: Path of the report file (e.g. "data/com-transactions-202401-en.csv.gz")
+
+    Returns:
+        File name of the uncompressed report (e.g. "com-transactions-202401-en.csv")
+    """
+    name = os.path.basename(path)
+    compression = compression_for(name)
+    if compression:
+        name = name[: -len(COMPRESSION_SUFFIXES[compression])]
+    return name
+
+
+def open_report(path: str) -> IO[str]:
+    """Open a report file for reading text, decompressing it as a stream.
+
+    Args:
+        path: Path of a plain, gzip or xz compressed report file
+
+    Returns:
+        Text file object positioned at the start of the report
+    """
+    compression = compression_for(path)
+    if compression == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    if compression == "xz":
+        return lzma.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def open_report_stream(fileobj: IO[bytes], name: str) -> IO[str]:
+    """Wrap a binary stream of a report as text, decompressing it on the fly.
+
+    Args:
+        fileobj: Binary file object, such as an archive member
+        name: Name of the report, used to detect the compression
+
+    Returns:
+        Text file object reading the report
+    """
+    compression = compression_for(name)
+    if compression == "gzip":
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    elif compression == "xz":
+        fileobj = lzma.LZMAFile(fileobj, "rb")
+    return io.TextIOWrapper(fileobj, encoding="utf-8", errors="replace", newline="")
+
+
+def compress_file(path: str, compression: str, remove_original: bool = True) -> str:
+    """Compress a report file next to the original.
+
+    gzip output is written without a timestamp or file name, so the same
+    report always compresses to the same bytes and deduplicates in the
+    content store.
+
+    Args:
+        path: Path of the uncompressed report file
+        compression: "gzip" or "xz"
+        remove_original: Remove the uncompressed file afterwards
+
+    Returns:
+        Path of the compressed file
+    """
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    compressed_path = path + COMPRESSION_SUFFIXES[compression]
+    temp_path = f"{compressed_path}.{os.getpid()}.tmp"
+    with open(path, "rb") as src, open(temp_path, "wb") as raw:
+        if compression == "gzip":
+            dest = gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0)
+        else:
+            dest = lzma.LZMAFile(raw, "wb", preset=6)
+        with dest:
+            shutil.copyfileobj(src, dest, COPY_CHUNK_SIZE)
+    os.replace(temp_path, compressed_path)
+
+    if remove_original:
+        os.remove(path)
+    logger.debug(f"Compressed {path} with {compression}")
+    return compressed_path
@@ -0,0 +1,353 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+from config import CONTENT_STORE_DIR, CONTENT_STORE_INDEX_BATCH
+from icann_reports.utils.compression import COMPRESSION_SUFFIXES
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = setup_logging(logger_name="content_store")
+
+# Bytes read at a time when hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Linux ioctl that clones a file's extents (copy-on-write reflink)
+FICLONE = 0x40049409
+
+
+class ContentStore:
+    """Content-addressed store for raw report files.
+
+    Each payload is stored once under ``objects/<first two hex digits>/<sha256>``,
+    and ``index.json`` maps report names to their hashes. Working directories get
+    reflinks or hardlinks to the stored objects, so several checkouts on one host
+    share a single copy of every download. Objects are read-only, and their hash
+    is checked again whenever one is linked out or read back.
+
+    The index is read once and kept in memory. New entries are written out
+    every ``index_batch_size`` entries and on ``flush``, merged with entries
+    other processes wrote in the meantime.
+    """
+
+    def __init__(
+        self,
+        store_dir: str = CONTENT_STORE_DIR,
+        metrics: Optional[MetricsRegistry] = None,
+        index_batch_size: int = CONTENT_STORE_INDEX_BATCH,
+    ):
+        """Initialize the content store.
+
+        Args:
+            store_dir: Directory holding the objects and the index
+            metrics: MetricsRegistry to record store lookups and deduplication in
+            index_batch_size: Number of new index entries kept in memory before
+                the index is written out
+        """
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, "objects")
+        self.index_file = os.path.join(store_dir, "index.json")
+        self.metrics = metrics or MetricsRegistry()
+        self.index_batch_size = index_batch_size
+        self._lock = threading.RLock()
+        # Index as last read or written, plus entries recorded since; guarded by _lock
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """Compute the SHA-256 digest of a file.
+
+        Args:
+            path: Path to the file
+
+        Returns:
+            Hex digest of the file contents
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def object_path(self, digest: str) -> str:
+        """Get the path of a stored object.
+
+        Args:
+            digest: SHA-256 hex digest of the object
+
+        Returns:
+            Path of the object in the store
+        """
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    @contextmanager
+    def _index_lock(self) -> Iterator[None]:
+        """Hold the index lock across threads and, where supported, processes."""
+        with (
+            self._lock,
+            open(os.path.join(self.store_dir, "index.lock"), "a") as lock_file,
+        ):
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Get the name to hash index, including entries not written out yet.
+
+        Returns:
+            Dictionary with report names as keys and object details as values
+        """
+        with self._lock:
+            return dict(self._memory_index())
+
+    def _memory_index(self) -> Dict[str, Dict[str, Any]]:
+        """Get the in-memory index, reading it on first use; needs the lock."""
+        if self._index is None:
+            self._index = self._read_index()
+        return self._index
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        """Read index.json as written by this or any other process."""
+        try:
+            with open(self.index_file, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load content store index: {e}")
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        """Write the index atomically; the caller must hold the index lock."""
+        temp_path = f"{self.index_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.index_file)
+
+    def flush(self) -> None:
+        """Write the index entries recorded since the last write to index.json.
+
+        The index on disk is read again first, so entries written by other
+        processes sharing the store are kept and become visible here.
+        """
+        with self._index_lock():
+            index = self._read_index()
+            if self._pending:
+                index.update(self._pending)
+                self._save_index(index)
+                logger.debug(f"Wrote {len(self._pending)} content store index entries")
+                self._pending.clear()
+            self._index = index
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Get the hash stored for a report name.
+
+        Args:
+            name: Report name, e.g. the file name of the report
+
+        Returns:
+            SHA-256 hex digest, or None if the name is not in the store
+        """
+        with self._lock:
+            entry = self._memory_index().get(name)
+        if entry and os.path.exists(self.object_path(entry["sha256"])):
+            return entry["sha256"]
+        return None
+
+    def report_digests(self, report_names: Iterable[str]) -> Dict[str, str]:
+        """Get the hashes stored for reports, whether stored compressed or not.
+
+        Args:
+            report_names: Names of uncompressed reports, e.g.
+                "com-transactions-202401-en.csv"
+
+        Returns:
+            Dictionary with the report names found in the store as keys and
+            SHA-256 hex digests as values
+        """
+        digests = {}
+        with self._lock:
+            index = self._memory_index()
+            for report_name in report_names:
+                for name in [report_name] + [
+                    report_name + suffix for suffix in COMPRESSION_SUFFIXES.values()
+                ]:
+                    if name in index:
+                        digests[report_name] = index[name]["sha256"]
+                        break
+        return digests
+
+    def put(self, name: str, path: str) -> str:
+        """Add a file to the store and record it under a name.
+
+        A payload that is already stored is not stored again; the file at
+        ``path`` is replaced with a link to the existing object instead.
+
+        Args:
+            name: Report name to record the file under
+            path: Path of the file to add
+
+        Returns:
+            SHA-256 hex digest of the file
+        """
+        digest = self.hash_file(path)
+        object_path = self.object_path(digest)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            if os.path.exists(object_path):
+                self.metrics.inc("store_objects_total", result="deduplicated")
+                self.metrics.inc("store_bytes_deduplicated_total", size)
+                logger.debug(f"{name} is already stored as {digest}")
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                temp_path = f"{object_path}.{os.getpid()}.tmp"
+                self._link_or_copy(path, temp_path)
+                os.chmod(temp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                os.replace(temp_path, object_path)
+                self.metrics.inc("store_objects_total", result="stored")
+                logger.debug(f"Stored {name} as {digest}")
+
+            entry = {"sha256": digest, "size": size, "stored_at": time.time()}
+            self._memory_index()[name] = entry
+            self._pending[name] = entry
+            if len(self._pending) >= self.index_batch_size:
+                self.flush()
+
+        if not self._same_file(path, object_path):
+            self._replace_with_link(object_path, path)
+        return digest
+
+    def verify(self, digest: str) -> bool:
+        """Check that a stored object still matches its hash.
+
+        A corrupt object is removed from the store.
+
+        Args:
+            digest: SHA-256 hex digest of the object
+
+        Returns:
+            True if the object exists and is intact, False otherwise
+        """
+        object_path = self.object_path(digest)
+        if not os.path.exists(object_path):
+            return False
+        if self.hash_file(object_path) == digest:
+            return True
+
+        logger.error(f"Content store object {digest} is corrupt; removing it")
+        self.metrics.inc("store_integrity_failures_total")
+        os.remove(object_path)
+        return False
+
+    def link_into(self, name: str, dest_path: str) -> Optional[str]:
+        """Place the stored file for a name at a path in a working directory.
+
+        The object is checked against its hash first, and a corrupt one is
+        removed, so the report is downloaded again. The file is reflinked where
+        the filesystem supports it, otherwise hardlinked, otherwise copied.
+
+        Args:
+            name: Report name to look up
+            dest_path: Path to place the file at
+
+        Returns:
+            dest_path if the file was placed, None if the name is not stored or
+            its object is corrupt
+        """
+        digest = self.lookup(name)
+        if digest is None or not self.verify(digest):
+            self.metrics.inc(
+                "cache_lookups_total", cache="content_store", result="miss"
+            )
+            return None
+
+        self.metrics.inc("cache_lookups_total", cache="content_store", result="hit")
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        self._replace_with_link(self.object_path(digest), dest_path)
+        return dest_path
+
+    def read_bytes(self, name: str) -> Optional[bytes]:
+        """Read the stored file for a name, checking its integrity.
+
+        Args:
+            name: Report name to look up
+
+        Returns:
+            The file contents, or None if the name is not stored or the object is
+            corrupt
+        """
+        digest = self.lookup(name)
+        if digest is None:
+            return None
+        with open(self.object_path(digest), "rb") as f:
+            content = f.read()
+        if hashlib.sha256(content).hexdigest() != digest:
+            self.verify(digest)
+            return None
+        return content
+
+    @staticmethod
+    def _same_file(path: str, other_path: str) -> bool:
+        """Check whether two paths are links to the same file."""
+        try:
+            return os.path.samefile(path, other_path)
+        except OSError:
+            return False
+
+    @staticmethod
+    def _reflink(src_path: str, dest_path: str) -> bool:
+        """Clone a file with a copy-on-write reflink, where supported.
+
+        Returns:
+            True if the reflink was created, False otherwise
+        """
+        if fcntl is None:
+            return False
+        try:
+            with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+                fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            return False
+
+    def _link_or_copy(self, src_path: str, dest_path: str) -> str:
+        """Create dest_path as a reflink, hardlink or copy of src_path.
+
+        Returns:
+            The method used: "reflink", "hardlink" or "copy"
+        """
+        if self._reflink(src_path, dest_path):
+            return "reflink"
+        try:
+            os.link(src_path, dest_path)
+            return "hardlink"
+        except OSError:
+            shutil.copyfile(src_path, dest_path)
+            return "copy"
+
+    def _replace_with_link(self, object_path: str, dest_path: str) -> None:
+        """Atomically replace dest_path with a link to a stored object."""
+        temp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.link"
+        method = self._link_or_copy(object_path, temp_path)
+        os.replace(temp_path, dest_path)
+        logger.debug(f"Placed {dest_path} from the content store by {method}")
@@ -1,35 +1,41 @@
 import csv
-import os
+import itertools
 from typing import Dict, List, Optional, Any
 
 from config import HEADER_PATTERNS
+from icann_reports.utils.compression import open_report, report_name
 from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
 
 logger = setup_logging(logger_name="file_structure")
 
+# Number of lines read from the top of a report to detect its structure
+STRUCTURE_SAMPLE_LINES = 10
+
 
 class FileStructureAnalyzer:
     """Analyzes CSV files to determine their structure and format."""
 
-    def __init__(self):
-        """Initialize the file structure analyzer."""
+    def __init__(self, metrics: Optional[MetricsRegistry] = None):
+        """Initialize the file structure analyzer.
+
+        Args:
+            metrics: MetricsRegistry to record structure cache lookups in
+        """
         self.file_structures: Dict[str, List[Dict[str, Any]]] = {}
+        self.metrics = metrics or MetricsRegistry()
 
-    def detect_file_structure(self, file_path: str) -> Dict[str, Any]:
-        """Detect the structure of a CSV file by examining its header.
+    def _known_structure(self, file_name: str) -> Optional[Dict[str, Any]]:
+        """Look up a structure already detected for the TLD of a file.
 
         Args:
-            file_path: Path to the CSV file
+            file_name: Name of the report file
 
         Returns:
-            Dict containing structure information including:
-                - tld: The TLD for this file
-                - header_rows: Number of header rows to skip
-                - header_type: Type of header (standard, icann_report, etc.)
+            The most recent structure detected for the file's TLD, or None
         """
-        file_name = os.path.basename(file_path)
-
-        # Extract TLD from filename (assuming format like "com-transactions-YYYYMM-en.csv")
+        # Extract TLD from filename (assuming format like
+        # "com-transactions-YYYYMM-en.csv")
         tld_match = file_name.split("-")[0] if "-" in file_name else None
 
         # If we already know the structure for this TLD, use it
@@ -37,75 +43,135 @@ class FileStructureAnalyzer:
             if tld_match and tld == tld_match and structures:
                 # Use the most recent structure for this TLD
                 logger.info(f"Using known structure for {tld} file: {file_name}")
+                self.metrics.inc(
+                    "cache_lookups_total", cache="file_structure", result="hit"
+                )
                 return structures[-1]
 
         # Need to detect structure
         logger.info(f"Detecting file structure for: {file_name}")
+        self.metrics.inc("cache_lookups_total", cache="file_structure", result="miss")
+        return None
+
+    def _default_structure(self, file_name: str) -> Dict[str, Any]:
+        """Build the structure assumed when detection fails."""
+        return {
+            "tld": file_name.split("-")[0] if "-" in file_name else None,
+            "header_rows": 0,
+            "header_type": "standard",
+            "detected_from": file_name,
+        }
+
+    def detect_file_structure(self, file_path: str) -> Dict[str, Any]:
+        """Detect the structure of a CSV file by examining its header.
+
+        Args:
+            file_path: Path to the CSV file (plain, or gzip or xz compressed)
+
+        Returns:
+            Dict containing structure information including:
+                - tld: The TLD for this file
+                - header_rows: Number of header rows to skip
+                - header_type: Type of header (standard, icann_report, etc.)
+        """
+        file_name = report_name(file_path)
+        known = self._known_structure(file_name)
+        if known:
+            return known
 
         try:
-            with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            with open_report(file_path) as f:
                 # Read the first few lines to detect headers
-                lines = []
-                for _ in range(10):  # Read up to 10 lines
-                    try:
-                        line = next(f)
-                        lines.append(line.strip())
-                    except StopIteration:
-                        break
-
-            # Analyze the lines to determine structure
-            header_rows = 0
-            header_type = "standard"
-
-            # Check for ICANN report header patterns
-            for i, line in enumerate(lines):
-                if any(pattern in line for pattern in HEADER_PATTERNS):
-                    header_type = "icann_report"
-                    header_rows = i + 1
-
-                # Look for CSV header row (contains expected field names)
-                if i > 0:  # Skip first row since it might be a title
-                    csv_reader = csv.reader([line])
-                    headers = list(next(csv_reader, []))
-
-                    # If this looks like a proper header row with known fields
-                    normalized_headers = [h.lower() for h in headers]
-                    if any(
-                        field.lower() in normalized_headers
-                        for field in ["tld", "registrar-name", "iana-id"]
-                    ):
-                        header_rows = i
-                        break
-
-            # Create structure info
-            structure = {
-                "tld": tld_match,
-                "header_rows": header_rows,
-                "header_type": header_type,
-                "detected_from": file_name,
-            }
-
-            # Save this structure
-            if tld_match:
-                if tld_match not in self.file_structures:
-                    self.file_structures[tld_match] = []
-                self.file_structures[tld_match].append(structure)
-
-            return structure
+                lines = list(itertools.islice(f, STRUCTURE_SAMPLE_LINES))
+            return self._analyze_lines(file_name, lines)
 
         except Exception as e:
             logger.error(f"Error detecting file structure: {e}")
             # Return a default structure
-            return {
-                "tld": tld_match,
-                "header_rows": 0,
-                "header_type": "standard",
-                "detected_from": file_name,
-            }
+            return self._default_structure(file_name)
+
+    def detect_structure_from_lines(
+        self, file_name: str, lines: List[str]
+    ) -> Dict[str, Any]:
+        """Detect the structure of a report from its first lines.
+
+        Use this for reports read from a stream, such as an archive member,
+        where the file cannot be reopened.
+
+        Args:
+            file_name: Name of the report file
+            lines: First lines of the report (up to STRUCTURE_SAMPLE_LINES are used)
+
+        Returns:
+            Dict containing structure information, as for detect_file_structure
+        """
+        file_name = report_name(file_name)
+        known = self._known_structure(file_name)
+        if known:
+            return known
+
+        try:
+            return self._analyze_lines(file_name, lines[:STRUCTURE_SAMPLE_LINES])
+        except Exception as e:
+            logger.error(f"Error detecting file structure: {e}")
+            return self._default_structure(file_name)
+
+    def _analyze_lines(self, file_name: str, lines: List[str]) -> Dict[str, Any]:
+        """Analyze the first lines of a report and remember the structure for its TLD.
+
+        Args:
+            file_name: Name of the report file
+            lines: First lines of the report
+
+        Returns:
+            Dict containing structure information
+        """
+        tld_match = file_name.split("-")[0] if "-" in file_name else None
+        lines = [line.strip() for line in lines]
+
+        # Analyze the lines to determine structure
+        header_rows = 0
+        header_type = "standard"
+
+        # Check for ICANN report header patterns
+        for i, line in enumerate(lines):
+            if any(pattern in line for pattern in HEADER_PATTERNS):
+                header_type = "icann_report"
+                header_rows = i + 1
+
+            # Look for CSV header row (contains expected field names)
+            if i > 0:  # Skip first row since it might be a title
+                csv_reader = csv.reader([line])
+                headers = list(next(csv_reader, []))
+
+                # If this looks like a proper header row with known fields
+                normalized_headers = [h.lower() for h in headers]
+                if any(
+                    field.lower() in normalized_headers
+                    for field in ["tld", "registrar-name", "iana-id"]
+                ):
+                    header_rows = i
+                    break
+
+        # Create structure info
+        structure = {
+            "tld": tld_match,
+            "header_rows": header_rows,
+            "header_type": header_type,
+            "detected_from": file_name,
+        }
+
+        # Save this structure
+        if tld_match:
+            if tld_match not in self.file_structures:
+                self.file_structures[tld_match] = []
+            self.file_structures[tld_match].append(structure)
+
+        return structure
 
     def get_file_structure_report(self) -> str:
         """Get a report of detected file structures by TLD.
-        
+
         Returns:
             String containing a formatted report of file structures
         """
@@ -121,4 +187,4 @@ class FileStructureAnalyzer:
                 report.append(f"    Header rows: {structure['header_rows']}")
                 report.append(f"    Header type: {structure['header_type']}")
 
-        return "\n".join(report)
\ No newline at end of file
+        return "\n".join(report)
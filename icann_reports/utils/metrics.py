@@ -0,0 +1,375 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="metrics")
+
+# Prefix for every exported metric name
+METRIC_PREFIX = "icann_reports"
+
+# Default histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Help text for the metrics recorded by the pipeline
+METRIC_DESCRIPTIONS: Dict[str, str] = {
+    "bytes_downloaded_total": "Bytes downloaded from the report server",
+    "downloads_total": "Download requests by outcome",
+    "download_resumes_total": "Downloads continued from a partial file, by result",
+    "download_retries_total": "Download attempts retried after an error",
+    "download_retries_dropped_total": "Failed download attempts not retried, by reason",
+    "retries_pending": "Download retries waiting in the retry scheduler",
+    "http_errors_total": "Failed HTTP requests by status code or error type",
+    "http_request_duration_seconds": "Duration of HTTP report downloads",
+    "download_concurrency_limit": "Current adaptive limit on in-flight downloads",
+    "downloads_in_flight": "Downloads currently in flight",
+    "download_concurrency_decreases_total": "Times the download concurrency limit was "
+    "cut",
+    "size_estimates_total": "Report sizes estimated for scheduling, by source",
+    "cache_lookups_total": "Cache lookups by cache and result",
+    "store_objects_total": "Files added to the content store, by result",
+    "store_bytes_deduplicated_total": "Bytes not stored again because the content "
+    "store already held them",
+    "store_integrity_failures_total": "Content store objects that failed their hash "
+    "check",
+    "run_files_resumed_total": "Reports picked up from a run manifest instead of "
+    "being redone, by stage",
+    "queue_tasks_total": "Work queue tasks claimed, completed or taken over from "
+    "expired leases",
+    "archive_members_total": "Archive members ingested, by result",
+    "files_parsed_total": "CSV files parsed",
+    "rows_parsed_total": "Rows parsed from CSV files",
+    "parse_errors_total": "CSV files that failed to parse",
+    "file_parse_duration_seconds": "Duration of parsing a single CSV file",
+    "rows_parsed_per_second": "Rows parsed per second of parse stage wall-clock time",
+    "columnar_reports_total": "Parsed reports written to or loaded from the columnar "
+    "store by result",
+    "columnar_bytes_written_total": "Bytes of columnar report files written",
+    "query_index_reports_total": "Columnar reports added to the query index",
+    "sqlite_reports_total": "Parsed reports exported to SQLite by result (loaded or "
+    "skipped as unchanged)",
+    "sqlite_rows_written_total": "Rows inserted into the SQLite monthly_metrics table",
+    "service_polls_total": "Polls of the resident service for newly published reports",
+    "service_poll_errors_total": "Polls of the resident service that failed",
+    "service_reports_applied_total": "Reports the resident service folded into its "
+    "aggregate",
+    "service_applied_reports": "Reports covered by the resident service's aggregate",
+    "service_last_poll_timestamp_seconds": "Unix time of the resident service's last "
+    "poll",
+    "api_requests_total": "Requests answered by the report API, by route and status",
+    "api_request_duration_seconds": "Duration of report API requests",
+    "api_response_cache_total": "Report API response cache lookups by result",
+    "api_report_loads_total": "Times the report API loaded the reports after they "
+    "changed",
+    "rows_streamed_total": "Rows validated and aggregated as their report was parsed, "
+    "then dropped",
+    "rows_validated_total": "Rows validated by result",
+    "reports_generated_total": "Report files written",
+    "report_bytes_written_total": "Bytes of report files written",
+    "report_cache_total": "Report cache lookups by result",
+    "report_cache_evictions_total": "Cached report sets evicted to keep the report "
+    "cache within its size limit",
+    "report_cache_bytes": "Size of the reports held in the report cache",
+    "stage_duration_seconds": "Wall-clock duration of each pipeline stage in the last "
+    "run",
+    "last_run_timestamp_seconds": "Unix time at which the last run finished",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    """Convert a labels dictionary into a hashable, ordered key."""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format labels for the Prometheus text format."""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs)
+        + "}"
+    )
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value for the Prometheus text format."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and histograms for a pipeline run."""
+
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        """Initialize the metrics registry.
+
+        Args:
+            prefix: Prefix for exported metric names
+        """
+        self.prefix = prefix
+        self.types: Dict[str, str] = {}
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Dict[str, Any]]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, metric_type: str) -> None:
+        """Record the type of a metric, rejecting conflicting reuse of a name."""
+        registered = self.types.setdefault(name, metric_type)
+        if registered != metric_type:
+            raise ValueError(f"Metric '{name}' is a {registered}, not a {metric_type}")
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter.
+
+        Args:
+            name: Name of the counter
+            value: Amount to increment by
+            **labels: Labels identifying the series
+        """
+        with self._lock:
+            self._register(name, "counter")
+            series = self.counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to a value.
+
+        Args:
+            name: Name of the gauge
+            value: New value of the gauge
+            **labels: Labels identifying the series
+        """
+        with self._lock:
+            self._register(name, "gauge")
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        **labels,
+    ) -> None:
+        """Record an observation in a histogram.
+
+        Args:
+            name: Name of the histogram
+            value: Observed value
+            buckets: Upper bounds of the histogram buckets (first use only)
+            **labels: Labels identifying the series
+        """
+        with self._lock:
+            self._register(name, "histogram")
+            bounds = self._buckets.setdefault(name, tuple(sorted(buckets)))
+            series = self.histograms.setdefault(name, {})
+            key = _label_key(labels)
+            histogram = series.setdefault(
+                key, {"count": 0, "sum": 0.0, "buckets": [0] * len(bounds)}
+            )
+            histogram["count"] += 1
+            histogram["sum"] += value
+            for index, bound in enumerate(bounds):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Time a block and record its duration in a histogram.
+
+        Args:
+            name: Name of the histogram
+            **labels: Labels identifying the series
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def time_stage(self, stage: str) -> Iterator[None]:
+        """Time a pipeline stage and record its wall-clock duration.
+
+        Args:
+            stage: Name of the stage
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.set_gauge(
+                "stage_duration_seconds", time.perf_counter() - start, stage=stage
+            )
+
+    def get_counter(self, name: str, **labels) -> float:
+        """Get the value of a counter series (0 if never incremented)."""
+        return self.counters.get(name, {}).get(_label_key(labels), 0)
+
+    def get_gauge(self, name: str, **labels) -> Optional[float]:
+        """Get the value of a gauge series (None if never set)."""
+        return self.gauges.get(name, {}).get(_label_key(labels))
+
+    def counter_total(self, name: str) -> float:
+        """Get the sum of a counter across all of its series."""
+        return sum(self.counters.get(name, {}).values())
+
+    def cache_hit_rates(self) -> Dict[str, float]:
+        """Compute the hit rate of every cache that recorded lookups.
+
+        Returns:
+            Dictionary with cache names as keys and hit rates as values
+        """
+        lookups: Dict[str, Dict[str, float]] = {}
+        for key, value in self.counters.get("cache_lookups_total", {}).items():
+            labels = dict(key)
+            counts = lookups.setdefault(labels.get("cache", ""), {"hit": 0, "miss": 0})
+            counts["hit" if labels.get("result") == "hit" else "miss"] += value
+
+        return {
+            cache: counts["hit"] / (counts["hit"] + counts["miss"])
+            for cache, counts in lookups.items()
+            if counts["hit"] + counts["miss"]
+        }
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Metrics text, suitable for the node exporter textfile collector
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self.types):
+                metric_type = self.types[name]
+                full_name = f"{self.prefix}_{name}"
+                description = METRIC_DESCRIPTIONS.get(name, name.replace("_", " "))
+                lines.append(f"# HELP {full_name} {description}")
+                lines.append(f"# TYPE {full_name} {metric_type}")
+
+                if metric_type == "counter":
+                    for key, value in sorted(self.counters[name].items()):
+                        lines.append(
+                            f"{full_name}{_format_labels(key)} {_format_value(value)}"
+                        )
+                elif metric_type == "gauge":
+                    for key, value in sorted(self.gauges[name].items()):
+                        lines.append(
+                            f"{full_name}{_format_labels(key)} {_format_value(value)}"
+                        )
+                else:
+                    bounds = self._buckets[name]
+                    for key, histogram in sorted(self.histograms[name].items()):
+                        for bound, count in zip(bounds, histogram["buckets"]):
+                            labels = _format_labels(key, ("le", _format_value(bound)))
+                            lines.append(f"{full_name}_bucket{labels} {count}")
+                        labels = _format_labels(key, ("le", "+Inf"))
+                        lines.append(f"{full_name}_bucket{labels} {histogram['count']}")
+                        lines.append(
+                            f"{full_name}_sum{_format_labels(key)} "
+                            f"{_format_value(histogram['sum'])}"
+                        )
+                        lines.append(
+                            f"{full_name}_count{_format_labels(key)} "
+                            f"{histogram['count']}"
+                        )
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """Build a JSON-serialisable summary of the run.
+
+        Returns:
+            Dictionary with every metric series and derived throughput figures
+        """
+        with self._lock:
+            metrics: Dict[str, Any] = {}
+            for name, metric_type in sorted(self.types.items()):
+                if metric_type == "counter":
+                    series = self.counters[name]
+                    samples = [
+                        {"labels": dict(key), "value": value}
+                        for key, value in series.items()
+                    ]
+                elif metric_type == "gauge":
+                    series = self.gauges[name]
+                    samples = [
+                        {"labels": dict(key), "value": value}
+                        for key, value in series.items()
+                    ]
+                else:
+                    bounds = self._buckets[name]
+                    samples = [
+                        {
+                            "labels": dict(key),
+                            "count": histogram["count"],
+                            "sum": histogram["sum"],
+                            "buckets": dict(
+                                zip((str(b) for b in bounds), histogram["buckets"])
+                            ),
+                        }
+                        for key, histogram in self.histograms[name].items()
+                    ]
+                metrics[name] = {"type": metric_type, "samples": samples}
+
+        return {
+            "metrics": metrics,
+            "stage_seconds": {
+                dict(key).get("stage", ""): value
+                for key, value in self.gauges.get("stage_duration_seconds", {}).items()
+            },
+            "rows_parsed_per_second": self.get_gauge("rows_parsed_per_second"),
+            "cache_hit_rates": self.cache_hit_rates(),
+        }
+
+    @staticmethod
+    def _write_atomic(path: str, content: str) -> None:
+        """Write a file through a temporary file, so readers never see partial data."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def write_prometheus_textfile(self, path: str) -> str:
+        """Write the metrics as a Prometheus textfile.
+
+        Args:
+            path: Path of the .prom file to write
+
+        Returns:
+            Path to the written file
+        """
+        self._write_atomic(path, self.to_prometheus())
+        logger.info(f"Prometheus metrics written to {path}")
+        return path
+
+    def write_json_summary(self, path: str) -> str:
+        """Write the run summary as JSON.
+
+        Args:
+            path: Path of the JSON file to write
+
+        Returns:
+            Path to the written file
+        """
+        self._write_atomic(path, json.dumps(self.summary(), indent=2))
+        logger.info(f"Metrics summary written to {path}")
+        return path
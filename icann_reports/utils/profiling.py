@@ -0,0 +1,257 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+from config import REPORTS_DIR
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="profiling")
+
+# Number of entries shown in the text summaries
+DEFAULT_TOP_N = 20
+
+# Number of stack frames tracemalloc stores per allocation
+TRACEMALLOC_FRAMES = 5
+
+
+class StageProfiler:
+    """Captures cProfile statistics and tracemalloc snapshots per pipeline stage.
+
+    Stages run either in the calling thread (``stage``) or as tasks in worker
+    threads (``wrap``). cProfile data from every thread is merged per stage;
+    memory snapshots are taken at the boundaries of each ``stage`` block.
+
+    Python 3.12+ only allows one cProfile profiler per process at a time, and
+    it sees the calls of every thread. Tasks that cannot start their own
+    profile are counted in ``skipped_profiles``, with a warning, and their
+    calls are left to the profile already running.
+    """
+
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        profile: bool = False,
+        trace_memory: bool = False,
+        top_n: int = DEFAULT_TOP_N,
+    ):
+        """Initialize the stage profiler.
+
+        Args:
+            output_dir: Directory to write captures to (default: a timestamped
+                directory under the reports directory)
+            profile: Capture cProfile statistics per stage
+            trace_memory: Capture tracemalloc snapshots per stage
+            top_n: Number of entries in the text summaries
+        """
+        self.output_dir = output_dir or os.path.join(
+            REPORTS_DIR, "profiles", datetime.now().strftime("%Y%m%d-%H%M%S")
+        )
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.top_n = top_n
+        self.profiles: Dict[str, List[cProfile.Profile]] = {}
+        # Stage name -> number of tasks whose profile could not be started
+        self.skipped_profiles: Dict[str, int] = {}
+        self.memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        """True if any capture is enabled."""
+        return self.profile or self.trace_memory
+
+    def _start_profile(self, name: str) -> Optional[cProfile.Profile]:
+        """Start profiling the current thread, unless it is already profiled.
+
+        Args:
+            name: Name of the stage
+
+        Returns:
+            The started profile, or None if profiling was not started
+        """
+        if not self.profile or getattr(self._local, "active", False):
+            return None
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Interpreters with a process-wide profiler only allow one at a time
+            with self._lock:
+                skipped = self.skipped_profiles.get(name, 0)
+                self.skipped_profiles[name] = skipped + 1
+            if not skipped:
+                logger.warning(
+                    f"Not profiling '{name}' tasks separately: {e}. Their calls "
+                    "only appear in the profile that is already running"
+                )
+            return None
+        self._local.active = True
+        return profiler
+
+    def _stop_profile(self, name: str, profiler: Optional[cProfile.Profile]) -> None:
+        """Stop a profile and store it under its stage.
+
+        Args:
+            name: Name of the stage
+            profiler: Profile returned by _start_profile
+        """
+        if profiler is None:
+            return
+
+        profiler.disable()
+        self._local.active = False
+        with self._lock:
+            self.profiles.setdefault(name, []).append(profiler)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Capture a pipeline stage running in the current thread.
+
+        Args:
+            name: Name of the stage
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start_snapshot = None
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            tracemalloc.reset_peak()
+            start_snapshot = tracemalloc.take_snapshot()
+
+        profiler = self._start_profile(name)
+        try:
+            yield
+        finally:
+            self._stop_profile(name, profiler)
+
+            if start_snapshot is not None:
+                end_snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                self.memory[name] = {
+                    "current_bytes": current,
+                    "peak_bytes": peak,
+                    "snapshot": end_snapshot,
+                    "top_stats": end_snapshot.compare_to(start_snapshot, "lineno"),
+                }
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """Wrap a function so that each call is profiled under a stage.
+
+        Use this for tasks submitted to worker threads, which the profiler
+        started by ``stage`` in the submitting thread does not see.
+
+        Args:
+            name: Name of the stage
+            func: Function to wrap
+
+        Returns:
+            The wrapped function, or func unchanged when profiling is disabled
+        """
+        if not self.profile:
+            return func
+
+        @wraps(func)
+        def profiled(*args, **kwargs):
+            profiler = self._start_profile(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._stop_profile(name, profiler)
+
+        return profiled
+
+    def _profile_summary(self, name: str, stats: pstats.Stats) -> str:
+        """Format the top entries of a stage profile.
+
+        Args:
+            name: Name of the stage
+            stats: Merged statistics for the stage
+
+        Returns:
+            Text summary sorted by cumulative time
+        """
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        skipped = ""
+        if self.skipped_profiles.get(name):
+            skipped = (
+                f"{self.skipped_profiles[name]} tasks were not profiled separately "
+                "because another profiler was active\n"
+            )
+        return (
+            f"Profile for stage '{name}' (top {self.top_n} by cumulative "
+            f"time)\n{skipped}{stream.getvalue()}"
+        )
+
+    def _memory_summary(self, name: str, memory: Dict[str, Any]) -> str:
+        """Format the top allocations of a stage.
+
+        Args:
+            name: Name of the stage
+            memory: Memory capture for the stage
+
+        Returns:
+            Text summary of the largest allocation differences
+        """
+        report = [
+            f"Memory for stage '{name}' (top {self.top_n} allocation differences)",
+            f"  Traced memory at end: {memory['current_bytes'] / 1024:.1f} KiB",
+            f"  Peak traced memory: {memory['peak_bytes'] / 1024:.1f} KiB",
+            "",
+        ]
+        for stat in memory["top_stats"][: self.top_n]:
+            report.append(f"  {stat}")
+        return "\n".join(report) + "\n"
+
+    def write_reports(self) -> Dict[str, List[str]]:
+        """Write the captured profiles and snapshots with text summaries.
+
+        Returns:
+            Dictionary with stage names as keys and written file paths as values
+        """
+        written: Dict[str, List[str]] = {}
+        for name, count in self.skipped_profiles.items():
+            logger.warning(
+                f"{count} '{name}' tasks were not profiled separately because "
+                "another profiler was active"
+            )
+        if not self.profiles and not self.memory:
+            return written
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        for name, profiles in self.profiles.items():
+            stats = pstats.Stats(*profiles)
+            stats_path = os.path.join(self.output_dir, f"{name}.prof")
+            summary_path = os.path.join(self.output_dir, f"{name}.prof.txt")
+            stats.dump_stats(stats_path)
+            with open(summary_path, "w") as f:
+                f.write(self._profile_summary(name, stats))
+            written.setdefault(name, []).extend([stats_path, summary_path])
+
+        for name, memory in self.memory.items():
+            snapshot_path = os.path.join(self.output_dir, f"{name}.tracemalloc")
+            summary_path = os.path.join(self.output_dir, f"{name}.memory.txt")
+            memory["snapshot"].dump(snapshot_path)
+            with open(summary_path, "w") as f:
+                f.write(self._memory_summary(name, memory))
+            written.setdefault(name, []).extend([snapshot_path, summary_path])
+
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        logger.info(f"Profiling output written to {self.output_dir}")
+        return written
@@ -0,0 +1,287 @@
+import json
+import os
+import threading
+from typing import Dict, List, Any, Iterable, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.utils.columnar import ColumnarStore
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="query_index")
+
+# Subdirectory of the columnar store holding the query index
+QUERY_INDEX_DIRNAME = "index"
+
+
+def _file_tld(file_name: str) -> str:
+    """Get the TLD of a report from its name, e.g. "com" for a .com report."""
+    return file_name.split("-", 1)[0].lower()
+
+
+class QueryIndex:
+    """On-disk indexes by IANA ID, TLD and month over a columnar store.
+
+    The index lives in ``index/`` inside the columnar store, as small JSON
+    files that each answer one kind of lookup without reading the others:
+
+    - ``files/<report>.json``: TLD, month, row count and IANA IDs of an
+      indexed report, with the size and modification time it was indexed at
+    - ``tlds/<tld>.json``: month and row count of every report of a TLD
+    - ``registrars/<iana id>.json``: names of a registrar with the months
+      they were seen in, and the rows of the registrar in every report
+
+    A point query for one registrar reads its registrar file and then only
+    its rows from the columnar reports, whatever the size of the store.
+    """
+
+    def __init__(
+        self, columnar_store: ColumnarStore, metrics: Optional[MetricsRegistry] = None
+    ):
+        """Initialize the query index of a columnar store.
+
+        Args:
+            columnar_store: ColumnarStore holding the parsed reports
+            metrics: MetricsRegistry to record indexed reports in
+        """
+        self.columnar_store = columnar_store
+        self.metrics = metrics or MetricsRegistry()
+        self.index_dir = os.path.join(columnar_store.columnar_dir, QUERY_INDEX_DIRNAME)
+        self._lock = threading.Lock()
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.index_dir, kind, quote(key, safe="") + ".json")
+
+    def _load(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(kind, key), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load {kind} index {key}: {e}")
+            return None
+
+    def _save(self, kind: str, key: str, entry: Dict[str, Any]) -> None:
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def _keys(self, kind: str) -> List[str]:
+        try:
+            entries = os.listdir(os.path.join(self.index_dir, kind))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            unquote(entry[: -len(".json")])
+            for entry in entries
+            if entry.endswith(".json")
+        )
+
+    def _stat(self, file_name: str) -> Tuple[int, int]:
+        stat = os.stat(self.columnar_store.path_for(file_name))
+        return stat.st_size, stat.st_mtime_ns
+
+    def stale_file_names(self) -> Tuple[List[str], List[str]]:
+        """Find the reports the index is out of date for.
+
+        Returns:
+            Tuple of the stored reports that are new or changed since they were
+            indexed, and the indexed reports no longer in the store
+        """
+        stored = set(self.columnar_store.file_names())
+        indexed = set(self._keys("files"))
+        changed = []
+        for file_name in sorted(stored):
+            entry = self._load("files", file_name) if file_name in indexed else None
+            if entry is None or [entry["size"], entry["mtime_ns"]] != list(
+                self._stat(file_name)
+            ):
+                changed.append(file_name)
+        return changed, sorted(indexed - stored)
+
+    def update(self, file_names: Optional[Iterable[str]] = None) -> int:
+        """Bring the index up to date with the columnar store.
+
+        Each registrar and TLD file is rewritten once per update, however
+        many of the updated reports it appears in.
+
+        Args:
+            file_names: Reports to (re)index; by default every new or changed
+                report is indexed and removed reports are dropped
+
+        Returns:
+            Number of reports indexed
+        """
+        with self._lock:
+            if file_names is None:
+                changed, removed = self.stale_file_names()
+            else:
+                changed, removed = sorted(set(file_names)), []
+            if not changed and not removed:
+                return 0
+
+            # IANA ID -> file name -> (month, row indices, names), None to drop the file
+            registrar_updates: Dict[
+                str, Dict[str, Optional[Tuple[str, List[int], Set[str]]]]
+            ] = {}
+            # TLD -> file name -> entry, None to drop the file
+            tld_updates: Dict[str, Dict[str, Optional[Dict[str, Any]]]] = {}
+
+            for file_name in changed + removed:
+                previous = self._load("files", file_name)
+                if previous:
+                    for iana_id in previous["iana_ids"]:
+                        registrar_updates.setdefault(iana_id, {})[file_name] = None
+                    tld_updates.setdefault(previous["tld"], {})[file_name] = None
+
+            indexed = 0
+            for file_name in changed:
+                try:
+                    file_entry = self._index_report(file_name, registrar_updates)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Failed to index columnar report {file_name}: {e}")
+                    continue
+                tld_updates.setdefault(file_entry["tld"], {})[file_name] = {
+                    "month": file_entry["month"],
+                    "rows": file_entry["rows"],
+                }
+                self._save("files", file_name, file_entry)
+                indexed += 1
+            for file_name in removed:
+                try:
+                    os.remove(self._path("files", file_name))
+                except FileNotFoundError:
+                    pass
+
+            for iana_id, updates in registrar_updates.items():
+                self._apply_registrar_updates(iana_id, updates)
+            for tld, updates in tld_updates.items():
+                entry = self._load("tlds", tld) or {"files": {}}
+                for file_name, file_entry in updates.items():
+                    if file_entry is None:
+                        entry["files"].pop(file_name, None)
+                    else:
+                        entry["files"][file_name] = file_entry
+                self._save("tlds", tld, entry)
+
+        self.metrics.inc("query_index_reports_total", indexed)
+        logger.info(
+            f"Indexed {indexed} reports ({len(removed)} removed, "
+            f"{len(registrar_updates)} registrars and {len(tld_updates)} TLDs updated)"
+        )
+        return indexed
+
+    def _index_report(
+        self,
+        file_name: str,
+        registrar_updates: Dict[
+            str, Dict[str, Optional[Tuple[str, List[int], Set[str]]]]
+        ],
+    ) -> Dict[str, Any]:
+        """Collect the registrar rows of one report into registrar_updates."""
+        size, mtime_ns = self._stat(file_name)
+        month = URLGenerator.parse_filename_date(file_name)
+        postings: Dict[str, Tuple[List[int], Set[str]]] = {}
+        with self.columnar_store.open(file_name) as report:
+            row_count = report.row_count
+            iana_ids = report.values("IANA-ID") if "IANA-ID" in report.columns else []
+            names = (
+                report.values("Registrar-name")
+                if "Registrar-name" in report.columns
+                else []
+            )
+        for index, iana_id in enumerate(iana_ids):
+            if not iana_id:
+                continue
+            rows, seen_names = postings.setdefault(iana_id, ([], set()))
+            rows.append(index)
+            name = names[index] if names else None
+            if name:
+                seen_names.add(name)
+        for iana_id, (rows, seen_names) in postings.items():
+            registrar_updates.setdefault(iana_id, {})[file_name] = (
+                month,
+                rows,
+                seen_names,
+            )
+        return {
+            "tld": _file_tld(file_name),
+            "month": month,
+            "rows": row_count,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "iana_ids": sorted(postings),
+        }
+
+    def _apply_registrar_updates(
+        self,
+        iana_id: str,
+        updates: Dict[str, Optional[Tuple[str, List[int], Set[str]]]],
+    ) -> None:
+        entry = self._load("registrars", iana_id) or {
+            "iana_id": iana_id,
+            "names": {},
+            "reports": {},
+        }
+        for file_name, update in updates.items():
+            if update is None:
+                entry["reports"].pop(file_name, None)
+                continue
+            month, rows, seen_names = update
+            entry["reports"][file_name] = {
+                "tld": _file_tld(file_name),
+                "month": month,
+                "rows": rows,
+            }
+            for name in seen_names:
+                first, last = entry["names"].get(name, (month, month))
+                entry["names"][name] = [min(first, month), max(last, month)]
+        if entry["reports"]:
+            self._save("registrars", iana_id, entry)
+        else:
+            try:
+                os.remove(self._path("registrars", iana_id))
+            except FileNotFoundError:
+                pass
+
+    def registrar(self, iana_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a registrar.
+
+        Args:
+            iana_id: IANA ID of the registrar
+
+        Returns:
+            Dictionary with "iana_id", "names" (name -> [first month, last month])
+            and "reports" (file name -> {"tld", "month", "rows"}), or None if
+            the registrar is not indexed
+        """
+        return self._load("registrars", iana_id)
+
+    def tld_reports(self, tld: str) -> Dict[str, Dict[str, Any]]:
+        """Look up the reports of a TLD.
+
+        Args:
+            tld: TLD, e.g. "com"
+
+        Returns:
+            Dictionary with file names as keys and {"month", "rows"} as values
+        """
+        entry = self._load("tlds", tld.lower())
+        return entry["files"] if entry else {}
+
+    def tlds(self) -> List[str]:
+        """Get every indexed TLD, sorted."""
+        return self._keys("tlds")
+
+    def iana_ids(self) -> List[str]:
+        """Get every indexed IANA ID, sorted."""
+        return self._keys("registrars")
+
+    def is_indexed(self, file_name: str) -> bool:
+        """Check whether a report has been indexed."""
+        return os.path.exists(self._path("files", file_name))
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from config import REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES
+from icann_reports.utils.content_store import ContentStore
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="report_cache")
+
+
+class ReportCache:
+    """Cache of generated report files keyed by a fingerprint of their inputs.
+
+    Each entry is a directory ``<fingerprint>/`` holding the report files
+    generated from one set of inputs, and ``index.json`` records the size,
+    report hashes and last use of every entry. When the entries grow beyond
+    the size limit, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = REPORT_CACHE_DIR,
+        max_bytes: int = REPORT_CACHE_MAX_BYTES,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """Initialize the report cache.
+
+        Args:
+            cache_dir: Directory holding the cached reports and the index
+            max_bytes: Total size of cached reports above which entries are evicted
+            metrics: MetricsRegistry to record hits, misses and evictions in
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.metrics = metrics or MetricsRegistry()
+        self.index_file = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(input_hashes: Dict[str, str], parameters: Dict[str, Any]) -> str:
+        """Fingerprint the inputs of a set of reports.
+
+        Args:
+            input_hashes: Content hash of every input report, keyed by report name
+            parameters: Everything else the reports depend on, such as the
+                report schema version and the reports generated
+
+        Returns:
+            SHA-256 hex digest identifying the inputs
+        """
+        payload = json.dumps(
+            {"inputs": input_hashes, "parameters": parameters}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_file, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to load report cache index: {e}")
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        temp_path = f"{self.index_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, self.index_file)
+
+    def _entry_dir(self, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, fingerprint)
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """Look up the reports generated from a fingerprint's inputs.
+
+        Args:
+            fingerprint: Fingerprint of the inputs
+
+        Returns:
+            Dictionary with report names as keys and {"path", "sha256"} of the
+            cached report file as values, or None on a miss
+        """
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(fingerprint)
+            reports = None
+            if entry:
+                reports = {
+                    name: {
+                        "path": os.path.join(
+                            self._entry_dir(fingerprint), f"{name}.json"
+                        ),
+                        "sha256": digest,
+                    }
+                    for name, digest in entry["reports"].items()
+                }
+                if not all(
+                    os.path.exists(report["path"]) for report in reports.values()
+                ):
+                    logger.warning(
+                        f"Cached reports of {fingerprint} are missing, dropping the "
+                        "entry"
+                    )
+                    del index[fingerprint]
+                    shutil.rmtree(self._entry_dir(fingerprint), ignore_errors=True)
+                    reports = None
+                else:
+                    entry["last_used"] = time.time()
+                self._save_index(index)
+
+        self.metrics.inc("report_cache_total", result="hit" if reports else "miss")
+        return reports
+
+    def put(self, fingerprint: str, reports: Dict[str, str]) -> None:
+        """Cache the reports generated from a fingerprint's inputs.
+
+        Args:
+            fingerprint: Fingerprint of the inputs
+            reports: Dictionary with report names as keys and report file paths as
+                values
+        """
+        entry_dir = self._entry_dir(fingerprint)
+        temp_dir = f"{entry_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(temp_dir, exist_ok=True)
+        digests = {}
+        size = 0
+        for name, path in reports.items():
+            cached_path = os.path.join(temp_dir, f"{name}.json")
+            shutil.copyfile(path, cached_path)
+            digests[name] = ContentStore.hash_file(cached_path)
+            size += os.path.getsize(cached_path)
+
+        with self._lock:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(temp_dir, entry_dir)
+            index = self._load_index()
+            index[fingerprint] = {
+                "reports": digests,
+                "size": size,
+                "last_used": time.time(),
+            }
+            self._evict(index, keep=fingerprint)
+            self._save_index(index)
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], keep: str) -> None:
+        """Evict least recently used entries until the cache fits; needs the lock."""
+        total = sum(entry["size"] for entry in index.values())
+        for fingerprint in sorted(
+            index, key=lambda fingerprint: index[fingerprint]["last_used"]
+        ):
+            if total <= self.max_bytes:
+                break
+            if fingerprint == keep:
+                continue
+            total -= index.pop(fingerprint)["size"]
+            shutil.rmtree(self._entry_dir(fingerprint), ignore_errors=True)
+            self.metrics.inc("report_cache_evictions_total")
+            logger.info(f"Evicted cached reports {fingerprint}")
+        self.metrics.set_gauge("report_cache_bytes", total)
@@ -0,0 +1,213 @@
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="run_manifest")
+
+# Stages a report passes through in a run, in order
+FILE_STAGES = ("planned", "downloaded", "parsed", "aggregated")
+
+
+class RunManifest:
+    """Durable record of a run's plan and of every report's progress through it.
+
+    ``manifest.json`` holds the planned URLs and the state of each report as
+    of the last compaction. Every later stage change is appended to
+    ``journal.jsonl`` and flushed to disk, so a crash loses at most the line
+    being written. Parsed rows are spilled to ``rows/<report>.json.gz``
+    before a report is marked parsed, so an interrupted run is resumed from
+    the manifest without planning, downloading or parsing anything again.
+    """
+
+    def __init__(self, run_dir: str, metrics: Optional[MetricsRegistry] = None):
+        """Initialize the run manifest, loading it if the run was started before.
+
+        Args:
+            run_dir: Directory holding the manifest, journal and spilled rows
+            metrics: MetricsRegistry to record resumed reports in
+        """
+        self.run_dir = run_dir
+        self.manifest_file = os.path.join(run_dir, "manifest.json")
+        self.journal_file = os.path.join(run_dir, "journal.jsonl")
+        self.rows_dir = os.path.join(run_dir, "rows")
+        self.metrics = metrics or MetricsRegistry()
+        self._lock = threading.Lock()
+        os.makedirs(self.rows_dir, exist_ok=True)
+
+        self.plan_options: Dict[str, Any] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.resumed = os.path.exists(self.manifest_file)
+        if self.resumed:
+            self._load()
+            self._compact()
+
+    def _load(self) -> None:
+        """Load the manifest and replay the journal on top of it."""
+        with open(self.manifest_file, "r") as f:
+            manifest = json.load(f)
+        self.plan_options = manifest.get("plan", {})
+        self.files = manifest.get("files", {})
+
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash; nothing after it was written
+                    logger.warning(
+                        f"Ignoring truncated journal entry in {self.journal_file}"
+                    )
+                    break
+                self.files.setdefault(entry["url"], {}).update(entry["state"])
+
+    def _compact(self) -> None:
+        """Fold the journal into the manifest, writing it atomically."""
+        temp_path = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {"plan": self.plan_options, "files": self.files},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.manifest_file)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+    def plan(
+        self, urls: List[str], options: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """Record the planned URLs of a new run, or get those of a resumed run.
+
+        Args:
+            urls: URLs planned for this invocation (ignored when resuming)
+            options: Options the plan was made with, kept for reference
+
+        Returns:
+            URLs of the run, in planned order
+        """
+        with self._lock:
+            if self.resumed:
+                logger.info(f"Resuming run in {self.run_dir}: {self.summary()}")
+                return list(self.files)
+
+            self.plan_options = {"created_at": time.time(), **(options or {})}
+            self.files = {url: {"stage": "planned"} for url in dict.fromkeys(urls)}
+            self._compact()
+            return list(self.files)
+
+    def stage(self, url: str) -> str:
+        """Get the stage a report reached ("planned" if unknown)."""
+        return self.files.get(url, {}).get("stage", "planned")
+
+    def reached(self, url: str, stage: str) -> bool:
+        """Check whether a report reached a stage or a later one."""
+        return FILE_STAGES.index(self.stage(url)) >= FILE_STAGES.index(stage)
+
+    def mark(self, url: str, stage: str, **details: Any) -> None:
+        """Record that a report reached a stage, durably.
+
+        Args:
+            url: URL of the report
+            stage: One of FILE_STAGES
+            **details: Extra state to keep, such as the downloaded file path
+        """
+        if stage not in FILE_STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+
+        state = {"stage": stage, **details}
+        line = json.dumps({"url": url, "state": state}, sort_keys=True)
+        with self._lock:
+            self.files.setdefault(url, {}).update(state)
+            with open(self.journal_file, "a") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def mark_all(self, from_stage: str, to_stage: str) -> int:
+        """Move every report in one stage on to another, with a single write.
+
+        Args:
+            from_stage: Stage the reports are in
+            to_stage: Stage to move them to
+
+        Returns:
+            Number of reports moved
+        """
+        with self._lock:
+            urls = [
+                url
+                for url, state in self.files.items()
+                if state.get("stage") == from_stage
+            ]
+            for url in urls:
+                self.files[url]["stage"] = to_stage
+            self._compact()
+        return len(urls)
+
+    def rows_path(self, file_name: str) -> str:
+        """Get the path rows of a report are spilled to."""
+        return os.path.join(self.rows_dir, f"{file_name}.json.gz")
+
+    def spill_rows(self, url: str, file_name: str, rows: List[Dict[str, Any]]) -> None:
+        """Write the parsed rows of a report to disk and mark it parsed.
+
+        Args:
+            url: URL of the report
+            file_name: Name of the report file
+            rows: Parsed row dictionaries
+        """
+        path = self.rows_path(file_name)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as raw:
+            with gzip.GzipFile(
+                filename="", mode="wb", fileobj=raw, mtime=0, compresslevel=1
+            ) as f:
+                f.write(json.dumps(rows).encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temp_path, path)
+        self.mark(url, "parsed", file_name=file_name, row_count=len(rows))
+
+    def load_rows(self, url: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Load the spilled rows of a report parsed earlier in the run.
+
+        Args:
+            url: URL of the report
+
+        Returns:
+            Dictionary with the report file name as key and its rows as value,
+            or None if the rows are missing or unreadable
+        """
+        file_name = self.files.get(url, {}).get("file_name")
+        if not file_name:
+            return None
+        try:
+            with gzip.open(self.rows_path(file_name), "rb") as f:
+                rows = json.loads(f.read().decode("utf-8"))
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning(f"Failed to load spilled rows for {file_name}: {e}")
+            return None
+        self.metrics.inc("run_files_resumed_total", stage="parsed")
+        return {file_name: rows}
+
+    def summary(self) -> Dict[str, int]:
+        """Count the reports in each stage.
+
+        Returns:
+            Dictionary with stage names as keys and report counts as values
+        """
+        counts = {stage: 0 for stage in FILE_STAGES}
+        for state in self.files.values():
+            counts[state.get("stage", "planned")] += 1
+        return counts
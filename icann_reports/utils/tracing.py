@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator
+
+from icann_reports.utils.logging_setup import setup_logging
+
+logger = setup_logging(logger_name="tracing")
+
+
+class TraceRecorder:
+    """Records pipeline activity as Chrome Trace Event JSON.
+
+    The output opens in Perfetto (https://ui.perfetto.dev) or chrome://tracing,
+    with one row per worker thread and one span per task.
+    """
+
+    def __init__(self, enabled: bool = False):
+        """Initialize the trace recorder.
+
+        Args:
+            enabled: Record events (a disabled recorder ignores all spans)
+        """
+        self.enabled = enabled
+        self.events: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._named_threads: set = set()
+        self._lock = threading.Lock()
+
+    def _timestamp(self) -> float:
+        """Microseconds since the recorder was created."""
+        return (time.perf_counter() - self._start) * 1_000_000
+
+    def _thread_metadata(self, pid: int, tid: int) -> None:
+        """Record the name of the current thread the first time it emits an event."""
+        if tid in self._named_threads:
+            return
+        self._named_threads.add(tid)
+        self.events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": threading.current_thread().name},
+            }
+        )
+
+    @contextmanager
+    def span(self, name: str, cat: str = "pipeline", **args) -> Iterator[None]:
+        """Record a span covering a block of work in the current thread.
+
+        Args:
+            name: Name of the span
+            cat: Category of the span, used for filtering in the viewer
+            **args: Extra details shown with the span, such as the file name
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = self._timestamp()
+        try:
+            yield
+        finally:
+            self.record(name, start, self._timestamp() - start, cat, **args)
+
+    def record(
+        self, name: str, start: float, duration: float, cat: str = "pipeline", **args
+    ) -> None:
+        """Record a completed span.
+
+        Args:
+            name: Name of the span
+            start: Start time in microseconds since the recorder was created
+            duration: Duration in microseconds
+            cat: Category of the span
+            **args: Extra details shown with the span
+        """
+        if not self.enabled:
+            return
+
+        pid = os.getpid()
+        tid = threading.get_ident()
+        with self._lock:
+            self._thread_metadata(pid, tid)
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "X",
+                    "ts": start,
+                    "dur": duration,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+
+    def instant(self, name: str, cat: str = "pipeline", **args) -> None:
+        """Record a point-in-time event in the current thread.
+
+        Args:
+            name: Name of the event
+            cat: Category of the event
+            **args: Extra details shown with the event
+        """
+        if not self.enabled:
+            return
+
+        pid = os.getpid()
+        tid = threading.get_ident()
+        with self._lock:
+            self._thread_metadata(pid, tid)
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "i",
+                    "s": "t",
+                    "ts": self._timestamp(),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Build the trace in the Chrome Trace Event JSON object format.
+
+        Returns:
+            Dictionary with the recorded events
+        """
+        with self._lock:
+            events = list(self.events)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str) -> str:
+        """Write the trace to a JSON file.
+
+        Args:
+            path: Path of the trace file to write
+
+        Returns:
+            Path to the written trace file
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+        logger.info(f"Trace with {len(self.events)} events written to {path}")
+        return path
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Iterator, Optional
+
+from config import LEASE_SECONDS
+from icann_reports.utils.logging_setup import setup_logging
+from icann_reports.utils.metrics import MetricsRegistry
+
+logger = setup_logging(logger_name="work_queue")
+
+
+@dataclass
+class Lease:
+    """A worker's claim on one task of the work queue."""
+
+    task_id: str
+    url: str
+    expires_at: float
+
+
+class LeaseWorkQueue:
+    """Work queue shared by workers on several hosts through a directory.
+
+    ``tasks/`` holds one file per URL to process, ``leases/`` one file per
+    task a worker is busy with and ``done/`` one file per finished task.
+    A worker claims a task by creating its lease file exclusively, which
+    only one worker can do. Leases expire unless renewed, so the tasks of a
+    worker that died are claimed again by the others. Finished tasks may in
+    rare races be processed twice, so their results must be idempotent.
+    """
+
+    def __init__(
+        self,
+        queue_dir: str,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = LEASE_SECONDS,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        """Initialize the work queue.
+
+        Args:
+            queue_dir: Directory on storage shared by all workers
+            worker_id: Name of this worker (defaults to hostname and process ID)
+            lease_seconds: Seconds a lease lasts unless renewed
+            metrics: MetricsRegistry to record claimed and finished tasks in
+        """
+        self.queue_dir = queue_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.metrics = metrics or MetricsRegistry()
+        self.tasks_dir = os.path.join(queue_dir, "tasks")
+        self.leases_dir = os.path.join(queue_dir, "leases")
+        self.done_dir = os.path.join(queue_dir, "done")
+        self.partials_dir = os.path.join(queue_dir, "partials")
+        for directory in (
+            self.tasks_dir,
+            self.leases_dir,
+            self.done_dir,
+            self.partials_dir,
+        ):
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def task_id(url: str) -> str:
+        """Get the ID of the task for a URL."""
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:20]
+
+    def _lease_path(self, task_id: str) -> str:
+        return os.path.join(self.leases_dir, f"{task_id}.lease")
+
+    def _done_path(self, task_id: str) -> str:
+        return os.path.join(self.done_dir, f"{task_id}.json")
+
+    @staticmethod
+    def _write_json(path: str, data: Dict) -> None:
+        """Write a JSON file atomically."""
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict]:
+        """Read a JSON file, or None if it is missing or being replaced."""
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def enqueue(self, urls: List[str]) -> int:
+        """Add URLs to the queue; URLs already queued are left alone.
+
+        Args:
+            urls: URLs to process
+
+        Returns:
+            Number of URLs newly added
+        """
+        added = 0
+        for position, url in enumerate(urls):
+            task_path = os.path.join(self.tasks_dir, f"{self.task_id(url)}.json")
+            if os.path.exists(task_path):
+                continue
+            self._write_json(task_path, {"url": url, "position": position})
+            added += 1
+        logger.info(f"Queued {added} new tasks in {self.queue_dir}")
+        return added
+
+    def _tasks(self) -> List[Dict]:
+        """Load all tasks in queue order."""
+        tasks = []
+        for entry in os.listdir(self.tasks_dir):
+            if not entry.endswith(".json"):
+                continue
+            task = self._read_json(os.path.join(self.tasks_dir, entry))
+            if task:
+                tasks.append({"task_id": entry[: -len(".json")], **task})
+        return sorted(
+            tasks, key=lambda task: (task.get("position", 0), task["task_id"])
+        )
+
+    def _take_lease(self, task_id: str, url: str) -> Optional[Lease]:
+        """Try to create the lease file of a task, taking over an expired lease."""
+        lease_path = self._lease_path(task_id)
+        expires_at = time.time() + self.lease_seconds
+        content = json.dumps(
+            {"worker": self.worker_id, "url": url, "expires_at": expires_at}
+        )
+
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            current = self._read_json(lease_path)
+            try:
+                # A lease left empty by a worker that died while creating it ages out
+                # too
+                expires = (
+                    current["expires_at"]
+                    if current
+                    else os.path.getmtime(lease_path) + self.lease_seconds
+                )
+            except FileNotFoundError:
+                return None
+            if expires > time.time():
+                return None
+            # Move the expired lease aside; only one worker's rename can succeed
+            stale_path = f"{lease_path}.{self.worker_id}.stale"
+            try:
+                os.rename(lease_path, stale_path)
+            except FileNotFoundError:
+                return None
+            taken = self._read_json(stale_path)
+            if taken != current:
+                # Another worker replaced the lease in between; give it back
+                try:
+                    os.link(stale_path, lease_path)
+                except FileExistsError:
+                    pass
+                os.remove(stale_path)
+                return None
+            os.remove(stale_path)
+            owner = current["worker"] if current else "a worker"
+            logger.warning(f"Lease of {owner} on {url} expired, taking it over")
+            self.metrics.inc("queue_tasks_total", result="lease_expired")
+            return self._take_lease(task_id, url)
+
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        return Lease(task_id, url, expires_at)
+
+    def claim(self, limit: int = 1) -> List[Lease]:
+        """Claim tasks that are neither finished nor leased by a live worker.
+
+        Args:
+            limit: Maximum number of tasks to claim
+
+        Returns:
+            Leases on the claimed tasks, in queue order
+        """
+        leases = []
+        for task in self._tasks():
+            if len(leases) >= limit:
+                break
+            if os.path.exists(self._done_path(task["task_id"])):
+                continue
+            lease = self._take_lease(task["task_id"], task["url"])
+            if lease and os.path.exists(self._done_path(task["task_id"])):
+                # The task was finished, and its lease dropped, after the check above
+                self.release(lease)
+                continue
+            if lease:
+                leases.append(lease)
+                self.metrics.inc("queue_tasks_total", result="claimed")
+        return leases
+
+    def renew(self, lease: Lease) -> bool:
+        """Extend a lease, if this worker still holds it.
+
+        Args:
+            lease: Lease to extend
+
+        Returns:
+            True if the lease was extended, False if it was lost
+        """
+        lease_path = self._lease_path(lease.task_id)
+        current = self._read_json(lease_path)
+        if not current or current["worker"] != self.worker_id:
+            logger.warning(f"Lost the lease on {lease.url}")
+            return False
+        lease.expires_at = time.time() + self.lease_seconds
+        self._write_json(
+            lease_path,
+            {
+                "worker": self.worker_id,
+                "url": lease.url,
+                "expires_at": lease.expires_at,
+            },
+        )
+        return True
+
+    @contextmanager
+    def keep_alive(self, leases: List[Lease]) -> Iterator[None]:
+        """Renew leases in the background while they are being worked on.
+
+        Args:
+            leases: Leases to keep renewing
+        """
+        stop = threading.Event()
+
+        def renew_loop() -> None:
+            while not stop.wait(self.lease_seconds / 3):
+                for lease in leases:
+                    self.renew(lease)
+
+        thread = threading.Thread(target=renew_loop, name="lease-renewal", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, lease: Lease) -> None:
+        """Mark a leased task as finished and release its lease."""
+        self._write_json(
+            self._done_path(lease.task_id),
+            {"url": lease.url, "worker": self.worker_id, "finished_at": time.time()},
+        )
+        self.release(lease)
+        self.metrics.inc("queue_tasks_total", result="completed")
+
+    def release(self, lease: Lease) -> None:
+        """Give up a lease without finishing the task, so it can be claimed again."""
+        current = self._read_json(self._lease_path(lease.task_id))
+        if current and current["worker"] == self.worker_id:
+            try:
+                os.remove(self._lease_path(lease.task_id))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """Count tasks that are finished, leased and waiting.
+
+        Returns:
+            Dictionary with "total", "done", "leased" and "waiting" counts
+        """
+        task_ids = [task["task_id"] for task in self._tasks()]
+        done = sum(
+            1 for task_id in task_ids if os.path.exists(self._done_path(task_id))
+        )
+        leased = sum(
+            1
+            for task_id in task_ids
+            if not os.path.exists(self._done_path(task_id))
+            and os.path.exists(self._lease_path(task_id))
+        )
+        return {
+            "total": len(task_ids),
+            "done": done,
+            "leased": leased,
+            "waiting": len(task_ids) - done - leased,
+        }
+
+    def finished(self) -> bool:
+        """Check whether every task in the queue is finished."""
+        stats = self.stats()
+        return stats["done"] == stats["total"]
+
+    def partial_path(self, worker_id: Optional[str] = None) -> str:
+        """Get the path of a worker's partial aggregate (this worker's by default)."""
+        return os.path.join(self.partials_dir, f"{worker_id or self.worker_id}.json")
+
+    def partial_paths(self) -> List[str]:
+        """Get the paths of every worker's partial aggregate."""
+        return sorted(
+            os.path.join(self.partials_dir, entry)
+            for entry in os.listdir(self.partials_dir)
+            if entry.endswith(".json")
+        )
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Compress the raw reports already kept in a data directory.
+
+Existing uncompressed CSV downloads are rewritten as gzip or xz files next to
+the original, which is then removed. The pipeline parses the compressed files
+directly, so nothing else has to change.
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_DIR  # noqa: E402
+from icann_reports.utils.compression import (  # noqa: E402
+    COMPRESSION_SUFFIXES,
+    compress_file,
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Compress raw ICANN reports in a data directory."
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=DATA_DIR,
+        help="Directory containing the raw CSV reports (default: data)",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=sorted(COMPRESSION_SUFFIXES),
+        default="gzip",
+        help="Compression to use (default: gzip)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Compress every uncompressed report in the data directory."""
+    args = parse_arguments()
+
+    before = after = 0
+    for path in sorted(glob.glob(os.path.join(args.data_dir, "*.csv"))):
+        size = os.path.getsize(path)
+        compressed_path = compress_file(path, args.compression)
+        before += size
+        after += os.path.getsize(compressed_path)
+        print(
+            f"{os.path.basename(compressed_path)}: {size} -> "
+            f"{os.path.getsize(compressed_path)} bytes"
+        )
+
+    if before:
+        print(
+            f"Total: {before} -> {after} bytes ({before / max(after, 1):.1f}x smaller)"
+        )
+    else:
+        print(f"No uncompressed reports found in {args.data_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Run the pipeline benchmark against synthetic ICANN reports.
+
+The benchmark generates reproducible monthly transaction reports, serves them
+from a local HTTP server and times every pipeline stage. Results are written
+as JSON so that runs can be compared to catch performance regressions.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MAX_WORKERS  # noqa: E402
+from icann_reports.benchmark.runner import BenchmarkRunner  # noqa: E402
+from icann_reports.benchmark.synthetic import (  # noqa: E402
+    HEADER_VARIANTS,
+    SyntheticReportGenerator,
+)
+from icann_reports.processor.vectorized import AGGREGATION_BACKENDS  # noqa: E402
+
+PIPELINE_LOGGERS = [
+    "cache",
+    "csv_downloader",
+    "csv_processor",
+    "field_validation",
+    "file_structure",
+    "local_server",
+    "reports",
+    "vectorized",
+]
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the ICANN reports pipeline on synthetic data."
+    )
+    parser.add_argument(
+        "--tlds",
+        nargs="+",
+        default=["com", "net"],
+        help="TLDs to generate reports for (default: com net)",
+    )
+    parser.add_argument(
+        "--start-date",
+        type=str,
+        default="2024-01",
+        help="First month to generate in YYYY-MM format (default: 2024-01)",
+    )
+    parser.add_argument(
+        "--end-date",
+        type=str,
+        default="2024-12",
+        help="Last month to generate in YYYY-MM format (default: 2024-12)",
+    )
+    parser.add_argument(
+        "--registrars",
+        type=int,
+        default=500,
+        help="Number of registrars per report (default: 500)",
+    )
+    parser.add_argument(
+        "--header-variants",
+        nargs="+",
+        default=["standard"],
+        choices=HEADER_VARIANTS,
+        help="Header layouts to rotate through per TLD (default: standard)",
+    )
+    parser.add_argument(
+        "--noise",
+        type=float,
+        default=0.0,
+        help="Fraction of metric cells made blank or invalid (default: 0.0)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for the synthetic data (default: 0)",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_WORKERS,
+        help=f"Maximum number of worker threads (default: {MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--aggregation-backend",
+        choices=AGGREGATION_BACKENDS,
+        default="auto",
+        help="Backend of the report generation stage (default: auto)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of times to run the pipeline (default: 3)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="bench_output.json",
+        help="Path of the JSON results file (default: bench_output.json)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show pipeline log output while benchmarking",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the benchmark and write the results."""
+    args = parse_arguments()
+
+    if not args.verbose:
+        for logger_name in PIPELINE_LOGGERS:
+            logging.getLogger(logger_name).setLevel(logging.ERROR)
+
+    generator = SyntheticReportGenerator(
+        tlds=args.tlds,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        registrar_count=args.registrars,
+        header_variants=args.header_variants,
+        noise=args.noise,
+        seed=args.seed,
+    )
+    runner = BenchmarkRunner(
+        generator,
+        max_workers=args.max_workers,
+        repeat=args.repeat,
+        aggregation_backend=args.aggregation_backend,
+    )
+    results = runner.run()
+    runner.save_results(results, args.output)
+
+    for stage, summary in results["stages"].items():
+        print(f"{stage:<20} {summary['seconds']['median']:.4f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
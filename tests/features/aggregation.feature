@@ -0,0 +1,22 @@
+Feature: Mergeable Report Aggregates
+  As an operator running a distributed backfill
+  I want each worker's partial aggregate to merge into the final reports
+  So that the reports do not depend on which worker processed which month
+
+  Scenario: Merged partial aggregates match a single aggregate
+    Given I have processed reports for the months "202401, 202402, 202403"
+    When one worker aggregates the months "202401, 202403" and another the month "202402"
+    And I merge the saved partial aggregates
+    Then the merged summaries should equal the summaries of a single aggregate
+
+  Scenario: The latest month wins whatever the merge order
+    Given I have processed reports for the months "202401, 202402, 202403"
+    When one worker aggregates the months "202403" and another the month "202401"
+    And I merge the saved partial aggregates in reverse order
+    Then the registrar "Example Registrar" should have 300 total domains in "COM"
+
+  Scenario: A report processed by two workers is counted once
+    Given I have processed reports for the months "202401, 202402, 202403"
+    When one worker aggregates the months "202401, 202402, 202403" and another the month "202402"
+    And I merge the saved partial aggregates
+    Then the merged summaries should equal the summaries of a single aggregate
@@ -0,0 +1,25 @@
+Feature: Aggregation Backends
+  As an analyst aggregating the full history of the reports
+  I want report aggregation to run as NumPy array operations when NumPy is installed
+  So that summaries take a fraction of the time, with the same output
+
+  Scenario: The NumPy backend gives the same summaries as pure Python
+    Given NumPy is installed
+    And I have parsed synthetic reports for "com" and "net" from "2023-10" to "2024-03" with noise
+    And the parsed reports also have rows with missing, blank and invalid cells
+    Then every summary of the "numpy" backend should equal the summary of the "python" backend
+
+  Scenario: Values too large for int64 are aggregated in pure Python
+    Given NumPy is installed
+    And I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-01" with noise
+    And the parsed reports also have a row with 99999999999999999999 domains
+    Then every summary of the "numpy" backend should equal the summary of the "python" backend
+
+  Scenario: Requesting NumPy without it installed falls back to pure Python
+    Given NumPy is not importable
+    When I create a report generator with the "numpy" backend
+    Then the report generator should use the "python" backend
+
+  Scenario: Unknown backends are refused
+    When I create a report generator with the "fortran" backend
+    Then creating the report generator should fail with "Unknown aggregation backend: fortran"
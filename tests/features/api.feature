@@ -0,0 +1,47 @@
+Feature: Report API
+  As a dashboard author
+  I want registrar, TLD and time-series slices of the reports over HTTP
+  So that page loads do not re-parse the report files
+
+  Background:
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-03" with noise
+    And reports generated from the parsed reports up to "2024-02"
+    And a report API serving the generated reports
+
+  Scenario: Registrars are served a page at a time
+    When I request "/registrars?page=2&per_page=10" from the report API
+    Then the report API should answer 200
+    And the answer should be page 2 of the registrar summary with 10 registrars per page
+
+  Scenario: A registrar is served by IANA ID
+    When I request the first registrar from the report API
+    Then the report API should answer 200
+    And the answer should equal the first registrar of the registrar summary
+
+  Scenario: TLD time series are filtered by month
+    When I request "/tlds/COM/timeseries?since=2024-02" from the report API
+    Then the report API should answer 200
+    And the answer should list the "com" months from "2024-02" of the TLD summary
+
+  Scenario: Unchanged answers are revalidated with their ETag
+    When I request "/tlds/com" from the report API
+    And I request "/tlds/com" from the report API again with its ETag
+    Then the report API should answer 304 with no body
+
+  Scenario: Large answers are compressed for clients accepting gzip
+    When I request "/registrars?per_page=50" from the report API with and without gzip
+    Then the gzip answer should decompress to the plain answer
+
+  Scenario: Invalid requests get an error
+    When I request "/registrars/0" from the report API
+    Then the report API should answer 404
+    When I request "/registrars?per_page=0" from the report API
+    Then the report API should answer 400
+
+  Scenario: Newly written reports replace the served ones
+    When I request "/tlds/com/timeseries" from the report API
+    And I regenerate the reports from every parsed report
+    And I request "/tlds/com/timeseries" from the report API again with its ETag
+    Then the report API should answer 200
+    And the answer should list the "com" months from "2024-01" of the TLD summary
+    And the report API should have loaded the reports 2 times
@@ -0,0 +1,44 @@
+Feature: Archive Ingestion
+  As an operator bootstrapping a new environment
+  I want reports processed straight from zip and tar bundles
+  So that historical backfills need neither extraction nor network access
+
+  Scenario Outline: Ingest every report in an archive
+    Given I have a "<format>" archive of 3 synthetic monthly reports and a readme
+    When I ingest the archive
+    Then 3 reports should have been ingested
+    And each ingested report should have 20 rows
+    And no files should have been extracted next to the archive
+
+    Examples:
+      | format  |
+      | zip     |
+      | tar.gz  |
+
+  Scenario: Ingest compressed members
+    Given I have a "tar" archive of 3 gzip compressed synthetic monthly reports
+    When I ingest the archive
+    Then 3 reports should have been ingested
+    And each ingested report should have 20 rows
+
+  Scenario: Skip reports that were already processed
+    Given I have a "zip" archive of 3 synthetic monthly reports and a readme
+    When I ingest the archive
+    And I ingest the archive again with the same cache
+    Then 0 reports should have been ingested
+    And 3 archive members should have been skipped as already processed
+
+  Scenario: Archive ingestion accepts the report options
+    When I run the command line with "--ingest-archive reports.zip --validate --generate-reports"
+    Then the command line should be accepted
+
+  Scenario Outline: Options that only apply to downloads are rejected
+    When I run the command line with "--ingest-archive reports.zip <option>"
+    Then the command line should be rejected mentioning "<rejected>"
+
+    Examples:
+      | option              | rejected    |
+      | --stream            | --stream    |
+      | --run-dir run       | --run-dir   |
+      | --columnar          | --columnar  |
+      | --queue-dir queue   | --queue-dir |
@@ -0,0 +1,21 @@
+Feature: Benchmark Suite
+  As a maintainer of the ICANN Reports Downloader
+  I want to benchmark the pipeline on synthetic reports
+  So that I can catch performance regressions without depending on icann.org
+
+  Scenario: Generate synthetic reports with a title row header
+    Given I have a synthetic report generator for "com" using the "title_rows" header variant
+    When I generate the synthetic reports
+    Then 3 synthetic report files should be created
+    And the file structure should show 2 header rows
+
+  Scenario: Generate synthetic reports without a TLD column
+    Given I have a synthetic report generator for "net" using the "missing_tld" header variant
+    When I generate the synthetic reports
+    Then the synthetic report headers should not include the TLD field
+
+  Scenario: Run the benchmark against a local server
+    Given I have a synthetic report generator for "com" using the "standard" header variant
+    When I run the benchmark
+    Then the benchmark results should include timings for every stage
+    And the benchmark results should count 30 parsed rows
@@ -0,0 +1,36 @@
+Feature: Columnar Report Files
+  As an analyst re-running reports over years of data
+  I want parsed reports kept in memory-mapped columnar files
+  So that loading them costs page-cache hits instead of CSV parsing
+
+  Scenario: Parsed reports read back from columnar files unchanged
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-03" with noise
+    When I write the parsed reports to a columnar store
+    Then loading every report from the columnar store should give the parsed data
+    And the columnar store should have counted 6 reports "written" and 6 "loaded"
+
+  Scenario: Metric columns are read in place as int64 values
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-01" with noise
+    When I write the parsed reports to a columnar store
+    Then the integer columns of each columnar report should be read-only int64 views
+    And the sums of the integer columns should match the parsed rows
+
+  Scenario: Cells that are not plain integers keep their text
+    Given I write a columnar report with the rows:
+      | registrar-name | IANA-ID | total-domains |
+      | Alpha          | 1       | 10            |
+      | Beta           | 2       |               |
+      | Alpha          | 003     | 7             |
+    Then the columnar report column "total-domains" should be stored as "int64"
+    And the columnar report column "IANA-ID" should be stored as "string"
+    And the columnar report string table should hold each distinct value once
+    And the columnar report should read back the same rows
+    And each row of the columnar report should read back on its own
+
+  Scenario: Files of another format version are refused
+    Given I write a columnar report with the rows:
+      | registrar-name | total-domains |
+      | Alpha          | 10            |
+    When I change the format version of the columnar report to 9
+    Then opening the columnar report should fail with "Unsupported columnar report version 9"
+    And loading the report from its columnar store should give nothing
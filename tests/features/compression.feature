@@ -0,0 +1,26 @@
+Feature: Compressed Raw Reports
+  As an operator keeping years of raw reports
+  I want reports stored gzip or xz compressed and parsed straight from the compressed stream
+  So that the archive takes less disk space without temporary files
+
+  Scenario Outline: Parse a compressed report
+    Given I have a synthetic "title_rows" report compressed with "<compression>"
+    When I process the compressed report and its uncompressed original
+    Then both should produce the same rows
+    And the processed data should be keyed by the uncompressed file name
+    And the compressed report should be smaller than the original
+
+    Examples:
+      | compression |
+      | gzip        |
+      | xz          |
+
+  Scenario: Compress the same report to the same bytes
+    Given I have a synthetic "standard" report compressed with "gzip"
+    When I compress the original report again
+    Then both compressed files should be identical
+
+  Scenario: Keep downloads compressed
+    Given I have a local server with a synthetic report to download
+    When I download the report with "xz" compression
+    Then the downloaded report should be stored as "com-transactions-202401-en.csv.xz"
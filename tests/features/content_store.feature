@@ -0,0 +1,49 @@
+Feature: Content-Addressed Report Store
+  As an operator running several checkouts on one host
+  I want raw reports stored once by their SHA-256 hash
+  So that identical downloads share disk space and are downloaded only once
+
+  Scenario: Store identical payloads once
+    Given I have an empty content store
+    When I store two report files with identical contents as "a.csv" and "b.csv"
+    Then the content store should hold 1 object
+    And "a.csv" and "b.csv" should map to the same hash
+
+  Scenario: Link a stored report into a working directory
+    Given I have an empty content store
+    And I have stored a report file as "com-transactions-202401-en.csv"
+    When I link "com-transactions-202401-en.csv" into a working directory
+    Then the linked file should match the stored report
+
+  Scenario: Detect a corrupt object on read
+    Given I have an empty content store
+    And I have stored a report file as "com-transactions-202401-en.csv"
+    When the stored object for "com-transactions-202401-en.csv" is corrupted
+    And I read "com-transactions-202401-en.csv" back from the content store
+    Then the read should be refused
+    And 1 integrity failure should have been recorded
+
+  Scenario: Write index entries out in batches
+    Given I have an empty content store that writes its index every 2 entries
+    When I store report files as "a.csv", "b.csv" and "c.csv"
+    Then the index on disk should list "a.csv, b.csv"
+    And "c.csv" should be found in the content store
+    When I flush the content store
+    Then the index on disk should list "a.csv, b.csv, c.csv"
+
+  Scenario: Share a download between two checkouts
+    Given I have an empty content store
+    And I have a local report server with one report
+    When two checkouts download the report through the content store
+    Then the second checkout should have linked the report from the store
+    And both checkouts should have the same report contents
+
+  Scenario: A corrupt stored object is downloaded again instead of linked
+    Given I have an empty content store
+    And I have a local report server with one report
+    When the first checkout downloads the report through the content store
+    And the stored object for "com-transactions-202401-en.csv" is corrupted
+    And the second checkout downloads the report through the content store
+    Then the second checkout should have downloaded the report again
+    And the second checkout should have the served report contents
+    And 1 integrity failure should have been recorded
@@ -0,0 +1,32 @@
+Feature: Adaptive Download Concurrency
+  As an operator of the ICANN Reports Downloader
+  I want the number of in-flight downloads to adapt to the server
+  So that backfills run fast without triggering ICANN rate limiting
+
+  Scenario: Grow the limit additively while downloads are healthy
+    Given I have a concurrency limiter starting at 2 with limits 1 to 10
+    When 10 downloads complete successfully
+    Then the concurrency limit should be greater than 2
+    And the concurrency limit should be at most 10
+
+  Scenario: Cut the limit multiplicatively when throttled
+    Given I have a concurrency limiter starting at 8 with limits 1 to 10
+    When a download is throttled
+    Then the concurrency limit should be 4
+    When another download is throttled within the cooldown
+    Then the concurrency limit should be 4
+
+  Scenario: Never cut the limit below the minimum
+    Given I have a concurrency limiter starting at 2 with limits 2 to 10 and no cooldown
+    When 3 downloads are throttled
+    Then the concurrency limit should be 2
+
+  Scenario Outline: Classify download errors
+    Given a download failed with HTTP status <status>
+    Then the error should count as throttling: <throttling>
+
+    Examples:
+      | status | throttling |
+      | 429    | yes        |
+      | 503    | yes        |
+      | 404    | no         |
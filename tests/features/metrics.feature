@@ -0,0 +1,26 @@
+Feature: Pipeline Metrics
+  As an operator of the ICANN Reports Downloader
+  I want the pipeline to record throughput, latency and cache metrics
+  So that I can alert on throughput drops and retry storms
+
+  Scenario: Export counters, gauges and histograms as a Prometheus textfile
+    Given I have a metrics registry
+    When I record 3 downloads totalling 1500 bytes
+    And I record a "parse" stage duration of 2.5 seconds
+    And I write the metrics as a Prometheus textfile
+    Then the textfile should contain the line "icann_reports_bytes_downloaded_total 1500"
+    And the textfile should contain the line "icann_reports_http_request_duration_seconds_count 3"
+    And the textfile should contain the line "icann_reports_stage_duration_seconds{stage="parse"} 2.5"
+
+  Scenario: Summarise cache hit rates in the JSON run summary
+    Given I have a metrics registry
+    When I record 3 cache hits and 1 cache miss for the "processed_files" cache
+    And I write the metrics JSON summary
+    Then the JSON summary should report a hit rate of 0.75 for the "processed_files" cache
+
+  Scenario: Record parse metrics while processing a CSV file
+    Given I have a metrics registry
+    And I have a CSV file with 4 data rows to process with metrics
+    When I process the CSV file with metrics
+    Then the "rows_parsed_total" counter should be 4
+    And the "files_parsed_total" counter should be 1
@@ -0,0 +1,31 @@
+Feature: Stage Profiling
+  As an operator of the ICANN Reports Downloader
+  I want to capture profiles and memory snapshots per pipeline stage
+  So that I can diagnose slow or memory-hungry runs without code changes
+
+  Scenario: Capture cProfile statistics for a stage and its worker tasks
+    Given I have a stage profiler with profiling enabled
+    When I run a "parse" stage with tasks in worker threads
+    And I write the profiling reports
+    Then a profile and a summary should be written for the "parse" stage
+    And the "parse" summary should mention the worker task function
+
+  Scenario: Worker tasks that cannot start their own profile are reported
+    Given I have a stage profiler with profiling enabled
+    And only one profiler can be active at a time
+    When I run a "parse" stage with tasks in worker threads
+    And I write the profiling reports
+    Then 4 "parse" tasks should have been counted as not profiled separately
+    And the "parse" summary should mention the tasks not profiled separately
+
+  Scenario: Capture memory snapshots for a stage
+    Given I have a stage profiler with memory tracing enabled
+    When I run a "validate" stage that allocates memory
+    And I write the profiling reports
+    Then a memory snapshot and a summary should be written for the "validate" stage
+
+  Scenario: Disabled profiler writes nothing
+    Given I have a stage profiler with nothing enabled
+    When I run a "report" stage that allocates memory
+    And I write the profiling reports
+    Then no profiling reports should be written
@@ -0,0 +1,38 @@
+Feature: Report Queries
+  As an analyst answering questions about registrars
+  I want indexed queries over the parsed reports
+  So that a point query reads a registrar's rows instead of the whole dataset
+
+  Background:
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-03" with noise
+    And the parsed reports are in an indexed columnar store
+
+  Scenario: A registrar query reads only the registrar's rows
+    When I query the "new_additions" of one registrar on "net" since "2024-02"
+    Then the query should return 2 records, one per month
+    And the query figures should match the registrar's parsed rows
+
+  Scenario: Grouping sums the figures of every row in the group
+    When I query all figures grouped by "month"
+    Then the query should return 3 records, one per month
+    And each month's figures should be the sum over both TLDs
+
+  Scenario: Raw metric columns can be queried
+    When I query the "Net-adds-1-yr" of one registrar on "com" since "2024-01"
+    Then the query should return 3 records, one per month
+
+  Scenario: Query results are written as CSV or JSON
+    When I query all figures grouped by "tld"
+    Then the query results written as "csv" should read back the same records
+    And the query results written as "json" should read back the same records
+
+  Scenario: Unknown metrics are rejected
+    Then querying the metric "Not-a-metric" should fail
+
+  Scenario: The index is brought up to date incrementally
+    When I update the query index again
+    Then the query index should have indexed 0 reports
+    When I rewrite one report in the columnar store without the first registrar
+    And I update the query index again
+    Then the query index should have indexed 1 reports
+    And the first registrar should no longer be indexed for the rewritten report
@@ -0,0 +1,71 @@
+Feature: Registrar Dictionary
+  As a maintainer processing years of monthly reports
+  I want registrars and their repeated strings shared across all reports
+  So that rows do not each carry their own copies and summaries hash less
+
+  Scenario: Every IANA ID gets one small code in order of appearance
+    Given I have an empty registrar dictionary
+    When I encode the registrars:
+      | iana_id | name             | month   |
+      | 146     | GoDaddy.com, LLC | 2024-01 |
+      | 292     | MarkMonitor Inc. | 2024-01 |
+      | 146     | GoDaddy.com, LLC | 2024-02 |
+    Then the registrar codes should be "0, 1, 0"
+    And the registrar dictionary should hold 2 registrars
+
+  Scenario: Renamed registrars keep their name history whatever the order of reports
+    Given I have an empty registrar dictionary
+    When I encode the registrars:
+      | iana_id | name                  | month   |
+      | 146     | GoDaddy.com, LLC      | 2024-03 |
+      | 146     | Go Daddy Software     | 2019-06 |
+      | 146     | GoDaddy.com, LLC      | 2020-01 |
+      | 146     | Go Daddy Software     | 2018-02 |
+    Then the canonical name of registrar "146" should be "GoDaddy.com, LLC"
+    And the name history of registrar "146" should be:
+      | name              | first_seen | last_seen |
+      | Go Daddy Software | 2018-02    | 2019-06   |
+      | GoDaddy.com, LLC  | 2020-01    | 2024-03   |
+
+  Scenario: Parsed reports share one copy of each registrar string
+    Given I have an empty registrar dictionary
+    And I have synthetic reports for "com" from "2024-01" to "2024-02" parsed with that dictionary
+    Then the registrar names of the same IANA ID should be the same object in every report
+    And the registrar dictionary should hold a registrar for each IANA ID in the reports
+    And the registrar summary keys should be the same object on every call
+
+  Scenario: The registrar summary is unchanged by the shared keys
+    Given I have an empty registrar dictionary
+    And I have synthetic reports for "com" from "2024-01" to "2024-02" parsed with that dictionary
+    Then each registrar summary key should combine the registrar name and IANA ID
+
+  Scenario: Registrars are found by ID, by any of their names and by name prefix
+    Given I have an empty registrar dictionary
+    When I encode the registrars:
+      | iana_id | name                  | month   |
+      | 146     | Go Daddy Software     | 2018-02 |
+      | 146     | GoDaddy.com, LLC      | 2024-03 |
+      | 292     | MarkMonitor Inc.      | 2024-03 |
+      | 1068    | NameCheap, Inc.       | 2024-03 |
+      | 9999    | Godaddy Imitator Ltd. | 2024-03 |
+    Then finding registrar ID "292" should give "292"
+    And finding registrar ID "12345" should give nothing
+    And finding registrar name "Go Daddy Software" should give "146"
+    And finding registrar name "go daddy software" should give nothing
+    And finding registrar name prefix "go daddy" should give "146, 9999"
+    And finding registrar name prefix "GoDaddy.com" should give "146"
+    And finding registrar name prefix "name" should give "1068"
+
+  Scenario: A renamed registrar stays under its IANA ID in the registrar ID summary
+    Given I have an empty registrar dictionary
+    And I have registrar reports with the rows:
+      | month  | iana_id | name              | total |
+      | 202301 | 146     | Go Daddy Software | 100   |
+      | 202402 | 146     | GoDaddy.com, LLC  | 120   |
+      | 202401 | 146     | GoDaddy.com, LLC  | 110   |
+      | 202402 | 292     | MarkMonitor Inc.  | 50    |
+    Then the registrar summary should have 3 registrars
+    And the registrar ID summary should have the registrars "146, 292"
+    And registrar "146" of the registrar ID summary should be named "GoDaddy.com, LLC" with 2 names
+    And registrar "146" of the registrar ID summary should have 120 domains in "COM"
+    And the aggregated registrar ID summary should equal the registrar ID summary
@@ -0,0 +1,36 @@
+Feature: Offline Record and Replay
+  As a developer testing on an air-gapped machine
+  I want recorded report responses served from a local replay server
+  So that the download, concurrency and retry paths can be tested without icann.org
+
+  Scenario: Record responses while downloading
+    Given I have a local report server with 2 monthly reports
+    When I download 3 months from it while recording fixtures
+    Then the fixtures should hold 2 recorded reports
+    And the fixtures should hold 1 recorded "404" response
+
+  Scenario: Replay recorded responses
+    Given I have recorded fixtures for 3 monthly "com" reports
+    When I download the reports from a replay server
+    Then every replayed report should match its recording
+
+  Scenario: Inject the same faults on every run
+    Given I have a fault injector with rates "503=0.5" and seed 7
+    Then it should choose the same faults as another injector with the same seed
+
+  Scenario: Recover from injected server errors
+    Given I have recorded fixtures for 3 monthly "com" reports
+    When I download the reports from a replay server injecting "503=0.3" faults with seed 4
+    Then every replayed report should match its recording
+    And the download retries should match the injected faults
+
+  Scenario: Slow responses with latency and a bandwidth cap
+    Given I have recorded fixtures for 1 monthly "com" reports
+    When I download the reports from a replay server with 0.2 seconds latency and 20000 bytes per second
+    Then the download should have taken at least the latency plus the transfer time
+
+  Scenario: Time out on a stalled response
+    Given I have recorded fixtures for 1 monthly "com" reports
+    When I download the reports from a replay server that stalls every response
+    Then no replayed report should have been downloaded
+    And a timeout error should have been recorded
@@ -0,0 +1,80 @@
+Feature: Report Cache
+  As an analyst regenerating reports on a schedule
+  I want reports generated from unchanged inputs to be reused
+  So that report generation only runs when the data changed
+
+  Scenario: Unchanged inputs reuse the cached reports
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-02" with noise
+    And a report generator with a report cache
+    When I generate all reports with the report cache
+    And I generate all reports with the report cache again
+    Then the report cache should have counted 1 "miss" and 1 "hit"
+    And both runs should have produced the same reports
+    And the second run should not have rewritten the reports
+
+  Scenario: Changed inputs generate the reports again
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-02" with noise
+    And a report generator with a report cache
+    When I generate all reports with the report cache
+    And I change the content hash of one input report
+    And I generate all reports with the report cache again
+    Then the report cache should have counted 2 "miss" and 0 "hit"
+
+  Scenario: A rerun without the rows of processed reports reuses the cached reports
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-02" with noise
+    And a report generator with a report cache
+    When I generate all reports with the report cache
+    And I generate all reports with the report cache from processed reports without rows
+    Then the report cache should have counted 1 "miss" and 1 "hit"
+    And both runs should have produced the same reports
+
+  Scenario: Reports built without the rows of processed reports do not replace existing ones
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-02" with noise
+    And a report generator with a report cache
+    When I generate all reports with the report cache
+    And I change the content hash of one input report
+    And I generate all reports with the report cache from processed reports without rows
+    Then the report cache should have counted 2 "miss" and 0 "hit"
+    And both runs should have produced the same reports
+    And the second run should not have rewritten the reports
+    And the report cache should hold 1 entry
+
+  Scenario: A month published after a previous run reaches the reports
+    Given the "com" reports from "2024-01" to "2024-02" are served locally
+    When a pipeline run over the served reports from "2024-01" to "2024-02" generates the reports
+    And the "com" report of "2024-03" is published
+    And a pipeline run over the served reports from "2024-01" to "2024-03" generates the reports
+    Then the pipeline TLD summary should cover "202401", "202402" and "202403"
+
+  Scenario: Reports are kept when processed reports are no longer on disk
+    Given the "com" reports from "2024-01" to "2024-02" are served locally
+    When a pipeline run over the served reports from "2024-01" to "2024-02" generates the reports
+    And the "com" report of "2024-03" is published
+    And I delete the reports downloaded by the pipeline
+    And a pipeline run over the served reports from "2024-01" to "2024-03" generates the reports
+    Then the pipeline TLD summary should cover "202401" and "202402"
+
+  Scenario: Deleted report files are restored from the cache
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-01" with noise
+    And a report generator with a report cache
+    When I generate all reports with the report cache
+    And I delete the generated reports
+    And I generate all reports with the report cache again
+    Then the report cache should have counted 1 "miss" and 1 "hit"
+    And both runs should have produced the same reports
+
+  Scenario: Cache entries with missing files are dropped
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-01" with noise
+    And a report generator with a report cache
+    When I generate all reports with the report cache
+    And I delete a cached report file
+    And I generate all reports with the report cache again
+    Then the report cache should have counted 2 "miss" and 0 "hit"
+
+  Scenario: The least recently used entries are evicted beyond the size limit
+    Given a report cache holding at most 3500 bytes
+    When I cache reports of 1000 bytes under "first", "second" and "third"
+    And I look up the cached reports of "first"
+    And I cache reports of 1000 bytes under "fourth"
+    Then the report cache should hold "first", "third" and "fourth"
+    And the report cache should have counted 1 eviction(s)
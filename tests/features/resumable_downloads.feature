@@ -0,0 +1,26 @@
+Feature: Resumable Downloads
+  As an operator backfilling historical reports over a flaky link
+  I want interrupted downloads to resume from the bytes already received
+  So that retries do not transfer the same data again
+
+  Scenario: Resume an interrupted download with a range request
+    Given I have a report server that cuts off the first response for each file halfway
+    When I download the report with retries
+    Then the downloaded report should match the served report
+    And the download should have been resumed 1 time
+    And no partial download files should remain
+    And the bytes downloaded should equal the report size
+
+  Scenario: Restart the download when the server does not support ranges
+    Given I have a report server without range support that cuts off the first response for each file halfway
+    When I download the report with retries
+    Then the downloaded report should match the served report
+    And the download should have been restarted 1 time
+    And no partial download files should remain
+
+  Scenario: Discard a partial download that cannot be validated
+    Given I have a report server that cuts off the first response for each file halfway
+    And a partial download of the report exists without validators
+    When I download the report with retries
+    Then the downloaded report should match the served report
+    And the download should have been resumed 1 time
@@ -0,0 +1,45 @@
+Feature: Download Retry Scheduling
+  As an operator of the ICANN Reports Downloader
+  I want failed downloads retried with jittered backoff from a timer queue
+  So that transient outages do not tie up the worker pool with sleeping threads
+
+  Scenario: Back off exponentially with full jitter
+    Given I have a retry scheduler with a base delay of 2 seconds and a budget of 10 retries
+    Then every backoff delay for attempt 3 should be between 0 and 8 seconds
+
+  Scenario: Honour the Retry-After header
+    Given I have a retry scheduler with a base delay of 2 seconds and a budget of 10 retries
+    When a download fails with HTTP status 429 and Retry-After "7"
+    Then the retry should be scheduled after 7 seconds
+
+  Scenario: Do not retry permanent client errors
+    Given I have a retry scheduler with a base delay of 2 seconds and a budget of 10 retries
+    When a download fails with HTTP status 404 and no Retry-After
+    Then the download should not be retried
+
+  Scenario: Stop retrying when the run's retry budget is spent
+    Given I have a retry scheduler with a base delay of 2 seconds and a budget of 2 retries
+    When 3 downloads fail with HTTP status 503
+    Then 2 retries should have been granted
+    And the retries dropped for "budget_exhausted" should be 1
+
+  Scenario: Fire parked retries in due order
+    Given I have a retry scheduler with a base delay of 2 seconds and a budget of 10 retries
+    When I park retries "late" after 0.2 seconds and "early" after 0.05 seconds
+    Then the parked retries should fire in the order "early, late"
+
+  Scenario: Cancel parked retries when the scheduler closes
+    Given I have a retry scheduler with a base delay of 2 seconds and a budget of 10 retries
+    When I park a retry after 30 seconds and close the scheduler
+    Then the parked retry should have been cancelled instead of fired
+
+  Scenario: Recover downloads from a flaky server without sleeping workers
+    Given I have a local report server that answers the first request for each file with HTTP 503
+    When I download all of its reports with a single download worker
+    Then every report should have been downloaded
+    And 2 download retries should have been recorded
+
+  Scenario: Give up on downloads whose retry cannot be scheduled
+    Given I have a local report server that answers the first request for each file with HTTP 503
+    When I download all of its reports after the retry scheduler was closed
+    Then every report should have finished without a file
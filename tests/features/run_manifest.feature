@@ -0,0 +1,35 @@
+Feature: Run Manifest
+  As an operator running long backfills
+  I want every run to checkpoint the progress of each report
+  So that an interrupted run resumes where it stopped
+
+  Scenario: Resume the plan and report states of an interrupted run
+    Given a run was planned with 4 report URLs
+    And the first report was downloaded and the second was parsed with 5 rows
+    When the run is resumed from its directory
+    Then the resumed run should have the same 4 report URLs
+    And the first report should be in the "downloaded" stage
+    And the second report should be in the "parsed" stage
+    And the other reports should be in the "planned" stage
+    And the spilled rows of the second report should load with 5 rows
+
+  Scenario: Ignore a journal entry cut short by a crash
+    Given a run was planned with 4 report URLs
+    And the first report was downloaded and the second was parsed with 5 rows
+    And the journal ends with a partly written entry
+    When the run is resumed from its directory
+    Then the second report should be in the "parsed" stage
+
+  Scenario: Mark parsed reports as aggregated
+    Given a run was planned with 4 report URLs
+    And the first report was downloaded and the second was parsed with 5 rows
+    When the parsed reports are marked as aggregated
+    And the run is resumed from its directory
+    Then the second report should be in the "aggregated" stage
+    And the spilled rows of the second report should load with 5 rows
+    And the run summary should count 1 "downloaded", 1 "aggregated" and 2 "planned" reports
+
+  Scenario: A new plan is ignored when resuming
+    Given a run was planned with 4 report URLs
+    When the run is resumed from its directory with a plan of 2 other URLs
+    Then the resumed run should have the same 4 report URLs
@@ -0,0 +1,36 @@
+Feature: Makespan-Aware Scheduling
+  As an operator running backfills and interactive refreshes
+  I want downloads and parsing ordered by size or by month
+  So that backfills finish close to the ideal time and fresh data arrives early
+
+  Scenario: Order downloads largest first using sizes from earlier runs
+    Given earlier runs left "com" reports of 100, 4000 and 900 bytes in the data directory
+    And a "com" report for "202404" that no earlier run downloaded
+    When I order the report URLs with the "largest-first" strategy
+    Then the URLs should be ordered by month "202402, 202403, 202404, 202401"
+    And 3 size estimates should have come from "data_dir"
+    And 1 size estimate should have come from "estimated"
+
+  Scenario: Order downloads largest first using sizes from the content store
+    Given earlier runs stored "com" reports of 100, 4000 and 900 bytes in the content store
+    When I order the stored report URLs with the "largest-first" strategy
+    Then the URLs should be ordered by month "202402, 202403, 202401"
+    And 3 size estimates should have come from "content_store"
+    And the content store index should have been loaded once
+
+  Scenario: Probe unknown sizes with HEAD requests
+    Given a report server with "com" reports of 100, 4000 and 900 bytes
+    When I order the served report URLs largest first with size probing
+    Then the URLs should be ordered by month "202402, 202403, 202401"
+    And 3 size estimates should have come from "head"
+
+  Scenario: Order downloads and parsing newest month first
+    Given earlier runs left "com" reports of 100, 4000 and 900 bytes in the data directory
+    When I order the report URLs with the "newest-first" strategy
+    Then the URLs should be ordered by month "202403, 202402, 202401"
+    And the downloaded files should be parsed in month order "202403, 202402, 202401"
+
+  Scenario: Parse the largest downloaded files first
+    Given earlier runs left "com" reports of 100, 4000 and 900 bytes in the data directory
+    When I order the downloaded files with the "largest-first" strategy
+    Then the downloaded files should be parsed in month order "202402, 202403, 202401"
@@ -0,0 +1,39 @@
+Feature: Resident Service
+  As an operator keeping reports current
+  I want a resident service that polls for newly published months
+  So that new data reaches the reports without reprocessing everything
+
+  Background:
+    Given a local report server publishing "com" and "net" reports from "2024-01" to "2024-02"
+    And a report service polling "com" and "net" from "2024-01"
+
+  Scenario: The first poll applies every published month
+    When the service polls up to "2024-03"
+    Then the service poll should have checked 6 reports and applied 4
+    And the service reports should equal the summaries of every published report
+
+  Scenario: Newly published months are applied incrementally
+    When the service polls up to "2024-03"
+    And the server publishes the "2024-03" reports
+    And the service polls up to "2024-03"
+    Then the service poll should have checked 2 reports and applied 2
+    And the service reports should equal the summaries of every published report
+
+  Scenario: A restarted service resumes without processing anything again
+    When the service polls up to "2024-02"
+    And I restart the report service
+    And the service polls up to "2024-02"
+    Then the service poll should have checked 0 reports and applied 0
+    And the restarted service should have parsed no rows
+    And the service reports should equal the summaries of every published report
+
+  Scenario: Each poll retries unavailable reports with a fresh retry budget
+    Given the report service may retry 2 downloads per poll
+    When the server answers the first request for each "2024-02" report with HTTP 503
+    And the service polls up to "2024-02"
+    And the server publishes the "2024-03" reports
+    And the server answers the first request for each "2024-03" report with HTTP 503
+    And the service polls up to "2024-03"
+    Then the service poll should have checked 2 reports and applied 2
+    And the service should have retried 4 downloads
+    And the service reports should equal the summaries of every published report
@@ -0,0 +1,36 @@
+Feature: SQLite Export
+  As a downstream team running ad-hoc SQL
+  I want parsed rows and summaries loaded into indexed SQLite tables
+  So that I can join and filter them without parsing JSON reports
+
+  Background:
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-02" with noise
+    And an empty SQLite database
+
+  Scenario: Parsed rows are loaded into normalized tables
+    When I export the parsed reports to SQLite
+    Then the export should have loaded 4 reports and skipped 0
+    And the files table should list every parsed report
+    And monthly_metrics should hold every parsed row
+    And every registrar should be in the registrars table
+
+  Scenario: TLD summaries match the report generator
+    When I export the parsed reports to SQLite
+    Then the tld_monthly_summary table should match the monthly data of the TLD summary
+
+  Scenario: Loading is incremental per report
+    When I export the parsed reports to SQLite
+    And I export the parsed reports to SQLite again
+    Then the export should have loaded 0 reports and skipped 4
+    When I export one report with a row removed
+    Then the export should have loaded 1 reports and skipped 0
+    And monthly_metrics should hold one row fewer than was parsed
+
+  Scenario: Registrar lookups use an index
+    When I export the parsed reports to SQLite
+    Then looking up a registrar's monthly metrics should use the index "monthly_metrics_registrar"
+
+  Scenario: Streamed reports are exported with their content hashes
+    Given the "com" reports from "2024-01" to "2024-02" are served locally
+    When a streaming pipeline run over the served reports from "2024-01" to "2024-02" exports them to SQLite
+    Then the files table should hold the content hash of every served report
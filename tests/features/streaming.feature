@@ -0,0 +1,45 @@
+Feature: Streaming Mode
+  As an operator running multi-year backfills on small workers
+  I want parsed reports validated and aggregated as they arrive
+  So that memory does not grow with the number of reports in the run
+
+  Scenario: Streaming gives the same results as processing all data at once
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-04" with noise
+    When I stream the parsed reports one at a time into a sink
+    Then the streamed validation results should equal validating all data at once
+    And the streamed TLD summary should equal the TLD summary of all data
+    And the sink should have streamed 8 reports
+
+  Scenario: Reports streamed from several threads are all counted
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-04" with noise
+    When I stream the parsed reports from 4 threads into a sink
+    Then the streamed validation results should equal validating all data at once
+    And the streamed TLD summary should equal the TLD summary of all data
+    And the sink should have streamed 8 reports
+
+  Scenario: Streamed reports equal the reports generated from all data at once
+    Given I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-04" with noise
+    When I stream the parsed reports newest first into a sink writing reports with the "python" backend
+    And I generate all reports from the parsed reports newest first with the "python" backend
+    Then every streamed report should equal the report generated from all data at once
+
+  Scenario: Streamed reports equal the generated ones with the NumPy backend
+    Given NumPy is installed
+    And I have parsed synthetic reports for "com" and "net" from "2024-01" to "2024-04" with noise
+    When I stream the parsed reports newest first into a sink writing reports with the "numpy" backend
+    And I generate all reports from the parsed reports newest first with the "numpy" backend
+    Then every streamed report should equal the report generated from all data at once
+
+  Scenario: A streaming rerun still covers the reports processed by earlier runs
+    Given the "com" reports from "2024-01" to "2024-02" are served locally
+    When a streaming pipeline run over the served reports from "2024-01" to "2024-02" writes the reports
+    And a streaming pipeline run over the served reports from "2024-01" to "2024-02" writes the reports
+    Then the pipeline TLD summary should cover "202401" and "202402"
+
+  Scenario: A streaming rerun keeps the reports when processed reports are gone
+    Given the "com" reports from "2024-01" to "2024-02" are served locally
+    When a streaming pipeline run over the served reports from "2024-01" to "2024-02" writes the reports
+    And the "com" report of "2024-03" is published
+    And I delete the reports downloaded by the pipeline
+    And a streaming pipeline run over the served reports from "2024-01" to "2024-03" writes the reports
+    Then the pipeline TLD summary should cover "202401" and "202402"
@@ -0,0 +1,17 @@
+Feature: Pipeline Trace Timeline
+  As a maintainer of the ICANN Reports Downloader
+  I want a Chrome trace of concurrent pipeline activity
+  So that I can see idle threads, retry waits and stragglers in Perfetto
+
+  Scenario: Record spans from worker threads
+    Given I have an enabled trace recorder
+    When I record a "parse" span for 3 files in worker threads
+    And I write the trace to a file
+    Then the trace file should contain 3 complete "parse" events
+    And each "parse" event should be tagged with a file name, process ID and thread ID
+    And the trace should name the worker threads
+
+  Scenario: Disabled trace recorder records nothing
+    Given I have a disabled trace recorder
+    When I record a "parse" span for 3 files in worker threads
+    Then the trace recorder should have no events
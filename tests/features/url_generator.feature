@@ -21,4 +21,19 @@ Feature: URL Generator
   Scenario: Parse date from filename
     Given I have a filename "com-transactions-202401-en.csv"
     When I parse the date from the filename
-    Then I should get the date "2024-01"
\ No newline at end of file
+    Then I should get the date "2024-01"
+
+  Scenario: Interleave URLs across TLDs
+    Given I have a TLD configuration for "com" from "2024-01" to "2024-03"
+    And I have a TLD configuration for "net" from "2024-01" to "2024-01"
+    And I have a TLD configuration for "org" from "2024-02" to "2024-03"
+    When I generate the interleaved URLs
+    Then the URLs should be for the TLDs "com, net, org, com, org, com" in that order
+
+  Scenario: Load TLDs with their own date ranges from a manifest
+    Given I have a TLD manifest listing "com" and "net" from "2023-11" to "2023-12"
+    When I load the manifest with a default range from "2024-01" to "2024-02"
+    And I generate the interleaved URLs
+    Then 2 URLs should be for the "com" TLD
+    And 2 URLs should be for the "net" TLD
+    And the "net" URLs should include the months "202311" and "202312"
@@ -0,0 +1,38 @@
+Feature: Distributed Work Queue
+  As an operator refreshing the full portfolio history
+  I want several workers to share the reports through a lease-based queue
+  So that a run scales beyond one host and survives workers dying
+
+  Scenario: Several worker processes share a queue
+    Given a shared work queue with 12 report URLs
+    When 4 worker processes work through the queue
+    Then every task in the queue should be finished
+    And each task should have been claimed exactly once
+
+  Scenario: Tasks leased by a live worker are not claimed again
+    Given a shared work queue with 3 report URLs and leases of 30 seconds
+    When worker "a" claims 1 task
+    And worker "b" claims 3 tasks
+    Then worker "b" should hold 2 leases
+
+  Scenario: Tasks of a dead worker are claimed again after their leases expire
+    Given a shared work queue with 3 report URLs and leases of 0.2 seconds
+    When worker "a" claims 1 task
+    And 0.3 seconds pass
+    And worker "b" claims 3 tasks
+    Then worker "b" should hold 3 leases
+    And 1 lease should have been taken over after expiring
+
+  Scenario: Renewed leases are kept while the work runs
+    Given a shared work queue with 3 report URLs and leases of 0.3 seconds
+    When worker "a" claims 1 task and keeps it alive for 0.6 seconds
+    And worker "b" claims 3 tasks
+    Then worker "b" should hold 2 leases
+
+  Scenario: Every batch of a worker retries downloads with the run's scheduler
+    Given a local report server whose 2024-02 report first answers with HTTP 503
+    And a shared work queue of its reports from 2024-01 to 2024-02
+    When this worker processes the queue one report per batch with one retry scheduler
+    Then every task in the queue should be finished
+    And every queued report should have been parsed
+    And the shared retry scheduler should have granted 1 retry
@@ -0,0 +1,107 @@
+import os
+import tempfile
+from behave import given, when, then
+
+from icann_reports.processor.aggregation import ReportAggregator
+
+
+def report_rows(month_index):
+    """Build the rows of a monthly report; totals grow by 100 each month."""
+    return [
+        {
+            "TLD": "COM",
+            "Registrar-name": "Example Registrar",
+            "IANA-ID": "123",
+            "Total-domains": str(100 * month_index),
+            "Net-adds-1-yr": str(10 * month_index),
+            "Transfer-gaining-successful": "5",
+            "Deleted-domains-grace": "1",
+        },
+        {
+            "TLD": "COM",
+            "Registrar-name": "Another Registrar",
+            "IANA-ID": str(400 + month_index),
+            "Total-domains": "1000",
+            "Net-renews-1-yr": "20",
+        },
+    ]
+
+
+def parse_months(months):
+    """Split a comma-separated list of months."""
+    return [month.strip() for month in months.split(",")]
+
+
+@given('I have processed reports for the months "{months}"')
+def step_have_monthly_reports(context, months):
+    """Build processed data for each month."""
+    context.monthly_data = {
+        f"com-transactions-{month}-en.csv": report_rows(index)
+        for index, month in enumerate(parse_months(months), start=1)
+    }
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.partials_dir = temp_dir.name
+
+
+def data_for(context, months):
+    """Get the processed reports of some months."""
+    return {
+        file_name: rows
+        for file_name, rows in context.monthly_data.items()
+        if any(f"-{month}-" in file_name for month in parse_months(months))
+    }
+
+
+@when(
+    'one worker aggregates the months "{first_months}" and another the month '
+    '"{second_months}"'
+)
+def step_workers_aggregate(context, first_months, second_months):
+    """Aggregate two sets of months and save them as partials."""
+    context.partial_paths = []
+    for worker, months in (("worker-1", first_months), ("worker-2", second_months)):
+        aggregator = ReportAggregator()
+        aggregator.add(data_for(context, months))
+        path = os.path.join(context.partials_dir, f"{worker}.json")
+        aggregator.save(path)
+        context.partial_paths.append(path)
+
+
+def merge(context, paths):
+    """Merge saved partial aggregates."""
+    context.merged = ReportAggregator()
+    for path in paths:
+        context.merged.merge(ReportAggregator.load(path))
+
+
+@when("I merge the saved partial aggregates")
+def step_merge_partials(context):
+    """Merge the partials in the order they were saved."""
+    merge(context, context.partial_paths)
+
+
+@when("I merge the saved partial aggregates in reverse order")
+def step_merge_partials_reversed(context):
+    """Merge the partials in reverse order."""
+    merge(context, reversed(context.partial_paths))
+
+
+@then("the merged summaries should equal the summaries of a single aggregate")
+def step_check_merged_equals_single(context):
+    """Compare the merged summaries with aggregating every report at once."""
+    single = ReportAggregator()
+    single.add(context.monthly_data)
+    assert context.merged.registrar_summary() == single.registrar_summary()
+    assert (
+        context.merged.tld_summary() == single.tld_summary()
+    ), f"Expected {single.tld_summary()}, got {context.merged.tld_summary()}"
+
+
+@then('the registrar "{name}" should have {count:d} total domains in "{tld}"')
+def step_check_registrar_total(context, name, count, tld):
+    """Check a registrar's total domains in the merged summary."""
+    summary = context.merged.registrar_summary()
+    entry = next(value for value in summary.values() if value["name"] == name)
+    actual = entry["tlds"][tld]["total_domains"]
+    assert actual == count, f"Expected {count} total domains, got {actual}"
@@ -0,0 +1,107 @@
+import json
+import tempfile
+from behave import given, when, then
+
+from icann_reports.processor import vectorized
+from icann_reports.processor.reports import ReportGenerator
+
+
+@given("NumPy is installed")
+def step_numpy_installed(context):
+    """Skip the scenario when NumPy is not installed."""
+    if not vectorized.NUMPY_AVAILABLE:
+        context.scenario.skip("NumPy is not installed")
+
+
+@given("NumPy is not importable")
+def step_numpy_not_importable(context):
+    """Make the vectorized backend look unavailable for this scenario."""
+    available = vectorized.NUMPY_AVAILABLE
+    vectorized.NUMPY_AVAILABLE = False
+    context.add_cleanup(setattr, vectorized, "NUMPY_AVAILABLE", available)
+
+
+@given("the parsed reports also have rows with missing, blank and invalid cells")
+def step_add_edge_rows(context):
+    """Add rows the parser can produce from damaged reports."""
+    context.parsed_data["com-transactions-202404-en.csv"] = [
+        {
+            "TLD": "com",
+            "Registrar-name": "Renamed Registrar",
+            "IANA-ID": "1000",
+            "Total-domains": "-",
+        },
+        {"TLD": "com", "IANA-ID": "", "Net-adds-1-yr": " 3 ", "Net-adds-2-yr": "abc"},
+        {
+            "TLD": "com",
+            "Registrar-name": "No ID",
+            "Total-domains": "7",
+            "Deleted-domains-grace": "1_000",
+        },
+    ]
+    context.parsed_data["notes.csv"] = [
+        {"TLD": "xyz", "Total-domains": "5", "IANA-ID": "42"}
+    ]
+
+
+@given("the parsed reports also have a row with {count:d} domains")
+def step_add_large_row(context, count):
+    """Add a row with a value that does not fit in int64."""
+    context.parsed_data["com-transactions-202402-en.csv"] = [
+        {
+            "TLD": "com",
+            "Registrar-name": "Huge",
+            "IANA-ID": "7",
+            "Total-domains": str(count),
+        }
+    ]
+
+
+def report_generator(context, backend):
+    """Create a report generator with a backend."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    return ReportGenerator(data_dir=temp_dir.name, backend=backend)
+
+
+@then(
+    'every summary of the "{backend}" backend should equal the summary of the '
+    '"{reference}" backend'
+)
+def step_compare_backends(context, backend, reference):
+    """Compare the summaries, including key order, of two backends."""
+    generator = report_generator(context, backend)
+    reference_generator = report_generator(context, reference)
+    assert generator.backend == backend
+    for method in (
+        "generate_summary_by_registrar",
+        "generate_summary_by_registrar_id",
+        "generate_summary_by_tld",
+    ):
+        summary = getattr(generator, method)(context.parsed_data)
+        expected = getattr(reference_generator, method)(context.parsed_data)
+        assert json.dumps(summary) == json.dumps(expected), method
+
+
+@when('I create a report generator with the "{backend}" backend')
+def step_create_report_generator(context, backend):
+    """Create a report generator, keeping any error."""
+    context.generator_error = None
+    try:
+        context.report_generator = report_generator(context, backend)
+    except ValueError as e:
+        context.generator_error = e
+
+
+@then('the report generator should use the "{backend}" backend')
+def step_check_backend(context, backend):
+    """Check the backend the report generator resolved."""
+    assert context.report_generator.backend == backend, context.report_generator.backend
+
+
+@then('creating the report generator should fail with "{message}"')
+def step_check_backend_error(context, message):
+    """Check the error of an unknown backend."""
+    assert context.generator_error is not None and message in str(
+        context.generator_error
+    )
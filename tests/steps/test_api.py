@@ -0,0 +1,179 @@
+import gzip
+import json
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from behave import given, when, then
+
+from icann_reports.api import ReportAPI, ReportAPIServer
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+def api_request(context, path, headers=None):
+    """Request a path from the report API, keeping the status, headers and body."""
+    request = urllib.request.Request(
+        context.api_server.url + path, headers=headers or {}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            status, response_headers, body = (
+                response.status,
+                response.headers,
+                response.read(),
+            )
+    except urllib.error.HTTPError as e:
+        status, response_headers, body = e.code, e.headers, e.read()
+    context.api_response = {"status": status, "headers": response_headers, "body": body}
+    return context.api_response
+
+
+def generate_reports(context, until=None):
+    """Generate the reports from the parsed reports up to a month."""
+    data = {
+        file_name: rows
+        for file_name, rows in context.parsed_data.items()
+        if not until or URLGenerator.parse_filename_date(file_name) <= until
+    }
+    context.api_reports = context.api_report_generator.generate_all_reports(data)
+
+
+def load_report(context, report_name):
+    """Load a generated report."""
+    with open(context.api_reports[report_name], "r") as f:
+        return json.load(f)
+
+
+def answer(context):
+    """Decode the body of the last answer."""
+    return json.loads(context.api_response["body"])
+
+
+@given('reports generated from the parsed reports up to "{month}"')
+def step_reports_generated_up_to(context, month):
+    """Generate the reports from the parsed reports up to a month."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.api_report_generator = ReportGenerator(
+        data_dir=temp_dir.name, backend="python"
+    )
+    generate_reports(context, month)
+
+
+@given("a report API serving the generated reports")
+def step_report_api(context):
+    """Serve the generated reports on a free port."""
+    context.api_metrics = MetricsRegistry()
+    api = ReportAPI(
+        context.api_report_generator.reports_dir,
+        gzip_min_bytes=512,
+        metrics=context.api_metrics,
+    )
+    context.api_server = ReportAPIServer(api, port=0).start()
+    context.add_cleanup(context.api_server.stop)
+
+
+@when('I request "{path}" from the report API')
+def step_api_request(context, path):
+    """Request a path from the report API."""
+    api_request(context, path)
+
+
+@when('I request "{path}" from the report API again with its ETag')
+def step_api_request_with_etag(context, path):
+    """Request a path again, sending the ETag of the last answer."""
+    api_request(
+        context, path, {"If-None-Match": context.api_response["headers"]["ETag"]}
+    )
+
+
+@when("I request the first registrar from the report API")
+def step_api_request_first_registrar(context):
+    """Request the first registrar of the registrar summary by IANA ID."""
+    iana_id = next(iter(load_report(context, "registrar_id_summary")))
+    api_request(context, f"/registrars/{iana_id}")
+
+
+@when('I request "{path}" from the report API with and without gzip')
+def step_api_request_gzip(context, path):
+    """Request a path with and without Accept-Encoding: gzip."""
+    context.api_plain = api_request(context, path)
+    context.api_gzip = api_request(context, path, {"Accept-Encoding": "gzip, deflate"})
+
+
+@when("I regenerate the reports from every parsed report")
+def step_regenerate_reports(context):
+    """Write the reports again, now from every parsed report."""
+    # Let the rewritten files get a different modification time
+    time.sleep(0.01)
+    generate_reports(context)
+
+
+@then("the report API should answer {status:d}")
+def step_check_api_status(context, status):
+    """Check the status of the last answer."""
+    assert context.api_response["status"] == status, context.api_response
+
+
+@then("the report API should answer 304 with no body")
+def step_check_api_not_modified(context):
+    """Check the last answer was 304 Not Modified."""
+    assert context.api_response["status"] == 304, context.api_response
+    assert context.api_response["body"] == b""
+
+
+@then(
+    "the answer should be page {page:d} of the registrar summary with {per_page:d} "
+    "registrars per page"
+)
+def step_check_registrar_page(context, page, per_page):
+    """Compare the answer with a slice of the registrar summary."""
+    registrars = list(load_report(context, "registrar_id_summary").values())
+    result = answer(context)
+    assert result["total"] == len(registrars)
+    assert result["page"] == page and result["per_page"] == per_page
+    assert result["pages"] == -(-len(registrars) // per_page)
+    assert result["items"] == registrars[(page - 1) * per_page : page * per_page]
+
+
+@then("the answer should equal the first registrar of the registrar summary")
+def step_check_first_registrar(context):
+    """Compare the answer with the first registrar of the registrar summary."""
+    assert answer(context) == next(
+        iter(load_report(context, "registrar_id_summary").values())
+    )
+
+
+@then('the answer should list the "{tld}" months from "{since}" of the TLD summary')
+def step_check_timeseries(context, tld, since):
+    """Compare the answer with the monthly data of the TLD summary."""
+    tld_summary = {
+        key.lower(): summary
+        for key, summary in load_report(context, "tld_summary").items()
+    }
+    expected = [
+        {"month": f"{key[:4]}-{key[4:]}", **figures}
+        for key, figures in sorted(tld_summary[tld]["monthly_data"].items())
+        if f"{key[:4]}-{key[4:]}" >= since
+    ]
+    result = answer(context)
+    assert result["tld"] == tld
+    assert result["items"] == expected, result["items"]
+
+
+@then("the gzip answer should decompress to the plain answer")
+def step_check_gzip_answer(context):
+    """Check the gzip answer is the compressed plain answer."""
+    assert context.api_plain["headers"].get("Content-Encoding") is None
+    assert context.api_gzip["headers"]["Content-Encoding"] == "gzip"
+    assert len(context.api_gzip["body"]) < len(context.api_plain["body"])
+    assert gzip.decompress(context.api_gzip["body"]) == context.api_plain["body"]
+    assert context.api_gzip["headers"]["ETag"] == context.api_plain["headers"]["ETag"]
+
+
+@then("the report API should have loaded the reports {count:d} times")
+def step_check_api_loads(context, count):
+    """Check how often the report API loaded the report files."""
+    assert context.api_metrics.get_counter("api_report_loads_total") == count
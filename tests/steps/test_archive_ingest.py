@@ -0,0 +1,158 @@
+import contextlib
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import zipfile
+from unittest import mock
+from behave import given, when, then
+
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.main import parse_arguments
+from icann_reports.processor.archive import ArchiveIngestor
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.compression import compress_file
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+def build_archive(context, archive_format, compress_members):
+    """Generate reports and bundle them into an archive."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(context.temp_dir.cleanup)
+    site_dir = os.path.join(context.temp_dir.name, "site")
+    files = SyntheticReportGenerator(
+        tlds=["com"],
+        start_date="2024-01",
+        end_date="2024-03",
+        registrar_count=20,
+        seed=21,
+    ).generate(site_dir)["files"]
+    if compress_members:
+        files = [compress_file(path, "gzip") for path in files]
+    readme = os.path.join(site_dir, "README.txt")
+    with open(readme, "w") as f:
+        f.write("Monthly transaction reports\n")
+    files.append(readme)
+
+    archive_dir = os.path.join(context.temp_dir.name, "archives")
+    os.makedirs(archive_dir)
+    context.archive_dir = archive_dir
+    context.archive_path = os.path.join(archive_dir, f"reports.{archive_format}")
+    if archive_format == "zip":
+        with zipfile.ZipFile(
+            context.archive_path, "w", zipfile.ZIP_DEFLATED
+        ) as archive:
+            for path in files:
+                archive.write(path, os.path.relpath(path, site_dir))
+    else:
+        mode = "w:gz" if archive_format == "tar.gz" else "w"
+        with tarfile.open(context.archive_path, mode) as archive:
+            for path in files:
+                archive.add(path, os.path.relpath(path, site_dir))
+    context.cache_file = os.path.join(context.temp_dir.name, "cache.json")
+
+
+@given(
+    'I have a "{archive_format}" archive of 3 synthetic monthly reports and a readme'
+)
+def step_have_report_archive(context, archive_format):
+    """Build an archive of plain reports."""
+    build_archive(context, archive_format, compress_members=False)
+
+
+@given(
+    'I have a "{archive_format}" archive of 3 gzip compressed synthetic monthly reports'
+)
+def step_have_compressed_report_archive(context, archive_format):
+    """Build an archive of gzip compressed reports."""
+    build_archive(context, archive_format, compress_members=True)
+
+
+def ingest(context):
+    """Ingest the archive with a cache in the temporary directory."""
+    context.metrics = MetricsRegistry()
+    processor = CSVProcessor(
+        cache_manager=CacheManager(cache_file=context.cache_file),
+        metrics=context.metrics,
+    )
+    ingestor = ArchiveIngestor(processor, max_workers=2, metrics=context.metrics)
+    context.ingested = ingestor.ingest(context.archive_path)
+
+
+@when("I ingest the archive")
+def step_ingest_archive(context):
+    """Ingest the archive."""
+    ingest(context)
+
+
+@when("I ingest the archive again with the same cache")
+def step_ingest_archive_again(context):
+    """Ingest the archive a second time."""
+    ingest(context)
+
+
+@then("{count:d} reports should have been ingested")
+def step_check_ingested_count(context, count):
+    """Check the number of ingested reports."""
+    assert (
+        len(context.ingested) == count
+    ), f"Expected {count} reports, got {sorted(context.ingested)}"
+    for name in context.ingested:
+        assert name.endswith("-en.csv"), f"Unexpected report name {name}"
+
+
+@then("each ingested report should have {rows:d} rows")
+def step_check_ingested_rows(context, rows):
+    """Check the rows of every ingested report."""
+    for name, data in context.ingested.items():
+        assert len(data) == rows, f"{name} has {len(data)} rows, expected {rows}"
+        assert data[0].get("Registrar-name"), f"{name} rows have no registrar name"
+
+
+@then("no files should have been extracted next to the archive")
+def step_check_no_extraction(context):
+    """Check that the archive directory only holds the archive."""
+    assert os.listdir(context.archive_dir) == [
+        os.path.basename(context.archive_path)
+    ], f"Unexpected files {os.listdir(context.archive_dir)}"
+
+
+@then("{count:d} archive members should have been skipped as already processed")
+def step_check_skipped_members(context, count):
+    """Check the skipped member counter."""
+    skipped = context.metrics.get_counter(
+        "archive_members_total", result="already_processed"
+    )
+    assert skipped == count, f"Expected {count} skipped members, got {skipped}"
+
+
+@when('I run the command line with "{arguments}"')
+def step_run_command_line(context, arguments):
+    """Parse command line arguments, capturing a rejection."""
+    context.command_line_error = None
+    stderr = io.StringIO()
+    with (
+        mock.patch.object(sys, "argv", ["main.py", *arguments.split()]),
+        contextlib.redirect_stderr(stderr),
+    ):
+        try:
+            parse_arguments()
+        except SystemExit as e:
+            context.command_line_error = (e.code, stderr.getvalue())
+
+
+@then("the command line should be accepted")
+def step_check_command_line_accepted(context):
+    """Check the arguments were parsed without a usage error."""
+    assert context.command_line_error is None, context.command_line_error
+
+
+@then('the command line should be rejected mentioning "{option}"')
+def step_check_command_line_rejected(context, option):
+    """Check the arguments were rejected with a usage error naming an option."""
+    assert context.command_line_error, "The command line was accepted"
+    code, message = context.command_line_error
+    assert code == 2, f"Exited with {code}"
+    assert option in message.split("combined with")[-1], message
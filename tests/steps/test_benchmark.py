@@ -0,0 +1,80 @@
+import csv
+import tempfile
+from behave import given, when, then
+
+from icann_reports.benchmark.runner import BenchmarkRunner, STAGES
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.utils.file_structure import FileStructureAnalyzer
+
+
+@given(
+    'I have a synthetic report generator for "{tld}" using the "{variant}" header '
+    "variant"
+)
+def step_have_synthetic_generator(context, tld, variant):
+    """Create a small synthetic report generator."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    context.generator = SyntheticReportGenerator(
+        tlds=[tld],
+        start_date="2024-01",
+        end_date="2024-03",
+        registrar_count=10,
+        header_variants=[variant],
+        seed=42,
+    )
+
+
+@when("I generate the synthetic reports")
+def step_generate_synthetic_reports(context):
+    """Generate the synthetic reports into the temporary directory."""
+    context.generated = context.generator.generate(context.temp_dir.name)
+
+
+@when("I run the benchmark")
+def step_run_benchmark(context):
+    """Run the benchmark once with a small worker pool."""
+    runner = BenchmarkRunner(context.generator, max_workers=2, repeat=1)
+    context.benchmark_results = runner.run()
+
+
+@then("{count:d} synthetic report files should be created")
+def step_check_synthetic_file_count(context, count):
+    """Check the number of generated report files."""
+    assert (
+        context.generated["file_count"] == count
+    ), f"Expected {count} files, got {context.generated['file_count']}"
+    assert context.generated["bytes"] > 0, "No bytes were written"
+
+
+@then("the file structure should show {header_rows:d} header rows")
+def step_check_synthetic_header_rows(context, header_rows):
+    """Check that structure detection finds the title rows."""
+    analyzer = FileStructureAnalyzer()
+    structure = analyzer.detect_file_structure(context.generated["files"][0])
+    assert (
+        structure["header_rows"] == header_rows
+    ), f"Expected {header_rows} header rows, got {structure['header_rows']}"
+
+
+@then("the synthetic report headers should not include the TLD field")
+def step_check_synthetic_missing_tld(context):
+    """Check that the header row has no TLD column."""
+    with open(context.generated["files"][0], newline="") as f:
+        header = next(csv.reader(f))
+    assert "TLD" not in header, "TLD field found in header"
+    assert "Registrar-name" in header, "Registrar-name field missing from header"
+
+
+@then("the benchmark results should include timings for every stage")
+def step_check_benchmark_stages(context):
+    """Check that every pipeline stage was timed."""
+    for stage in STAGES:
+        assert stage in context.benchmark_results["stages"], f"Missing stage {stage}"
+        assert context.benchmark_results["stages"][stage]["seconds"]["median"] >= 0
+
+
+@then("the benchmark results should count {rows:d} parsed rows")
+def step_check_benchmark_rows(context, rows):
+    """Check the number of parsed rows recorded by the benchmark."""
+    parsed_rows = context.benchmark_results["stages"]["parse"]["rows"]
+    assert parsed_rows == rows, f"Expected {rows} parsed rows, got {parsed_rows}"
@@ -0,0 +1,176 @@
+import json
+import os
+import struct
+import tempfile
+from behave import given, when, then
+
+from icann_reports.utils.columnar import (
+    ColumnarReport,
+    ColumnarStore,
+    INT64_EMPTY,
+    write_columnar,
+)
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+def temp_directory(context) -> str:
+    """Create a temporary directory removed after the scenario."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    return temp_dir.name
+
+
+@when("I write the parsed reports to a columnar store")
+def step_write_columnar_store(context):
+    """Write every parsed report to a columnar store."""
+    context.columnar_metrics = MetricsRegistry()
+    context.columnar_store = ColumnarStore(
+        temp_directory(context), metrics=context.columnar_metrics
+    )
+    context.columnar_store.write(context.parsed_data)
+
+
+@then("loading every report from the columnar store should give the parsed data")
+def step_check_columnar_round_trip(context):
+    """Load every stored report and compare it with the parsed rows."""
+    assert context.columnar_store.file_names() == sorted(context.parsed_data)
+    loaded = {}
+    for file_name in context.columnar_store.file_names():
+        loaded.update(context.columnar_store.load(file_name))
+    assert loaded == context.parsed_data, "Columnar reports differ from the parsed data"
+
+
+@then(
+    'the columnar store should have counted {written:d} reports "written" and '
+    '{loaded:d} "loaded"'
+)
+def step_check_columnar_metrics(context, written, loaded):
+    """Check the columnar report counters."""
+    metrics = context.columnar_metrics
+    assert metrics.get_counter("columnar_reports_total", result="written") == written
+    assert metrics.get_counter("columnar_reports_total", result="loaded") == loaded
+
+
+@then("the integer columns of each columnar report should be read-only int64 views")
+def step_check_int64_views(context):
+    """Check that integer columns are memoryviews over the mapped file."""
+    for file_name in context.columnar_store.file_names():
+        with context.columnar_store.open(file_name) as report:
+            int_columns = [
+                name
+                for name, column in report.columns.items()
+                if column["type"] == "int64"
+            ]
+            assert "IANA-ID" in int_columns, int_columns
+            for name in int_columns:
+                column = report.column(name)
+                assert (
+                    column.format == "q"
+                    and column.readonly
+                    and len(column) == report.row_count
+                )
+                column.release()
+
+
+@then("the sums of the integer columns should match the parsed rows")
+def step_check_column_sums(context):
+    """Sum integer columns in place and compare with the parsed rows."""
+    for file_name, rows in context.parsed_data.items():
+        with context.columnar_store.open(file_name) as report:
+            for name, column in report.columns.items():
+                if column["type"] != "int64":
+                    continue
+                values = report.column(name)
+                total = sum(value for value in values if value != INT64_EMPTY)
+                values.release()
+                assert total == sum(int(row[name]) for row in rows if row.get(name)), (
+                    file_name,
+                    name,
+                )
+
+
+@given("I write a columnar report with the rows:")
+def step_write_columnar_report(context):
+    """Write the table rows as a columnar report."""
+    context.columnar_rows = [dict(row.items()) for row in context.table]
+    context.columnar_path = os.path.join(
+        temp_directory(context), "com-transactions-202401-en.csv.icr"
+    )
+    write_columnar(
+        context.columnar_path, "com-transactions-202401-en.csv", context.columnar_rows
+    )
+
+
+@then('the columnar report column "{column_name}" should be stored as "{column_type}"')
+def step_check_column_type(context, column_name, column_type):
+    """Check the stored type of a column."""
+    with ColumnarReport(context.columnar_path) as report:
+        assert report.columns[column_name]["type"] == column_type, report.columns[
+            column_name
+        ]
+
+
+@then("the columnar report string table should hold each distinct value once")
+def step_check_string_table(context):
+    """Check that string values are dictionary encoded."""
+    with ColumnarReport(context.columnar_path) as report:
+        table = report.string_table()
+    assert len(table) == len(set(table)), table
+    assert table.count("Alpha") == 1, table
+
+
+@then("the columnar report should read back the same rows")
+def step_check_columnar_rows(context):
+    """Read the rows back and compare them with the written ones."""
+    with ColumnarReport(context.columnar_path) as report:
+        assert list(report.rows()) == context.columnar_rows
+
+
+@then("each row of the columnar report should read back on its own")
+def step_check_columnar_single_rows(context):
+    """Read every row by position, without decoding whole columns."""
+    with ColumnarReport(context.columnar_path) as report:
+        assert [
+            report.row(index) for index in range(report.row_count)
+        ] == context.columnar_rows
+        try:
+            report.row(report.row_count)
+        except IndexError:
+            pass
+        else:
+            raise AssertionError("Reading past the last row did not fail")
+
+
+@when("I change the format version of the columnar report to {version:d}")
+def step_change_columnar_version(context, version):
+    """Rewrite the header of the columnar report with another version."""
+    with open(context.columnar_path, "r+b") as f:
+        magic, header_size = struct.unpack("<4sI", f.read(8))
+        header = json.loads(f.read(header_size))
+        # Keep the header the same length so the data sections do not move
+        encoded = json.dumps(
+            {**header, "version": version}, separators=(",", ":")
+        ).encode("utf-8")
+        assert len(encoded) == header_size
+        f.seek(8)
+        f.write(encoded)
+
+
+@then('opening the columnar report should fail with "{message}"')
+def step_check_columnar_open_fails(context, message):
+    """Check that the columnar report cannot be opened."""
+    try:
+        ColumnarReport(context.columnar_path)
+    except ValueError as e:
+        assert message in str(e), str(e)
+    else:
+        raise AssertionError("Opening the columnar report should have failed")
+
+
+@then("loading the report from its columnar store should give nothing")
+def step_check_columnar_load_fails(context):
+    """Check that a store skips a report it cannot read."""
+    metrics = MetricsRegistry()
+    store = ColumnarStore(os.path.dirname(context.columnar_path), metrics=metrics)
+    assert store.load("com-transactions-202401-en.csv") is None
+    assert metrics.get_counter("columnar_reports_total", result="failed") == 1
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+from behave import given, when, then
+
+from icann_reports.benchmark.local_server import LocalReportServer
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.csv_downloader import CSVDownloader
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.compression import compress_file
+
+
+def generate_report(context, variant):
+    """Generate one synthetic report into a temporary directory."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(context.temp_dir.cleanup)
+    site_dir = os.path.join(context.temp_dir.name, "site")
+    generated = SyntheticReportGenerator(
+        tlds=["com"],
+        start_date="2024-01",
+        end_date="2024-01",
+        registrar_count=200,
+        header_variants=[variant],
+        seed=11,
+    ).generate(site_dir)
+    return site_dir, generated["files"][0]
+
+
+@given('I have a synthetic "{variant}" report compressed with "{compression}"')
+def step_have_compressed_report(context, variant, compression):
+    """Keep an uncompressed copy and compress the report."""
+    _, report_path = generate_report(context, variant)
+    plain_dir = os.path.join(context.temp_dir.name, "plain")
+    os.makedirs(plain_dir)
+    context.plain_path = shutil.copy(report_path, plain_dir)
+    context.compression = compression
+    context.compressed_path = compress_file(report_path, compression)
+
+
+@given("I have a local server with a synthetic report to download")
+def step_have_server_with_report(context):
+    """Serve one synthetic report."""
+    site_dir, _ = generate_report(context, "standard")
+    server = LocalReportServer(site_dir).start()
+    context.add_cleanup(server.stop)
+    context.report_url = server.base_url.replace("{tld}", "com").replace(
+        "{date}", "202401"
+    )
+
+
+@when("I process the compressed report and its uncompressed original")
+def step_process_both_reports(context):
+    """Parse both files with separate processors."""
+    context.parsed = []
+    for index, path in enumerate([context.compressed_path, context.plain_path]):
+        cache_file = os.path.join(context.temp_dir.name, f"cache-{index}.json")
+        processor = CSVProcessor(cache_manager=CacheManager(cache_file=cache_file))
+        context.parsed.append(processor.process_csv((path, False)))
+
+
+@when("I compress the original report again")
+def step_compress_again(context):
+    """Compress the uncompressed copy with the same compression."""
+    context.recompressed_path = compress_file(context.plain_path, context.compression)
+
+
+@when('I download the report with "{compression}" compression')
+def step_download_compressed(context, compression):
+    """Download the report, keeping it compressed."""
+    data_dir = os.path.join(context.temp_dir.name, "downloads")
+    os.makedirs(data_dir)
+    downloader = CSVDownloader(
+        data_dir=data_dir,
+        cache_manager=CacheManager(
+            cache_file=os.path.join(context.temp_dir.name, "cache.json")
+        ),
+        compression=compression,
+    )
+    context.downloaded_path, _ = downloader.download_csv(context.report_url)
+    context.download_dir = data_dir
+
+
+@then("both should produce the same rows")
+def step_check_same_rows(context):
+    """Compare the rows parsed from both files."""
+    compressed, plain = context.parsed
+    assert compressed and plain, "A report failed to parse"
+    assert list(compressed.values()) == list(plain.values()), "Parsed rows differ"
+    assert len(next(iter(plain.values()))) == 200, "Unexpected row count"
+
+
+@then("the processed data should be keyed by the uncompressed file name")
+def step_check_processed_key(context):
+    """Check the key of the parsed data."""
+    compressed, _ = context.parsed
+    assert list(compressed) == [
+        os.path.basename(context.plain_path)
+    ], f"Unexpected key {list(compressed)}"
+
+
+@then("the compressed report should be smaller than the original")
+def step_check_compressed_size(context):
+    """Compare file sizes."""
+    assert (
+        os.path.getsize(context.compressed_path)
+        < os.path.getsize(context.plain_path) / 2
+    ), "Compressed report is not much smaller"
+
+
+@then("both compressed files should be identical")
+def step_check_identical_compression(context):
+    """Compare the bytes of the two compressed files."""
+    with (
+        open(context.compressed_path, "rb") as f,
+        open(context.recompressed_path, "rb") as g,
+    ):
+        assert f.read() == g.read(), "Compressed files differ"
+
+
+@then('the downloaded report should be stored as "{file_name}"')
+def step_check_stored_name(context, file_name):
+    """Check the name of the stored download."""
+    assert context.downloaded_path == os.path.join(
+        context.download_dir, file_name
+    ), f"Stored as {context.downloaded_path}"
+    assert os.listdir(context.download_dir) == [
+        file_name
+    ], f"Unexpected files {os.listdir(context.download_dir)}"
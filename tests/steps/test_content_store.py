@@ -0,0 +1,259 @@
+import json
+import os
+import stat
+import tempfile
+from behave import given, when, then
+
+from icann_reports.benchmark.local_server import LocalReportServer
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.csv_downloader import CSVDownloader
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.content_store import ContentStore
+from icann_reports.utils.metrics import MetricsRegistry
+
+REPORT_CONTENT = b"TLD,Registrar-name,IANA-ID\ncom,Example Registrar,1234\n"
+
+
+def write_file(path, content):
+    """Write bytes to a file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+@given("I have an empty content store")
+def step_have_empty_content_store(context):
+    """Create a content store in a temporary directory."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(context.temp_dir.cleanup)
+    context.metrics = MetricsRegistry()
+    context.store = ContentStore(
+        os.path.join(context.temp_dir.name, "store"), metrics=context.metrics
+    )
+
+
+@given("I have an empty content store that writes its index every {count:d} entries")
+def step_have_batching_content_store(context, count):
+    """Create a content store with a small index batch."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(context.temp_dir.cleanup)
+    context.metrics = MetricsRegistry()
+    context.store = ContentStore(
+        os.path.join(context.temp_dir.name, "store"),
+        metrics=context.metrics,
+        index_batch_size=count,
+    )
+
+
+@given('I have stored a report file as "{name}"')
+def step_have_stored_report(context, name):
+    """Store a small report under a name."""
+    path = write_file(
+        os.path.join(context.temp_dir.name, "incoming", name), REPORT_CONTENT
+    )
+    context.store.put(name, path)
+
+
+@given("I have a local report server with one report")
+def step_have_single_report_server(context):
+    """Serve one synthetic report."""
+    site_dir = os.path.join(context.temp_dir.name, "site")
+    SyntheticReportGenerator(
+        tlds=["com"],
+        start_date="2024-01",
+        end_date="2024-01",
+        registrar_count=5,
+        seed=9,
+    ).generate(site_dir)
+    server = LocalReportServer(site_dir).start()
+    context.add_cleanup(server.stop)
+    context.served_report_path = os.path.join(
+        site_dir, "mrr", "com", "com-transactions-202401-en.csv"
+    )
+    context.report_url = server.base_url.replace("{tld}", "com").replace(
+        "{date}", "202401"
+    )
+
+
+@when('I store two report files with identical contents as "{first}" and "{second}"')
+def step_store_identical_reports(context, first, second):
+    """Store the same bytes under two names."""
+    for name in (first, second):
+        path = write_file(
+            os.path.join(context.temp_dir.name, "incoming", name), REPORT_CONTENT
+        )
+        context.store.put(name, path)
+
+
+@when('I link "{name}" into a working directory')
+def step_link_into_working_dir(context, name):
+    """Link a stored report into a fresh directory."""
+    dest_path = os.path.join(context.temp_dir.name, "work", name)
+    context.linked_path = context.store.link_into(name, dest_path)
+
+
+@when('I store report files as "{first}", "{second}" and "{third}"')
+def step_store_three_reports(context, first, second, third):
+    """Store a different small report under each name."""
+    for name in (first, second, third):
+        path = write_file(
+            os.path.join(context.temp_dir.name, "incoming", name),
+            REPORT_CONTENT + name.encode("utf-8"),
+        )
+        context.store.put(name, path)
+
+
+@when("I flush the content store")
+def step_flush_content_store(context):
+    """Write out the pending index entries."""
+    context.store.flush()
+
+
+@when('I read "{name}" back from the content store')
+def step_read_from_store(context, name):
+    """Read a stored report's bytes."""
+    context.read_content = context.store.read_bytes(name)
+
+
+@when('the stored object for "{name}" is corrupted')
+def step_corrupt_stored_object(context, name):
+    """Overwrite the bytes of a stored object."""
+    object_path = context.store.object_path(context.store.lookup(name))
+    os.chmod(object_path, stat.S_IRUSR | stat.S_IWUSR)
+    with open(object_path, "r+b") as f:
+        f.write(b"XXX")
+
+
+def download_in_checkout(context, checkout):
+    """Download the report into a checkout's data directory sharing the store."""
+    root = os.path.join(context.temp_dir.name, checkout)
+    os.makedirs(root)
+    metrics = MetricsRegistry()
+    downloader = CSVDownloader(
+        data_dir=root,
+        cache_manager=CacheManager(cache_file=os.path.join(root, "cache.json")),
+        metrics=metrics,
+        # Store integrity failures are counted for the scenario
+        content_store=ContentStore(context.store.store_dir, metrics=context.metrics),
+    )
+    file_path, _ = downloader.download_csv(context.report_url)
+    # A finished run writes out its index entries
+    downloader.content_store.flush()
+    context.checkouts.append({"path": file_path, "metrics": metrics})
+
+
+@when("two checkouts download the report through the content store")
+def step_two_checkouts_download(context):
+    """Download the same report into two data directories sharing one store."""
+    context.checkouts = []
+    for checkout in ("first", "second"):
+        download_in_checkout(context, checkout)
+
+
+@when("the first checkout downloads the report through the content store")
+def step_first_checkout_downloads(context):
+    """Download the report into a first data directory."""
+    context.checkouts = []
+    download_in_checkout(context, "first")
+
+
+@when("the second checkout downloads the report through the content store")
+def step_second_checkout_downloads(context):
+    """Download the report into a second data directory."""
+    download_in_checkout(context, "second")
+
+
+@then("the content store should hold {count:d} object")
+def step_check_object_count(context, count):
+    """Count the objects in the store."""
+    objects = [
+        name for _, _, files in os.walk(context.store.objects_dir) for name in files
+    ]
+    assert len(objects) == count, f"Expected {count} objects, got {len(objects)}"
+
+
+@then('"{first}" and "{second}" should map to the same hash')
+def step_check_same_hash(context, first, second):
+    """Compare the hashes of two names."""
+    assert context.store.lookup(first) is not None, f"{first} is not stored"
+    assert context.store.lookup(first) == context.store.lookup(second), "Hashes differ"
+
+
+@then("the linked file should match the stored report")
+def step_check_linked_file(context):
+    """Check the contents of the linked file."""
+    assert context.linked_path, "Report was not linked"
+    with open(context.linked_path, "rb") as f:
+        assert f.read() == REPORT_CONTENT, "Linked file differs from the stored report"
+
+
+@then("the read should be refused")
+def step_check_read_refused(context):
+    """Check that a corrupt object was not read."""
+    assert context.read_content is None, "Corrupt object was read"
+
+
+@then('the index on disk should list "{names}"')
+def step_check_index_on_disk(context, names):
+    """Check the names written to index.json."""
+    with open(context.store.index_file) as f:
+        index = json.load(f)
+    expected = [name.strip() for name in names.split(",")]
+    assert sorted(index) == expected, f"Expected {expected}, got {sorted(index)}"
+
+
+@then('"{name}" should be found in the content store')
+def step_check_found_in_store(context, name):
+    """Check that a name is known before the index is written out."""
+    assert context.store.lookup(name) is not None, f"{name} is not found"
+
+
+@then("{count:d} integrity failure should have been recorded")
+def step_check_integrity_failures(context, count):
+    """Check the integrity failure counter."""
+    failures = context.metrics.get_counter("store_integrity_failures_total")
+    assert failures == count, f"Expected {count} integrity failures, got {failures}"
+
+
+@then("the second checkout should have linked the report from the store")
+def step_check_linked_from_store(context):
+    """Check that the second checkout did not download anything."""
+    metrics = context.checkouts[1]["metrics"]
+    assert (
+        metrics.get_counter("downloads_total", result="content_store") == 1
+    ), "Report not linked"
+    assert (
+        metrics.get_counter("bytes_downloaded_total") == 0
+    ), "Report was downloaded again"
+
+
+@then("both checkouts should have the same report contents")
+def step_check_checkouts_match(context):
+    """Compare the report files in both checkouts."""
+    contents = []
+    for checkout in context.checkouts:
+        with open(checkout["path"], "rb") as f:
+            contents.append(f.read())
+    assert (
+        contents[0] and contents[0] == contents[1]
+    ), "Checkouts have different report contents"
+
+
+@then("the second checkout should have downloaded the report again")
+def step_check_downloaded_again(context):
+    """Check that the second checkout did not link the corrupt object."""
+    metrics = context.checkouts[1]["metrics"]
+    assert (
+        metrics.get_counter("downloads_total", result="content_store") == 0
+    ), "Corrupt object was linked"
+    assert metrics.get_counter("bytes_downloaded_total") > 0, "Report not downloaded"
+
+
+@then("the second checkout should have the served report contents")
+def step_check_served_contents(context):
+    """Compare the second checkout's report with the one served."""
+    with open(context.checkouts[1]["path"], "rb") as f:
+        downloaded = f.read()
+    with open(context.served_report_path, "rb") as f:
+        assert downloaded == f.read(), "Report differs from the served one"
@@ -0,0 +1,97 @@
+import urllib.error
+from behave import given, when, then
+
+from icann_reports.downloader.concurrency import AdaptiveConcurrencyLimiter
+from icann_reports.downloader.csv_downloader import CSVDownloader
+
+
+@given(
+    "I have a concurrency limiter starting at {initial:d} with limits {low:d} to "
+    "{high:d}"
+)
+def step_have_concurrency_limiter(context, initial, low, high):
+    """Create a concurrency limiter with the default cooldown."""
+    context.limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=initial, min_limit=low, max_limit=high, cooldown=60
+    )
+
+
+@given(
+    "I have a concurrency limiter starting at {initial:d} with limits {low:d} to "
+    "{high:d} and no cooldown"
+)
+def step_have_concurrency_limiter_no_cooldown(context, initial, low, high):
+    """Create a concurrency limiter that cuts on every throttled download."""
+    context.limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=initial, min_limit=low, max_limit=high, cooldown=0
+    )
+
+
+@given("a download failed with HTTP status {status:d}")
+def step_download_failed_with_status(context, status):
+    """Create an HTTP error with the given status."""
+    context.download_error = urllib.error.HTTPError(
+        "https://example.com/report.csv", status, "Error", None, None
+    )
+
+
+@when("{count:d} downloads complete successfully")
+def step_downloads_succeed(context, count):
+    """Release slots for successful downloads."""
+    for _ in range(count):
+        with context.limiter.slot() as slot:
+            slot.succeeded()
+
+
+@when("{count:d} downloads are throttled")
+def step_downloads_throttled(context, count):
+    """Release slots for throttled downloads."""
+    for _ in range(count):
+        with context.limiter.slot() as slot:
+            slot.throttled()
+
+
+@when("a download is throttled")
+def step_download_throttled(context):
+    """Release a slot for a throttled download."""
+    with context.limiter.slot() as slot:
+        slot.throttled()
+
+
+@when("another download is throttled within the cooldown")
+def step_download_throttled_again(context):
+    """Release another throttled slot straight away."""
+    step_download_throttled(context)
+
+
+@then("the concurrency limit should be greater than {value:d}")
+def step_check_limit_greater(context, value):
+    """Check that the limit grew."""
+    assert (
+        context.limiter.limit > value
+    ), f"Limit {context.limiter.limit} not greater than {value}"
+
+
+@then("the concurrency limit should be at most {value:d}")
+def step_check_limit_at_most(context, value):
+    """Check that the limit stays within its maximum."""
+    assert (
+        context.limiter.limit <= value
+    ), f"Limit {context.limiter.limit} above {value}"
+
+
+@then("the concurrency limit should be {value:d}")
+def step_check_limit(context, value):
+    """Check the exact limit and that no slots are left in flight."""
+    assert (
+        context.limiter.limit == value
+    ), f"Expected limit {value}, got {context.limiter.limit}"
+    assert context.limiter.in_flight == 0, "Slots left in flight"
+
+
+@then("the error should count as throttling: {throttling}")
+def step_check_throttling_error(context, throttling):
+    """Check the throttling classification of an error."""
+    expected = throttling == "yes"
+    actual = CSVDownloader.is_throttling_error(context.download_error)
+    assert actual == expected, f"Expected throttling={expected}, got {actual}"
@@ -0,0 +1,99 @@
+import csv
+import json
+import os
+import tempfile
+from behave import given, when, then
+
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+@given("I have a metrics registry")
+def step_have_metrics_registry(context):
+    """Create an empty metrics registry and a temporary output directory."""
+    context.metrics = MetricsRegistry()
+    context.temp_dir = tempfile.TemporaryDirectory()
+
+
+@given("I have a CSV file with {rows:d} data rows to process with metrics")
+def step_have_csv_for_metrics(context, rows):
+    """Create a CSV file with the given number of data rows."""
+    context.metrics_csv_path = os.path.join(
+        context.temp_dir.name, "com-transactions-202401-en.csv"
+    )
+    with open(context.metrics_csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["TLD", "Registrar-name", "IANA-ID", "Total-domains"])
+        for i in range(rows):
+            writer.writerow(["COM", f"Registrar {i}", str(100 + i), "1000"])
+
+
+@when("I record {count:d} downloads totalling {total:d} bytes")
+def step_record_downloads(context, count, total):
+    """Record download bytes and latencies."""
+    for _ in range(count):
+        context.metrics.inc("bytes_downloaded_total", total // count)
+        context.metrics.observe("http_request_duration_seconds", 0.2)
+
+
+@when('I record a "{stage}" stage duration of {seconds:f} seconds')
+def step_record_stage_duration(context, stage, seconds):
+    """Record a stage duration gauge."""
+    context.metrics.set_gauge("stage_duration_seconds", seconds, stage=stage)
+
+
+@when('I record {hits:d} cache hits and {misses:d} cache miss for the "{cache}" cache')
+def step_record_cache_lookups(context, hits, misses, cache):
+    """Record cache hits and misses."""
+    context.metrics.inc("cache_lookups_total", hits, cache=cache, result="hit")
+    context.metrics.inc("cache_lookups_total", misses, cache=cache, result="miss")
+
+
+@when("I write the metrics as a Prometheus textfile")
+def step_write_prometheus_textfile(context):
+    """Write the registry to a Prometheus textfile."""
+    path = os.path.join(context.temp_dir.name, "icann_reports.prom")
+    context.metrics.write_prometheus_textfile(path)
+    with open(path) as f:
+        context.textfile_lines = f.read().splitlines()
+
+
+@when("I write the metrics JSON summary")
+def step_write_metrics_json(context):
+    """Write the registry as a JSON summary."""
+    path = os.path.join(context.temp_dir.name, "metrics.json")
+    context.metrics.write_json_summary(path)
+    with open(path) as f:
+        context.metrics_summary = json.load(f)
+
+
+@when("I process the CSV file with metrics")
+def step_process_csv_with_metrics(context):
+    """Process the CSV file with a processor recording into the registry."""
+    processor = CSVProcessor(
+        data_dir=context.temp_dir.name,
+        cache_manager=CacheManager(os.path.join(context.temp_dir.name, "cache.json")),
+        metrics=context.metrics,
+    )
+    context.result = processor.process_csv((context.metrics_csv_path, False))
+
+
+@then('the textfile should contain the line "{line}"')
+def step_check_textfile_line(context, line):
+    """Check that the textfile contains an exact line."""
+    assert line in context.textfile_lines, f"Line '{line}' not found in textfile"
+
+
+@then('the JSON summary should report a hit rate of {rate:f} for the "{cache}" cache')
+def step_check_cache_hit_rate(context, rate, cache):
+    """Check the derived cache hit rate."""
+    actual = context.metrics_summary["cache_hit_rates"][cache]
+    assert actual == rate, f"Expected hit rate {rate}, got {actual}"
+
+
+@then('the "{name}" counter should be {value:d}')
+def step_check_counter_value(context, name, value):
+    """Check the total of a counter."""
+    actual = context.metrics.counter_total(name)
+    assert actual == value, f"Expected {name} to be {value}, got {actual}"
@@ -0,0 +1,139 @@
+import cProfile
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from behave import given, when, then
+
+from icann_reports.utils.profiling import StageProfiler
+
+
+def sum_of_squares(count):
+    """Small CPU-bound task to profile."""
+    return sum(i * i for i in range(count))
+
+
+class ProcessWideProfile(cProfile.Profile):
+    """Profile that, like cProfile on Python 3.12+, allows one active at a time."""
+
+    active = None
+    lock = threading.Lock()
+
+    def enable(self, *args, **kwargs):
+        """Start profiling, unless another profile is active."""
+        with ProcessWideProfile.lock:
+            if ProcessWideProfile.active is not None:
+                raise ValueError("Another profiling tool is already active")
+            ProcessWideProfile.active = self
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        """Stop profiling, letting another profile start."""
+        super().disable()
+        with ProcessWideProfile.lock:
+            if ProcessWideProfile.active is self:
+                ProcessWideProfile.active = None
+
+
+def _make_profiler(context, **kwargs):
+    context.temp_dir = tempfile.TemporaryDirectory()
+    context.profiler = StageProfiler(
+        output_dir=context.temp_dir.name, top_n=10, **kwargs
+    )
+
+
+@given("I have a stage profiler with profiling enabled")
+def step_have_profiler_with_profiling(context):
+    """Create a profiler capturing cProfile statistics."""
+    _make_profiler(context, profile=True)
+
+
+@given("I have a stage profiler with memory tracing enabled")
+def step_have_profiler_with_memory(context):
+    """Create a profiler capturing tracemalloc snapshots."""
+    _make_profiler(context, trace_memory=True)
+
+
+@given("I have a stage profiler with nothing enabled")
+def step_have_disabled_profiler(context):
+    """Create a profiler with every capture disabled."""
+    _make_profiler(context)
+
+
+@given("only one profiler can be active at a time")
+def step_one_active_profiler(context):
+    """Make profiles behave as on Python 3.12+, whatever the interpreter."""
+    patcher = mock.patch.object(cProfile, "Profile", ProcessWideProfile)
+    patcher.start()
+    context.add_cleanup(patcher.stop)
+
+
+@when('I run a "{stage}" stage with tasks in worker threads')
+def step_run_stage_with_workers(context, stage):
+    """Run profiled tasks in a thread pool inside a stage."""
+    with context.profiler.stage(stage), ThreadPoolExecutor(max_workers=2) as executor:
+        task = context.profiler.wrap(stage, sum_of_squares)
+        list(executor.map(task, [10000] * 4))
+
+
+@when('I run a "{stage}" stage that allocates memory')
+def step_run_stage_allocating(context, stage):
+    """Run a stage in the current thread that keeps some allocations alive."""
+    with context.profiler.stage(stage):
+        context.allocated = [str(i) * 10 for i in range(10000)]
+
+
+@when("I write the profiling reports")
+def step_write_profiling_reports(context):
+    """Write the captured profiles and snapshots."""
+    context.profiling_output = context.profiler.write_reports()
+
+
+@then('a profile and a summary should be written for the "{stage}" stage')
+def step_check_profile_written(context, stage):
+    """Check that the stage profile files exist."""
+    for suffix in (".prof", ".prof.txt"):
+        path = os.path.join(context.temp_dir.name, f"{stage}{suffix}")
+        assert path in context.profiling_output[stage], f"{path} not reported"
+        assert os.path.isfile(path), f"{path} not written"
+
+
+@then('the "{stage}" summary should mention the worker task function')
+def step_check_profile_mentions_task(context, stage):
+    """Check that work done in the worker threads was captured."""
+    with open(os.path.join(context.temp_dir.name, f"{stage}.prof.txt")) as f:
+        summary = f.read()
+    assert "sum_of_squares" in summary, "Worker task missing from profile summary"
+
+
+@then('{count:d} "{stage}" tasks should have been counted as not profiled separately')
+def step_check_skipped_profiles(context, count, stage):
+    """Check the tasks whose profile could not be started were counted."""
+    skipped = context.profiler.skipped_profiles.get(stage, 0)
+    assert skipped == count, f"Expected {count} skipped profiles, got {skipped}"
+
+
+@then('the "{stage}" summary should mention the tasks not profiled separately')
+def step_check_summary_mentions_skipped(context, stage):
+    """Check the stage summary says some tasks were not profiled separately."""
+    with open(os.path.join(context.temp_dir.name, f"{stage}.prof.txt")) as f:
+        summary = f.read()
+    assert "were not profiled separately" in summary, summary
+
+
+@then('a memory snapshot and a summary should be written for the "{stage}" stage')
+def step_check_memory_written(context, stage):
+    """Check that the stage memory files exist."""
+    for suffix in (".tracemalloc", ".memory.txt"):
+        path = os.path.join(context.temp_dir.name, f"{stage}{suffix}")
+        assert os.path.isfile(path), f"{path} not written"
+    with open(os.path.join(context.temp_dir.name, f"{stage}.memory.txt")) as f:
+        assert "Peak traced memory" in f.read(), "Peak memory missing from summary"
+
+
+@then("no profiling reports should be written")
+def step_check_no_profiling_reports(context):
+    """Check that a disabled profiler writes nothing."""
+    assert context.profiling_output == {}, "Reports were written"
+    assert os.listdir(context.temp_dir.name) == [], "Files were written"
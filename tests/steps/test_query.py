@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import tempfile
+from behave import given, when, then
+
+from icann_reports.processor.query import (
+    QUERY_MEASURES,
+    ReportQuery,
+    write_query_results,
+)
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.utils.columnar import ColumnarStore
+from icann_reports.utils.query_index import QueryIndex
+
+
+@given("the parsed reports are in an indexed columnar store")
+def step_indexed_columnar_store(context):
+    """Write the parsed reports to a columnar store and index it."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.query_store = ColumnarStore(temp_dir.name)
+    context.query_store.write(context.parsed_data)
+    context.query_index = QueryIndex(context.query_store)
+    assert context.query_index.update() == len(context.parsed_data)
+    context.report_query = ReportQuery(context.query_store, context.query_index)
+    first_rows = context.parsed_data[sorted(context.parsed_data)[0]]
+    context.query_iana_id = next(
+        row["IANA-ID"] for row in first_rows if row.get("IANA-ID")
+    )
+
+
+@when('I query the "{metric}" of one registrar on "{tld}" since "{since}"')
+def step_query_registrar(context, metric, tld, since):
+    """Query one figure of one registrar."""
+    context.query_metric = metric
+    context.query_tld = tld
+    context.query_since = since
+    context.query_records = context.report_query.run(
+        iana_ids=[context.query_iana_id], tlds=[tld], since=since, metrics=[metric]
+    )
+
+
+@when('I query all figures grouped by "{group_field}"')
+def step_query_grouped(context, group_field):
+    """Query every figure of every row, grouped by one field."""
+    context.query_records = context.report_query.run(group_by=[group_field])
+
+
+@then("the query should return {count:d} records, one per month")
+def step_check_query_months(context, count):
+    """Check the number of records and that each month appears once."""
+    months = [record["month"] for record in context.query_records]
+    assert len(months) == count and len(set(months)) == count, context.query_records
+
+
+@then("the query figures should match the registrar's parsed rows")
+def step_check_query_figures(context):
+    """Compare the query results with the figures of the parsed rows."""
+    expected = []
+    for file_name in sorted(context.parsed_data):
+        tld, _, date = file_name.split("-")[:3]
+        if tld != context.query_tld or f"{date[:4]}-{date[4:6]}" < context.query_since:
+            continue
+        for row in context.parsed_data[file_name]:
+            if row.get("IANA-ID") == context.query_iana_id:
+                expected.append(
+                    ReportGenerator._registrar_stats(row)[context.query_metric]
+                )
+    assert [
+        record[context.query_metric] for record in context.query_records
+    ] == expected
+    assert all(
+        record["iana_id"] == context.query_iana_id and record["name"]
+        for record in context.query_records
+    )
+
+
+@then("each month's figures should be the sum over both TLDs")
+def step_check_month_sums(context):
+    """Compare each month's figures with the sums over the parsed rows."""
+    for record in context.query_records:
+        date = record["month"].replace("-", "")
+        expected = dict.fromkeys(QUERY_MEASURES, 0)
+        for file_name, rows in context.parsed_data.items():
+            if file_name.split("-")[2] != date:
+                continue
+            for row in rows:
+                for name, value in ReportGenerator._registrar_stats(row).items():
+                    expected[name] += value
+        assert {name: record[name] for name in QUERY_MEASURES} == expected, record
+
+
+@then(
+    'the query results written as "{output_format}" should read back the same records'
+)
+def step_check_query_output(context, output_format):
+    """Write the results and parse them back."""
+    output = io.StringIO()
+    write_query_results(context.query_records, output, output_format)
+    output.seek(0)
+    if output_format == "json":
+        assert json.load(output) == context.query_records
+    else:
+        records = list(csv.DictReader(output))
+        assert records == [
+            {name: str(value) for name, value in record.items()}
+            for record in context.query_records
+        ]
+
+
+@then('querying the metric "{metric}" should fail')
+def step_check_unknown_metric(context, metric):
+    """Check that an unknown metric raises ValueError."""
+    try:
+        context.report_query.run(metrics=[metric])
+    except ValueError as e:
+        assert metric in str(e)
+    else:
+        raise AssertionError("Query with an unknown metric did not fail")
+
+
+@when("I update the query index again")
+def step_update_query_index(context):
+    """Bring the query index up to date."""
+    context.query_indexed = context.query_index.update()
+
+
+@then("the query index should have indexed {count:d} reports")
+def step_check_indexed_count(context, count):
+    """Check how many reports the last update indexed."""
+    assert context.query_indexed == count, context.query_indexed
+
+
+@when("I rewrite one report in the columnar store without the first registrar")
+def step_rewrite_report(context):
+    """Store one report again, leaving out the rows of the queried registrar."""
+    context.rewritten_report = sorted(context.parsed_data)[-1]
+    rows = [
+        row
+        for row in context.parsed_data[context.rewritten_report]
+        if row.get("IANA-ID") != context.query_iana_id
+    ]
+    context.query_store.write({context.rewritten_report: rows})
+
+
+@then("the first registrar should no longer be indexed for the rewritten report")
+def step_check_registrar_dropped(context):
+    """Check the registrar index no longer lists the rewritten report."""
+    registrar = context.query_index.registrar(context.query_iana_id)
+    assert context.rewritten_report not in registrar["reports"]
+    assert len(registrar["reports"]) == len(context.parsed_data) - 1
@@ -0,0 +1,242 @@
+import glob
+import os
+import tempfile
+from behave import given, when, then
+
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.models.registrar_dictionary import RegistrarDictionary
+from icann_reports.processor.aggregation import ReportAggregator
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.utils.cache import CacheManager
+
+
+@given("I have an empty registrar dictionary")
+def step_empty_registrar_dictionary(context):
+    """Create a registrar dictionary separate from the process-wide one."""
+    context.registrar_dictionary = RegistrarDictionary()
+
+
+@when("I encode the registrars:")
+def step_encode_registrars(context):
+    """Encode each registrar of the table."""
+    context.registrar_codes = [
+        context.registrar_dictionary.encode(row["iana_id"], row["name"], row["month"])
+        for row in context.table
+    ]
+
+
+@then('the registrar codes should be "{codes}"')
+def step_check_registrar_codes(context, codes):
+    """Check the codes handed out."""
+    expected = [int(code) for code in codes.split(", ")]
+    assert context.registrar_codes == expected, context.registrar_codes
+
+
+@then("the registrar dictionary should hold {count:d} registrars")
+def step_check_registrar_count(context, count):
+    """Check the number of registrars in the dictionary."""
+    assert len(context.registrar_dictionary.registrars) == count
+
+
+@then('the canonical name of registrar "{iana_id}" should be "{name}"')
+def step_check_canonical_name(context, iana_id, name):
+    """Check the latest name of a registrar."""
+    assert context.registrar_dictionary.canonical_name(iana_id) == name
+
+
+@then('the name history of registrar "{iana_id}" should be:')
+def step_check_name_history(context, iana_id):
+    """Check every name of a registrar with the months it was seen in."""
+    registrar = context.registrar_dictionary.decode(
+        context.registrar_dictionary.code(iana_id)
+    )
+    expected = [dict(row.items()) for row in context.table]
+    assert registrar.name_history() == expected, registrar.name_history()
+
+
+@given(
+    'I have synthetic reports for "{tld}" from "{start_date}" to "{end_date}" parsed '
+    "with that dictionary"
+)
+def step_parse_with_dictionary(context, tld, start_date, end_date):
+    """Generate synthetic reports and parse them through the registrar dictionary."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    SyntheticReportGenerator(
+        tlds=[tld],
+        start_date=start_date,
+        end_date=end_date,
+        registrar_count=20,
+        seed=43,
+    ).generate(temp_dir.name)
+    processor = CSVProcessor(
+        cache_manager=CacheManager(
+            cache_file=os.path.join(temp_dir.name, "cache.json")
+        ),
+        registrar_dictionary=context.registrar_dictionary,
+    )
+    context.parsed_data = {}
+    for path in sorted(
+        glob.glob(os.path.join(temp_dir.name, "**", "*.csv"), recursive=True)
+    ):
+        context.parsed_data.update(processor.process_csv((path, False)))
+    context.report_generator = ReportGenerator(
+        data_dir=temp_dir.name, registrar_dictionary=context.registrar_dictionary
+    )
+
+
+@then(
+    "the registrar names of the same IANA ID should be the same object in every report"
+)
+def step_check_shared_names(context):
+    """Check that rows of different reports share their name strings."""
+    names = {}
+    for rows in context.parsed_data.values():
+        for row in rows:
+            shared = names.setdefault(row["IANA-ID"], row["Registrar-name"])
+            assert shared is row["Registrar-name"], row["IANA-ID"]
+    assert len(context.parsed_data) == 2 and names
+
+
+@then(
+    "the registrar dictionary should hold a registrar for each IANA ID in the reports"
+)
+def step_check_registrars_recorded(context):
+    """Check that parsing recorded every registrar."""
+    iana_ids = {row["IANA-ID"] for rows in context.parsed_data.values() for row in rows}
+    assert {
+        registrar.iana_id for registrar in context.registrar_dictionary.registrars
+    } == iana_ids
+
+
+@then("the registrar summary keys should be the same object on every call")
+def step_check_shared_keys(context):
+    """Check that summaries reuse the keys built for earlier rows."""
+    first = context.report_generator.generate_summary_by_registrar(context.parsed_data)
+    second = context.report_generator.generate_summary_by_registrar(context.parsed_data)
+    for first_key, second_key in zip(sorted(first), sorted(second)):
+        assert first_key is second_key, first_key
+
+
+@then("each registrar summary key should combine the registrar name and IANA ID")
+def step_check_summary_keys(context):
+    """Check the format of the registrar summary keys."""
+    summary = context.report_generator.generate_summary_by_registrar(
+        context.parsed_data
+    )
+    expected = {
+        f"{row['Registrar-name']} (IANA ID: {row['IANA-ID']})"
+        for rows in context.parsed_data.values()
+        for row in rows
+    }
+    assert set(summary) == expected
+    for key, registrar in summary.items():
+        assert key == f"{registrar['name']} (IANA ID: {registrar['iana_id']})"
+
+
+def iana_ids(registrars):
+    """List the IANA IDs of registrars for messages."""
+    return ", ".join(registrar.iana_id for registrar in registrars) or "nothing"
+
+
+@then('finding registrar ID "{iana_id}" should give {expected}')
+def step_check_find_by_id(context, iana_id, expected):
+    """Look a registrar up by IANA ID."""
+    registrar = context.registrar_dictionary.find_by_id(iana_id)
+    assert iana_ids([registrar] if registrar else []) == expected.strip('"'), registrar
+
+
+@then('finding registrar name "{name}" should give {expected}')
+def step_check_find_by_name(context, name, expected):
+    """Look registrars up by exact name."""
+    found = iana_ids(context.registrar_dictionary.find_by_name(name))
+    assert found == expected.strip('"'), found
+
+
+@then('finding registrar name prefix "{prefix}" should give {expected}')
+def step_check_find_by_prefix(context, prefix, expected):
+    """Look registrars up by the start of a name."""
+    found = iana_ids(context.registrar_dictionary.find_by_prefix(prefix))
+    assert found == expected.strip('"'), found
+
+
+@given("I have registrar reports with the rows:")
+def step_registrar_reports(context):
+    """Build parsed reports from the table, one report per month."""
+    context.parsed_data = {}
+    for row in context.table:
+        context.parsed_data.setdefault(
+            f"com-transactions-{row['month']}-en.csv", []
+        ).append(
+            {
+                "TLD": "COM",
+                "Registrar-name": row["name"],
+                "IANA-ID": row["iana_id"],
+                "Total-domains": row["total"],
+            }
+        )
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.report_generator = ReportGenerator(
+        data_dir=temp_dir.name, registrar_dictionary=context.registrar_dictionary
+    )
+
+
+@then("the registrar summary should have {count:d} registrars")
+def step_check_registrar_summary_size(context, count):
+    """Check the number of name and IANA ID keys of the registrar summary."""
+    assert (
+        len(context.report_generator.generate_summary_by_registrar(context.parsed_data))
+        == count
+    )
+
+
+@then('the registrar ID summary should have the registrars "{expected}"')
+def step_check_registrar_id_summary_keys(context, expected):
+    """Check the IANA IDs of the registrar ID summary."""
+    summary = context.report_generator.generate_summary_by_registrar_id(
+        context.parsed_data
+    )
+    assert ", ".join(summary) == expected, list(summary)
+
+
+@then(
+    'registrar "{iana_id}" of the registrar ID summary should be named "{name}" with '
+    "{count:d} names"
+)
+def step_check_registrar_id_names(context, iana_id, name, count):
+    """Check the names attached to a registrar of the registrar ID summary."""
+    registrar = context.report_generator.generate_summary_by_registrar_id(
+        context.parsed_data
+    )[iana_id]
+    assert registrar["name"] == name, registrar["name"]
+    assert len(registrar["names"]) == count, registrar["names"]
+
+
+@then(
+    'registrar "{iana_id}" of the registrar ID summary should have {total:d} domains '
+    'in "{tld}"'
+)
+def step_check_registrar_id_figures(context, iana_id, total, tld):
+    """Check that figures come from the latest month."""
+    registrar = context.report_generator.generate_summary_by_registrar_id(
+        context.parsed_data
+    )[iana_id]
+    assert registrar["tlds"][tld]["total_domains"] == total, registrar["tlds"]
+
+
+@then("the aggregated registrar ID summary should equal the registrar ID summary")
+def step_check_aggregated_registrar_id_summary(context):
+    """Compare the registrar ID summary of merged per-report aggregates."""
+    aggregator = ReportAggregator(context.report_generator)
+    for file_name in reversed(list(context.parsed_data)):
+        partial = ReportAggregator(context.report_generator)
+        partial.add({file_name: context.parsed_data[file_name]})
+        aggregator.merge(partial)
+    expected = context.report_generator.generate_summary_by_registrar_id(
+        context.parsed_data
+    )
+    assert (
+        aggregator.registrar_id_summary() == expected
+    ), aggregator.registrar_id_summary()
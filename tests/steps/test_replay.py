@@ -0,0 +1,264 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from behave import given, when, then
+
+from config import BASE_URL
+from icann_reports.benchmark.local_server import LocalReportServer
+from icann_reports.benchmark.replay import FaultInjector, ReplayServer
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.csv_downloader import CSVDownloader
+from icann_reports.downloader.recorder import ResponseRecorder
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+def make_temp_dir(context):
+    """Create a temporary directory for the scenario."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(context.temp_dir.cleanup)
+    return context.temp_dir.name
+
+
+def generate_reports(root, months):
+    """Generate synthetic "com" reports for the first months of 2024."""
+    return SyntheticReportGenerator(
+        tlds=["com"],
+        start_date="2024-01",
+        end_date=f"2024-{months:02d}",
+        registrar_count=40,
+        seed=13,
+    ).generate(os.path.join(root, "site"))["files"]
+
+
+def month_urls(base_url, months):
+    """Build the report URLs for the first months of 2024."""
+    return URLGenerator().generate_tld_urls(
+        [
+            {
+                "tld": "com",
+                "base_url": base_url,
+                "start_date": "2024-01",
+                "end_date": f"2024-{months:02d}",
+            }
+        ]
+    )
+
+
+def make_downloader(context, **kwargs):
+    """Create a downloader writing to a fresh directory in the scenario's temp dir."""
+    context.metrics = MetricsRegistry()
+    context.download_dir = tempfile.mkdtemp(dir=context.temp_dir.name)
+    return CSVDownloader(
+        data_dir=context.download_dir,
+        cache_manager=CacheManager(
+            cache_file=os.path.join(context.download_dir, "cache.json")
+        ),
+        metrics=context.metrics,
+        **kwargs,
+    )
+
+
+def replay(context, **server_kwargs):
+    """Download every recorded report from a replay server."""
+    server = ReplayServer(context.fixture_dir, **server_kwargs).start()
+    context.add_cleanup(server.stop)
+    downloader = make_downloader(context, retry_delay=0)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        context.replayed = downloader.download_all(
+            month_urls(server.base_url, context.months), executor
+        )
+    downloader.retry_scheduler.close()
+    context.replay_seconds = time.perf_counter() - start
+    context.replay_server = server
+
+
+@given("I have a local report server with {months:d} monthly reports")
+def step_have_local_server_with_reports(context, months):
+    """Serve synthetic reports from a local server."""
+    root = make_temp_dir(context)
+    generate_reports(root, months)
+    server = LocalReportServer(os.path.join(root, "site")).start()
+    context.add_cleanup(server.stop)
+    context.local_server = server
+
+
+@given('I have recorded fixtures for {months:d} monthly "{tld}" reports')
+def step_have_recorded_fixtures(context, months, tld):
+    """Record synthetic reports as if they had been downloaded from icann.org."""
+    root = make_temp_dir(context)
+    context.months = months
+    context.fixture_dir = os.path.join(root, "fixtures")
+    recorder = ResponseRecorder(context.fixture_dir)
+    context.recorded = {}
+    for path, url in zip(generate_reports(root, months), month_urls(BASE_URL, months)):
+        recorder.record(
+            url,
+            200,
+            {
+                "Content-Type": "text/csv",
+                "ETag": f'"{os.path.basename(path)}"',
+                "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+            },
+            path,
+        )
+        with open(path, "rb") as f:
+            context.recorded[os.path.basename(path)] = f.read()
+
+
+@given('I have a fault injector with rates "{rates}" and seed {seed:d}')
+def step_have_fault_injector(context, rates, seed):
+    """Create a fault injector."""
+    context.rates = FaultInjector.parse_rates(rates)
+    context.seed = seed
+    context.injector = FaultInjector(context.rates, seed=seed)
+
+
+@when("I download {months:d} months from it while recording fixtures")
+def step_download_while_recording(context, months):
+    """Download the served reports and one missing month with a recorder."""
+    context.fixture_dir = os.path.join(context.temp_dir.name, "fixtures")
+    downloader = make_downloader(
+        context, recorder=ResponseRecorder(context.fixture_dir)
+    )
+    for url in month_urls(context.local_server.base_url, months):
+        downloader.download_csv(url)
+
+
+@when("I download the reports from a replay server")
+def step_download_from_replay(context):
+    """Replay the fixtures without faults."""
+    replay(context)
+
+
+@when(
+    'I download the reports from a replay server injecting "{rates}" faults with seed '
+    "{seed:d}"
+)
+def step_download_with_faults(context, rates, seed):
+    """Replay the fixtures with injected faults."""
+    replay(context, faults=FaultInjector(FaultInjector.parse_rates(rates), seed=seed))
+
+
+@when(
+    "I download the reports from a replay server with {latency:f} seconds latency and "
+    "{bandwidth:d} bytes per second"
+)
+def step_download_slowly(context, latency, bandwidth):
+    """Replay the fixtures with latency and a bandwidth cap."""
+    context.latency = latency
+    context.bandwidth = bandwidth
+    replay(context, latency=latency, bandwidth=bandwidth)
+
+
+@when("I download the reports from a replay server that stalls every response")
+def step_download_stalled(context):
+    """Replay the fixtures with every response stalling past the client timeout."""
+    server = ReplayServer(
+        context.fixture_dir, faults=FaultInjector({"timeout": 1.0}), timeout_delay=1.0
+    ).start()
+    context.add_cleanup(server.stop)
+    downloader = make_downloader(context, download_timeout=0.2, max_retries=0)
+    context.replayed = {
+        url: downloader.download_csv(url)
+        for url in month_urls(server.base_url, context.months)
+    }
+
+
+@then("the fixtures should hold {count:d} recorded reports")
+def step_check_recorded_reports(context, count):
+    """Count the recorded 200 responses with bodies."""
+    index = ResponseRecorder.load_index(context.fixture_dir)
+    recorded = [
+        entry for entry in index.values() if entry["status"] == 200 and entry["body"]
+    ]
+    assert (
+        len(recorded) == count
+    ), f"Expected {count} recorded reports, got {len(recorded)}"
+    for entry in recorded:
+        assert os.path.exists(
+            os.path.join(context.fixture_dir, "bodies", entry["body"])
+        ), "Body missing"
+        assert "Last-Modified" in entry["headers"], "Last-Modified header not recorded"
+
+
+@then('the fixtures should hold {count:d} recorded "{status:d}" response')
+def step_check_recorded_errors(context, count, status):
+    """Count the recorded error responses."""
+    index = ResponseRecorder.load_index(context.fixture_dir)
+    recorded = [entry for entry in index.values() if entry["status"] == status]
+    assert (
+        len(recorded) == count
+    ), f"Expected {count} recorded {status} responses, got {len(recorded)}"
+
+
+@then("every replayed report should match its recording")
+def step_check_replayed_reports(context):
+    """Compare each downloaded report with its recorded body."""
+    assert len(context.replayed) == len(context.recorded), "Missing replayed reports"
+    for url, (file_path, _) in context.replayed.items():
+        assert file_path, f"{url} was not downloaded"
+        with open(file_path, "rb") as f:
+            assert (
+                f.read() == context.recorded[os.path.basename(file_path)]
+            ), f"{url} differs"
+
+
+@then("it should choose the same faults as another injector with the same seed")
+def step_check_fault_determinism(context):
+    """Compare the fault decisions of two injectors."""
+    other = FaultInjector(context.rates, seed=context.seed)
+    paths = [f"/report-{index}.csv" for index in range(20)]
+    first = {
+        (path, attempt): context.injector.choose(path)
+        for attempt in range(3)
+        for path in paths
+    }
+    # Requests for different paths arrive in a different order on the second run
+    second = {
+        (path, attempt): other.choose(path)
+        for attempt in range(3)
+        for path in reversed(paths)
+    }
+    assert first == second, "Fault decisions differ between injectors"
+    assert "503" in first.values() and None in first.values(), "Faults are not mixed"
+
+
+@then("the download retries should match the injected faults")
+def step_check_retries_match_faults(context):
+    """Check that every injected fault was retried."""
+    injected = sum(context.replay_server.faults.injected.values())
+    retries = context.metrics.get_counter("download_retries_total")
+    assert injected > 0, "No faults were injected"
+    assert retries == injected, f"Expected {injected} retries, got {retries}"
+
+
+@then("the download should have taken at least the latency plus the transfer time")
+def step_check_slow_download(context):
+    """Check that latency and bandwidth slowed the download down."""
+    size = sum(len(body) for body in context.recorded.values())
+    minimum = context.latency + size / context.bandwidth
+    assert (
+        context.replay_seconds >= minimum * 0.9
+    ), f"Download took {context.replay_seconds:.2f}s, expected at least {minimum:.2f}s"
+
+
+@then("no replayed report should have been downloaded")
+def step_check_nothing_replayed(context):
+    """Check that the stalled downloads failed."""
+    assert all(
+        file_path is None for file_path, _ in context.replayed.values()
+    ), "A report was downloaded"
+
+
+@then("a timeout error should have been recorded")
+def step_check_timeout_error(context):
+    """Check the HTTP error counter for timeouts."""
+    errors = context.metrics.counters.get("http_errors_total", {})
+    timeouts = sum(
+        value for key, value in errors.items() if "imeout" in dict(key).get("error", "")
+    )
+    assert timeouts >= 1, f"No timeout errors recorded: {errors}"
@@ -0,0 +1,305 @@
+import json
+import os
+import tempfile
+import time
+from behave import given, when, then
+
+from icann_reports.benchmark.local_server import LocalReportServer
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.main import download_and_process_csv_files, generate_run_reports
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.metrics import MetricsRegistry
+from icann_reports.utils.report_cache import ReportCache
+
+
+def temp_directory(context) -> str:
+    """Create a temporary directory removed after the scenario."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    return temp_dir.name
+
+
+def read_reports(reports):
+    """Read the contents of report files."""
+    contents = {}
+    for report_name, report_path in reports.items():
+        with open(report_path, "rb") as f:
+            contents[report_name] = f.read()
+    return contents
+
+
+@given("a report generator with a report cache")
+def step_report_generator_with_cache(context):
+    """Create a report generator with a report cache in a temporary directory."""
+    context.report_cache_metrics = MetricsRegistry()
+    context.report_cache = ReportCache(
+        temp_directory(context), metrics=context.report_cache_metrics
+    )
+    context.cached_report_generator = ReportGenerator(
+        data_dir=temp_directory(context), report_cache=context.report_cache
+    )
+    context.file_hashes = {
+        file_name: f"sha-{file_name}" for file_name in context.parsed_data
+    }
+    context.report_runs = []
+
+
+def generate_with_cache(context, data, input_names=None):
+    """Generate all reports, recording their contents and modification times."""
+    reports = context.cached_report_generator.generate_all_reports(
+        data, context.file_hashes, input_names
+    )
+    context.report_runs.append(
+        {
+            "reports": reports,
+            "contents": read_reports(reports),
+            "mtimes": {
+                name: os.stat(path).st_mtime_ns for name, path in reports.items()
+            },
+        }
+    )
+    # Let rewritten files get a different modification time
+    time.sleep(0.01)
+
+
+@when("I generate all reports with the report cache")
+@when("I generate all reports with the report cache again")
+def step_generate_with_cache(context):
+    """Generate all reports from the parsed rows."""
+    generate_with_cache(context, context.parsed_data)
+
+
+@when(
+    "I generate all reports with the report cache from processed reports without rows"
+)
+def step_generate_without_rows(context):
+    """Generate all reports as a rerun does, with every input processed before."""
+    generate_with_cache(context, {}, list(context.parsed_data))
+
+
+@when("I change the content hash of one input report")
+def step_change_input_hash(context):
+    """Pretend one input report was downloaded again with other content."""
+    file_name = sorted(context.file_hashes)[0]
+    context.file_hashes[file_name] = "sha-changed"
+
+
+@when("I delete the generated reports")
+def step_delete_generated_reports(context):
+    """Remove the reports written by the last run."""
+    for report_path in context.report_runs[-1]["reports"].values():
+        os.remove(report_path)
+
+
+@when("I delete a cached report file")
+def step_delete_cached_report(context):
+    """Remove one file of the only cache entry."""
+    fingerprint = next(
+        name
+        for name in os.listdir(context.report_cache.cache_dir)
+        if name != "index.json"
+    )
+    os.remove(
+        os.path.join(context.report_cache.cache_dir, fingerprint, "tld_summary.json")
+    )
+
+
+@then('the report cache should have counted {misses:d} "miss" and {hits:d} "hit"')
+def step_check_report_cache_counts(context, misses, hits):
+    """Check the report cache hit and miss counters."""
+    metrics = context.report_cache_metrics
+    assert metrics.get_counter("report_cache_total", result="miss") == misses
+    assert metrics.get_counter("report_cache_total", result="hit") == hits
+
+
+@then("both runs should have produced the same reports")
+def step_check_same_reports(context):
+    """Compare the report files of the two runs."""
+    first, second = context.report_runs
+    assert first["reports"] == second["reports"]
+    assert (
+        first["contents"] == second["contents"]
+    ), "Cached reports differ from the generated ones"
+
+
+@then("the second run should not have rewritten the reports")
+def step_check_not_rewritten(context):
+    """Check that identical report files were left alone."""
+    first, second = context.report_runs
+    assert first["mtimes"] == second["mtimes"], "Reports were rewritten on a cache hit"
+
+
+def publish_pipeline_reports(context, start_date, end_date):
+    """Publish synthetic reports of the pipeline's TLD for some months."""
+    SyntheticReportGenerator(
+        tlds=[context.pipeline_tld],
+        start_date=start_date,
+        end_date=end_date,
+        registrar_count=10,
+        seed=23,
+    ).generate(os.path.join(context.pipeline_dir, "site"))
+
+
+@given('the "{tld}" reports from "{start_date}" to "{end_date}" are served locally')
+def step_pipeline_report_server(context, tld, start_date, end_date):
+    """Serve synthetic reports of one TLD for a pipeline to download."""
+    context.pipeline_dir = temp_directory(context)
+    context.pipeline_tld = tld
+    os.makedirs(os.path.join(context.pipeline_dir, "downloads"))
+    publish_pipeline_reports(context, start_date, end_date)
+    context.pipeline_server = LocalReportServer(
+        os.path.join(context.pipeline_dir, "site")
+    ).start()
+    context.add_cleanup(context.pipeline_server.stop)
+
+
+@when('the "{tld}" report of "{month}" is published')
+def step_publish_pipeline_report(context, tld, month):
+    """Publish another month of reports."""
+    assert tld == context.pipeline_tld
+    publish_pipeline_reports(context, month, month)
+
+
+@when(
+    'a pipeline run over the served reports from "{start_date}" to "{end_date}" '
+    "generates the reports"
+)
+def step_pipeline_run(context, start_date, end_date):
+    """Download, process and report the served months, as main() does."""
+    urls = URLGenerator().generate_tld_urls(
+        [
+            {
+                "tld": context.pipeline_tld,
+                "base_url": context.pipeline_server.base_url,
+                "start_date": start_date,
+                "end_date": end_date,
+            }
+        ]
+    )
+    cache_manager = CacheManager(os.path.join(context.pipeline_dir, "processed.json"))
+
+    def process_urls(batch_urls, reparse_processed=False):
+        return download_and_process_csv_files(
+            batch_urls,
+            2,
+            reparse_processed=reparse_processed,
+            data_dir=os.path.join(context.pipeline_dir, "downloads"),
+            cache_manager=cache_manager,
+        )
+
+    report_generator = ReportGenerator(
+        data_dir=os.path.join(context.pipeline_dir, "output"),
+        report_cache=ReportCache(os.path.join(context.pipeline_dir, "report_cache")),
+    )
+    context.pipeline_reports = generate_run_reports(
+        report_generator,
+        urls,
+        process_urls(urls),
+        process_urls,
+        cache_manager=cache_manager,
+    )
+
+
+@when("I delete the reports downloaded by the pipeline")
+def step_delete_pipeline_downloads(context):
+    """Remove the downloaded reports, as if the data directory was cleaned up."""
+    downloads_dir = os.path.join(context.pipeline_dir, "downloads")
+    for file_name in os.listdir(downloads_dir):
+        os.remove(os.path.join(downloads_dir, file_name))
+
+
+def check_pipeline_months(context, months):
+    """Check the months of the pipeline's TLD summary."""
+    with open(context.pipeline_reports["tld_summary"], "r") as f:
+        tld_summary = json.load(f)
+    monthly_data = tld_summary[context.pipeline_tld.upper()]["monthly_data"]
+    assert sorted(monthly_data) == months, f"Reports cover {sorted(monthly_data)}"
+
+
+@then('the pipeline TLD summary should cover "{first}", "{second}" and "{third}"')
+def step_check_pipeline_three_months(context, first, second, third):
+    """Check the reports cover three months."""
+    check_pipeline_months(context, [first, second, third])
+
+
+@then('the pipeline TLD summary should cover "{first}" and "{second}"')
+def step_check_pipeline_two_months(context, first, second):
+    """Check the reports cover two months."""
+    check_pipeline_months(context, [first, second])
+
+
+@given("a report cache holding at most {max_bytes:d} bytes")
+def step_small_report_cache(context, max_bytes):
+    """Create a report cache with a small size limit."""
+    context.report_cache_metrics = MetricsRegistry()
+    context.report_cache = ReportCache(
+        temp_directory(context),
+        max_bytes=max_bytes,
+        metrics=context.report_cache_metrics,
+    )
+    context.report_source_dir = temp_directory(context)
+
+
+def cache_reports(context, name, size):
+    """Cache a report set of a given size."""
+    report_path = os.path.join(context.report_source_dir, f"{name}.json")
+    with open(report_path, "w") as f:
+        f.write(name[0] * size)
+    context.report_cache.put(name, {"summary": report_path})
+    # Keep the last use times of the entries apart
+    time.sleep(0.01)
+
+
+@when('I cache reports of {size:d} bytes under "{first}", "{second}" and "{third}"')
+def step_cache_three_reports(context, size, first, second, third):
+    """Cache three entries of one report each."""
+    for name in (first, second, third):
+        cache_reports(context, name, size)
+
+
+@when('I cache reports of {size:d} bytes under "{name}"')
+def step_cache_one_report(context, size, name):
+    """Cache an entry of one report."""
+    cache_reports(context, name, size)
+
+
+@when('I look up the cached reports of "{name}"')
+def step_look_up_cached_reports(context, name):
+    """Use a cache entry, making it the most recently used."""
+    assert context.report_cache.get(name) is not None
+    time.sleep(0.01)
+
+
+@then('the report cache should hold "{first}", "{second}" and "{third}"')
+def step_check_cached_entries(context, first, second, third):
+    """Check which entries are left in the cache."""
+    for name in (first, second, third):
+        assert context.report_cache.get(name) is not None, f"{name} was evicted"
+    entries = sorted(
+        name
+        for name in os.listdir(context.report_cache.cache_dir)
+        if name != "index.json"
+    )
+    assert entries == sorted([first, second, third]), entries
+
+
+@then("the report cache should have counted {evictions:d} eviction(s)")
+def step_check_report_cache_evictions(context, evictions):
+    """Check the eviction counter."""
+    assert (
+        context.report_cache_metrics.get_counter("report_cache_evictions_total")
+        == evictions
+    )
+
+
+@then("the report cache should hold {count:d} entry")
+def step_check_cache_entry_count(context, count):
+    """Check the number of cached report sets."""
+    entries = [
+        name
+        for name in os.listdir(context.report_cache.cache_dir)
+        if name != "index.json"
+    ]
+    assert len(entries) == count, f"Expected {count} entries, got {entries}"
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler
+from behave import given, when, then
+
+from icann_reports.benchmark.local_server import LocalReportServer, QuietRequestHandler
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.csv_downloader import CSVDownloader
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+class TruncatingReportServer(LocalReportServer):
+    """Local report server that breaks off the first response for every file."""
+
+    def __init__(self, root_dir, support_ranges=True):
+        """Initialize the server, optionally without range support."""
+        super().__init__(root_dir)
+        self.support_ranges = support_ranges
+
+    def make_handler(self):
+        """Create a handler that cuts the first response of every file short."""
+        truncated = set()
+        lock = threading.Lock()
+        root_dir = self.root_dir
+        base = QuietRequestHandler
+
+        class TruncatingHandler(base):
+            if not self.support_ranges:
+                send_head = SimpleHTTPRequestHandler.send_head
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=root_dir, **kwargs)
+
+            def copyfile(self, source, outputfile):
+                with lock:
+                    first = self.path not in truncated
+                    truncated.add(self.path)
+                data = source.read()
+                if first:
+                    outputfile.write(data[: len(data) // 2])
+                    self.close_connection = True
+                    return
+                outputfile.write(data)
+
+        return TruncatingHandler
+
+
+def start_truncating_server(context, support_ranges):
+    """Generate one report and serve it from a truncating server."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    generator = SyntheticReportGenerator(
+        tlds=["com"],
+        start_date="2024-01",
+        end_date="2024-01",
+        registrar_count=50,
+        seed=5,
+    )
+    site_dir = os.path.join(context.temp_dir.name, "site")
+    context.served_file = generator.generate(site_dir)["files"][0]
+    context.report_server = TruncatingReportServer(site_dir, support_ranges).start()
+    context.add_cleanup(context.report_server.stop)
+    context.add_cleanup(context.temp_dir.cleanup)
+    context.report_url = context.report_server.base_url.replace("{tld}", "com").replace(
+        "{date}", "202401"
+    )
+    context.download_dir = os.path.join(context.temp_dir.name, "downloads")
+    os.makedirs(context.download_dir)
+
+
+@given("I have a report server that cuts off the first response for each file halfway")
+def step_have_truncating_server(context):
+    """Start a server that supports byte ranges."""
+    start_truncating_server(context, support_ranges=True)
+
+
+@given(
+    "I have a report server without range support that cuts off the first response "
+    "for each file halfway"
+)
+def step_have_truncating_server_without_ranges(context):
+    """Start a server that ignores byte ranges."""
+    start_truncating_server(context, support_ranges=False)
+
+
+@given("a partial download of the report exists without validators")
+def step_have_unvalidated_partial(context):
+    """Leave a partial file without a metadata sidecar."""
+    file_path = os.path.join(
+        context.download_dir, os.path.basename(context.served_file)
+    )
+    part_path, _ = CSVDownloader.partial_paths(file_path)
+    with open(part_path, "wb") as f:
+        f.write(b"stale bytes")
+
+
+@when("I download the report with retries")
+def step_download_report_with_retries(context):
+    """Download the report, retrying without backoff."""
+    context.metrics = MetricsRegistry()
+    downloader = CSVDownloader(
+        data_dir=context.download_dir,
+        retry_delay=0,
+        cache_manager=CacheManager(
+            cache_file=os.path.join(context.temp_dir.name, "cache.json")
+        ),
+        metrics=context.metrics,
+    )
+    context.downloaded_path, _ = downloader.download_csv(context.report_url)
+
+
+@then("the downloaded report should match the served report")
+def step_check_downloaded_report(context):
+    """Compare the downloaded bytes with the served file."""
+    assert context.downloaded_path, "Download failed"
+    with open(context.downloaded_path, "rb") as f, open(context.served_file, "rb") as g:
+        assert f.read() == g.read(), "Downloaded report differs from the served report"
+
+
+@then("the download should have been {result} {count:d} time")
+def step_check_resume_result(context, result, count):
+    """Check how the partial download was continued."""
+    value = context.metrics.get_counter("download_resumes_total", result=result)
+    assert value == count, f"Expected {count} {result} downloads, got {value}"
+
+
+@then("no partial download files should remain")
+def step_check_no_partial_files(context):
+    """Check that the sidecar files were cleaned up."""
+    leftovers = [name for name in os.listdir(context.download_dir) if ".part" in name]
+    assert not leftovers, f"Partial files left behind: {leftovers}"
+
+
+@then("the bytes downloaded should equal the report size")
+def step_check_bytes_downloaded(context):
+    """Check that no byte was transferred twice."""
+    transferred = context.metrics.get_counter("bytes_downloaded_total")
+    size = os.path.getsize(context.served_file)
+    assert (
+        transferred == size
+    ), f"Transferred {transferred} bytes for a {size} byte report"
@@ -0,0 +1,288 @@
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from behave import given, when, then
+
+from icann_reports.benchmark.local_server import LocalReportServer, QuietRequestHandler
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.csv_downloader import CSVDownloader
+from icann_reports.downloader.retry import RetryScheduler
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+class FlakyReportServer(LocalReportServer):
+    """Local report server that fails the first request for every file."""
+
+    def make_handler(self):
+        """Create a handler that fails the first request of every file."""
+        seen = set()
+        lock = threading.Lock()
+        root_dir = self.root_dir
+
+        class FlakyHandler(QuietRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=root_dir, **kwargs)
+
+            def do_GET(self):
+                with lock:
+                    first = self.path not in seen
+                    seen.add(self.path)
+                if first:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                super().do_GET()
+
+        return FlakyHandler
+
+
+def make_http_error(status, retry_after=None):
+    """Create an HTTP error with an optional Retry-After header."""
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    return urllib.error.HTTPError(
+        "https://example.com/report.csv", status, "Error", headers, None
+    )
+
+
+@given(
+    "I have a retry scheduler with a base delay of {delay:d} seconds and a budget of "
+    "{budget:d} retries"
+)
+def step_have_retry_scheduler(context, delay, budget):
+    """Create a seeded retry scheduler."""
+    context.metrics = MetricsRegistry()
+    context.retry_scheduler = RetryScheduler(
+        base_delay=delay,
+        retry_budget=budget,
+        metrics=context.metrics,
+        rng=random.Random(1),
+    )
+
+
+@given(
+    "I have a local report server that answers the first request for each file with "
+    "HTTP 503"
+)
+def step_have_flaky_server(context):
+    """Generate two reports and serve them from a flaky server."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    generator = SyntheticReportGenerator(
+        tlds=["com"],
+        start_date="2024-01",
+        end_date="2024-02",
+        registrar_count=5,
+        seed=3,
+    )
+    generator.generate(os.path.join(context.temp_dir.name, "site"))
+    context.flaky_server = FlakyReportServer(
+        os.path.join(context.temp_dir.name, "site")
+    ).start()
+    context.add_cleanup(context.flaky_server.stop)
+    context.add_cleanup(context.temp_dir.cleanup)
+    context.urls = URLGenerator().generate_tld_urls(
+        [
+            {
+                "tld": "com",
+                "base_url": context.flaky_server.base_url,
+                "start_date": "2024-01",
+                "end_date": "2024-02",
+            }
+        ]
+    )
+
+
+@when('a download fails with HTTP status {status:d} and Retry-After "{retry_after}"')
+def step_fail_with_retry_after(context, status, retry_after):
+    """Ask the scheduler about a failure with a Retry-After header."""
+    context.retry_delay = context.retry_scheduler.retry_delay(
+        make_http_error(status, retry_after), 1
+    )
+
+
+@when("a download fails with HTTP status {status:d} and no Retry-After")
+def step_fail_without_retry_after(context, status):
+    """Ask the scheduler about a failure without a Retry-After header."""
+    context.retry_delay = context.retry_scheduler.retry_delay(
+        make_http_error(status), 1
+    )
+
+
+@when("{count:d} downloads fail with HTTP status {status:d}")
+def step_many_downloads_fail(context, count, status):
+    """Ask the scheduler about several failed first attempts."""
+    context.retry_delays = [
+        context.retry_scheduler.retry_delay(make_http_error(status), 1)
+        for _ in range(count)
+    ]
+
+
+@when(
+    'I park retries "{late}" after {late_delay:f} seconds and "{early}" after '
+    "{early_delay:f} seconds"
+)
+def step_park_retries(context, late, late_delay, early, early_delay):
+    """Schedule two callbacks and wait for both to fire."""
+    context.fired = []
+    done = threading.Event()
+
+    def fire(name):
+        context.fired.append(name)
+        if len(context.fired) == 2:
+            done.set()
+
+    start = time.perf_counter()
+    context.retry_scheduler.schedule(late_delay, lambda: fire(late))
+    context.retry_scheduler.schedule(early_delay, lambda: fire(early))
+    context.schedule_seconds = time.perf_counter() - start
+    assert done.wait(5), "Parked retries did not fire"
+    context.retry_scheduler.close()
+
+
+@when("I park a retry after {delay:d} seconds and close the scheduler")
+def step_park_and_close(context, delay):
+    """Schedule a callback with a cancel hook and close the scheduler."""
+    context.fired = []
+    context.cancelled = []
+    context.retry_scheduler.schedule(
+        delay,
+        lambda: context.fired.append("retry"),
+        on_cancel=lambda: context.cancelled.append("retry"),
+    )
+    context.retry_scheduler.close()
+
+
+@when("I download all of its reports after the retry scheduler was closed")
+def step_download_with_closed_scheduler(context):
+    """Download every report with a scheduler that can no longer park retries."""
+    context.metrics = MetricsRegistry()
+    data_dir = os.path.join(context.temp_dir.name, "downloads")
+    os.makedirs(data_dir)
+    retry_scheduler = RetryScheduler(metrics=context.metrics)
+    retry_scheduler.close()
+    downloader = CSVDownloader(
+        data_dir=data_dir,
+        cache_manager=CacheManager(
+            cache_file=os.path.join(context.temp_dir.name, "cache.json")
+        ),
+        metrics=context.metrics,
+        retry_scheduler=retry_scheduler,
+    )
+    result = {}
+
+    def download():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            result["downloads"] = downloader.download_all(context.urls, executor)
+
+    thread = threading.Thread(target=download, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), "download_all did not return"
+    context.downloads = result["downloads"]
+
+
+@when("I download all of its reports with a single download worker")
+def step_download_from_flaky_server(context):
+    """Download every report with one worker and a fresh cache."""
+    context.metrics = MetricsRegistry()
+    data_dir = os.path.join(context.temp_dir.name, "downloads")
+    os.makedirs(data_dir)
+    downloader = CSVDownloader(
+        data_dir=data_dir,
+        cache_manager=CacheManager(
+            cache_file=os.path.join(context.temp_dir.name, "cache.json")
+        ),
+        metrics=context.metrics,
+    )
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        context.downloads = downloader.download_all(context.urls, executor)
+    downloader.retry_scheduler.close()
+
+
+@then(
+    "every backoff delay for attempt {attempt:d} should be between 0 and {upper:d} "
+    "seconds"
+)
+def step_check_backoff_range(context, attempt, upper):
+    """Check that jittered delays stay within the exponential cap."""
+    delays = [context.retry_scheduler.backoff_delay(attempt) for _ in range(200)]
+    assert all(0 <= delay <= upper for delay in delays), f"Delay outside 0-{upper}s"
+    assert len(set(delays)) > 1, "Delays are not jittered"
+
+
+@then("the retry should be scheduled after {seconds:d} seconds")
+def step_check_retry_delay(context, seconds):
+    """Check the delay returned for the failure."""
+    assert (
+        context.retry_delay == seconds
+    ), f"Expected {seconds}s, got {context.retry_delay}"
+
+
+@then("the download should not be retried")
+def step_check_not_retried(context):
+    """Check that the scheduler gave up on the failure."""
+    assert context.retry_delay is None, f"Retry scheduled after {context.retry_delay}s"
+
+
+@then("{count:d} retries should have been granted")
+def step_check_retries_granted(context, count):
+    """Check how many retries the budget allowed."""
+    granted = [delay for delay in context.retry_delays if delay is not None]
+    assert len(granted) == count, f"Expected {count} retries, got {len(granted)}"
+
+
+@then('the retries dropped for "{reason}" should be {count:d}')
+def step_check_retries_dropped(context, reason, count):
+    """Check the dropped-retry counter."""
+    dropped = context.metrics.get_counter(
+        "download_retries_dropped_total", reason=reason
+    )
+    assert dropped == count, f"Expected {count} dropped retries, got {dropped}"
+
+
+@then('the parked retries should fire in the order "{order}"')
+def step_check_fire_order(context, order):
+    """Check the firing order and that scheduling did not block."""
+    expected = [name.strip() for name in order.split(",")]
+    assert context.fired == expected, f"Expected {expected}, got {context.fired}"
+    assert context.schedule_seconds < 0.05, "Scheduling blocked the caller"
+
+
+@then("every report should have been downloaded")
+def step_check_all_downloaded(context):
+    """Check that every URL produced a downloaded file."""
+    assert set(context.downloads) == set(context.urls), "Missing download results"
+    for url, (file_path, _) in context.downloads.items():
+        assert file_path and os.path.exists(file_path), f"{url} was not downloaded"
+
+
+@then("{count:d} download retries should have been recorded")
+def step_check_download_retries(context, count):
+    """Check the retry counter."""
+    retries = context.metrics.get_counter("download_retries_total")
+    assert retries == count, f"Expected {count} retries, got {retries}"
+
+
+@then("the parked retry should have been cancelled instead of fired")
+def step_check_retry_cancelled(context):
+    """Check that closing the scheduler cancelled the parked retry."""
+    assert context.cancelled == ["retry"], f"Cancelled: {context.cancelled}"
+    assert context.fired == [], f"Fired: {context.fired}"
+    assert context.retry_scheduler.pending == 0, "Retries still pending"
+
+
+@then("every report should have finished without a file")
+def step_check_all_given_up(context):
+    """Check that every URL reached a final, failed state."""
+    assert set(context.downloads) == set(context.urls), "Missing download results"
+    for url, (file_path, _) in context.downloads.items():
+        assert file_path is None, f"{url} was downloaded"
+    failed = context.metrics.get_counter("downloads_total", result="failed")
+    assert failed == len(context.urls), f"Expected {len(context.urls)}, got {failed}"
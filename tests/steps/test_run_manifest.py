@@ -0,0 +1,119 @@
+import os
+import tempfile
+from behave import given, when, then
+
+from icann_reports.utils.metrics import MetricsRegistry
+from icann_reports.utils.run_manifest import RunManifest
+
+REPORT_URL = (
+    "https://www.icann.org/sites/default/files/mrr/com/"
+    "com-transactions-2024{month:02d}-en.csv"
+)
+
+
+@given("a run was planned with {count:d} report URLs")
+def step_run_planned(context, count):
+    """Plan a run in a temporary directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.run_dir = os.path.join(temp_dir.name, "run")
+    context.planned_urls = [
+        REPORT_URL.format(month=month) for month in range(1, count + 1)
+    ]
+    context.run_manifest = RunManifest(context.run_dir)
+    context.run_manifest.plan(context.planned_urls, {"tlds": ["com"]})
+
+
+@given("the first report was downloaded and the second was parsed with {count:d} rows")
+def step_reports_progressed(context, count):
+    """Record progress for the first two reports."""
+    first, second = context.planned_urls[:2]
+    context.run_manifest.mark(
+        first, "downloaded", path="/tmp/com-transactions-202401-en.csv"
+    )
+    context.run_manifest.mark(
+        second, "downloaded", path="/tmp/com-transactions-202402-en.csv"
+    )
+    rows = [{"Registrar-name": f"Registrar {i}", "TLD": "com"} for i in range(count)]
+    context.run_manifest.spill_rows(second, second.split("/")[-1], rows)
+
+
+@given("the journal ends with a partly written entry")
+def step_truncated_journal(context):
+    """Append half a journal line, as a crash mid-write would leave it."""
+    with open(context.run_manifest.journal_file, "a") as f:
+        f.write('{"state": {"stage": "down')
+
+
+@when("the parsed reports are marked as aggregated")
+def step_mark_aggregated(context):
+    """Move parsed reports on to the aggregated stage."""
+    context.run_manifest.mark_all("parsed", "aggregated")
+
+
+@when("the run is resumed from its directory")
+def step_resume_run(context):
+    """Open the run directory again, as a restarted process would."""
+    context.metrics = MetricsRegistry()
+    context.run_manifest = RunManifest(context.run_dir, metrics=context.metrics)
+    context.resumed_urls = context.run_manifest.plan(context.planned_urls)
+
+
+@when("the run is resumed from its directory with a plan of {count:d} other URLs")
+def step_resume_run_with_new_plan(context, count):
+    """Resume the run while passing a different plan."""
+    context.run_manifest = RunManifest(context.run_dir)
+    other_urls = [url.replace("/com/", "/net/") for url in context.planned_urls[:count]]
+    context.resumed_urls = context.run_manifest.plan(other_urls)
+
+
+@then("the resumed run should have the same {count:d} report URLs")
+def step_check_resumed_urls(context, count):
+    """Check that the resumed run kept its original plan."""
+    assert context.run_manifest.resumed, "Expected the run to be resumed"
+    assert (
+        context.resumed_urls == context.planned_urls[:count]
+    ), f"Expected the planned URLs, got {context.resumed_urls}"
+
+
+@then('the {position} report should be in the "{stage}" stage')
+def step_check_report_stage(context, position, stage):
+    """Check the stage of the first or second report."""
+    url = context.planned_urls[["first", "second"].index(position)]
+    actual = context.run_manifest.stage(url)
+    assert actual == stage, f"Expected the {position} report in {stage}, got {actual}"
+
+
+@then('the other reports should be in the "{stage}" stage')
+def step_check_other_report_stages(context, stage):
+    """Check the stage of every report after the first two."""
+    for url in context.planned_urls[2:]:
+        actual = context.run_manifest.stage(url)
+        assert actual == stage, f"Expected {url} in {stage}, got {actual}"
+
+
+@then("the spilled rows of the second report should load with {count:d} rows")
+def step_check_spilled_rows(context, count):
+    """Check that the parsed rows come back from the spill file."""
+    url = context.planned_urls[1]
+    data = context.run_manifest.load_rows(url)
+    assert data is not None, "Expected spilled rows to load"
+    rows = data[url.split("/")[-1]]
+    assert len(rows) == count, f"Expected {count} rows, got {len(rows)}"
+    assert context.metrics.get_counter("run_files_resumed_total", stage="parsed") == 1
+
+
+@then(
+    'the run summary should count {downloaded:d} "downloaded", {aggregated:d} '
+    '"aggregated" and {planned:d} "planned" reports'
+)
+def step_check_run_summary(context, downloaded, aggregated, planned):
+    """Check the number of reports in each stage."""
+    summary = context.run_manifest.summary()
+    expected = {
+        "planned": planned,
+        "downloaded": downloaded,
+        "parsed": 0,
+        "aggregated": aggregated,
+    }
+    assert summary == expected, f"Expected {expected}, got {summary}"
@@ -0,0 +1,181 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from behave import given, when, then
+
+from icann_reports.benchmark.local_server import LocalReportServer
+from icann_reports.downloader.scheduling import WorkScheduler
+from icann_reports.utils.content_store import ContentStore
+from icann_reports.utils.metrics import MetricsRegistry
+
+REPORT_URL = (
+    "https://www.icann.org/sites/default/files/mrr/"
+    "{tld}/{tld}-transactions-{date}-en.csv"
+)
+
+
+class CountingContentStore(ContentStore):
+    """Content store that counts how often its index is loaded."""
+
+    index_loads = 0
+
+    def load_index(self):
+        """Load the index, counting the load."""
+        self.index_loads += 1
+        return super().load_index()
+
+
+def write_reports(directory, tld, sizes):
+    """Write one report of each size, for consecutive months from 2024-01."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for month, size in enumerate(sizes, start=1):
+        path = os.path.join(directory, f"{tld}-transactions-2024{month:02d}-en.csv")
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        paths.append(path)
+    return paths
+
+
+def parse_sizes(sizes):
+    """Parse a list of sizes such as "100, 4000 and 900"."""
+    return [int(size) for size in sizes.replace(" and ", ",").split(",")]
+
+
+def url_month(url):
+    """Get the YYYYMM month from a report URL or path."""
+    return WorkScheduler.report_month(url)
+
+
+@given('earlier runs left "{tld}" reports of {sizes} bytes in the data directory')
+def step_have_earlier_reports(context, tld, sizes):
+    """Write reports of the given sizes into a temporary data directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.data_dir = temp_dir.name
+    paths = write_reports(context.data_dir, tld, parse_sizes(sizes))
+    context.file_infos = [(path, False) for path in paths]
+    context.report_urls = [
+        REPORT_URL.format(tld=tld, date=url_month(path)) for path in paths
+    ]
+
+
+@given('earlier runs stored "{tld}" reports of {sizes} bytes in the content store')
+def step_have_stored_reports(context, tld, sizes):
+    """Store reports of the given sizes, leaving the data directory empty."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.data_dir = os.path.join(temp_dir.name, "data")
+    context.content_store = CountingContentStore(os.path.join(temp_dir.name, "store"))
+    paths = write_reports(
+        os.path.join(temp_dir.name, "downloads"), tld, parse_sizes(sizes)
+    )
+    for path in paths:
+        context.content_store.put(os.path.basename(path), path)
+    context.report_urls = [
+        REPORT_URL.format(tld=tld, date=url_month(path)) for path in paths
+    ]
+
+
+@given('a "{tld}" report for "{month}" that no earlier run downloaded')
+def step_have_new_report(context, tld, month):
+    """Add the URL of a report without a local copy."""
+    context.report_urls.append(REPORT_URL.format(tld=tld, date=month))
+
+
+@when('I order the report URLs with the "{strategy}" strategy')
+def step_order_report_urls(context, strategy):
+    """Order the URLs and the downloaded files with a strategy."""
+    context.metrics = MetricsRegistry()
+    scheduler = WorkScheduler(
+        strategy, data_dir=context.data_dir, metrics=context.metrics
+    )
+    context.ordered_urls = scheduler.order(context.report_urls)
+    context.ordered_files = scheduler.order_files(context.file_infos)
+
+
+@when('I order the stored report URLs with the "{strategy}" strategy')
+def step_order_stored_report_urls(context, strategy):
+    """Order the URLs with sizes from the content store."""
+    context.metrics = MetricsRegistry()
+    context.content_store.index_loads = 0
+    scheduler = WorkScheduler(
+        strategy,
+        data_dir=context.data_dir,
+        content_store=context.content_store,
+        metrics=context.metrics,
+    )
+    context.ordered_urls = scheduler.order(context.report_urls)
+
+
+@when('I order the downloaded files with the "{strategy}" strategy')
+def step_order_downloaded_files(context, strategy):
+    """Order the downloaded files for parsing with a strategy."""
+    scheduler = WorkScheduler(strategy, data_dir=context.data_dir)
+    context.ordered_files = scheduler.order_files(list(reversed(context.file_infos)))
+
+
+@given('a report server with "{tld}" reports of {sizes} bytes')
+def step_have_sized_report_server(context, tld, sizes):
+    """Serve reports of the given sizes from a local server."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    paths = write_reports(
+        os.path.join(temp_dir.name, "site", "mrr", tld), tld, parse_sizes(sizes)
+    )
+    context.report_server = LocalReportServer(
+        os.path.join(temp_dir.name, "site")
+    ).start()
+    context.add_cleanup(context.report_server.stop)
+    context.data_dir = os.path.join(temp_dir.name, "data")
+    base_url = context.report_server.base_url.replace("{tld}", tld)
+    context.report_urls = [
+        base_url.replace("{date}", url_month(path)) for path in paths
+    ]
+
+
+@when("I order the served report URLs largest first with size probing")
+def step_order_with_probing(context):
+    """Order the served URLs, probing their sizes with HEAD requests."""
+    context.metrics = MetricsRegistry()
+    scheduler = WorkScheduler(
+        "largest-first",
+        data_dir=context.data_dir,
+        probe_sizes=True,
+        metrics=context.metrics,
+    )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        context.ordered_urls = scheduler.order(context.report_urls, executor)
+
+
+@then('the URLs should be ordered by month "{months}"')
+def step_check_url_month_order(context, months):
+    """Check the months of the ordered URLs."""
+    expected = [month.strip() for month in months.split(",")]
+    actual = [url_month(url) for url in context.ordered_urls]
+    assert actual == expected, f"Expected URL order {expected}, got {actual}"
+
+
+@then('the downloaded files should be parsed in month order "{months}"')
+def step_check_file_month_order(context, months):
+    """Check the months of the ordered files."""
+    expected = [month.strip() for month in months.split(",")]
+    actual = [url_month(path) for path, _ in context.ordered_files]
+    assert actual == expected, f"Expected parse order {expected}, got {actual}"
+
+
+@then('{count:d} size estimates should have come from "{source}"')
+@then('{count:d} size estimate should have come from "{source}"')
+def step_check_size_estimate_source(context, count, source):
+    """Check where the size estimates came from."""
+    actual = context.metrics.get_counter("size_estimates_total", source=source)
+    assert (
+        actual == count
+    ), f"Expected {count} size estimates from {source}, got {actual}"
+
+
+@then("the content store index should have been loaded once")
+def step_check_index_loaded_once(context):
+    """Check that the sizes were looked up in a single index load."""
+    loads = context.content_store.index_loads
+    assert loads == 1, f"Expected 1 index load, got {loads}"
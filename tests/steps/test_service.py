@@ -0,0 +1,187 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+from behave import given, when, then
+
+from icann_reports.benchmark.local_server import LocalReportServer, QuietRequestHandler
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.processor.aggregation import ReportAggregator
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.service import OPEN_END_DATE, ReportService
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+class UnavailableMonthsServer(LocalReportServer):
+    """Local report server that fails the first request of reports of some months."""
+
+    def __init__(self, root_dir):
+        """Serve a directory, with no month unavailable yet."""
+        super().__init__(root_dir)
+        self.unavailable_months = set()
+
+    def make_handler(self):
+        """Create a handler answering a month's first requests with 503."""
+        seen = set()
+        lock = threading.Lock()
+        root_dir = self.root_dir
+        server = self
+
+        class UnavailableMonthsHandler(QuietRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=root_dir, **kwargs)
+
+            def do_GET(self):
+                with lock:
+                    first = self.path not in seen and any(
+                        f"-{month}-" in self.path for month in server.unavailable_months
+                    )
+                    seen.add(self.path)
+                if first:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                super().do_GET()
+
+        return UnavailableMonthsHandler
+
+
+def publish_reports(context, start_date, end_date):
+    """Publish synthetic reports for some months."""
+    SyntheticReportGenerator(
+        tlds=context.service_tlds,
+        start_date=start_date,
+        end_date=end_date,
+        registrar_count=15,
+        seed=17,
+    ).generate(context.site_dir)
+
+
+def start_service(context):
+    """Start a report service on the scenario's state directory."""
+    context.service_metrics = MetricsRegistry()
+    context.report_service = ReportService(
+        [
+            {"tld": tld, "start_date": context.service_start, "end_date": OPEN_END_DATE}
+            for tld in context.service_tlds
+        ],
+        base_url=context.report_server.base_url,
+        data_dir=os.path.join(context.service_root, "data"),
+        state_dir=os.path.join(context.service_root, "state"),
+        max_workers=2,
+        metrics=context.service_metrics,
+    )
+
+
+@given(
+    'a local report server publishing "{first_tld}" and "{second_tld}" reports from '
+    '"{start_date}" to "{end_date}"'
+)
+def step_report_server_publishing(context, first_tld, second_tld, start_date, end_date):
+    """Serve synthetic reports for two TLDs."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.service_root = temp_dir.name
+    context.site_dir = os.path.join(temp_dir.name, "site")
+    context.service_tlds = [first_tld, second_tld]
+    publish_reports(context, start_date, end_date)
+    context.report_server = UnavailableMonthsServer(context.site_dir).start()
+    context.add_cleanup(context.report_server.stop)
+
+
+@given('a report service polling "{first_tld}" and "{second_tld}" from "{start_date}"')
+def step_report_service(context, first_tld, second_tld, start_date):
+    """Start a report service with its state in a temporary directory."""
+    assert [first_tld, second_tld] == context.service_tlds
+    context.service_start = start_date
+    start_service(context)
+
+
+@given("the report service may retry {count:d} downloads per poll")
+def step_service_retry_budget(context, count):
+    """Limit the retries of each poll."""
+    context.report_service.csv_downloader.retry_scheduler.retry_budget = count
+
+
+@when('the server answers the first request for each "{month}" report with HTTP 503')
+def step_server_month_unavailable(context, month):
+    """Make the first request of every report of a month fail."""
+    context.report_server.unavailable_months.add(month.replace("-", ""))
+
+
+@when('the service polls up to "{month}"')
+def step_service_polls(context, month):
+    """Poll for reports published up to a month."""
+    context.service_result = context.report_service.poll(month)
+
+
+@when('the server publishes the "{month}" reports')
+def step_server_publishes(context, month):
+    """Publish another month of reports."""
+    publish_reports(context, month, month)
+
+
+@when("I restart the report service")
+def step_restart_service(context):
+    """Replace the service with a new one on the same state directory."""
+    start_service(context)
+
+
+@then(
+    "the service poll should have checked {checked:d} reports and applied {applied:d}"
+)
+def step_check_service_poll(context, checked, applied):
+    """Check the result of the last poll."""
+    result = context.service_result
+    assert result["checked"] == checked, result
+    assert len(result["applied"]) == applied, result
+
+
+@then("the service should have retried {count:d} downloads")
+def step_check_service_retries(context, count):
+    """Check the retries of every poll so far."""
+    retries = context.service_metrics.get_counter("download_retries_total")
+    assert retries == count, f"Expected {count} retries, got {retries}"
+
+
+@then("the restarted service should have parsed no rows")
+def step_check_no_rows_parsed(context):
+    """Check the restarted service did not parse any report."""
+    assert context.service_metrics.get_counter("rows_parsed_total") == 0
+    assert len(context.report_service.applied_files) == 4
+
+
+@then("the service reports should equal the summaries of every published report")
+def step_check_service_reports(context):
+    """Compare the written reports with a single aggregate of every published report."""
+    processor = CSVProcessor(
+        cache_manager=CacheManager(
+            cache_file=os.path.join(context.service_root, "check.json")
+        )
+    )
+    data = {}
+    for path in sorted(
+        glob.glob(os.path.join(context.site_dir, "**", "*.csv"), recursive=True)
+    ):
+        data.update(processor.process_csv((path, False)))
+    aggregator = ReportAggregator(
+        ReportGenerator(data_dir=os.path.join(context.service_root, "check"))
+    )
+    aggregator.add(data)
+
+    reports_dir = os.path.join(context.service_root, "data", "reports")
+    expected = {
+        "registrar_summary": aggregator.registrar_summary(),
+        "registrar_id_summary": aggregator.registrar_id_summary(),
+        "tld_summary": aggregator.tld_summary(),
+    }
+    for report_name, summary in expected.items():
+        with open(os.path.join(reports_dir, f"{report_name}.json"), "r") as f:
+            assert json.load(f) == json.loads(
+                json.dumps(summary)
+            ), f"{report_name} differs"
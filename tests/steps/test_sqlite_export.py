@@ -0,0 +1,185 @@
+import os
+import tempfile
+from behave import given, when, then
+
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.main import download_and_process_csv_files, streaming_row_sink
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.processor.sqlite_export import SQLiteExporter
+from icann_reports.processor.streaming import StreamingSink
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.content_store import ContentStore
+
+
+@given("an empty SQLite database")
+def step_empty_sqlite_database(context):
+    """Open an exporter on a new database in a temporary directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.sqlite_dir = temp_dir.name
+    context.sqlite_exporter = SQLiteExporter(
+        os.path.join(temp_dir.name, "reports.sqlite")
+    )
+    context.add_cleanup(context.sqlite_exporter.close)
+
+
+@when("I export the parsed reports to SQLite")
+@when("I export the parsed reports to SQLite again")
+def step_export_sqlite(context):
+    """Export every parsed report."""
+    context.sqlite_counts = context.sqlite_exporter.export(context.parsed_data)
+
+
+@when("I export one report with a row removed")
+def step_export_changed_report(context):
+    """Export one report again with its last row left out."""
+    file_name = sorted(context.parsed_data)[0]
+    context.sqlite_counts = context.sqlite_exporter.export(
+        {file_name: context.parsed_data[file_name][:-1]}
+    )
+
+
+@when(
+    'a streaming pipeline run over the served reports from "{start_date}" to '
+    '"{end_date}" exports them to SQLite'
+)
+def step_streaming_pipeline_export(context, start_date, end_date):
+    """Download and stream the served months into the database, as main() does."""
+    context.pipeline_urls = URLGenerator().generate_tld_urls(
+        [
+            {
+                "tld": context.pipeline_tld,
+                "base_url": context.pipeline_server.base_url,
+                "start_date": start_date,
+                "end_date": end_date,
+            }
+        ]
+    )
+    content_store = ContentStore(os.path.join(context.pipeline_dir, "store"))
+    download_and_process_csv_files(
+        context.pipeline_urls,
+        2,
+        content_store=content_store,
+        row_sink=streaming_row_sink(
+            StreamingSink(), context.sqlite_exporter, content_store
+        ),
+        data_dir=os.path.join(context.pipeline_dir, "downloads"),
+        cache_manager=CacheManager(
+            os.path.join(context.pipeline_dir, "processed.json")
+        ),
+    )
+
+
+@then("the export should have loaded {loaded:d} reports and skipped {skipped:d}")
+def step_check_export_counts(context, loaded, skipped):
+    """Check how many reports the last export loaded and skipped."""
+    assert context.sqlite_counts["loaded"] == loaded, context.sqlite_counts
+    assert context.sqlite_counts["skipped"] == skipped, context.sqlite_counts
+
+
+def query(context, sql, parameters=()):
+    """Run a query on the exported database."""
+    return context.sqlite_exporter.connection.execute(sql, parameters).fetchall()
+
+
+@then("the files table should list every parsed report")
+def step_check_files_table(context):
+    """Compare the files table with the parsed reports."""
+    files = {
+        file_name: row_count
+        for file_name, row_count in query(
+            context, "SELECT file_name, row_count FROM files"
+        )
+    }
+    assert files == {
+        file_name: len(rows) for file_name, rows in context.parsed_data.items()
+    }
+    assert set(context.sqlite_exporter.loaded_hashes()) == set(context.parsed_data)
+
+
+@then("the files table should hold the content hash of every served report")
+def step_check_served_hashes(context):
+    """Compare the recorded hashes with the hashes of the served files."""
+    served = {}
+    for url in context.pipeline_urls:
+        file_name = url.split("/")[-1]
+        served[file_name] = ContentStore.hash_file(
+            os.path.join(
+                context.pipeline_dir, "site", "mrr", context.pipeline_tld, file_name
+            )
+        )
+    assert dict(query(context, "SELECT file_name, content_hash FROM files")) == served
+
+
+@then("monthly_metrics should hold every parsed row")
+def step_check_metric_rows(context):
+    """Compare the metric rows of every report with its parsed rows."""
+    for file_name, rows in context.parsed_data.items():
+        stored = query(
+            context,
+            "SELECT m.iana_id, m.net_adds_1_yr FROM monthly_metrics m JOIN files f ON "
+            "f.id = m.file_id "
+            "WHERE f.file_name = ? ORDER BY m.row_number",
+            (file_name,),
+        )
+        assert len(stored) == len(rows)
+        for (iana_id, net_adds), row in zip(stored, rows):
+            assert iana_id == (row.get("IANA-ID") or None)
+            value = (row.get("Net-adds-1-yr") or "").strip()
+            try:
+                expected = int(value) if value else None
+            except ValueError:
+                expected = None
+            assert net_adds == expected, (net_adds, value)
+
+
+@then("monthly_metrics should hold one row fewer than was parsed")
+def step_check_replaced_rows(context):
+    """Check the changed report replaced its earlier rows."""
+    total = query(context, "SELECT COUNT(*) FROM monthly_metrics")[0][0]
+    assert total == sum(len(rows) for rows in context.parsed_data.values()) - 1, total
+
+
+@then("every registrar should be in the registrars table")
+def step_check_registrars_table(context):
+    """Compare the registrars table with the parsed IANA IDs."""
+    iana_ids = {
+        row["IANA-ID"]
+        for rows in context.parsed_data.values()
+        for row in rows
+        if row.get("IANA-ID")
+    }
+    assert {
+        iana_id for (iana_id,) in query(context, "SELECT iana_id FROM registrars")
+    } == iana_ids
+    assert query(context, "SELECT COUNT(*) FROM registrar_names")[0][0] >= len(iana_ids)
+
+
+@then("the tld_monthly_summary table should match the monthly data of the TLD summary")
+def step_check_tld_summary_table(context):
+    """Compare the SQL summaries with ReportGenerator's TLD summary."""
+    tld_summary = ReportGenerator(data_dir=context.sqlite_dir).generate_summary_by_tld(
+        context.parsed_data
+    )
+    rows = query(
+        context,
+        "SELECT tld, month, total_domains, new_additions, renewals, transfers, "
+        "deletions FROM tld_monthly_summary",
+    )
+    assert len(rows) == len(context.parsed_data)
+    for tld, month, *figures in rows:
+        monthly = tld_summary[tld.upper()]["monthly_data"][month.replace("-", "")]
+        names = ["total_domains", "new_additions", "renewals", "transfers", "deletions"]
+        assert dict(zip(names, figures)) == monthly, (tld, month, figures, monthly)
+
+
+@then('looking up a registrar\'s monthly metrics should use the index "{index_name}"')
+def step_check_index_used(context, index_name):
+    """Check the query plan of a registrar lookup."""
+    plan = query(
+        context,
+        "EXPLAIN QUERY PLAN SELECT * FROM monthly_metrics WHERE iana_id = ? AND tld = "
+        "?",
+        ("1", "com"),
+    )
+    assert any(index_name in detail for *_, detail in plan), plan
@@ -0,0 +1,196 @@
+import glob
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from behave import given, when, then
+
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.main import download_and_process_csv_files, write_streamed_reports
+from icann_reports.models.registrar_dictionary import RegistrarDictionary
+from icann_reports.processor.aggregation import ReportAggregator
+from icann_reports.processor.csv_processor import CSVProcessor
+from icann_reports.processor.field_validation import FieldValidator
+from icann_reports.processor.reports import ReportGenerator
+from icann_reports.processor.streaming import StreamingSink
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.metrics import MetricsRegistry
+
+
+@given(
+    'I have parsed synthetic reports for "{first_tld}" and "{second_tld}" from '
+    '"{start_date}" to "{end_date}" with noise'
+)
+def step_have_parsed_reports(context, first_tld, second_tld, start_date, end_date):
+    """Generate noisy synthetic reports and parse them."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    SyntheticReportGenerator(
+        tlds=[first_tld, second_tld],
+        start_date=start_date,
+        end_date=end_date,
+        registrar_count=25,
+        noise=0.05,
+        seed=41,
+    ).generate(temp_dir.name)
+    processor = CSVProcessor(
+        cache_manager=CacheManager(cache_file=os.path.join(temp_dir.name, "cache.json"))
+    )
+    context.parsed_data = {}
+    for path in sorted(
+        glob.glob(os.path.join(temp_dir.name, "**", "*.csv"), recursive=True)
+    ):
+        context.parsed_data.update(processor.process_csv((path, False)))
+
+
+def new_sink():
+    """Create a streaming sink with its own aggregate."""
+    return StreamingSink(
+        FieldValidator(), ReportAggregator(), metrics=MetricsRegistry()
+    )
+
+
+@when("I stream the parsed reports one at a time into a sink")
+def step_stream_reports(context):
+    """Hand each report to the sink in turn."""
+    context.sink = new_sink()
+    for file_name, rows in context.parsed_data.items():
+        context.sink.consume({file_name: rows})
+
+
+@when("I stream the parsed reports from {count:d} threads into a sink")
+def step_stream_reports_concurrently(context, count):
+    """Hand the reports to the sink from several threads at once."""
+    context.sink = new_sink()
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        list(
+            executor.map(
+                lambda item: context.sink.consume(dict([item])),
+                context.parsed_data.items(),
+            )
+        )
+
+
+def newest_first(parsed_data):
+    """Get the parsed reports with the latest months first."""
+    return dict(
+        sorted(
+            parsed_data.items(),
+            key=lambda item: item[0].split("-")[2],
+            reverse=True,
+        )
+    )
+
+
+def report_generator_in(context, backend):
+    """Create a report generator with its own registrar dictionary and directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    return ReportGenerator(
+        data_dir=temp_dir.name,
+        backend=backend,
+        registrar_dictionary=RegistrarDictionary(),
+    )
+
+
+@when(
+    "I stream the parsed reports newest first into a sink writing reports with the "
+    '"{backend}" backend'
+)
+def step_stream_reports_newest_first(context, backend):
+    """Stream the reports in reverse month order and write the aggregate."""
+    context.sink = StreamingSink(
+        None, ReportAggregator(report_generator_in(context, backend))
+    )
+    for file_name, rows in newest_first(context.parsed_data).items():
+        context.sink.consume({file_name: rows})
+    context.streamed_reports = context.sink.aggregator.write_reports()
+
+
+@when(
+    'I generate all reports from the parsed reports newest first with the "{backend}" '
+    "backend"
+)
+def step_generate_reports_newest_first(context, backend):
+    """Generate every report from all the data, in reverse month order."""
+    context.generated_reports = report_generator_in(
+        context, backend
+    ).generate_all_reports(newest_first(context.parsed_data))
+
+
+@then("the streamed validation results should equal validating all data at once")
+def step_check_streamed_validation(context):
+    """Compare the sink's validation results with batch validation."""
+    expected = FieldValidator().validate_data(context.parsed_data)
+    assert any(
+        results["invalid_rows"] for results in expected.values()
+    ), "Expected some invalid rows"
+    assert context.sink.validation_results == expected
+
+
+@then("the streamed TLD summary should equal the TLD summary of all data")
+def step_check_streamed_tld_summary(context):
+    """Compare the sink's TLD summary with the batch summary."""
+    expected = ReportGenerator().generate_summary_by_tld(context.parsed_data)
+    actual = context.sink.aggregator.tld_summary()
+    assert actual == expected, f"Expected {expected}, got {actual}"
+
+
+@then("the sink should have streamed {count:d} reports")
+def step_check_streamed_count(context, count):
+    """Check the number of reports and rows streamed."""
+    assert (
+        context.sink.files == count
+    ), f"Expected {count} reports, got {context.sink.files}"
+    expected_rows = sum(len(rows) for rows in context.parsed_data.values())
+    assert context.sink.rows == expected_rows
+    assert context.sink.metrics.get_counter("rows_streamed_total") == expected_rows
+
+
+@then("every streamed report should equal the report generated from all data at once")
+def step_check_streamed_reports(context):
+    """Compare the contents of every report written by both paths."""
+    assert set(context.streamed_reports) == set(context.generated_reports)
+    for report_name, report_path in context.generated_reports.items():
+        with open(report_path) as f:
+            expected = json.load(f)
+        with open(context.streamed_reports[report_name]) as f:
+            actual = json.load(f)
+        assert actual == expected, f"The streamed {report_name} differs"
+
+
+@when(
+    'a streaming pipeline run over the served reports from "{start_date}" to '
+    '"{end_date}" writes the reports'
+)
+def step_streaming_pipeline_run(context, start_date, end_date):
+    """Download and stream the served months into an aggregate, as main() does."""
+    urls = URLGenerator().generate_tld_urls(
+        [
+            {
+                "tld": context.pipeline_tld,
+                "base_url": context.pipeline_server.base_url,
+                "start_date": start_date,
+                "end_date": end_date,
+            }
+        ]
+    )
+    cache_manager = CacheManager(os.path.join(context.pipeline_dir, "processed.json"))
+    sink = StreamingSink(
+        aggregator=ReportAggregator(
+            ReportGenerator(
+                data_dir=os.path.join(context.pipeline_dir, "output"),
+                registrar_dictionary=RegistrarDictionary(),
+            )
+        )
+    )
+    download_and_process_csv_files(
+        urls,
+        2,
+        reparse_processed=True,
+        row_sink=sink.consume,
+        data_dir=os.path.join(context.pipeline_dir, "downloads"),
+        cache_manager=cache_manager,
+    )
+    context.pipeline_reports = write_streamed_reports(sink, urls, cache_manager)
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from behave import given, when, then
+
+from icann_reports.utils.tracing import TraceRecorder
+
+
+@given("I have an enabled trace recorder")
+def step_have_enabled_tracer(context):
+    """Create a trace recorder that records events."""
+    context.tracer = TraceRecorder(enabled=True)
+
+
+@given("I have a disabled trace recorder")
+def step_have_disabled_tracer(context):
+    """Create a trace recorder that ignores events."""
+    context.tracer = TraceRecorder()
+
+
+@when('I record a "{name}" span for {count:d} files in worker threads')
+def step_record_spans_in_workers(context, name, count):
+    """Record one span per file from a thread pool."""
+
+    def task(file_name):
+        with context.tracer.span(name, cat="parse", file=file_name):
+            return sum(range(1000))
+
+    file_names = [
+        f"com-transactions-2024{month:02d}-en.csv" for month in range(1, count + 1)
+    ]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(task, file_names))
+
+
+@when("I write the trace to a file")
+def step_write_trace(context):
+    """Write the trace and load it back."""
+    context.temp_dir = tempfile.TemporaryDirectory()
+    path = context.tracer.write(os.path.join(context.temp_dir.name, "trace.json"))
+    with open(path) as f:
+        context.trace = json.load(f)
+
+
+@then('the trace file should contain {count:d} complete "{name}" events')
+def step_check_trace_event_count(context, count, name):
+    """Check the number of complete events with a name."""
+    events = [
+        e for e in context.trace["traceEvents"] if e["ph"] == "X" and e["name"] == name
+    ]
+    assert len(events) == count, f"Expected {count} {name} events, got {len(events)}"
+
+
+@then('each "{name}" event should be tagged with a file name, process ID and thread ID')
+def step_check_trace_event_tags(context, name):
+    """Check that the events carry the details Perfetto needs."""
+    for event in context.trace["traceEvents"]:
+        if event["name"] == name:
+            assert event["args"]["file"].endswith(".csv"), "Missing file name"
+            assert event["pid"] == os.getpid(), "Incorrect process ID"
+            assert isinstance(event["tid"], int), "Missing thread ID"
+            assert event["dur"] >= 0, "Negative duration"
+
+
+@then("the trace should name the worker threads")
+def step_check_trace_thread_names(context):
+    """Check that thread name metadata was recorded."""
+    names = [e["args"]["name"] for e in context.trace["traceEvents"] if e["ph"] == "M"]
+    assert names, "No thread name metadata recorded"
+    assert all(
+        name.startswith("ThreadPoolExecutor") for name in names
+    ), f"Unexpected thread names: {names}"
+
+
+@then("the trace recorder should have no events")
+def step_check_no_trace_events(context):
+    """Check that nothing was recorded."""
+    assert context.tracer.events == [], "Events were recorded"
@@ -1,3 +1,7 @@
+import json
+import os
+import tempfile
+
 import pytest
 from behave import given, when, then
 
@@ -30,6 +34,58 @@ def step_generate_urls(context):
     context.urls = context.url_generator.generate_tld_urls(context.tld_configs)
 
 
+@when("I generate the interleaved URLs")
+def step_generate_interleaved_urls(context):
+    """Generate URLs interleaved across the TLD configurations."""
+    context.url_generator = URLGenerator()
+    context.urls = context.url_generator.generate_interleaved_urls(context.tld_configs)
+
+
+@given(
+    'I have a TLD manifest listing "{first_tld}" and "{second_tld}" from '
+    '"{start_date}" to "{end_date}"'
+)
+def step_have_tld_manifest(context, first_tld, second_tld, start_date, end_date):
+    """Write a manifest with one plain TLD and one TLD with its own date range."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.manifest_path = os.path.join(temp_dir.name, "tlds.json")
+    with open(context.manifest_path, "w") as f:
+        json.dump(
+            [
+                first_tld,
+                {"tld": second_tld, "start_date": start_date, "end_date": end_date},
+            ],
+            f,
+        )
+
+
+@when('I load the manifest with a default range from "{start_date}" to "{end_date}"')
+def step_load_tld_manifest(context, start_date, end_date):
+    """Load the TLD configurations from the manifest."""
+    context.tld_configs = URLGenerator.load_tld_manifest(
+        context.manifest_path, start_date, end_date
+    )
+
+
+@then('the URLs should be for the TLDs "{tlds}" in that order')
+def step_check_url_tld_order(context, tlds):
+    """Check the TLD of each URL, in order."""
+    expected = [tld.strip() for tld in tlds.split(",")]
+    actual = [url.split("/mrr/")[1].split("/")[0] for url in context.urls]
+    assert actual == expected, f"Expected TLD order {expected}, got {actual}"
+
+
+@then('the "{tld}" URLs should include the months "{month1}" and "{month2}"')
+def step_check_tld_months(context, tld, month1, month2):
+    """Check that a TLD's URLs cover exactly the given months."""
+    months = sorted(
+        url.split("-transactions-")[1][:6] for url in context.urls if f"/{tld}/" in url
+    )
+    expected = [month1, month2]
+    assert months == expected, f"Expected months {expected} for {tld}, got {months}"
+
+
 @then('I should get {count:d} URLs for the "{tld}" TLD')
 def step_check_url_count_for_tld(context, count, tld):
     """Check that the correct number of URLs were generated for the specified TLD."""
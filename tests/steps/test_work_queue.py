@@ -0,0 +1,269 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from behave import given, when, then
+
+from icann_reports.benchmark.local_server import LocalReportServer, QuietRequestHandler
+from icann_reports.benchmark.synthetic import SyntheticReportGenerator
+from icann_reports.downloader.retry import RetryScheduler
+from icann_reports.downloader.url_generator import URLGenerator
+from icann_reports.main import download_and_process_csv_files, process_work_queue
+from icann_reports.utils.cache import CacheManager
+from icann_reports.utils.metrics import MetricsRegistry
+from icann_reports.utils.work_queue import LeaseWorkQueue
+
+REPORT_URL = (
+    "https://www.icann.org/sites/default/files/mrr/com/com-transactions-{date}-en.csv"
+)
+
+
+class MonthUnavailableServer(LocalReportServer):
+    """Local report server that fails the first request for one month."""
+
+    def __init__(self, root_dir, month):
+        """Serve a directory, failing the first request of a YYYYMM month."""
+        super().__init__(root_dir)
+        self.month = month
+
+    def make_handler(self):
+        """Create a handler that answers the month's first request with 503."""
+        failed = threading.Event()
+        root_dir = self.root_dir
+        month = self.month
+
+        class MonthUnavailableHandler(QuietRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=root_dir, **kwargs)
+
+            def do_GET(self):
+                if month in self.path and not failed.is_set():
+                    failed.set()
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                super().do_GET()
+
+        return MonthUnavailableHandler
+
+
+def queue_worker(queue_dir, worker_id, claims_dir):
+    """Claim and finish tasks one at a time until the queue is finished."""
+    queue = LeaseWorkQueue(queue_dir, worker_id, lease_seconds=30)
+    while not queue.finished():
+        for lease in queue.claim(1):
+            with open(os.path.join(claims_dir, f"{lease.task_id}.{worker_id}"), "w"):
+                pass
+            time.sleep(0.01)
+            queue.complete(lease)
+
+
+def create_queue(context, count, lease_seconds):
+    """Create a queue of report URLs in a temporary directory."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.queue_dir = os.path.join(temp_dir.name, "queue")
+    context.claims_dir = os.path.join(temp_dir.name, "claims")
+    os.makedirs(context.claims_dir)
+    context.lease_seconds = lease_seconds
+    context.metrics = MetricsRegistry()
+    context.queue_urls = [
+        REPORT_URL.format(date=f"2024{month:02d}") for month in range(1, 13)
+    ][:count]
+    LeaseWorkQueue(context.queue_dir, "planner", lease_seconds).enqueue(
+        context.queue_urls
+    )
+    context.worker_leases = {}
+
+
+@given("a shared work queue with {count:d} report URLs")
+def step_have_work_queue(context, count):
+    """Create a work queue with the default lease time."""
+    create_queue(context, count, 30)
+
+
+@given(
+    "a shared work queue with {count:d} report URLs and leases of {seconds:g} seconds"
+)
+def step_have_work_queue_with_leases(context, count, seconds):
+    """Create a work queue with a given lease time."""
+    create_queue(context, count, seconds)
+
+
+def worker_queue(context, worker_id):
+    """Open the queue as a named worker."""
+    return LeaseWorkQueue(
+        context.queue_dir, worker_id, context.lease_seconds, context.metrics
+    )
+
+
+@when("{count:d} worker processes work through the queue")
+def step_run_worker_processes(context, count):
+    """Run worker processes against the queue and wait for them."""
+    fork = multiprocessing.get_context("fork")
+    workers = [
+        fork.Process(
+            target=queue_worker,
+            args=(context.queue_dir, f"worker-{i}", context.claims_dir),
+        )
+        for i in range(count)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0, f"Worker exited with {worker.exitcode}"
+
+
+@when('worker "{worker_id}" claims {count:d} task')
+@when('worker "{worker_id}" claims {count:d} tasks')
+def step_worker_claims(context, worker_id, count):
+    """Claim tasks as a named worker."""
+    context.worker_leases[worker_id] = worker_queue(context, worker_id).claim(count)
+
+
+@when("{seconds:g} seconds pass")
+def step_seconds_pass(context, seconds):
+    """Wait, without renewing any leases."""
+    time.sleep(seconds)
+
+
+@when(
+    'worker "{worker_id}" claims {count:d} task and keeps it alive for {seconds:g} '
+    "seconds"
+)
+def step_worker_claims_and_renews(context, worker_id, count, seconds):
+    """Claim tasks and renew their leases in the background for a while."""
+    queue = worker_queue(context, worker_id)
+    leases = queue.claim(count)
+    with queue.keep_alive(leases):
+        time.sleep(seconds)
+    context.worker_leases[worker_id] = leases
+
+
+@given("a local report server whose {month} report first answers with HTTP 503")
+def step_have_month_unavailable_server(context, month):
+    """Generate reports and serve them, failing one month's first request."""
+    temp_dir = tempfile.TemporaryDirectory()
+    context.add_cleanup(temp_dir.cleanup)
+    context.temp_dir = temp_dir.name
+    SyntheticReportGenerator(
+        tlds=["com"],
+        start_date="2024-01",
+        end_date="2024-02",
+        registrar_count=5,
+        seed=4,
+    ).generate(os.path.join(temp_dir.name, "site"))
+    context.report_server = MonthUnavailableServer(
+        os.path.join(temp_dir.name, "site"), month.replace("-", "")
+    ).start()
+    context.add_cleanup(context.report_server.stop)
+
+
+@given("a shared work queue of its reports from {start_date} to {end_date}")
+def step_have_work_queue_of_served_reports(context, start_date, end_date):
+    """Enqueue the served reports in month order."""
+    context.queue_dir = os.path.join(context.temp_dir, "queue")
+    context.lease_seconds = 30
+    context.metrics = MetricsRegistry()
+    context.queue_urls = URLGenerator().generate_tld_urls(
+        [
+            {
+                "tld": "com",
+                "base_url": context.report_server.base_url,
+                "start_date": start_date,
+                "end_date": end_date,
+            }
+        ]
+    )
+    LeaseWorkQueue(context.queue_dir, "planner").enqueue(context.queue_urls)
+
+
+@when("this worker processes the queue one report per batch with one retry scheduler")
+def step_process_queue_with_shared_scheduler(context):
+    """Process every batch with the same scheduler, as main() does."""
+    context.retry_scheduler = RetryScheduler(metrics=context.metrics)
+    context.add_cleanup(context.retry_scheduler.close)
+    data_dir = os.path.join(context.temp_dir, "downloads")
+    os.makedirs(data_dir)
+    cache_manager = CacheManager(os.path.join(context.temp_dir, "cache.json"))
+    context.parsed = {}
+
+    def process_batch(batch_urls):
+        batch_data = download_and_process_csv_files(
+            batch_urls,
+            1,
+            metrics=context.metrics,
+            retry_scheduler=context.retry_scheduler,
+            reparse_processed=True,
+            data_dir=data_dir,
+            cache_manager=cache_manager,
+        )
+        context.parsed.update(batch_data)
+        return batch_data
+
+    queue = LeaseWorkQueue(
+        context.queue_dir, "worker", context.lease_seconds, context.metrics
+    )
+    worker = threading.Thread(
+        target=process_work_queue, args=(queue, 1, process_batch), daemon=True
+    )
+    worker.start()
+    worker.join(30)
+    assert not worker.is_alive(), "The worker did not finish the queue"
+
+
+@then("every task in the queue should be finished")
+def step_check_queue_finished(context):
+    """Check that no task is left waiting or leased."""
+    stats = LeaseWorkQueue(context.queue_dir, "checker").stats()
+    assert (
+        stats["done"] == stats["total"] == len(context.queue_urls)
+    ), f"Unexpected queue state: {stats}"
+
+
+@then("each task should have been claimed exactly once")
+def step_check_single_claims(context):
+    """Check that no two workers processed the same task."""
+    claimed_tasks = [entry.split(".")[0] for entry in os.listdir(context.claims_dir)]
+    assert len(claimed_tasks) == len(
+        context.queue_urls
+    ), f"Expected {len(context.queue_urls)} claims, got {len(claimed_tasks)}"
+    assert len(set(claimed_tasks)) == len(
+        claimed_tasks
+    ), "A task was claimed more than once"
+
+
+@then('worker "{worker_id}" should hold {count:d} leases')
+def step_check_worker_leases(context, worker_id, count):
+    """Check the number of leases a worker obtained."""
+    actual = len(context.worker_leases[worker_id])
+    assert (
+        actual == count
+    ), f"Expected worker {worker_id} to hold {count} leases, got {actual}"
+
+
+@then("{count:d} lease should have been taken over after expiring")
+def step_check_expired_leases(context, count):
+    """Check how many expired leases were taken over."""
+    actual = context.metrics.get_counter("queue_tasks_total", result="lease_expired")
+    assert actual == count, f"Expected {count} expired leases taken over, got {actual}"
+
+
+@then("every queued report should have been parsed")
+def step_check_queued_reports_parsed(context):
+    """Check that each queued report produced rows."""
+    expected = {url.split("/")[-1] for url in context.queue_urls}
+    assert set(context.parsed) == expected, f"Parsed {sorted(context.parsed)}"
+    assert all(context.parsed.values()), "A queued report has no rows"
+
+
+@then("the shared retry scheduler should have granted {count:d} retry")
+def step_check_shared_scheduler_retries(context, count):
+    """Check the retries taken from the run's budget."""
+    assert (
+        context.retry_scheduler.retries_used == count
+    ), f"Expected {count} retries, got {context.retry_scheduler.retries_used}"